@@ -0,0 +1,329 @@
+"""
+Async Database Connection Module for Hospital OLTP System
+asyncio counterpart of database_connection.py built on mysql.connector.aio
+
+Connections come from an async pool (one per event loop and database) sized
+by POOL_CONFIG, so many concurrent coroutines share a few connections without
+a thread pool. Logging and return values match DatabaseConnection: methods
+log errors and return False/None instead of raising.
+
+Usage:
+    async with AsyncDatabaseConnection() as db:
+        rows = await db.execute_select("SELECT * FROM appointments WHERE doctor_id = %s", (7,))
+"""
+
+import asyncio
+import time
+import weakref
+from collections import deque
+from itertools import islice
+
+import mysql.connector.aio
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+from database_connection import BATCH_CONFIG, DATABASE_NAME, DB_CONFIG, POOL_CONFIG, logger
+from row_factories import ROW_TYPES, build_rows
+
+
+class AsyncPooledConnection:
+    """Proxy around a pooled async MySQL connection; close() returns it to the pool"""
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self.created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    async def close(self):
+        """Return the connection to the pool instead of closing it"""
+        if self._connection is not None:
+            await self._pool.release(self)
+
+    def raw_connection(self):
+        """Underlying mysql.connector.aio connection"""
+        return self._connection
+
+
+class AsyncConnectionPool:
+    """asyncio MySQL connection pool with health checks and recycling"""
+
+    def __init__(self, config, pool_size=5, max_lifetime=1800,
+                 checkout_timeout=30, health_check=True):
+        self.config = config
+        self.pool_size = pool_size
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self._idle = deque()
+        self._open_count = 0
+        self._closed = False
+        self._condition = asyncio.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'failed_health_checks': 0,
+            'checkout_waits': 0,
+            'checkout_timeouts': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0
+        }
+
+    async def _create_connection(self):
+        """Open a new physical connection"""
+        connection = await mysql.connector.aio.connect(**self.config)
+        self._stats['connections_created'] += 1
+        return connection, time.monotonic()
+
+    async def _close_quietly(self, connection):
+        try:
+            await connection.close()
+        except Exception:
+            pass
+
+    async def _free_slot(self):
+        async with self._condition:
+            self._open_count -= 1
+            self._condition.notify()
+
+    async def _abandon(self, connection):
+        """Close a half-checked-out connection (if any) and free its slot"""
+        if connection is not None:
+            await self._close_quietly(connection)
+        await self._free_slot()
+
+    async def _is_healthy(self, connection):
+        """Ping the server without reconnecting"""
+        try:
+            await connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    async def get_connection(self):
+        """Borrow a connection, waiting up to checkout_timeout seconds"""
+        start = time.monotonic()
+        waited = False
+        async with self._condition:
+            while not self._idle and self._open_count >= self.pool_size:
+                waited = True
+                remaining = self.checkout_timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats['checkout_timeouts'] += 1
+                    raise PoolError(f"No connection available after {self.checkout_timeout}s "
+                                    f"(pool size {self.pool_size})")
+                try:
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            if self._idle:
+                connection, created_at = self._idle.popleft()
+            else:
+                connection, created_at = None, None
+                self._open_count += 1
+
+        # Single-threaded event loop: the counters need no lock
+        wait_time = time.monotonic() - start
+        self._stats['checkouts'] += 1
+        if waited:
+            self._stats['checkout_waits'] += 1
+        self._stats['total_wait_time'] += wait_time
+        self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait_time)
+
+        try:
+            if connection is not None:
+                if time.monotonic() - created_at > self.max_lifetime:
+                    await self._close_quietly(connection)
+                    connection = None
+                    self._stats['connections_recycled'] += 1
+                elif self.health_check and not await self._is_healthy(connection):
+                    await self._close_quietly(connection)
+                    connection = None
+                    self._stats['failed_health_checks'] += 1
+            if connection is None:
+                connection, created_at = await self._create_connection()
+        except BaseException:
+            # Also on cancellation or a timeout around connect(): without the slot the pool shrinks for good.
+            # Shielded so a second cancellation can't interrupt the cleanup.
+            await asyncio.shield(self._abandon(connection))
+            raise
+
+        return AsyncPooledConnection(self, connection, created_at)
+
+    async def release(self, pooled):
+        """Return a borrowed connection to the pool"""
+        connection = pooled._connection
+        pooled._connection = None
+        if self._closed:
+            # Borrowed before close_all(); nothing will lend it out again
+            await self._abandon(connection)
+            return
+        try:
+            if await connection.is_connected():
+                if connection.in_transaction:
+                    await connection.rollback()
+            else:
+                await self._close_quietly(connection)
+                await self._free_slot()
+                return
+        except Error:
+            await self._close_quietly(connection)
+            await self._free_slot()
+            return
+        async with self._condition:
+            if not self._closed:
+                self._idle.append((connection, pooled.created_at))
+                self._condition.notify()
+                return
+        await self._abandon(connection)
+
+    async def close_all(self):
+        """Close every idle connection; borrowed ones are closed when released"""
+        async with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open_count -= len(idle)
+            self._condition.notify_all()
+        for connection, _ in idle:
+            await self._close_quietly(connection)
+
+    def stats(self):
+        """Return pool usage and wait-time metrics"""
+        stats = dict(self._stats)
+        stats['open_connections'] = self._open_count
+        stats['idle_connections'] = len(self._idle)
+        stats['in_use'] = self._open_count - len(self._idle)
+        checkouts = stats['checkouts']
+        stats['avg_wait_time'] = stats['total_wait_time'] / checkouts if checkouts else 0.0
+        return stats
+
+
+# asyncio primitives belong to one event loop, so pools are kept per loop
+_async_pools = weakref.WeakKeyDictionary()
+
+
+def get_async_pool(use_database=True):
+    """Return the running loop's pool for the server or the hospital database"""
+    pools = _async_pools.setdefault(asyncio.get_running_loop(), {})
+    key = DATABASE_NAME if use_database else None
+    if key not in pools:
+        config = DB_CONFIG.copy()
+        if use_database:
+            config['database'] = DATABASE_NAME
+        pools[key] = AsyncConnectionPool(config, **POOL_CONFIG)
+    return pools[key]
+
+
+async def get_async_connection(use_database=True):
+    """Borrow a pooled async connection; await close() on it to return it"""
+    return await get_async_pool(use_database).get_connection()
+
+
+async def close_all_async_pools():
+    """Close the running loop's pools; connections still borrowed are closed when released"""
+    pools = _async_pools.pop(asyncio.get_running_loop(), {})
+    for pool in pools.values():
+        await pool.close_all()
+
+
+def get_async_pool_stats():
+    """Return stats for the running loop's pools"""
+    pools = _async_pools.get(asyncio.get_running_loop(), {})
+    return {key or 'server': pool.stats() for key, pool in pools.items()}
+
+
+class AsyncDatabaseConnection:
+    """Async database connection manager with async context manager support"""
+
+    def __init__(self, use_database=True, row_factory='dict'):
+        if row_factory not in ROW_TYPES:
+            raise ValueError(f"Unknown row factory {row_factory!r}; expected one of {', '.join(ROW_TYPES)}")
+        self.connection = None
+        self.cursor = None
+        self.use_database = use_database
+        self.row_factory = row_factory
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        await self.close()
+        return False
+
+    async def connect(self):
+        """Borrow a connection from the event loop's pool"""
+        try:
+            self.connection = await get_async_connection(self.use_database)
+            self.cursor = await self.connection.cursor()
+            logger.info(f"Successfully connected to MySQL Server version {self.connection.get_server_info()}")
+            return True
+        except Error as e:
+            logger.error(f"Error connecting to MySQL: {e}")
+            return False
+
+    async def close(self):
+        """Return database connection to the pool"""
+        if self.cursor:
+            await self.cursor.close()
+            self.cursor = None
+        if self.connection:
+            await self.connection.close()
+            self.connection = None
+            logger.info("MySQL connection returned to pool")
+
+    async def execute_query(self, query, params=None):
+        """Execute a query that doesn't return results (INSERT, UPDATE, DELETE)"""
+        try:
+            await self.cursor.execute(query, params or ())
+            await self.connection.commit()
+            logger.info(f"Query executed successfully: {self.cursor.rowcount} rows affected")
+            return True
+        except Error as e:
+            logger.error(f"Error executing query: {e}")
+            await self.connection.rollback()
+            return False
+
+    async def execute_select(self, query, params=None, row_factory=None):
+        """Execute a SELECT query and return results ('dict' rows unless row_factory says otherwise)"""
+        try:
+            await self.cursor.execute(query, params or ())
+            rows = await self.cursor.fetchall()
+            return build_rows(self.cursor.column_names, rows, row_factory or self.row_factory)
+        except Error as e:
+            logger.error(f"Error executing SELECT query: {e}")
+            return None
+
+    async def execute_many(self, query, data_list, chunk_size=None):
+        """Execute multiple queries with different parameters, committed in chunks
+
+        A failed chunk is rolled back and logged; the remaining chunks still run.
+        """
+        chunk_size = chunk_size or BATCH_CONFIG['max_batch_rows']
+        rows = iter(data_list)
+        committed = 0
+        failed = 0
+        start = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            try:
+                await self.cursor.executemany(query, chunk)
+                await self.connection.commit()
+                committed += len(chunk)
+            except Error as e:
+                logger.error(f"Error executing batch rows {start}-{start + len(chunk) - 1}: {e}")
+                await self.connection.rollback()
+                failed += len(chunk)
+            start += len(chunk)
+        if failed:
+            return False
+        logger.info(f"Batch executed successfully: {committed} rows affected")
+        return True
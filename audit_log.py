@@ -0,0 +1,545 @@
+"""
+Hospital OLTP System - Audit Log Partitions, Writer and Queries
+================================================================
+
+audit_logs is range-partitioned by month on TO_DAYS(timestamp):
+
+    p_history | p202501 | p202502 | ... | p<current + months_ahead> | p_future
+
+- ensure_partitions() splits the (empty) p_future partition into the coming
+  months, so inserts never land in a catch-all partition.
+- purge_partitions() drops whole partitions older than the retention period;
+  a purge is a metadata operation instead of a full-table DELETE.
+- migrate_audit_logs() brings an existing audit_logs table to this layout.
+
+old_values/new_values are native JSON. Virtual generated columns expose the
+patient (patient_id) and the field names an event touched (changed_fields),
+indexed as (patient_id, timestamp) and (patient_id, multi-valued
+changed_fields). audit_history() and field_history() query through them, so
+"all changes to patient 123's phone" is an index range scan.
+
+AuditWriter takes audit events off the request path: log() only appends to an
+in-memory queue, and a background thread writes the queue in multi-row
+INSERTs (up to batch_size rows or every flush_interval seconds) over a pooled
+connection. Failed batches are retried, then counted as dropped and logged.
+
+Usage:
+    python audit_log.py --status
+    python audit_log.py --rotate --months-ahead 3 --retention-months 84
+    python audit_log.py --migrate
+    python audit_log.py --history 123 --field phone
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+from mysql.connector import Error
+from database_connection import DatabaseConnection, get_connection, logger
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+AUDIT_CONFIG = {
+    'months_ahead': 3,              # Future monthly partitions kept ready
+    'retention_months': 84,         # Partitions older than this are dropped
+    'batch_size': 500,              # Events per multi-row INSERT
+    'flush_interval': 0.2,          # Seconds an event may wait for a fuller batch
+    'queue_size': 100000,           # Events buffered before log() starts dropping
+    'block_when_full': False,       # Wait for queue space instead of dropping
+    'max_retries': 3                # Write attempts per batch after the first
+}
+
+AUDIT_TABLE = 'audit_logs'
+AUDIT_COLUMNS = ('table_name', 'record_id', 'action', 'user_id', 'user_type', 'old_values', 'new_values',
+                 'ip_address', 'user_agent', 'timestamp')
+INSERT_AUDIT_EVENTS = (f"INSERT INTO {AUDIT_TABLE} ({', '.join(AUDIT_COLUMNS)}) "
+                       f"VALUES ({', '.join(['%s'] * len(AUDIT_COLUMNS))})")
+
+# Same definitions as create_schema.sql, for migrating existing tables
+AUDIT_GENERATED_COLUMNS = {
+    'patient_id': "INT AS (CASE WHEN table_name = 'patients' THEN record_id "
+                  "ELSE JSON_VALUE(COALESCE(new_values, old_values), '$.patient_id' "
+                  "RETURNING UNSIGNED NULL ON EMPTY NULL ON ERROR) END) VIRTUAL",
+    'changed_fields': "JSON AS (JSON_KEYS(JSON_REMOVE(COALESCE(new_values, old_values), '$.patient_id'))) VIRTUAL"
+}
+
+# Indexes of the migrated table; anything else found on an unpartitioned audit_logs is dropped
+AUDIT_INDEXES = {
+    'idx_audit_record': '(table_name, record_id)',
+    'idx_audit_user': '(user_id)',
+    'idx_audit_patient': '(patient_id, timestamp)',
+    'idx_audit_patient_field': '(patient_id, (CAST(changed_fields AS CHAR(64) ARRAY)))'
+}
+
+# Kept in UPDATE values even when unchanged, so patient_id can be derived
+IDENTITY_FIELDS = ('patient_id',)
+
+FIELD_NAME = re.compile(r'^\w{1,64}$')
+
+
+# ---- partitions --------------------------------------------------------------
+
+def to_days(day):
+    """MySQL TO_DAYS() of a date"""
+    return day.toordinal() + 365
+
+
+def from_days(days):
+    """MySQL FROM_DAYS()"""
+    return date.fromordinal(days - 365)
+
+
+def month_start(day, offset=0):
+    """First day of the month offset months from day's month"""
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(start):
+    return f"p{start:%Y%m}"
+
+
+def monthly_partitions(first, last):
+    """Partition definitions for each month from first up to (excluding) last"""
+    definitions = []
+    start = first
+    while start < last:
+        end = month_start(start, 1)
+        definitions.append(f"PARTITION {partition_name(start)} VALUES LESS THAN ({to_days(end)})")
+        start = end
+    return definitions
+
+
+def list_partitions(cursor):
+    """[(name, upper bound date or None for MAXVALUE, approximate rows)] in order"""
+    cursor.execute("SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS FROM information_schema.PARTITIONS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY PARTITION_ORDINAL_POSITION",
+                   (AUDIT_TABLE,))
+    partitions = []
+    for name, description, rows in cursor.fetchall():
+        if name is None:
+            return []
+        bound = None if description == 'MAXVALUE' else from_days(int(description))
+        partitions.append((name, bound, rows))
+    return partitions
+
+
+def ensure_partitions(cursor, months_ahead=None, dry_run=False):
+    """Split p_future so monthly partitions exist through months_ahead; return the statements"""
+    months_ahead = AUDIT_CONFIG['months_ahead'] if months_ahead is None else months_ahead
+    partitions = list_partitions(cursor)
+    if not partitions:
+        raise ValueError(f"{AUDIT_TABLE} is not partitioned; run with --migrate first")
+    bounds = [bound for _, bound, _ in partitions if bound is not None]
+    last = month_start(date.today(), months_ahead + 1)
+    if partitions[-1][1] is not None or not bounds or bounds[-1] >= last:
+        return []
+    definitions = monthly_partitions(bounds[-1], last)
+    statement = (f"ALTER TABLE {AUDIT_TABLE} REORGANIZE PARTITION {partitions[-1][0]} INTO (\n    "
+                 + ',\n    '.join(definitions + ["PARTITION p_future VALUES LESS THAN MAXVALUE"]) + "\n)")
+    if not dry_run:
+        cursor.execute(statement)
+        logger.info(f"Added {len(definitions)} monthly partitions to {AUDIT_TABLE}")
+    return [statement]
+
+
+def purge_partitions(cursor, retention_months=None, dry_run=False):
+    """Drop partitions whose rows are all older than the retention period; return the statements"""
+    retention_months = AUDIT_CONFIG['retention_months'] if retention_months is None else retention_months
+    cutoff = month_start(date.today(), -retention_months)
+    partitions = list_partitions(cursor)
+    expired = [name for name, bound, _ in partitions if bound is not None and bound <= cutoff]
+    # Keep at least one bounded partition ahead of p_future
+    if expired and len(expired) == len([p for p in partitions if p[1] is not None]):
+        expired = expired[:-1]
+    if not expired:
+        return []
+    statement = f"ALTER TABLE {AUDIT_TABLE} DROP PARTITION {', '.join(expired)}"
+    if not dry_run:
+        cursor.execute(statement)
+        logger.info(f"Dropped {len(expired)} audit partitions older than {cutoff}")
+    return [statement]
+
+
+def rotate_partitions(months_ahead=None, retention_months=None, dry_run=False):
+    """Add upcoming monthly partitions and drop expired ones"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        statements = ensure_partitions(cursor, months_ahead, dry_run)
+        statements += purge_partitions(cursor, retention_months, dry_run)
+        cursor.close()
+        if dry_run:
+            for statement in statements:
+                print(f"   (dry run) {statement}")
+        return True
+    except (Error, ValueError) as e:
+        logger.error(f"Error rotating audit partitions: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def _quote_invalid_json(cursor):
+    """Wrap TEXT values that aren't valid JSON as JSON strings so the columns can become JSON"""
+    for column in ('old_values', 'new_values'):
+        cursor.execute(f"UPDATE {AUDIT_TABLE} SET {column} = JSON_QUOTE({column}) "
+                       f"WHERE {column} IS NOT NULL AND NOT JSON_VALID({column})")
+        if cursor.rowcount:
+            logger.warning(f"Stored {cursor.rowcount} non-JSON {column} values as JSON strings")
+
+
+def migrate_audit_logs(months_ahead=None):
+    """Bring an existing audit_logs to the current layout in one ALTER
+
+    Converts old_values/new_values to JSON, adds the generated columns, and
+    partitions the table by month if it isn't yet (primary key widened to
+    (log_id, timestamp), indexes replaced with AUDIT_INDEXES).
+    """
+    months_ahead = AUDIT_CONFIG['months_ahead'] if months_ahead is None else months_ahead
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (AUDIT_TABLE,))
+        column_types = dict(cursor.fetchall())
+        cursor.execute("SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY'",
+                       (AUDIT_TABLE,))
+        index_names = [name for (name,) in cursor.fetchall()]
+        partitioned = bool(list_partitions(cursor))
+
+        clauses = []
+        if column_types.get('old_values') != 'json' or column_types.get('new_values') != 'json':
+            _quote_invalid_json(cursor)
+            connection.commit()
+            clauses += ["MODIFY old_values JSON", "MODIFY new_values JSON"]
+        clauses += [f"ADD COLUMN {name} {definition}" for name, definition in AUDIT_GENERATED_COLUMNS.items()
+                    if name not in column_types]
+        if partitioned:
+            clauses += [f"ADD INDEX {name} {columns}" for name, columns in AUDIT_INDEXES.items()
+                        if name not in index_names]
+        else:
+            clauses += ["DROP PRIMARY KEY", "ADD PRIMARY KEY (log_id, timestamp)"]
+            clauses += [f"DROP INDEX {name}" for name in index_names]
+            clauses += [f"ADD INDEX {name} {columns}" for name, columns in AUDIT_INDEXES.items()]
+        if not clauses:
+            logger.info(f"{AUDIT_TABLE} is already migrated")
+            return True
+
+        statement = f"ALTER TABLE {AUDIT_TABLE} {', '.join(clauses)}"
+        if not partitioned:
+            cursor.execute(f"SELECT MIN(timestamp) FROM {AUDIT_TABLE}")
+            oldest = cursor.fetchone()[0]
+            first = month_start((oldest or datetime.now()).date())
+            partitions = ([f"PARTITION p_history VALUES LESS THAN ({to_days(first)})"]
+                          + monthly_partitions(first, month_start(date.today(), months_ahead + 1))
+                          + ["PARTITION p_future VALUES LESS THAN MAXVALUE"])
+            statement += ("\nPARTITION BY RANGE (TO_DAYS(timestamp)) (\n    "
+                          + ',\n    '.join(partitions) + "\n)")
+            print(f"   Partitioning {AUDIT_TABLE} into {len(partitions)} partitions...")
+        print(f"   Applying {len(clauses)} changes to {AUDIT_TABLE}...")
+        cursor.execute(statement)
+        cursor.close()
+        invalidate_statement_caches()
+        return True
+    except Error as e:
+        logger.error(f"Error migrating {AUDIT_TABLE}: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def print_partition_status():
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        partitions = list_partitions(cursor)
+        cursor.close()
+    except Error as e:
+        logger.error(f"Error reading audit partitions: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+    if not partitions:
+        print(f"   {AUDIT_TABLE} is not partitioned (run --migrate)")
+        return False
+    for name, bound, rows in partitions:
+        print(f"   {name:<12} < {str(bound or 'MAXVALUE'):<10} ~{rows:>10,} rows")
+    return True
+
+
+# ---- buffered writer ---------------------------------------------------------
+
+def changed_values(old_values, new_values):
+    """Reduce an UPDATE's before/after images to the changed fields (plus IDENTITY_FIELDS)"""
+    changed = {key for key in old_values.keys() | new_values.keys()
+               if key in IDENTITY_FIELDS or old_values.get(key) != new_values.get(key)}
+    return ({key: value for key, value in old_values.items() if key in changed},
+            {key: value for key, value in new_values.items() if key in changed})
+
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Buffer audit events in memory and write them in batches from a background thread"""
+
+    def __init__(self, **options):
+        unknown = set(options) - set(AUDIT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown audit writer options: {', '.join(sorted(unknown))}")
+        self.config = {**AUDIT_CONFIG, **options}
+        self._queue = queue.Queue(self.config['queue_size'])
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'queued': 0, 'written': 0, 'batches': 0, 'dropped': 0, 'retries': 0}
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                    self._thread.start()
+
+    def log(self, table_name, record_id, action, user_id=None, user_type=None, old_values=None,
+            new_values=None, ip_address=None, user_agent=None, timestamp=None):
+        """Queue one audit event; returns False if it had to be dropped
+
+        old_values/new_values may be dicts (stored as JSON); for an UPDATE only
+        the fields that changed are kept. The event time is taken now, not
+        when the batch is written.
+        """
+        if action == 'UPDATE' and isinstance(old_values, dict) and isinstance(new_values, dict):
+            old_values, new_values = changed_values(old_values, new_values)
+        if isinstance(old_values, dict):
+            old_values = json.dumps(old_values, default=str)
+        if isinstance(new_values, dict):
+            new_values = json.dumps(new_values, default=str)
+        event = (table_name, record_id, action, user_id, user_type, old_values, new_values,
+                 ip_address, user_agent, timestamp or datetime.now())
+        self._ensure_started()
+        try:
+            self._queue.put(event, block=self.config['block_when_full'])
+        except queue.Full:
+            self._count('dropped')
+            logger.warning("Audit queue full; event dropped")
+            return False
+        self._count('queued')
+        return True
+
+    def _next_batch(self):
+        """Block for the first event, then gather more until the batch is full or flush_interval passes"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.config['flush_interval']
+        while len(batch) < self.config['batch_size']:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if event is _STOP:
+                return batch, True
+            batch.append(event)
+        return batch, False
+
+    def _write(self, batch):
+        for attempt in range(self.config['max_retries'] + 1):
+            connection = None
+            try:
+                connection = get_connection()
+                cursor = connection.cursor()
+                # executemany rewrites a plain INSERT into one multi-row statement
+                cursor.executemany(INSERT_AUDIT_EVENTS, batch)
+                connection.commit()
+                cursor.close()
+                self._count('written', len(batch))
+                self._count('batches')
+                return True
+            except Error as e:
+                if connection:
+                    connection.rollback()
+                if attempt == self.config['max_retries']:
+                    logger.error(f"Dropping {len(batch)} audit events after {attempt + 1} attempts: {e}")
+                    self._count('dropped', len(batch))
+                    return False
+                self._count('retries')
+                time.sleep(0.5 * (attempt + 1))
+            finally:
+                if connection:
+                    connection.close()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stopping):
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued event has been written (or dropped)"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write the remaining events and stop the background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        stats['avg_batch_size'] = stats['written'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+
+_default_writer = None
+_default_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """Process-wide AuditWriter, flushed at interpreter exit"""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = AuditWriter()
+            atexit.register(_default_writer.close)
+        return _default_writer
+
+
+def audit_event(table_name, record_id, action, **details):
+    """Queue an audit event on the process-wide writer"""
+    return get_audit_writer().log(table_name, record_id, action, **details)
+
+
+# ---- queries -----------------------------------------------------------------
+
+def _json_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def audit_history(patient_id=None, table_name=None, record_id=None, field=None, user_id=None,
+                  action=None, since=None, until=None, limit=100):
+    """Audit events matching the filters, newest first, with old/new values decoded
+
+    patient_id (+ field) uses idx_audit_patient / idx_audit_patient_field,
+    table_name + record_id uses idx_audit_record, and since/until prune
+    partitions.
+    """
+    if field is not None and not FIELD_NAME.match(field):
+        raise ValueError(f"Invalid field name {field!r}")
+    filters = [('patient_id = %s', patient_id), ('table_name = %s', table_name), ('record_id = %s', record_id),
+               ('user_id = %s', user_id), ('action = %s', action), ('timestamp >= %s', since),
+               ('timestamp < %s', until), ('%s MEMBER OF (changed_fields)', field)]
+    clauses = [clause for clause, value in filters if value is not None]
+    params = [value for _, value in filters if value is not None]
+    query = (f"SELECT log_id, timestamp, table_name, record_id, action, user_id, user_type, "
+             f"old_values, new_values, ip_address FROM {AUDIT_TABLE}"
+             + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+             + " ORDER BY timestamp DESC, log_id DESC LIMIT %s")
+    with DatabaseConnection() as db:
+        rows = db.execute_select(query, params + [limit])
+    for row in rows or []:
+        row['old_values'] = _json_value(row['old_values'])
+        row['new_values'] = _json_value(row['new_values'])
+    return rows
+
+
+def field_history(patient_id, field, since=None, until=None, limit=100):
+    """Changes to one field of a patient's records, newest first: old_value -> new_value"""
+    if not FIELD_NAME.match(field):
+        raise ValueError(f"Invalid field name {field!r}")
+    path = f'$."{field}"'
+    filters = [('timestamp >= %s', since), ('timestamp < %s', until)]
+    query = (f"SELECT log_id, timestamp, table_name, record_id, action, user_id, "
+             f"JSON_UNQUOTE(JSON_EXTRACT(old_values, %s)) AS old_value, "
+             f"JSON_UNQUOTE(JSON_EXTRACT(new_values, %s)) AS new_value "
+             f"FROM {AUDIT_TABLE} WHERE patient_id = %s AND %s MEMBER OF (changed_fields)"
+             + ''.join(f" AND {clause}" for clause, value in filters if value is not None)
+             + " ORDER BY timestamp DESC, log_id DESC LIMIT %s")
+    params = [path, path, patient_id, field] + [value for _, value in filters if value is not None] + [limit]
+    with DatabaseConnection() as db:
+        return db.execute_select(query, params)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage audit_logs partitions")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--status', action='store_true', help="list partitions and approximate row counts")
+    action.add_argument('--rotate', action='store_true', help="add upcoming partitions and drop expired ones")
+    action.add_argument('--migrate', action='store_true',
+                        help="migrate an existing audit_logs (JSON columns, generated columns, partitions)")
+    action.add_argument('--history', type=int, metavar='PATIENT_ID', help="print a patient's audit history")
+    parser.add_argument('--field', help="with --history: only changes to this field")
+    parser.add_argument('--months-ahead', type=int, default=AUDIT_CONFIG['months_ahead'],
+                        help=f"future monthly partitions to keep (default: {AUDIT_CONFIG['months_ahead']})")
+    parser.add_argument('--retention-months', type=int, default=AUDIT_CONFIG['retention_months'],
+                        help=f"months of audit history to keep (default: {AUDIT_CONFIG['retention_months']})")
+    parser.add_argument('--dry-run', action='store_true', help="with --rotate: print the statements only")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - AUDIT LOG PARTITIONS")
+    print("=" * 60)
+    if args.history is not None:
+        rows = (field_history(args.history, args.field) if args.field
+                else audit_history(patient_id=args.history))
+        for row in rows or []:
+            change = (f"{row['old_value']} -> {row['new_value']}" if args.field
+                      else f"{row['old_values']} -> {row['new_values']}")
+            print(f"   {row['timestamp']}  {row['table_name']}#{row['record_id']:<8} {row['action']:<6} "
+                  f"user {row['user_id']}: {change}")
+        success = rows is not None
+        print(f"\n{'✓' if success else '✗'} {len(rows or [])} events")
+        return success
+    if args.migrate:
+        success = migrate_audit_logs(args.months_ahead)
+    elif args.rotate:
+        success = rotate_partitions(args.months_ahead, args.retention_months, args.dry_run)
+    else:
+        success = True
+    if success:
+        success = print_partition_status()
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,454 @@
+"""
+Hospital OLTP System - Bed Availability Service
+================================================
+
+Live bed-availability index plus atomic reserve/assign operations, so
+admissions don't have to go through vw_available_beds / vw_bed_occupancy.
+
+- bed_availability holds one row per bed with its room's facility and
+  department, the bed type and a derived is_available flag (the same rule as
+  vw_available_beds). It is indexed by (is_available, facility_id, bed_type,
+  department_id) so lookups and counts are index-only.
+- Triggers on beds and rooms keep the index in step with every write, and
+  reservation details are cleared once a bed leaves the 'reserved' state.
+- reserve_bed() / assign_bed() pick a bed with SELECT ... FOR UPDATE SKIP
+  LOCKED, so concurrent admissions take different beds without waiting on
+  each other. The beds row is then updated with a status guard; a bed can
+  never be reserved or assigned twice.
+- Deadlocks and lock wait timeouts are retried.
+
+Rows removed by ON DELETE CASCADE (facility -> rooms -> beds) do not fire
+triggers; --rebuild resynchronizes the index.
+
+Usage:
+    python bed_service.py --install
+    python bed_service.py --counts
+    python bed_service.py --surge 200 --workers 16
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+BED_SERVICE_CONFIG = {
+    'reservation_minutes': 15,      # How long a reservation holds a bed
+    'max_retries': 3                # Retries after a deadlock or lock wait timeout
+}
+
+# Deadlock, lock wait timeout
+RETRYABLE_ERRORS = {1213, 1205}
+
+BED_INDEX_TABLE = """CREATE TABLE IF NOT EXISTS bed_availability (
+    bed_id INT PRIMARY KEY,
+    room_id INT NOT NULL,
+    facility_id INT NOT NULL,
+    department_id INT,
+    bed_type ENUM('standard', 'ICU', 'pediatric', 'bariatric', 'isolation') NOT NULL,
+    bed_status ENUM('available', 'occupied', 'maintenance', 'reserved') NOT NULL,
+    is_available BOOLEAN NOT NULL,
+    reserved_for_patient INT,
+    reservation_token CHAR(32),
+    reserved_until DATETIME,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_bed_reservation (reservation_token),
+    INDEX idx_bed_avail_lookup (is_available, facility_id, bed_type, department_id),
+    INDEX idx_bed_avail_room (room_id),
+    INDEX idx_bed_avail_expiry (reserved_until)
+)"""
+
+# Upserts the index row of one bed from NEW.* and its room
+_UPSERT_BED = (
+    "INSERT INTO bed_availability (bed_id, room_id, facility_id, department_id, bed_type, bed_status, is_available) "
+    "SELECT * FROM (SELECT NEW.bed_id AS bed_id, r.room_id, r.facility_id, r.department_id, "
+    "NEW.bed_type AS bed_type, NEW.status AS bed_status, "
+    "NEW.status = 'available' AND NOT NEW.is_occupied AND r.status = 'available' AS is_available "
+    "FROM rooms r WHERE r.room_id = NEW.room_id) AS new "
+    "ON DUPLICATE KEY UPDATE room_id = new.room_id, facility_id = new.facility_id, "
+    "department_id = new.department_id, bed_type = new.bed_type, bed_status = new.bed_status, "
+    "is_available = new.is_available, "
+    "reserved_for_patient = IF(new.bed_status = 'reserved', bed_availability.reserved_for_patient, NULL), "
+    "reservation_token = IF(new.bed_status = 'reserved', bed_availability.reservation_token, NULL), "
+    "reserved_until = IF(new.bed_status = 'reserved', bed_availability.reserved_until, NULL)"
+)
+
+BED_INDEX_TRIGGERS = {
+    'trg_bed_availability_beds_ai': f"AFTER INSERT ON beds FOR EACH ROW {_UPSERT_BED}",
+    'trg_bed_availability_beds_au': f"AFTER UPDATE ON beds FOR EACH ROW {_UPSERT_BED}",
+    'trg_bed_availability_beds_ad': "AFTER DELETE ON beds FOR EACH ROW "
+                                    "DELETE FROM bed_availability WHERE bed_id = OLD.bed_id",
+    'trg_bed_availability_rooms_au': (
+        "AFTER UPDATE ON rooms FOR EACH ROW "
+        "UPDATE bed_availability ba JOIN beds b ON b.bed_id = ba.bed_id "
+        "SET ba.facility_id = NEW.facility_id, ba.department_id = NEW.department_id, "
+        "ba.is_available = (b.status = 'available' AND NOT b.is_occupied AND NEW.status = 'available') "
+        "WHERE ba.room_id = NEW.room_id"),
+    'trg_bed_availability_rooms_ad': "AFTER DELETE ON rooms FOR EACH ROW "
+                                     "DELETE FROM bed_availability WHERE room_id = OLD.room_id"
+}
+
+# Composite indexes behind vw_bed_occupancy, replacing their single-column prefixes
+OCCUPANCY_INDEXES = [
+    ('bed_assignments', 'idx_bed_assign_status_bed', '(status, bed_id)', 'idx_bed_assign_status'),
+    ('nurse_assignments', 'idx_nurse_assign_patient_end', '(patient_id, end_date)', 'idx_nurse_assign_patient')
+]
+
+REBUILD_INDEX = [
+    "DELETE ba FROM bed_availability ba LEFT JOIN beds b ON b.bed_id = ba.bed_id WHERE b.bed_id IS NULL",
+    "INSERT INTO bed_availability (bed_id, room_id, facility_id, department_id, bed_type, bed_status, is_available) "
+    "SELECT * FROM (SELECT b.bed_id, r.room_id, r.facility_id, r.department_id, b.bed_type, b.status AS bed_status, "
+    "b.status = 'available' AND NOT b.is_occupied AND r.status = 'available' AS is_available "
+    "FROM beds b JOIN rooms r ON r.room_id = b.room_id) AS new "
+    "ON DUPLICATE KEY UPDATE room_id = new.room_id, facility_id = new.facility_id, "
+    "department_id = new.department_id, bed_type = new.bed_type, bed_status = new.bed_status, "
+    "is_available = new.is_available, "
+    "reserved_for_patient = IF(new.bed_status = 'reserved', bed_availability.reserved_for_patient, NULL), "
+    "reservation_token = IF(new.bed_status = 'reserved', bed_availability.reservation_token, NULL), "
+    "reserved_until = IF(new.bed_status = 'reserved', bed_availability.reserved_until, NULL)"
+]
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s", (table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def install_bed_index():
+    """Create the availability index, its triggers and the occupancy indexes, then fill the index"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute(BED_INDEX_TABLE)
+        for name, body in BED_INDEX_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+        for table, index, columns, replaces in OCCUPANCY_INDEXES:
+            if not _index_exists(cursor, table, index):
+                cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} {columns}")
+                logger.info(f"Added index {index} on {table}{columns}")
+            if _index_exists(cursor, table, replaces):
+                cursor.execute(f"ALTER TABLE {table} DROP INDEX {replaces}")
+        cursor.close()
+        invalidate_statement_caches()
+        return rebuild_bed_index(connection)
+    except Error as e:
+        logger.error(f"Error installing bed availability index: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def rebuild_bed_index(connection=None):
+    """Resynchronize bed_availability with beds and rooms"""
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        cursor = connection.cursor()
+        for statement in REBUILD_INDEX:
+            cursor.execute(statement)
+        connection.commit()
+        cursor.close()
+        logger.info("Bed availability index rebuilt")
+        return True
+    except Error as e:
+        logger.error(f"Error rebuilding bed availability index: {e}")
+        if connection:
+            connection.rollback()
+        return False
+    finally:
+        if owned and connection:
+            connection.close()
+
+
+def _in_transaction(operation, description):
+    """Run operation(cursor) in a transaction, retrying deadlocks; return its result or None"""
+    connection = None
+    try:
+        connection = get_connection()
+        for attempt in range(BED_SERVICE_CONFIG['max_retries'] + 1):
+            cursor = connection.cursor()
+            try:
+                connection.start_transaction()
+                result = operation(cursor)
+                connection.commit()
+                return result
+            except Error as e:
+                connection.rollback()
+                if e.errno not in RETRYABLE_ERRORS or attempt == BED_SERVICE_CONFIG['max_retries']:
+                    raise
+                logger.warning(f"Retrying {description} after: {e}")
+            finally:
+                cursor.close()
+    except Error as e:
+        logger.error(f"Error during {description}: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def _criteria(facility_id, department_id, bed_type):
+    clauses, params = [], []
+    for column, value in (('facility_id', facility_id), ('bed_type', bed_type), ('department_id', department_id)):
+        if value is not None:
+            clauses.append(f"{column} = %s")
+            params.append(value)
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+def _lock_free_bed(cursor, facility_id, department_id, bed_type):
+    """Lock one available bed matching the criteria, skipping beds other sessions hold"""
+    where, params = _criteria(facility_id, department_id, bed_type)
+    while True:
+        cursor.execute(f"SELECT bed_id FROM bed_availability WHERE is_available = TRUE{where} "
+                       f"ORDER BY bed_id LIMIT 1 FOR UPDATE SKIP LOCKED", params)
+        row = cursor.fetchone()
+        if row is None:
+            return
+        yield row[0]
+
+
+def _take_bed(cursor, status, facility_id, department_id, bed_type):
+    """Move the first free matching bed to status; return its bed_id or None"""
+    for bed_id in _lock_free_bed(cursor, facility_id, department_id, bed_type):
+        cursor.execute("UPDATE beds SET status = %s, is_occupied = %s "
+                       "WHERE bed_id = %s AND status = 'available' AND NOT is_occupied",
+                       (status, status == 'occupied', bed_id))
+        if cursor.rowcount == 1:
+            return bed_id
+        # The index lagged behind beds; correct this entry and try the next bed
+        cursor.execute("UPDATE bed_availability SET is_available = FALSE WHERE bed_id = %s", (bed_id,))
+    return None
+
+
+def expire_reservations():
+    """Release beds whose reservation ran out; return how many were released"""
+    def operation(cursor):
+        cursor.execute("SELECT bed_id FROM bed_availability WHERE reserved_until < NOW() FOR UPDATE SKIP LOCKED")
+        bed_ids = [row[0] for row in cursor.fetchall()]
+        if not bed_ids:
+            return 0
+        placeholders = ', '.join(['%s'] * len(bed_ids))
+        cursor.execute(f"UPDATE beds SET status = 'available' "
+                       f"WHERE bed_id IN ({placeholders}) AND status = 'reserved'", bed_ids)
+        return cursor.rowcount
+
+    released = _in_transaction(operation, "reservation expiry")
+    if released:
+        logger.info(f"Released {released} expired bed reservations")
+    return released
+
+
+def reserve_bed(patient_id, facility_id=None, department_id=None, bed_type=None):
+    """Hold a matching bed for a patient; return {bed_id, reservation_token, reserved_until} or None"""
+    def operation(cursor):
+        bed_id = _take_bed(cursor, 'reserved', facility_id, department_id, bed_type)
+        if bed_id is None:
+            return None
+        token = uuid.uuid4().hex
+        cursor.execute("UPDATE bed_availability SET reserved_for_patient = %s, reservation_token = %s, "
+                       "reserved_until = NOW() + INTERVAL %s MINUTE WHERE bed_id = %s",
+                       (patient_id, token, BED_SERVICE_CONFIG['reservation_minutes'], bed_id))
+        cursor.execute("SELECT reserved_until FROM bed_availability WHERE bed_id = %s", (bed_id,))
+        return {'bed_id': bed_id, 'reservation_token': token, 'reserved_until': cursor.fetchone()[0]}
+
+    reservation = _in_transaction(operation, "bed reservation")
+    if reservation is None and expire_reservations():
+        reservation = _in_transaction(operation, "bed reservation")
+    if reservation is None:
+        logger.warning(f"No bed available for patient {patient_id} "
+                       f"(facility={facility_id}, department={department_id}, type={bed_type})")
+    return reservation
+
+
+def cancel_reservation(reservation_token):
+    """Give a reserved bed back; return True if the reservation existed"""
+    def operation(cursor):
+        cursor.execute("SELECT bed_id FROM bed_availability WHERE reservation_token = %s FOR UPDATE",
+                       (reservation_token,))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        cursor.execute("UPDATE beds SET status = 'available' WHERE bed_id = %s AND status = 'reserved'", (row[0],))
+        return True
+
+    return bool(_in_transaction(operation, "reservation cancel"))
+
+
+def assign_bed(patient_id, encounter_id=None, reservation_token=None, facility_id=None,
+               department_id=None, bed_type=None, assigned_by=None, reason=None):
+    """Occupy a bed and record the bed_assignments row; return {assignment_id, bed_id} or None
+
+    With reservation_token the reserved bed is used (if the reservation is still
+    valid and belongs to the patient); otherwise a matching free bed is taken.
+    """
+    def operation(cursor):
+        if reservation_token:
+            cursor.execute("SELECT bed_id FROM bed_availability WHERE reservation_token = %s "
+                           "AND reserved_for_patient = %s AND reserved_until >= NOW() FOR UPDATE",
+                           (reservation_token, patient_id))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            bed_id = row[0]
+            cursor.execute("UPDATE beds SET status = 'occupied', is_occupied = TRUE "
+                           "WHERE bed_id = %s AND status = 'reserved'", (bed_id,))
+            if cursor.rowcount != 1:
+                return None
+        else:
+            bed_id = _take_bed(cursor, 'occupied', facility_id, department_id, bed_type)
+            if bed_id is None:
+                return None
+        cursor.execute("INSERT INTO bed_assignments (patient_id, bed_id, encounter_id, assignment_datetime, "
+                       "reason, assigned_by, status) VALUES (%s, %s, %s, NOW(), %s, %s, 'active')",
+                       (patient_id, bed_id, encounter_id, reason, assigned_by))
+        return {'assignment_id': cursor.lastrowid, 'bed_id': bed_id}
+
+    assignment = _in_transaction(operation, "bed assignment")
+    if assignment is None:
+        logger.warning(f"Could not assign a bed to patient {patient_id}")
+    return assignment
+
+
+def release_bed(assignment_id, status='discharged'):
+    """End an active bed assignment and free the bed; return True on success"""
+    def operation(cursor):
+        cursor.execute("SELECT bed_id FROM bed_assignments WHERE assignment_id = %s AND status = 'active' "
+                       "FOR UPDATE", (assignment_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        cursor.execute("UPDATE bed_assignments SET status = %s, discharge_datetime = NOW() "
+                       "WHERE assignment_id = %s", (status, assignment_id))
+        cursor.execute("UPDATE beds SET status = 'available', is_occupied = FALSE WHERE bed_id = %s", (row[0],))
+        return True
+
+    return bool(_in_transaction(operation, "bed release"))
+
+
+def find_available_beds(facility_id=None, department_id=None, bed_type=None, limit=50):
+    """Free beds matching the criteria, read from the availability index"""
+    where, params = _criteria(facility_id, department_id, bed_type)
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"SELECT bed_id, room_id, facility_id, department_id, bed_type FROM bed_availability "
+                       f"WHERE is_available = TRUE{where} ORDER BY bed_id LIMIT %s", params + [limit])
+        beds = cursor.fetchall()
+        cursor.close()
+        return beds
+    except Error as e:
+        logger.error(f"Error reading bed availability: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def availability_counts(facility_id=None):
+    """Free bed counts per (facility_id, department_id, bed_type)"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor(dictionary=True)
+        where = " AND facility_id = %s" if facility_id is not None else ""
+        cursor.execute(f"SELECT facility_id, department_id, bed_type, COUNT(*) AS available_beds "
+                       f"FROM bed_availability WHERE is_available = TRUE{where} "
+                       f"GROUP BY facility_id, department_id, bed_type ORDER BY facility_id, department_id, bed_type",
+                       (facility_id,) if facility_id is not None else ())
+        counts = cursor.fetchall()
+        cursor.close()
+        return counts
+    except Error as e:
+        logger.error(f"Error reading bed availability counts: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def run_surge(requests, workers, bed_type=None):
+    """Reserve beds from many threads at once, check none was handed out twice, then cancel them"""
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def admit(patient_id):
+        start = time.perf_counter()
+        reservation = reserve_bed(patient_id, bed_type=bed_type)
+        with latencies_lock:
+            latencies.append(time.perf_counter() - start)
+        return reservation
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        reservations = [r for r in executor.map(admit, range(1, requests + 1)) if r]
+    elapsed = time.perf_counter() - start
+
+    bed_ids = [reservation['bed_id'] for reservation in reservations]
+    double_booked = len(bed_ids) - len(set(bed_ids))
+    for reservation in reservations:
+        cancel_reservation(reservation['reservation_token'])
+
+    latencies.sort()
+    print(f"   Requests:       {requests} ({workers} workers)")
+    print(f"   Reserved:       {len(reservations)} beds in {elapsed:.2f}s")
+    if latencies:
+        print(f"   Latency:        median {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f} ms")
+    print(f"   Double-booked:  {double_booked}")
+    return double_booked == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bed availability index and reservation service")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="create the index, its triggers and occupancy indexes")
+    action.add_argument('--rebuild', action='store_true', help="resynchronize the index with beds and rooms")
+    action.add_argument('--counts', action='store_true', help="print free beds per facility/department/bed type")
+    action.add_argument('--surge', type=int, metavar='N', help="reserve N beds concurrently, verify, then cancel")
+    parser.add_argument('--workers', type=int, default=16, help="threads for --surge (default: 16)")
+    parser.add_argument('--bed-type', help="bed type for --surge")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - BED AVAILABILITY")
+    print("=" * 60)
+    if args.install:
+        success = install_bed_index()
+    elif args.rebuild:
+        success = rebuild_bed_index()
+    elif args.counts:
+        counts = availability_counts()
+        success = counts is not None
+        for row in counts or []:
+            print(f"   facility {row['facility_id']:<4} department {str(row['department_id']):<5} "
+                  f"{row['bed_type']:<10} {row['available_beds']:>5} free")
+    else:
+        success = run_surge(args.surge, args.workers, args.bed_type)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
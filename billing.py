@@ -0,0 +1,514 @@
+"""
+Hospital OLTP System - Billing Engine
+=====================================
+
+Applies invoice items and payments transactionally and keeps invoice totals,
+payment status and accounts-receivable aging up to date incrementally, so AR
+dashboards read a four-row summary instead of evaluating DATEDIFF over every
+open invoice (vw_outstanding_invoices).
+
+- Triggers on invoice_items add each line's change to its invoice's
+  subtotal/tax/discount/total; triggers on payment_transactions add each
+  completed payment (and take back refunded or cancelled ones) to
+  amount_paid. amount_due stays the generated total_amount - amount_paid.
+- A BEFORE INSERT/UPDATE trigger on invoices derives payment_status from the
+  row (paid / partial / overdue / pending; cancelled is kept).
+- Triggers on invoices keep ar_due_date_totals: open invoice count and
+  amount due per due date, spread over aging_shards rows per date (by
+  invoice_id) so concurrent payments don't queue on one counter row.
+- refresh_aging() moves pending invoices past their due date to overdue and
+  rebuilds ar_aging_summary (Current/Warning/Severe/Critical, the
+  vw_outstanding_invoices buckets) from ar_due_date_totals, which holds a
+  few rows per due date rather than one per invoice. read_aging() serves
+  the summary while it is younger than max_staleness and from today.
+
+Rows removed by ON DELETE CASCADE fire no triggers; --rebuild recomputes
+totals and the due-date counters (run it while billing is quiet).
+
+Usage:
+    python billing.py --install
+    python billing.py --aging
+    python billing.py --refresh
+    python billing.py --verify
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import logging
+import sys
+import time
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from mysql.connector import Error
+from database_connection import DatabaseConnection, get_connection, logger
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+BILLING_CONFIG = {
+    'aging_shards': 16,             # Counter rows per due date in ar_due_date_totals
+    'max_staleness': 60.0,          # Seconds read_aging() may serve an old summary for
+    'max_retries': 3                # Retries after a deadlock or lock wait timeout
+}
+
+# Deadlock, lock wait timeout
+RETRYABLE_ERRORS = {1213, 1205}
+DUPLICATE_KEY = 1062
+
+OPEN_STATUSES = ('pending', 'partial', 'overdue')
+
+# vw_outstanding_invoices buckets: (name, days overdue above which it applies), most overdue first
+AGING_BUCKETS = (('Critical', 90), ('Severe', 60), ('Warning', 30), ('Current', None))
+
+BILLING_TABLES = [
+    """CREATE TABLE IF NOT EXISTS ar_due_date_totals (
+    due_date DATE NOT NULL,
+    shard TINYINT UNSIGNED NOT NULL,
+    open_invoices INT NOT NULL DEFAULT 0,
+    amount_due DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (due_date, shard)
+)""",
+    """CREATE TABLE IF NOT EXISTS ar_aging_summary (
+    aging_status VARCHAR(10) PRIMARY KEY,
+    invoice_count INT NOT NULL,
+    amount_due DECIMAL(14,2) NOT NULL,
+    oldest_due_date DATE,
+    as_of DATE NOT NULL,
+    refreshed_at DATETIME(6) NOT NULL
+)"""
+]
+
+_DERIVE_STATUS = ("SET NEW.payment_status = IF(NEW.payment_status = 'cancelled', 'cancelled', "
+                  "IF(NEW.total_amount - COALESCE(NEW.amount_paid, 0) <= 0, 'paid', "
+                  "IF(COALESCE(NEW.amount_paid, 0) > 0, 'partial', "
+                  "IF(NEW.due_date < CURDATE(), 'overdue', 'pending'))))")
+
+
+def _open_due(row):
+    """Amount an invoice row adds to the open receivables (0 when it is not open)"""
+    statuses = ', '.join(f"'{status}'" for status in OPEN_STATUSES)
+    return f"IF({row}.payment_status IN ({statuses}) AND {row}.amount_due > 0, {row}.amount_due, 0)"
+
+
+def _due_date_delta(rows):
+    """Trigger body adding the open amount of NEW and/or subtracting that of OLD"""
+    shards = BILLING_CONFIG['aging_shards']
+    deltas = ' UNION ALL '.join(
+        f"SELECT {row}.due_date AS due_date, {row}.invoice_id % {shards} AS shard, "
+        f"{sign}({_open_due(row)} > 0) AS open_invoices, {sign}{_open_due(row)} AS amount_due"
+        for row, sign in rows)
+    # Netted per counter row, so updates that leave the open amount alone lock nothing
+    return ("INSERT INTO ar_due_date_totals (due_date, shard, open_invoices, amount_due) "
+            f"SELECT * FROM (SELECT due_date, shard, SUM(open_invoices) AS open_invoices, "
+            f"SUM(amount_due) AS amount_due FROM ({deltas}) AS changes GROUP BY due_date, shard "
+            f"HAVING open_invoices <> 0 OR amount_due <> 0) AS delta "
+            "ON DUPLICATE KEY UPDATE open_invoices = ar_due_date_totals.open_invoices + delta.open_invoices, "
+            "amount_due = ar_due_date_totals.amount_due + delta.amount_due")
+
+
+def _invoice_delta(changes, rows):
+    """Trigger body adding each column change of NEW and/or taking back that of OLD on their invoices"""
+    assignments = []
+    for column, expression in changes.items():
+        terms = ' '.join(f"{sign} IF(invoice_id = {row}.invoice_id, {expression.format(row=row)}, 0)"
+                         for row, sign in rows)
+        assignments.append(f"{column} = COALESCE({column}, 0) {terms}")
+    invoice_ids = ', '.join(f"{row}.invoice_id" for row, _ in rows)
+    return f"UPDATE invoices SET {', '.join(assignments)} WHERE invoice_id IN ({invoice_ids})"
+
+
+_ITEM_CHANGES = {
+    'subtotal_amount': "{row}.total_price",
+    'tax_amount': "COALESCE({row}.tax_amount, 0)",
+    'discount_amount': "COALESCE({row}.discount_amount, 0)",
+    'total_amount': "{row}.total_price + COALESCE({row}.tax_amount, 0) - COALESCE({row}.discount_amount, 0)"
+}
+_PAYMENT_CHANGES = {
+    'amount_paid': "IF({row}.status = 'completed', {row}.payment_amount, 0)"
+}
+
+BILLING_TRIGGERS = {
+    'trg_billing_invoices_bi': f"BEFORE INSERT ON invoices FOR EACH ROW {_DERIVE_STATUS}",
+    'trg_billing_invoices_bu': f"BEFORE UPDATE ON invoices FOR EACH ROW {_DERIVE_STATUS}",
+    'trg_billing_invoices_ai': "AFTER INSERT ON invoices FOR EACH ROW " + _due_date_delta([('NEW', '')]),
+    'trg_billing_invoices_au': "AFTER UPDATE ON invoices FOR EACH ROW "
+                               + _due_date_delta([('OLD', '-'), ('NEW', '')]),
+    'trg_billing_invoices_ad': "AFTER DELETE ON invoices FOR EACH ROW " + _due_date_delta([('OLD', '-')]),
+    'trg_billing_items_ai': "AFTER INSERT ON invoice_items FOR EACH ROW "
+                            + _invoice_delta(_ITEM_CHANGES, [('NEW', '+')]),
+    'trg_billing_items_au': "AFTER UPDATE ON invoice_items FOR EACH ROW "
+                            + _invoice_delta(_ITEM_CHANGES, [('NEW', '+'), ('OLD', '-')]),
+    'trg_billing_items_ad': "AFTER DELETE ON invoice_items FOR EACH ROW "
+                            + _invoice_delta(_ITEM_CHANGES, [('OLD', '-')]),
+    'trg_billing_payments_ai': "AFTER INSERT ON payment_transactions FOR EACH ROW "
+                               + _invoice_delta(_PAYMENT_CHANGES, [('NEW', '+')]),
+    'trg_billing_payments_au': "AFTER UPDATE ON payment_transactions FOR EACH ROW "
+                               + _invoice_delta(_PAYMENT_CHANGES, [('NEW', '+'), ('OLD', '-')]),
+    'trg_billing_payments_ad': "AFTER DELETE ON payment_transactions FOR EACH ROW "
+                               + _invoice_delta(_PAYMENT_CHANGES, [('OLD', '-')])
+}
+
+# Invoice-level tax and discount (not from items) are kept; items only replace the subtotal
+REBUILD_TOTALS = [
+    "UPDATE invoices i JOIN (SELECT invoice_id, SUM(total_price) AS subtotal FROM invoice_items "
+    "GROUP BY invoice_id) items ON items.invoice_id = i.invoice_id "
+    "SET i.subtotal_amount = items.subtotal, "
+    "i.total_amount = items.subtotal + COALESCE(i.tax_amount, 0) - COALESCE(i.discount_amount, 0) "
+    "WHERE i.subtotal_amount <> items.subtotal",
+    "UPDATE invoices i LEFT JOIN (SELECT invoice_id, SUM(payment_amount) AS paid FROM payment_transactions "
+    "WHERE status = 'completed' GROUP BY invoice_id) payments ON payments.invoice_id = i.invoice_id "
+    "SET i.amount_paid = COALESCE(payments.paid, 0) WHERE NOT (i.amount_paid <=> COALESCE(payments.paid, 0))",
+    # Loaders write payment_status statically; let the status trigger recompute it
+    "UPDATE invoices SET payment_status = payment_status",
+]
+
+
+def _rebuild_due_dates():
+    statuses = ', '.join(['%s'] * len(OPEN_STATUSES))
+    return [
+        ("DELETE FROM ar_due_date_totals", ()),
+        (f"INSERT INTO ar_due_date_totals (due_date, shard, open_invoices, amount_due) "
+         f"SELECT due_date, invoice_id % {BILLING_CONFIG['aging_shards']}, COUNT(*), SUM(amount_due) "
+         f"FROM invoices WHERE payment_status IN ({statuses}) AND amount_due > 0 "
+         f"GROUP BY due_date, invoice_id % {BILLING_CONFIG['aging_shards']}", OPEN_STATUSES)
+    ]
+
+
+def _aging_case(days_overdue):
+    cases = ' '.join(f"WHEN {days_overdue} > {days} THEN '{name}'" for name, days in AGING_BUCKETS if days is not None)
+    return f"CASE {cases} ELSE '{AGING_BUCKETS[-1][0]}' END"
+
+
+def install_billing():
+    """Create the AR tables and billing triggers, then rebuild totals and aging"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        for statement in BILLING_TABLES:
+            cursor.execute(statement)
+        for name, body in BILLING_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+        cursor.close()
+        invalidate_statement_caches()
+        return rebuild_billing(connection) and refresh_aging(connection) is not None
+    except Error as e:
+        logger.error(f"Error installing billing triggers: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def rebuild_billing(connection=None):
+    """Recompute invoice totals, amount_paid, payment_status and the due-date counters"""
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        cursor = connection.cursor()
+        for statement in REBUILD_TOTALS:
+            cursor.execute(statement)
+            logger.info(f"Updated {cursor.rowcount} invoices")
+        for statement, params in _rebuild_due_dates():
+            cursor.execute(statement, params)
+        connection.commit()
+        cursor.close()
+        logger.info("Billing totals and due-date counters rebuilt")
+        return True
+    except Error as e:
+        logger.error(f"Error rebuilding billing totals: {e}")
+        if connection:
+            connection.rollback()
+        return False
+    finally:
+        if owned and connection:
+            connection.close()
+
+
+def _in_transaction(operation, description):
+    """Run operation(cursor) in a transaction, retrying deadlocks; return its result or None"""
+    connection = None
+    try:
+        connection = get_connection()
+        for attempt in range(BILLING_CONFIG['max_retries'] + 1):
+            cursor = connection.cursor(dictionary=True)
+            try:
+                connection.start_transaction()
+                result = operation(cursor)
+                connection.commit()
+                return result
+            except Error as e:
+                connection.rollback()
+                if e.errno not in RETRYABLE_ERRORS or attempt == BILLING_CONFIG['max_retries']:
+                    raise
+                logger.warning(f"Retrying {description} after: {e}")
+            finally:
+                cursor.close()
+    except Error as e:
+        logger.error(f"Error during {description}: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def _lock_invoice(cursor, invoice_id):
+    cursor.execute("SELECT invoice_id, patient_id, total_amount, amount_paid, amount_due, payment_status "
+                   "FROM invoices WHERE invoice_id = %s FOR UPDATE", (invoice_id,))
+    return cursor.fetchone()
+
+
+def _balance(cursor, invoice_id):
+    cursor.execute("SELECT invoice_id, subtotal_amount, total_amount, amount_paid, amount_due, payment_status "
+                   "FROM invoices WHERE invoice_id = %s", (invoice_id,))
+    return cursor.fetchone()
+
+
+def add_invoice_item(invoice_id, item_type, description, unit_price, quantity=1, cpt_code_id=None,
+                     discount_amount=0, tax_amount=0):
+    """Append a line to an open invoice; return {item_id, invoice balance...}, False if closed, None on error"""
+    def operation(cursor):
+        invoice = _lock_invoice(cursor, invoice_id)
+        if invoice is None or invoice['payment_status'] == 'cancelled':
+            return False
+        cursor.execute("SELECT COALESCE(MAX(line_number), 0) + 1 AS line_number FROM invoice_items "
+                       "WHERE invoice_id = %s", (invoice_id,))
+        line_number = cursor.fetchone()['line_number']
+        cursor.execute("INSERT INTO invoice_items (invoice_id, line_number, item_type, cpt_code_id, description, "
+                       "quantity, unit_price, total_price, discount_amount, tax_amount) "
+                       "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                       (invoice_id, line_number, item_type, cpt_code_id, description, quantity, unit_price,
+                        Decimal(str(unit_price)) * quantity, discount_amount, tax_amount))
+        return {'item_id': cursor.lastrowid, **_balance(cursor, invoice_id)}
+
+    return _in_transaction(operation, f"item for invoice {invoice_id}")
+
+
+def remove_invoice_item(item_id):
+    """Delete an invoice line; return the invoice balance, False if there is no such line, None on error"""
+    def operation(cursor):
+        cursor.execute("SELECT invoice_id FROM invoice_items WHERE item_id = %s", (item_id,))
+        row = cursor.fetchone()
+        if row is None or _lock_invoice(cursor, row['invoice_id']) is None:
+            return False
+        cursor.execute("DELETE FROM invoice_items WHERE item_id = %s", (item_id,))
+        return _balance(cursor, row['invoice_id']) if cursor.rowcount == 1 else False
+
+    return _in_transaction(operation, f"removal of invoice item {item_id}")
+
+
+def apply_payment(invoice_id, amount, payment_method, transaction_number=None, payment_reference=None,
+                  processed_by=None, payment_date=None):
+    """Record a completed payment against an invoice
+
+    transaction_number makes the call idempotent: repeating it returns the
+    recorded payment. Returns {transaction_id, invoice balance...}, False if
+    the invoice is not open, the amount exceeds what is due or the
+    transaction_number was already used for another invoice, None on error.
+    """
+    amount = Decimal(str(amount))
+    transaction_number = transaction_number or f"TXN{uuid.uuid4().hex[:20].upper()}"
+
+    def recorded_payment(cursor):
+        # A locking read sees payments committed after this transaction's snapshot
+        cursor.execute("SELECT transaction_id, invoice_id FROM payment_transactions "
+                       "WHERE transaction_number = %s FOR SHARE", (transaction_number,))
+        return cursor.fetchone()
+
+    def operation(cursor):
+        # Retries of the same payment queue on the invoice lock, then find the first one's row
+        invoice = _lock_invoice(cursor, invoice_id)
+        recorded = recorded_payment(cursor)
+        if recorded is None:
+            if invoice is None or invoice['payment_status'] not in OPEN_STATUSES or \
+                    not 0 < amount <= invoice['amount_due']:
+                return False
+            try:
+                cursor.execute("INSERT INTO payment_transactions (transaction_number, invoice_id, patient_id, "
+                               "payment_date, payment_amount, payment_method, payment_reference, processed_by, "
+                               "status) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'completed')",
+                               (transaction_number, invoice_id, invoice['patient_id'], payment_date or date.today(),
+                                amount, payment_method, payment_reference, processed_by))
+                recorded = {'transaction_id': cursor.lastrowid, 'invoice_id': invoice_id}
+            except Error as e:
+                if e.errno != DUPLICATE_KEY:
+                    raise
+                # Committed meanwhile by a payment on another invoice
+                recorded = recorded_payment(cursor)
+                if recorded is None:
+                    raise
+        if recorded['invoice_id'] != invoice_id:
+            logger.warning(f"Transaction {transaction_number} already paid invoice {recorded['invoice_id']}, "
+                           f"not invoice {invoice_id}")
+            return False
+        return {'transaction_id': recorded['transaction_id'], 'transaction_number': transaction_number,
+                **_balance(cursor, recorded['invoice_id'])}
+
+    return _in_transaction(operation, f"payment on invoice {invoice_id}")
+
+
+def refund_payment(transaction_id):
+    """Mark a completed payment refunded; return the invoice balance, False if not refundable, None on error"""
+    def operation(cursor):
+        cursor.execute("SELECT invoice_id FROM payment_transactions WHERE transaction_id = %s", (transaction_id,))
+        row = cursor.fetchone()
+        if row is None or _lock_invoice(cursor, row['invoice_id']) is None:
+            return False
+        cursor.execute("UPDATE payment_transactions SET status = 'refunded' "
+                       "WHERE transaction_id = %s AND status = 'completed'", (transaction_id,))
+        return _balance(cursor, row['invoice_id']) if cursor.rowcount == 1 else False
+
+    return _in_transaction(operation, f"refund of payment {transaction_id}")
+
+
+def refresh_aging(connection=None):
+    """Mark newly overdue invoices and rebuild ar_aging_summary; return the buckets or None on error"""
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        cursor = connection.cursor()
+        try:
+            # The status trigger turns past-due pending invoices into overdue ones
+            cursor.execute("UPDATE invoices SET payment_status = payment_status "
+                           "WHERE payment_status = 'pending' AND due_date < CURDATE()")
+            if cursor.rowcount:
+                logger.info(f"{cursor.rowcount} invoices became overdue")
+            connection.commit()
+            connection.start_transaction()
+            cursor.execute("DELETE FROM ar_due_date_totals WHERE open_invoices = 0 AND amount_due = 0")
+            cursor.execute("DELETE FROM ar_aging_summary")
+            cursor.execute(f"INSERT INTO ar_aging_summary (aging_status, invoice_count, amount_due, oldest_due_date, "
+                           f"as_of, refreshed_at) SELECT {_aging_case('DATEDIFF(CURDATE(), due_date)')}, "
+                           f"SUM(open_invoices), SUM(amount_due), MIN(due_date), CURDATE(), NOW(6) "
+                           f"FROM ar_due_date_totals WHERE open_invoices <> 0 "
+                           f"GROUP BY {_aging_case('DATEDIFF(CURDATE(), due_date)')}")
+            connection.commit()
+        except Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        return _read_aging_table(connection)
+    except Error as e:
+        logger.error(f"Error refreshing AR aging: {e}")
+        return None
+    finally:
+        if owned and connection:
+            connection.close()
+
+
+def _read_aging_table(connection):
+    """Every bucket in AGING_BUCKETS order, zero-filled; age is None if refreshed on an earlier day"""
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT aging_status, invoice_count, amount_due, oldest_due_date, as_of, "
+                   "IF(as_of < CURDATE(), NULL, TIMESTAMPDIFF(MICROSECOND, refreshed_at, NOW(6)) / 1000000) AS age "
+                   "FROM ar_aging_summary")
+    rows = {row['aging_status']: row for row in cursor.fetchall()}
+    cursor.close()
+    connection.commit()
+    return [rows.get(name, {'aging_status': name, 'invoice_count': 0, 'amount_due': Decimal('0.00'),
+                            'oldest_due_date': None, 'as_of': None, 'age': None})
+            for name, _ in AGING_BUCKETS]
+
+
+def read_aging(max_staleness=None):
+    """AR aging buckets at most max_staleness seconds old and computed today; None on error"""
+    max_staleness = BILLING_CONFIG['max_staleness'] if max_staleness is None else max_staleness
+    connection = None
+    try:
+        connection = get_connection()
+        buckets = _read_aging_table(connection)
+        stamped = [bucket for bucket in buckets if bucket['as_of'] is not None]
+        if not stamped or stamped[0]['age'] is None or float(stamped[0]['age']) > max_staleness:
+            buckets = refresh_aging(connection)
+        return buckets
+    except Error as e:
+        logger.error(f"Error reading AR aging: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def verify_billing():
+    """Compare totals, counters and aging with a direct computation; print both read times"""
+    statuses = ', '.join(['%s'] * len(OPEN_STATUSES))
+    checks = [
+        ("Invoices off their items", "SELECT COUNT(*) FROM invoices i JOIN (SELECT invoice_id, SUM(total_price) AS s "
+         "FROM invoice_items GROUP BY invoice_id) items ON items.invoice_id = i.invoice_id "
+         "WHERE i.subtotal_amount <> items.s", ()),
+        ("Invoices off their payments", "SELECT COUNT(*) FROM invoices i LEFT JOIN (SELECT invoice_id, "
+         "SUM(payment_amount) AS paid FROM payment_transactions WHERE status = 'completed' GROUP BY invoice_id) p "
+         "ON p.invoice_id = i.invoice_id WHERE NOT (i.amount_paid <=> COALESCE(p.paid, 0))", ()),
+        ("Due dates off their invoices", f"SELECT COUNT(*) FROM (SELECT due_date, SUM(open_invoices) AS n, "
+         f"SUM(amount_due) AS due FROM ar_due_date_totals GROUP BY due_date HAVING n <> 0 OR due <> 0) t "
+         f"LEFT JOIN (SELECT due_date, COUNT(*) AS n, SUM(amount_due) AS due FROM invoices "
+         f"WHERE payment_status IN ({statuses}) AND amount_due > 0 GROUP BY due_date) i ON i.due_date = t.due_date "
+         f"WHERE NOT (t.n <=> i.n AND t.due <=> i.due)", OPEN_STATUSES),
+    ]
+    success = True
+    with DatabaseConnection(row_factory='tuple') as db:
+        for label, query, params in checks:
+            rows = db.execute_select(query, params)
+            if rows is None:
+                return False
+            success = success and rows[0][0] == 0
+            print(f"   [{'OK' if rows[0][0] == 0 else 'MISMATCH'}] {label:<30} {rows[0][0]}")
+        start = time.perf_counter()
+        expected = db.execute_select("SELECT aging_status, COUNT(*), SUM(amount_due) FROM vw_outstanding_invoices "
+                                     "GROUP BY aging_status")
+        view_time = time.perf_counter() - start
+    start = time.perf_counter()
+    buckets = read_aging(max_staleness=0)
+    summary_time = time.perf_counter() - start
+    if expected is None or buckets is None:
+        return False
+    actual = {(bucket['aging_status'], bucket['invoice_count'], bucket['amount_due'])
+              for bucket in buckets if bucket['invoice_count']}
+    matches = set(tuple(row) for row in expected) == actual
+    print(f"   [{'OK' if matches else 'MISMATCH'}] {'Aging buckets':<30} "
+          f"view {view_time * 1000:8.1f} ms   summary {summary_time * 1000:8.1f} ms")
+    return success and matches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental invoice totals and AR aging")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="create the AR tables and billing triggers")
+    action.add_argument('--rebuild', action='store_true', help="recompute invoice totals and due-date counters")
+    action.add_argument('--refresh', action='store_true', help="mark overdue invoices and rebuild the aging summary")
+    action.add_argument('--aging', action='store_true', help="print the AR aging buckets")
+    action.add_argument('--verify', action='store_true', help="check totals and aging against the invoices")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - BILLING")
+    print("=" * 60)
+    if args.install:
+        success = install_billing()
+    elif args.rebuild:
+        success = rebuild_billing()
+    elif args.refresh or args.aging:
+        buckets = refresh_aging() if args.refresh else read_aging()
+        success = buckets is not None
+        for bucket in buckets or []:
+            print(f"   {bucket['aging_status']:<10} {bucket['invoice_count']:>8,} invoices   "
+                  f"{bucket['amount_due']:>16,.2f} due")
+    else:
+        success = verify_billing()
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
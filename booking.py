@@ -0,0 +1,401 @@
+"""
+Hospital OLTP System - Appointment Booking
+==========================================
+
+Books and cancels appointments transactionally with no double-booking under
+concurrency, without serializing bookings on a lock.
+
+- Slot claims: a booking inserts one appointment_slot_claims row per
+  slot_minutes cell its time covers, keyed (doctor_id, slot_date, slot_time).
+  Two overlapping bookings collide on a primary key, so the loser gets a
+  duplicate-key error and rolls back; bookings that don't overlap never wait
+  on each other. Triggers release the claims when an appointment is
+  cancelled, moved or deleted.
+- Schema guard: --install adds a UNIQUE (doctor_id, appointment_date,
+  appointment_time, slot_guard) key to appointments, where the generated
+  slot_guard is NULL for cancelled/rescheduled rows, so even writers that
+  bypass this module can't put two live appointments on the same start
+  time. It is skipped while existing (e.g. generated) data double-books.
+- Appointments loaded before the claims existed are checked with a read on
+  the (doctor_id, appointment_date, appointment_time) index.
+- appointment_number comes from a Snowflake-style generator (milliseconds,
+  random per-process worker id, per-millisecond sequence) instead of a
+  shared counter row; a duplicate number is simply retried.
+
+Usage:
+    python booking.py --install
+    python booking.py --benchmark --threads 32 --bookings 5000 --doctors 5
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from mysql.connector import Error
+from database_connection import DATABASE_NAME, DB_CONFIG, POOL_CONFIG, ConnectionPool, get_connection, logger
+from slot_search import BOOKED_STATUSES, SLOT_CONFIG, as_time, minutes
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+BOOKING_CONFIG = {
+    'max_retries': 3                # Retries after a deadlock or duplicate appointment_number
+}
+
+# Deadlock, lock wait timeout
+RETRYABLE_ERRORS = {1213, 1205}
+DUPLICATE_KEY = 1062
+
+SLOT_CLAIMS_TABLE = """CREATE TABLE IF NOT EXISTS appointment_slot_claims (
+    doctor_id INT NOT NULL,
+    slot_date DATE NOT NULL,
+    slot_time TIME NOT NULL,
+    appointment_id INT NOT NULL,
+    PRIMARY KEY (doctor_id, slot_date, slot_time),
+    INDEX idx_slot_claim_appointment (appointment_id)
+)"""
+
+# Claims follow the appointment: freed when it is cancelled, moved or deleted by
+# any writer. A moved appointment is still seen by the unclaimed-overlap check.
+_RELEASE_CLAIMS = "DELETE FROM appointment_slot_claims WHERE appointment_id = OLD.appointment_id"
+
+CLAIM_TRIGGERS = {
+    'trg_slot_claims_appointments_au': (
+        "AFTER UPDATE ON appointments FOR EACH ROW " + _RELEASE_CLAIMS +
+        " AND (NEW.status IN ('cancelled', 'rescheduled') OR NOT (OLD.doctor_id <=> NEW.doctor_id "
+        "AND OLD.appointment_date <=> NEW.appointment_date AND OLD.appointment_time <=> NEW.appointment_time "
+        "AND OLD.duration_minutes <=> NEW.duration_minutes))"),
+    'trg_slot_claims_appointments_ad': (
+        "AFTER DELETE ON appointments FOR EACH ROW " + _RELEASE_CLAIMS),
+}
+
+# Added by install_booking once existing appointments don't double-book
+SLOT_GUARD_COLUMN = "TINYINT AS (IF(status IN ('cancelled', 'rescheduled'), NULL, 1)) VIRTUAL"
+SLOT_GUARD_INDEX = "(doctor_id, appointment_date, appointment_time, slot_guard)"
+
+
+class AppointmentNumbers:
+    """Unique, roughly time-ordered appointment numbers without a shared counter
+
+    41 bits of milliseconds since EPOCH, a 10-bit worker id picked at random
+    per process and a 12-bit per-millisecond sequence.
+    """
+
+    EPOCH_MS = 1704067200000        # 2024-01-01 UTC
+
+    def __init__(self, worker_id=None):
+        self.worker_id = random.SystemRandom().getrandbits(10) if worker_id is None else worker_id & 0x3FF
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next(self):
+        with self._lock:
+            now = int(time.time() * 1000) - self.EPOCH_MS
+            if now <= self._last_ms:
+                now = self._last_ms
+                self._sequence = (self._sequence + 1) & 0xFFF
+                if self._sequence == 0:
+                    # Sequence exhausted within this millisecond: borrow the next one
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return f"APT{(now << 22) | (self.worker_id << 12) | self._sequence}"
+
+    def reseed(self):
+        """Pick another worker id (after colliding with another process)"""
+        with self._lock:
+            self.worker_id = random.SystemRandom().getrandbits(10)
+
+
+appointment_numbers = AppointmentNumbers()
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s", (table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def install_booking():
+    """Create the slot claims table and its triggers and add the slot guard to appointments"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute(SLOT_CLAIMS_TABLE)
+        for name, body in CLAIM_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+        if not _index_exists(cursor, 'appointments', 'uq_appointment_slot'):
+            cursor.execute("SELECT COUNT(*) FROM (SELECT 1 FROM appointments "
+                           "WHERE status NOT IN ('cancelled', 'rescheduled') "
+                           "GROUP BY doctor_id, appointment_date, appointment_time HAVING COUNT(*) > 1) AS clashes")
+            clashes = cursor.fetchone()[0]
+            if clashes:
+                # Generated or migrated data may double-book; the claims still protect new bookings
+                logger.warning(f"{clashes} doctor time slots already hold several live appointments; "
+                               f"skipping uq_appointment_slot until they are resolved")
+            else:
+                cursor.execute(f"ALTER TABLE appointments ADD COLUMN slot_guard {SLOT_GUARD_COLUMN}, "
+                               f"ADD UNIQUE KEY uq_appointment_slot {SLOT_GUARD_INDEX}")
+                logger.info("Added uq_appointment_slot to appointments")
+        cursor.close()
+        invalidate_statement_caches()
+        return True
+    except Error as e:
+        logger.error(f"Error installing booking tables: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def slot_cells(start, duration):
+    """slot_minutes cells (minutes since midnight) covered by [start, start + duration)"""
+    grid = SLOT_CONFIG['slot_minutes']
+    first = start // grid * grid
+    last = -(-(start + duration) // grid) * grid
+    return range(first, last, grid)
+
+
+def _book(cursor, patient_id, doctor_id, appointment_date, start, duration, details):
+    """Insert the appointment and its claims; return (appointment_id, number) or None if the time is taken"""
+    end = start + duration
+    statuses = ', '.join(['%s'] * len(BOOKED_STATUSES))
+    # Appointments without claims (loaded before this module) still block the time
+    cursor.execute(f"SELECT COUNT(*) FROM appointments WHERE doctor_id = %s AND appointment_date = %s "
+                   f"AND appointment_time < %s AND status IN ({statuses}) "
+                   f"AND ADDTIME(appointment_time, SEC_TO_TIME(duration_minutes * 60)) > %s",
+                   (doctor_id, appointment_date, as_time(end), *BOOKED_STATUSES, as_time(start)))
+    if cursor.fetchone()[0]:
+        return None
+    number = appointment_numbers.next()
+    cursor.execute("INSERT INTO appointments (appointment_number, patient_id, doctor_id, appointment_type_id, "
+                   "appointment_date, appointment_time, duration_minutes, room_id, reason, status, priority, "
+                   "created_by) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'scheduled', %s, %s)",
+                   (number, patient_id, doctor_id, details['appointment_type_id'], appointment_date, as_time(start),
+                    duration, details['room_id'], details['reason'], details['priority'], details['created_by']))
+    appointment_id = cursor.lastrowid
+    cursor.execute("INSERT INTO appointment_slot_claims (doctor_id, slot_date, slot_time, appointment_id) VALUES "
+                   + ', '.join(['(%s, %s, %s, %s)'] * len(slot_cells(start, duration))),
+                   [value for cell in slot_cells(start, duration)
+                    for value in (doctor_id, appointment_date, as_time(cell), appointment_id)])
+    return appointment_id, number
+
+
+def book_appointment(patient_id, doctor_id, appointment_date, appointment_time, duration_minutes=30,
+                     appointment_type_id=None, room_id=None, reason=None, priority='routine', created_by=None,
+                     connection=None):
+    """Book a doctor's time for a patient
+
+    Returns {appointment_id, appointment_number} on success, False if the
+    time overlaps another booking, None on error.
+    """
+    details = {'appointment_type_id': appointment_type_id, 'room_id': room_id, 'reason': reason,
+               'priority': priority, 'created_by': created_by}
+    if isinstance(appointment_time, str):
+        hours, _, rest = appointment_time.partition(':')
+        start = int(hours) * 60 + int(rest[:2])
+    else:
+        start = minutes(appointment_time)
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        for attempt in range(BOOKING_CONFIG['max_retries'] + 1):
+            cursor = connection.cursor()
+            try:
+                connection.start_transaction()
+                booked = _book(cursor, patient_id, doctor_id, appointment_date, start, duration_minutes, details)
+                if booked is None:
+                    connection.rollback()
+                    return False
+                connection.commit()
+                return {'appointment_id': booked[0], 'appointment_number': booked[1]}
+            except Error as e:
+                connection.rollback()
+                if e.errno == DUPLICATE_KEY and 'appointment_number' in str(e):
+                    appointment_numbers.reseed()
+                elif e.errno == DUPLICATE_KEY:
+                    # Claim or slot guard collision: someone booked an overlapping time first
+                    return False
+                elif e.errno not in RETRYABLE_ERRORS:
+                    raise
+                if attempt == BOOKING_CONFIG['max_retries']:
+                    raise
+            finally:
+                cursor.close()
+    except Error as e:
+        logger.error(f"Error booking appointment for patient {patient_id} with doctor {doctor_id}: {e}")
+        return None
+    finally:
+        if owned and connection:
+            connection.close()
+
+
+def cancel_appointment(appointment_id, reason=None, connection=None):
+    """Cancel a live appointment and release its time; return True if it was cancelled"""
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        cursor = connection.cursor()
+        try:
+            connection.start_transaction()
+            statuses = ', '.join(['%s'] * len(BOOKED_STATUSES))
+            cursor.execute(f"UPDATE appointments SET status = 'cancelled', cancellation_reason = %s "
+                           f"WHERE appointment_id = %s AND status IN ({statuses})",
+                           (reason, appointment_id, *BOOKED_STATUSES))
+            # trg_slot_claims_appointments_au releases the claims
+            cancelled = cursor.rowcount == 1
+            connection.commit()
+            return cancelled
+        except Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+    except Error as e:
+        logger.error(f"Error cancelling appointment {appointment_id}: {e}")
+        return False
+    finally:
+        if owned and connection:
+            connection.close()
+
+
+# ---- contention benchmark ----------------------------------------------------
+
+BENCHMARK_REASON = 'booking benchmark'
+
+
+def run_contention_benchmark(threads, bookings, doctors, days):
+    """Book random slots of a few doctors from many threads; report throughput, latency and overlaps"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT doctor_id FROM doctors WHERE status = 'active' ORDER BY doctor_id LIMIT %s",
+                       (doctors,))
+        doctor_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT patient_id FROM patients ORDER BY patient_id LIMIT 1000")
+        patient_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        connection.commit()
+    except Error as e:
+        logger.error(f"Error preparing booking benchmark: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+    if not doctor_ids or not patient_ids:
+        print("   Need active doctors and patients to run the benchmark")
+        return False
+
+    # Far enough ahead to stay clear of real bookings and the slot index horizon
+    first_day = date.today() + timedelta(days=365)
+    grid = SLOT_CONFIG['slot_minutes']
+    cells = [(doctor_id, first_day + timedelta(days=day), 8 * 60 + slot * grid)
+             for doctor_id in doctor_ids for day in range(days) for slot in range(9 * 60 // grid)]
+    latencies, outcomes = [], {'booked': 0, 'taken': 0, 'error': 0}
+    lock = threading.Lock()
+
+    def attempt(seed):
+        rng = random.Random(seed)
+        doctor_id, day, start = rng.choice(cells)
+        started = time.perf_counter()
+        connection = pool.get_connection()
+        try:
+            result = book_appointment(rng.choice(patient_ids), doctor_id, day, start,
+                                      duration_minutes=rng.choice((grid, 2 * grid)), reason=BENCHMARK_REASON,
+                                      connection=connection)
+        finally:
+            connection.close()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            outcomes['booked' if result else 'taken' if result is False else 'error'] += 1
+
+    # One connection per thread: measure contention on the slots, not on pool checkout
+    pool = ConnectionPool({**DB_CONFIG, 'database': DATABASE_NAME}, **{**POOL_CONFIG, 'pool_size': threads})
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(attempt, range(bookings)))
+    finally:
+        pool.close_all()
+    elapsed = time.perf_counter() - started
+
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        # Overlapping live benchmark appointments of the same doctor (must be zero)
+        cursor.execute("SELECT COUNT(*) FROM appointments a JOIN appointments b "
+                       "ON a.doctor_id = b.doctor_id AND a.appointment_date = b.appointment_date "
+                       "AND a.appointment_id < b.appointment_id "
+                       "AND a.appointment_time < ADDTIME(b.appointment_time, SEC_TO_TIME(b.duration_minutes * 60)) "
+                       "AND b.appointment_time < ADDTIME(a.appointment_time, SEC_TO_TIME(a.duration_minutes * 60)) "
+                       "WHERE a.reason = %s AND b.reason = %s AND a.status = 'scheduled' AND b.status = 'scheduled'",
+                       (BENCHMARK_REASON, BENCHMARK_REASON))
+        overlaps = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM appointments WHERE reason = %s AND appointment_date >= %s",
+                       (BENCHMARK_REASON, first_day))
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.error(f"Error verifying booking benchmark: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+    latencies.sort()
+    print(f"   Threads:          {threads} ({len(doctor_ids)} doctors, {len(cells)} slots)")
+    print(f"   Attempts:         {bookings:,} in {elapsed:.2f}s")
+    print(f"   Booked:           {outcomes['booked']:,} ({outcomes['booked'] / elapsed:,.0f} bookings/sec)")
+    print(f"   Slot taken:       {outcomes['taken']:,}")
+    print(f"   Errors:           {outcomes['error']:,}")
+    print(f"   Latency:          median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f} ms")
+    print(f"   Overlaps:         {overlaps}")
+    return overlaps == 0 and outcomes['error'] == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrency-safe appointment booking")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="create slot claims and the appointments slot guard")
+    action.add_argument('--benchmark', action='store_true', help="run the multi-threaded contention benchmark")
+    parser.add_argument('--threads', type=int, default=32, help="booking threads (default: 32)")
+    parser.add_argument('--bookings', type=int, default=5000, help="booking attempts (default: 5000)")
+    parser.add_argument('--doctors', type=int, default=5, help="doctors to book (fewer = more contention)")
+    parser.add_argument('--days', type=int, default=2, help="days of slots per doctor (default: 2)")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - APPOINTMENT BOOKING")
+    print("=" * 60)
+    if args.install:
+        success = install_booking()
+    else:
+        success = run_contention_benchmark(args.threads, args.bookings, args.doctors, args.days)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
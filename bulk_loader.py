@@ -0,0 +1,287 @@
+"""
+Hospital OLTP System - Bulk Loader (LOAD DATA LOCAL INFILE)
+============================================================
+
+Loads synthetic_data_generator.py data through MySQL's bulk-load path instead
+of batched INSERT IGNORE statements.
+
+For every table:
+- Generated rows are streamed as TSV to a temporary file, or to a named pipe
+  (--pipe, POSIX only) so nothing is staged on disk.
+- unique_checks and foreign_key_checks are relaxed for the session while the
+  file is ingested with LOAD DATA LOCAL INFILE ... IGNORE, then restored.
+- Because the server skipped FK validation, a post-load verification counts
+  orphaned FK values (anti-join against every parent listed in
+  create_schema.sql) and compares the rows the table gained with the rows
+  loaded, so rows skipped by IGNORE (duplicates) are reported.
+
+--method compare loads alternating chunks of each table with LOAD DATA and with
+the existing executemany path, so both rates are measured on the same data.
+
+The server must allow local infile (SET GLOBAL local_infile = 1). Client-side,
+only files inside the bulk load directory can be sent.
+
+Usage:
+    python bulk_loader.py --patients 1_000_000
+    python bulk_loader.py --patients 200_000 --method compare --pipe
+
+Exit Codes:
+    0: All data loaded and verified
+    1: Loading or verification failed
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from itertools import takewhile
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+import parallel_loader
+import synthetic_data_generator
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+BULK_LOAD_DIR = os.path.join(tempfile.gettempdir(), 'hospital_oltp_bulk')
+
+METHODS = ('load_data', 'executemany', 'compare')
+
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def tsv_value(value):
+    """Format one value in LOAD DATA's default (tab/newline, backslash-escaped) format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat(' ') if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return str(value).translate(_TSV_ESCAPES)
+
+
+def write_tsv(rows, file):
+    """Write rows to a binary file object as UTF-8 TSV; return the row count"""
+    written = 0
+    for row in rows:
+        file.write(('\t'.join(tsv_value(value) for value in row) + '\n').encode('utf-8'))
+        written += 1
+    return written
+
+
+def load_data_sql(table):
+    """Build the LOAD DATA statement for a generated table (file path is a parameter)"""
+    columns = ', '.join(synthetic_data_generator.TABLE_COLUMNS[table])
+    return (f"LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({columns})")
+
+
+def _load_file(cursor, table, rows):
+    """Stage rows in a temporary TSV file and ingest it; return (rows_written, rows_inserted)"""
+    fd, path = tempfile.mkstemp(prefix=f'{table}_', suffix='.tsv', dir=BULK_LOAD_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            written = write_tsv(rows, file)
+        cursor.execute(load_data_sql(table), (path,))
+        return written, cursor.rowcount
+    finally:
+        os.remove(path)
+
+
+def _load_pipe(cursor, table, rows):
+    """Stream rows through a named pipe while the server ingests it"""
+    path = os.path.join(BULK_LOAD_DIR, f'{table}_{os.getpid()}_{threading.get_ident()}.fifo')
+    os.mkfifo(path, 0o600)
+    result = {'written': 0, 'error': None}
+    cancelled = threading.Event()
+
+    def writer():
+        try:
+            # Blocks until the connector opens the pipe for reading
+            with open(path, 'wb') as pipe:
+                result['written'] = write_tsv(takewhile(lambda _: not cancelled.is_set(), rows), pipe)
+        except OSError as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=writer, name=f'tsv-{table}', daemon=True)
+    thread.start()
+    try:
+        cursor.execute(load_data_sql(table), (path,))
+        thread.join()
+        if result['error']:
+            raise result['error']
+        return result['written'], cursor.rowcount
+    finally:
+        if thread.is_alive():
+            # LOAD DATA failed before reading: stop the writer and drain the pipe until it exits
+            cancelled.set()
+            reader = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            try:
+                while thread.is_alive():
+                    try:
+                        os.read(reader, 65536)
+                    except BlockingIOError:
+                        thread.join(0.01)
+            finally:
+                os.close(reader)
+        os.remove(path)
+
+
+def bulk_load_rows(cursor, table, rows, use_pipe=False):
+    """Load rows with LOAD DATA LOCAL INFILE under relaxed checks; return (written, inserted)"""
+    os.makedirs(BULK_LOAD_DIR, exist_ok=True)
+    cursor.execute("SELECT @@SESSION.unique_checks, @@SESSION.foreign_key_checks")
+    unique_checks, foreign_key_checks = cursor.fetchone()
+    cursor.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+    try:
+        if use_pipe and hasattr(os, 'mkfifo'):
+            return _load_pipe(cursor, table, rows)
+        return _load_file(cursor, table, rows)
+    finally:
+        cursor.execute("SET SESSION unique_checks = %s, foreign_key_checks = %s",
+                       (unique_checks, foreign_key_checks))
+
+
+def count_rows(cursor, table):
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def verify_table(cursor, table, foreign_keys, expected_rows=None, rows_before=0):
+    """Return a list of integrity problems for a bulk-loaded table
+
+    With expected_rows, the table must have gained that many rows since it
+    held rows_before.
+    """
+    problems = []
+    for child, column, parent, parent_column in foreign_keys:
+        if child != table:
+            continue
+        cursor.execute(f"SELECT COUNT(*) FROM {child} c LEFT JOIN {parent} p ON p.{parent_column} = c.{column} "
+                       f"WHERE c.{column} IS NOT NULL AND p.{parent_column} IS NULL")
+        orphans = cursor.fetchone()[0]
+        if orphans:
+            problems.append(f"{orphans} {table}.{column} values missing from {parent}.{parent_column}")
+    if expected_rows is not None:
+        gained = count_rows(cursor, table) - rows_before
+        if gained != expected_rows:
+            problems.append(f"{table} gained {gained} rows, expected {expected_rows} "
+                            f"({expected_rows - gained} skipped as duplicates or missing)")
+    return problems
+
+
+def _rate(rows, elapsed):
+    return rows / elapsed if elapsed > 0 else 0
+
+
+def bulk_load_synthetic(method='load_data', use_pipe=False, batch_size=1000,
+                        seed=synthetic_data_generator.DEFAULT_SEED,
+                        anchor_date=synthetic_data_generator.DEFAULT_ANCHOR_DATE, **scale):
+    """Load synthetic data with LOAD DATA, executemany, or both (alternating chunks)"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}; expected one of {', '.join(METHODS)}")
+    os.makedirs(BULK_LOAD_DIR, exist_ok=True)
+    foreign_keys = parallel_loader.parse_foreign_key_columns()
+    connection = None
+    try:
+        connection = get_connection(local_infile_dir=BULK_LOAD_DIR)
+        cursor = connection.cursor()
+        generator = synthetic_data_generator.SyntheticDataGenerator(
+            synthetic_data_generator.fetch_reference_ids(cursor),
+            synthetic_data_generator.fetch_id_offsets(cursor),
+            seed=seed, anchor_date=anchor_date, **scale)
+
+        print("\n" + "=" * 70)
+        print(f"HOSPITAL OLTP SYSTEM - BULK LOADER ({method}{', pipe' if use_pipe else ''})")
+        print("=" * 70)
+        print(f"Patients: {generator.scale['patients']:,}  Seed: {seed}  Anchor date: {anchor_date}")
+
+        # totals[path] = [rows, seconds]
+        totals = {'load_data': [0, 0.0], 'executemany': [0, 0.0]}
+        problems = []
+        for domain, table in synthetic_data_generator.generation_plan(generator):
+            table_rows = {'load_data': [0, 0.0], 'executemany': [0, 0.0]}
+            rows_before = count_rows(cursor, table)
+            for chunk in range(generator.chunk_count(table)):
+                path = method if method != 'compare' else ('executemany', 'load_data')[chunk % 2]
+                started = time.perf_counter()
+                if path == 'load_data':
+                    written, inserted = bulk_load_rows(cursor, table, generator.rows(table, chunk), use_pipe)
+                    if inserted < written:
+                        logger.warning(f"{table}[{chunk}]: {written - inserted} duplicate rows skipped")
+                else:
+                    written = synthetic_data_generator.load_table(cursor, generator, table, batch_size, [chunk])
+                connection.commit()
+                table_rows[path][0] += written
+                table_rows[path][1] += time.perf_counter() - started
+
+            loaded = sum(rows for rows, _ in table_rows.values())
+            table_problems = verify_table(cursor, table, foreign_keys, loaded, rows_before)
+            problems.extend(table_problems)
+            rates = '  '.join(f"{path}: {_rate(rows, seconds):>10,.0f} rows/sec"
+                              for path, (rows, seconds) in table_rows.items() if rows)
+            status = 'FAILED' if table_problems else 'OK'
+            logger.info(f"Loaded {loaded} {table} rows ({rates.strip()})")
+            print(f"   [{status}] {table:<30}: {loaded:>11,} rows  {rates}")
+            for path, (rows, seconds) in table_rows.items():
+                totals[path][0] += rows
+                totals[path][1] += seconds
+
+        cursor.close()
+        print("\n" + "=" * 70)
+        for path, (rows, seconds) in totals.items():
+            if rows:
+                print(f"  {path:<12}: {rows:>12,} rows in {seconds:>8.1f}s ({_rate(rows, seconds):,.0f} rows/sec)")
+        if totals['load_data'][0] and totals['executemany'][0]:
+            speedup = _rate(*totals['load_data']) / max(_rate(*totals['executemany']), 1)
+            print(f"  LOAD DATA speedup over executemany: {speedup:.1f}x")
+        print("=" * 70)
+
+        if problems:
+            for problem in problems:
+                logger.error(f"Integrity check failed: {problem}")
+                print(f"   [FAILED] {problem}")
+            return False
+        print("[OK] POST-LOAD INTEGRITY VERIFICATION PASSED")
+        return True
+
+    except Error as e:
+        logger.error(f"Error bulk loading synthetic data: {e}")
+        print(f"\n[FAILED] Error: {e}")
+        if connection and connection.is_connected():
+            connection.rollback()
+        return False
+
+    finally:
+        if connection:
+            connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk load synthetic data with LOAD DATA LOCAL INFILE")
+    parser.add_argument('--method', choices=METHODS, default='load_data',
+                        help="load path; compare alternates chunks between both (default: load_data)")
+    parser.add_argument('--pipe', action='store_true', help="stream through a named pipe instead of temp files")
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per executemany (default: 1000)")
+    synthetic_data_generator.add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    return bulk_load_synthetic(method=args.method, use_pipe=args.pipe, batch_size=args.batch_size,
+                               seed=args.seed, anchor_date=args.anchor_date,
+                               **synthetic_data_generator.scale_from_args(args))
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,513 @@
+"""
+Hospital OLTP System - Batch Claim Adjudication
+===============================================
+
+Adjudicates submitted and pending insurance_claims in a streaming pipeline:
+one reader pages through the claims, a pool of workers adjudicates and writes
+whole batches, and a checkpoint lets an interrupted run continue where it
+stopped.
+
+- The reader pages with keyset pagination on (status, claim_id), which the
+  status index covers, so every page is an index range read no matter how
+  far the run has got (no OFFSET).
+- A worker adjudicates a batch in one transaction with a handful of
+  set-based reads: the claims (locked), their policies and plans (locked,
+  so batches sharing a policy take turns on its deductible and
+  authorizations), the claim items, approved authorizations and the
+  deductible / out-of-pocket already used this year.
+- Rules: the policy must belong to the patient, be active and cover the
+  service dates, and its plan must be active and in effect then. Lines
+  charging more than authorization_over need an approved authorization for
+  the policy (matching CPT code or none, valid on the service date, units
+  left). Allowed amounts then pay after deductible, copay and coinsurance,
+  with the patient's share capped at the plan's out-of-pocket maximum.
+- Results go out in bulk: one multi-row upsert into claim_adjudications,
+  then UPDATE ... JOINs that copy them to insurance_claims,
+  insurance_claim_items and insurance_authorizations.units_used.
+- Batches complete in order of submission; after each, the run's checkpoint
+  (last claim_id per status) and counters are saved, and claims/sec is
+  logged. Adjudicated claims leave the submitted/pending statuses, so a
+  re-run never adjudicates a claim twice.
+
+Usage:
+    python claim_adjudication.py --install
+    python claim_adjudication.py --run --workers 8 --batch-size 500
+    python claim_adjudication.py --run --resume
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import logging
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+
+from mysql.connector import Error
+from database_connection import DATABASE_NAME, DB_CONFIG, POOL_CONFIG, ConnectionPool, get_connection, logger
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+ADJUDICATION_CONFIG = {
+    'batch_size': 500,              # Claims per worker transaction
+    'workers': 8,                   # Adjudicating threads
+    'batches_ahead': 2,             # Batches queued per worker before the reader waits
+    'authorization_over': Decimal('2500.00'),  # Line charges above this need prior authorization
+    'max_retries': 3,               # Retries after a deadlock or lock wait timeout
+    'progress_every': 20            # Batches between throughput log lines
+}
+
+# Deadlock, lock wait timeout
+RETRYABLE_ERRORS = {1213, 1205}
+
+# Statuses awaiting adjudication, read in this order
+PENDING_STATUSES = ('submitted', 'pending')
+
+CENTS = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+ADJUDICATION_TABLES = [
+    """CREATE TABLE IF NOT EXISTS claim_adjudications (
+    claim_id INT PRIMARY KEY,
+    run_id INT NOT NULL,
+    policy_id INT NOT NULL,
+    service_year SMALLINT NOT NULL,
+    status ENUM('approved', 'denied') NOT NULL,
+    allowed_amount DECIMAL(12,2) NOT NULL,
+    deductible_applied DECIMAL(12,2) NOT NULL,
+    copay_applied DECIMAL(12,2) NOT NULL,
+    coinsurance_amount DECIMAL(12,2) NOT NULL,
+    patient_responsibility DECIMAL(12,2) NOT NULL,
+    payable_amount DECIMAL(12,2) NOT NULL,
+    denied_lines INT NOT NULL,
+    denial_reason VARCHAR(255),
+    adjudicated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_adjudication_policy_year (policy_id, service_year),
+    INDEX idx_adjudication_run (run_id)
+)""",
+    """CREATE TABLE IF NOT EXISTS claim_adjudication_runs (
+    run_id INT PRIMARY KEY AUTO_INCREMENT,
+    status ENUM('running', 'finished', 'failed') NOT NULL DEFAULT 'running',
+    claims_processed INT NOT NULL DEFAULT 0,
+    claims_approved INT NOT NULL DEFAULT 0,
+    claims_denied INT NOT NULL DEFAULT 0,
+    elapsed_seconds DECIMAL(12,3) NOT NULL DEFAULT 0,
+    started_at DATETIME(6) NOT NULL,
+    finished_at DATETIME(6)
+)""",
+    """CREATE TABLE IF NOT EXISTS claim_adjudication_checkpoints (
+    run_id INT NOT NULL,
+    claim_status VARCHAR(20) NOT NULL,
+    last_claim_id INT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, claim_status)
+)"""
+]
+
+
+def install_adjudication():
+    """Create the adjudication result, run and checkpoint tables"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        for statement in ADJUDICATION_TABLES:
+            cursor.execute(statement)
+        cursor.close()
+        invalidate_statement_caches()
+        return True
+    except Error as e:
+        logger.error(f"Error installing claim adjudication tables: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+# ---- rules -----------------------------------------------------------------
+
+def _money(value):
+    return Decimal(value or 0).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _covers(start, end, day):
+    return (start is None or start <= day) and (end is None or day <= end)
+
+
+def claim_denial(claim, policy):
+    """Reason the whole claim is denied, or None"""
+    if policy is None:
+        return 'Policy not found'
+    if policy['patient_id'] != claim['patient_id']:
+        return 'Policy does not belong to the patient'
+    if policy['status'] != 'active':
+        return f"Policy {policy['status']}"
+    if not (_covers(policy['policy_start_date'], policy['policy_end_date'], claim['service_date_from'])
+            and _covers(policy['policy_start_date'], policy['policy_end_date'], claim['service_date_to'])):
+        return 'Service dates outside the policy period'
+    if not policy['is_active'] or not _covers(policy['effective_date'], policy['termination_date'],
+                                              claim['service_date_from']):
+        return 'Plan not in effect on the service date'
+    return None
+
+
+def _take_authorization(item, authorizations, units_used):
+    """Consume units of a matching approved authorization; return its id or None"""
+    for authorization in authorizations:
+        if authorization['cpt_code_id'] not in (None, item['cpt_code_id']):
+            continue
+        if not _covers(authorization['effective_date'], authorization['expiration_date'], item['service_date']):
+            continue
+        used = units_used.get(authorization['authorization_id'], authorization['units_used'] or 0)
+        quantity = item['quantity'] or 1
+        if authorization['units_authorized'] is not None and used + quantity > authorization['units_authorized']:
+            continue
+        units_used[authorization['authorization_id']] = used + quantity
+        return authorization['authorization_id']
+    return None
+
+
+def adjudicate_claim(claim, items, policy, authorizations, year_usage, units_used):
+    """Adjudicate one claim; return (claim result, [(claim_item_id, allowed, adjustment, reason)])
+
+    year_usage {(policy_id, year): [deductible applied, patient responsibility]}
+    and units_used {authorization_id: units} carry state between the claims
+    of a batch and are updated in place.
+    """
+    denial = claim_denial(claim, policy)
+    lines, allowed, denied_lines = [], ZERO, 0
+    for item in items:
+        charge = _money(item['total_charge'])
+        reason = denial
+        if reason is None and charge > ADJUDICATION_CONFIG['authorization_over'] and \
+                _take_authorization(item, authorizations, units_used) is None:
+            reason = 'No prior authorization'
+        if reason is None:
+            allowed += charge
+            lines.append((item['claim_item_id'], charge, ZERO, None))
+        else:
+            denied_lines += 1
+            lines.append((item['claim_item_id'], ZERO, charge, reason[:255]))
+
+    year = claim['service_date_from'].year
+    usage = year_usage.setdefault((claim['policy_id'], year), [ZERO, ZERO])
+    deductible = copay = coinsurance = patient = ZERO
+    if allowed > 0:
+        deductible = min(allowed, max(ZERO, _money(policy['deductible_amount']) - usage[0]))
+        copay = min(allowed - deductible, _money(policy['copay_amount']))
+        coverage = Decimal(100) if policy['coverage_percentage'] is None else Decimal(policy['coverage_percentage'])
+        coinsurance = _money((allowed - deductible - copay) * (100 - coverage) / 100)
+        patient = deductible + copay + coinsurance
+        if policy['out_of_pocket_max'] is not None:
+            patient = min(patient, max(ZERO, _money(policy['out_of_pocket_max']) - usage[1]))
+        usage[0] += deductible
+        usage[1] += patient
+    if allowed > 0:
+        status, reason = 'approved', None
+    else:
+        status = 'denied'
+        reason = denial or next((line[3] for line in lines if line[3]), 'No billable lines')
+    result = {'claim_id': claim['claim_id'], 'policy_id': claim['policy_id'], 'service_year': year,
+              'status': status, 'allowed_amount': allowed, 'deductible_applied': deductible,
+              'copay_applied': copay, 'coinsurance_amount': coinsurance, 'patient_responsibility': patient,
+              'payable_amount': allowed - patient, 'denied_lines': denied_lines, 'denial_reason': reason,
+              'adjustment_amount': _money(claim['total_charge']) - allowed}
+    return result, lines
+
+
+# ---- batches ---------------------------------------------------------------
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _load_batch(cursor, claim_ids, status):
+    """Claims, policies, items, authorizations and year usage of a batch, locking claims and policies"""
+    cursor.execute(f"SELECT claim_id, patient_id, policy_id, service_date_from, "
+                   f"COALESCE(service_date_to, service_date_from) AS service_date_to, total_charge "
+                   f"FROM insurance_claims WHERE claim_id IN ({_placeholders(claim_ids)}) AND status = %s "
+                   f"ORDER BY claim_id FOR UPDATE", (*claim_ids, status))
+    claims = cursor.fetchall()
+    if not claims:
+        return claims, {}, {}, {}, {}
+    policy_ids = sorted({claim['policy_id'] for claim in claims})
+    cursor.execute(f"SELECT p.policy_id, p.patient_id, p.status, p.policy_start_date, p.policy_end_date, "
+                   f"pl.is_active, pl.effective_date, pl.termination_date, pl.deductible_amount, pl.copay_amount, "
+                   f"pl.out_of_pocket_max, pl.coverage_percentage FROM patient_insurance_policies p "
+                   f"JOIN insurance_plans pl ON pl.plan_id = p.insurance_plan_id "
+                   f"WHERE p.policy_id IN ({_placeholders(policy_ids)}) ORDER BY p.policy_id FOR UPDATE OF p",
+                   policy_ids)
+    policies = {row['policy_id']: row for row in cursor.fetchall()}
+    found_ids = [claim['claim_id'] for claim in claims]
+    cursor.execute(f"SELECT claim_item_id, claim_id, service_date, cpt_code_id, quantity, total_charge "
+                   f"FROM insurance_claim_items WHERE claim_id IN ({_placeholders(found_ids)}) "
+                   f"ORDER BY claim_id, line_number", found_ids)
+    items = {}
+    for row in cursor.fetchall():
+        items.setdefault(row['claim_id'], []).append(row)
+    cursor.execute(f"SELECT authorization_id, policy_id, cpt_code_id, units_authorized, units_used, "
+                   f"effective_date, expiration_date FROM insurance_authorizations "
+                   f"WHERE policy_id IN ({_placeholders(policy_ids)}) AND status = 'approved' "
+                   f"ORDER BY expiration_date, authorization_id", policy_ids)
+    authorizations = {}
+    for row in cursor.fetchall():
+        authorizations.setdefault(row['policy_id'], []).append(row)
+    # Claims being re-adjudicated don't count against their own deductible
+    cursor.execute(f"SELECT policy_id, service_year, SUM(deductible_applied) AS deductible, "
+                   f"SUM(patient_responsibility) AS patient FROM claim_adjudications "
+                   f"WHERE policy_id IN ({_placeholders(policy_ids)}) "
+                   f"AND claim_id NOT IN ({_placeholders(found_ids)}) GROUP BY policy_id, service_year",
+                   (*policy_ids, *found_ids))
+    year_usage = {(row['policy_id'], row['service_year']): [_money(row['deductible']), _money(row['patient'])]
+                  for row in cursor.fetchall()}
+    return claims, policies, items, authorizations, year_usage
+
+
+def _write_results(cursor, run_id, results, lines, units_used, authorizations_before):
+    """Upsert claim_adjudications and copy the results to claims, items and authorizations"""
+    columns = ('claim_id', 'run_id', 'policy_id', 'service_year', 'status', 'allowed_amount', 'deductible_applied',
+               'copay_applied', 'coinsurance_amount', 'patient_responsibility', 'payable_amount', 'denied_lines',
+               'denial_reason')
+    row = f"({_placeholders(columns)})"
+    updates = ', '.join(f"{column} = new.{column}" for column in columns[1:])
+    cursor.execute(f"INSERT INTO claim_adjudications ({', '.join(columns)}) VALUES "
+                   f"{', '.join([row] * len(results))} AS new ON DUPLICATE KEY UPDATE {updates}, "
+                   f"adjudicated_at = CURRENT_TIMESTAMP",
+                   [value for result in results
+                    for value in (result['claim_id'], run_id, *(result[column] for column in columns[2:]))])
+    claim_ids = [result['claim_id'] for result in results]
+    cursor.execute(f"UPDATE insurance_claims c JOIN (VALUES "
+                   f"{', '.join(['ROW(%s, %s)'] * len(results))}) AS r ON c.claim_id = r.column_0 "
+                   f"JOIN claim_adjudications a ON a.claim_id = c.claim_id "
+                   f"SET c.status = a.status, c.allowed_amount = a.allowed_amount, "
+                   f"c.patient_responsibility = a.patient_responsibility, c.adjustment_amount = r.column_1, "
+                   f"c.denial_reason = a.denial_reason, c.adjudication_date = CURDATE() "
+                   f"WHERE c.claim_id IN ({_placeholders(claim_ids)})",
+                   [value for result in results for value in (result['claim_id'], result['adjustment_amount'])]
+                   + claim_ids)
+    if lines:
+        cursor.execute(f"UPDATE insurance_claim_items i JOIN (VALUES "
+                       f"{', '.join(['ROW(%s, %s, %s, %s)'] * len(lines))}) AS r ON i.claim_item_id = r.column_0 "
+                       f"SET i.allowed_amount = r.column_1, i.adjustment_amount = r.column_2, "
+                       f"i.adjustment_reason = r.column_3",
+                       [value for line in lines for value in line])
+    consumed = [(authorization_id, units - authorizations_before[authorization_id])
+                for authorization_id, units in units_used.items() if units != authorizations_before[authorization_id]]
+    if consumed:
+        cursor.execute(f"UPDATE insurance_authorizations a JOIN (VALUES "
+                       f"{', '.join(['ROW(%s, %s)'] * len(consumed))}) AS r ON a.authorization_id = r.column_0 "
+                       f"SET a.units_used = COALESCE(a.units_used, 0) + r.column_1",
+                       [value for pair in consumed for value in pair])
+
+
+def adjudicate_batch(run_id, status, claim_ids, pool=None):
+    """Adjudicate and write one batch in a transaction; return (approved, denied) or None on error
+
+    pool is the ConnectionPool to borrow from (the shared one when omitted).
+    """
+    connection = None
+    try:
+        connection = pool.get_connection() if pool else get_connection()
+        for attempt in range(ADJUDICATION_CONFIG['max_retries'] + 1):
+            cursor = connection.cursor(dictionary=True)
+            try:
+                connection.start_transaction()
+                claims, policies, items, authorizations, year_usage = _load_batch(cursor, claim_ids, status)
+                units_used = {}
+                results, lines = [], []
+                for claim in claims:
+                    result, claim_lines = adjudicate_claim(
+                        claim, items.get(claim['claim_id'], []), policies.get(claim['policy_id']),
+                        authorizations.get(claim['policy_id'], []), year_usage, units_used)
+                    results.append(result)
+                    lines.extend(claim_lines)
+                if results:
+                    before = {authorization['authorization_id']: authorization['units_used'] or 0
+                              for rows in authorizations.values() for authorization in rows}
+                    _write_results(cursor, run_id, results, lines, units_used, before)
+                connection.commit()
+                approved = sum(1 for result in results if result['status'] == 'approved')
+                return approved, len(results) - approved
+            except Error as e:
+                connection.rollback()
+                if e.errno not in RETRYABLE_ERRORS or attempt == ADJUDICATION_CONFIG['max_retries']:
+                    raise
+                logger.warning(f"Retrying claim batch {claim_ids[0]}-{claim_ids[-1]} after: {e}")
+            finally:
+                cursor.close()
+    except Error as e:
+        logger.error(f"Error adjudicating claims {claim_ids[0]}-{claim_ids[-1]}: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+# ---- runs and checkpoints --------------------------------------------------
+
+def _start_run(cursor, resume):
+    """(run_id, {status: last_claim_id}, counters) of a resumed or new run"""
+    if resume:
+        cursor.execute("SELECT run_id, claims_processed, claims_approved, claims_denied, elapsed_seconds "
+                       "FROM claim_adjudication_runs WHERE status IN ('running', 'failed') "
+                       "ORDER BY run_id DESC LIMIT 1")
+        run = cursor.fetchone()
+        if run is not None:
+            cursor.execute("UPDATE claim_adjudication_runs SET status = 'running', finished_at = NULL "
+                           "WHERE run_id = %s", (run[0],))
+            cursor.execute("SELECT claim_status, last_claim_id FROM claim_adjudication_checkpoints "
+                           "WHERE run_id = %s", (run[0],))
+            checkpoints = dict(cursor.fetchall())
+            logger.info(f"Resuming claim adjudication run {run[0]} from {checkpoints}")
+            return run[0], checkpoints, {'processed': run[1], 'approved': run[2], 'denied': run[3],
+                                         'elapsed': float(run[4])}
+        logger.info("No unfinished claim adjudication run to resume; starting a new one")
+    cursor.execute("INSERT INTO claim_adjudication_runs (started_at) VALUES (NOW(6))")
+    return cursor.lastrowid, {}, {'processed': 0, 'approved': 0, 'denied': 0, 'elapsed': 0.0}
+
+
+def _save_progress(connection, run_id, counters, run_status='running', status=None, last_claim_id=None):
+    """Store the run's counters and, with a status, its checkpoint for that status"""
+    cursor = connection.cursor()
+    if status is not None:
+        cursor.execute("INSERT INTO claim_adjudication_checkpoints (run_id, claim_status, last_claim_id) "
+                       "VALUES (%s, %s, %s) AS new ON DUPLICATE KEY UPDATE last_claim_id = new.last_claim_id",
+                       (run_id, status, last_claim_id))
+    cursor.execute("UPDATE claim_adjudication_runs SET status = %s, claims_processed = %s, claims_approved = %s, "
+                   "claims_denied = %s, elapsed_seconds = %s, "
+                   "finished_at = IF(%s = 'running', NULL, NOW(6)) WHERE run_id = %s",
+                   (run_status, counters['processed'], counters['approved'], counters['denied'],
+                    round(counters['elapsed'], 3), run_status, run_id))
+    connection.commit()
+    cursor.close()
+
+
+def _keyset_pages(connection, status, after, batch_size, limit):
+    """Lists of claim_ids with the given status above after, in claim_id order"""
+    cursor = connection.cursor()
+    read = 0
+    while limit is None or read < limit:
+        size = batch_size if limit is None else min(batch_size, limit - read)
+        cursor.execute("SELECT claim_id FROM insurance_claims WHERE status = %s AND claim_id > %s "
+                       "ORDER BY claim_id LIMIT %s", (status, after, size))
+        claim_ids = [row[0] for row in cursor.fetchall()]
+        # A fresh snapshot per page
+        connection.commit()
+        if not claim_ids:
+            break
+        read += len(claim_ids)
+        after = claim_ids[-1]
+        yield claim_ids
+    cursor.close()
+
+
+def run_adjudication(workers=None, batch_size=None, resume=False, max_claims=None):
+    """Adjudicate pending claims with a worker pool; return True if every batch succeeded"""
+    workers = workers or ADJUDICATION_CONFIG['workers']
+    batch_size = batch_size or ADJUDICATION_CONFIG['batch_size']
+    # One connection per worker, apart from the shared pool the reader borrows from
+    pool = ConnectionPool({**DB_CONFIG, 'database': DATABASE_NAME}, **{**POOL_CONFIG, 'pool_size': workers})
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        run_id, checkpoints, counters = _start_run(cursor, resume)
+        connection.commit()
+        cursor.close()
+        success = True
+        started = time.perf_counter() - counters['elapsed']
+        batches = 0
+        remaining = max_claims
+        in_flight = deque()
+
+        def collect(status):
+            """Wait for the oldest batch, count it and move the checkpoint past it"""
+            nonlocal batches
+            last_claim_id, future = in_flight.popleft()
+            outcome = future.result()
+            if outcome is None:
+                return False
+            batches += 1
+            counters['approved'] += outcome[0]
+            counters['denied'] += outcome[1]
+            counters['processed'] += outcome[0] + outcome[1]
+            counters['elapsed'] = time.perf_counter() - started
+            _save_progress(connection, run_id, counters, status=status, last_claim_id=last_claim_id)
+            if batches % ADJUDICATION_CONFIG['progress_every'] == 0:
+                logger.info(f"Run {run_id}: {counters['processed']:,} claims, "
+                            f"{counters['processed'] / counters['elapsed']:,.0f} claims/sec")
+            return True
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for status in PENDING_STATUSES:
+                for claim_ids in _keyset_pages(connection, status, checkpoints.get(status, 0), batch_size, remaining):
+                    if remaining is not None:
+                        remaining -= len(claim_ids)
+                    future = executor.submit(adjudicate_batch, run_id, status, claim_ids, pool)
+                    in_flight.append((claim_ids[-1], future))
+                    while success and in_flight and (
+                            len(in_flight) >= workers * ADJUDICATION_CONFIG['batches_ahead'] or in_flight[0][1].done()):
+                        success = collect(status)
+                    if not success:
+                        break
+                while in_flight:
+                    # Let submitted batches finish; the checkpoint stops at the first failure
+                    if success:
+                        success = collect(status)
+                    else:
+                        in_flight.popleft()[1].result()
+                if not success or remaining == 0:
+                    break
+        counters['elapsed'] = time.perf_counter() - started
+        _save_progress(connection, run_id, counters, 'finished' if success else 'failed')
+        elapsed = counters['elapsed']
+        print(f"   Run:              {run_id} ({workers} workers, batches of {batch_size})")
+        print(f"   Claims:           {counters['processed']:,} in {elapsed:.2f}s "
+              f"({counters['processed'] / elapsed if elapsed else 0:,.0f} claims/sec)")
+        print(f"   Approved:         {counters['approved']:,}")
+        print(f"   Denied:           {counters['denied']:,}")
+        if not success:
+            print("   Stopped after a failed batch; --resume continues from the checkpoint")
+        return success
+    except Error as e:
+        logger.error(f"Error running claim adjudication: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+        pool.close_all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch adjudication of submitted and pending insurance claims")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="create the result, run and checkpoint tables")
+    action.add_argument('--run', action='store_true', help="adjudicate pending claims")
+    parser.add_argument('--resume', action='store_true', help="continue the last unfinished run from its checkpoint")
+    parser.add_argument('--workers', type=int, default=ADJUDICATION_CONFIG['workers'],
+                        help=f"adjudicating threads (default: {ADJUDICATION_CONFIG['workers']})")
+    parser.add_argument('--batch-size', type=int, default=ADJUDICATION_CONFIG['batch_size'],
+                        help=f"claims per batch (default: {ADJUDICATION_CONFIG['batch_size']})")
+    parser.add_argument('--max-claims', type=int, help="stop after this many claims")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - CLAIM ADJUDICATION")
+    print("=" * 60)
+    if args.install:
+        success = install_adjudication()
+    else:
+        success = run_adjudication(args.workers, args.batch_size, args.resume, args.max_claims)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -78,7 +78,6 @@ CREATE TABLE icd_codes (
     description TEXT NOT NULL,
     category VARCHAR(100),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_icd_code (code),
     INDEX idx_icd_category (category)
 );
 
@@ -90,7 +89,6 @@ CREATE TABLE cpt_codes (
     category VARCHAR(100),
     relative_value DECIMAL(8,2),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_cpt_code (code),
     INDEX idx_cpt_category (category)
 );
 
@@ -221,7 +219,6 @@ CREATE TABLE patients (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_patient_name (last_name, first_name),
-    INDEX idx_patient_mrn (mrn),
     INDEX idx_patient_dob (date_of_birth),
     INDEX idx_patient_status (status)
 );
@@ -328,8 +325,7 @@ CREATE TABLE doctors (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_doctor_dept (department_id),
     INDEX idx_doctor_specialization (specialization),
-    INDEX idx_doctor_status (status),
-    INDEX idx_doctor_npi (npi_number)
+    INDEX idx_doctor_status (status)
 );
 
 -- Specialists (Consulting doctors)
@@ -378,7 +374,7 @@ CREATE TABLE nurse_assignments (
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_nurse_assign_nurse (nurse_id),
-    INDEX idx_nurse_assign_patient (patient_id),
+    INDEX idx_nurse_assign_patient_end (patient_id, end_date),
     INDEX idx_nurse_assign_date (assigned_date)
 );
 
@@ -414,7 +410,7 @@ CREATE TABLE doctor_schedules (
     effective_to DATE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_schedule_doctor (doctor_id),
+    INDEX idx_schedule_doctor_day (doctor_id, day_of_week),
     INDEX idx_schedule_day (day_of_week)
 );
 
@@ -458,10 +454,10 @@ CREATE TABLE appointments (
     created_by INT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_appointment_date (appointment_date),
+    INDEX idx_appointment_date_time (appointment_date, appointment_time),
     INDEX idx_appointment_patient (patient_id),
-    INDEX idx_appointment_doctor (doctor_id),
-    INDEX idx_appointment_status (status),
+    INDEX idx_appointment_doctor_date (doctor_id, appointment_date, appointment_time),
+    INDEX idx_appointment_status_date (status, appointment_date),
     INDEX idx_appointment_type (appointment_type_id)
 );
 
@@ -609,7 +605,7 @@ CREATE TABLE bed_assignments (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_bed_assign_patient (patient_id),
     INDEX idx_bed_assign_bed (bed_id),
-    INDEX idx_bed_assign_status (status)
+    INDEX idx_bed_assign_status_bed (status, bed_id)
 );
 
 -- =====================================================
@@ -663,7 +659,7 @@ CREATE TABLE lab_results (
     verification_datetime DATETIME,
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_result_test (test_id),
+    UNIQUE KEY uq_result_test (test_id),
     INDEX idx_result_datetime (result_datetime)
 );
 
@@ -735,7 +731,6 @@ CREATE TABLE medications (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_med_name (medication_name),
     INDEX idx_med_generic (generic_name),
-    INDEX idx_med_ndc (ndc_code),
     INDEX idx_med_class (drug_class)
 );
 
@@ -750,7 +745,6 @@ CREATE TABLE drug_interactions (
     recommendation TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE KEY unique_interaction (medication_id_1, medication_id_2),
-    INDEX idx_interaction_med1 (medication_id_1),
     INDEX idx_interaction_med2 (medication_id_2)
 );
 
@@ -789,7 +783,7 @@ CREATE TABLE prescriptions (
     INDEX idx_rx_doctor (doctor_id),
     INDEX idx_rx_medication (medication_id),
     INDEX idx_rx_date (prescription_date),
-    INDEX idx_rx_status (status)
+    INDEX idx_rx_status_end (status, end_date)
 );
 
 -- Prescription Refills
@@ -823,7 +817,7 @@ CREATE TABLE medication_inventory (
     status ENUM('available', 'low_stock', 'expired', 'recalled') DEFAULT 'available',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_inventory_med (medication_id),
+    INDEX idx_inventory_med_expiry (medication_id, expiration_date),
     INDEX idx_inventory_status (status),
     INDEX idx_inventory_expiry (expiration_date)
 );
@@ -870,7 +864,6 @@ CREATE TABLE insurance_companies (
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_insurance_name (company_name),
     INDEX idx_insurance_active (is_active)
 );
 
@@ -1020,7 +1013,7 @@ CREATE TABLE invoices (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_invoice_patient (patient_id),
     INDEX idx_invoice_encounter (encounter_id),
-    INDEX idx_invoice_status (payment_status),
+    INDEX idx_invoice_status_due (payment_status, amount_due),
     INDEX idx_invoice_date (invoice_date)
 );
 
@@ -1084,8 +1077,6 @@ CREATE TABLE users (
     account_locked BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_user_username (username),
-    INDEX idx_user_email (email),
     INDEX idx_user_type (user_type)
 );
 
@@ -1110,24 +1101,31 @@ CREATE TABLE user_roles (
     UNIQUE KEY unique_user_role (user_id, role_id)
 );
 
--- Audit Logs
+-- Audit Logs (monthly range partitions; audit_log.py adds future months and drops expired ones)
 CREATE TABLE audit_logs (
-    log_id INT PRIMARY KEY AUTO_INCREMENT,
+    log_id INT NOT NULL AUTO_INCREMENT,
     table_name VARCHAR(100) NOT NULL,
     record_id INT NOT NULL,
     action ENUM('INSERT', 'UPDATE', 'DELETE', 'VIEW') NOT NULL,
     user_id INT,
     user_type VARCHAR(50),
-    old_values TEXT COMMENT 'JSON format',
-    new_values TEXT COMMENT 'JSON format',
+    old_values JSON,
+    new_values JSON,
     ip_address VARCHAR(45),
     user_agent TEXT,
     timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_audit_table (table_name),
-    INDEX idx_audit_record (record_id),
+    patient_id INT AS (CASE WHEN table_name = 'patients' THEN record_id
+        ELSE JSON_VALUE(COALESCE(new_values, old_values), '$.patient_id' RETURNING UNSIGNED NULL ON EMPTY NULL ON ERROR) END) VIRTUAL,
+    changed_fields JSON AS (JSON_KEYS(JSON_REMOVE(COALESCE(new_values, old_values), '$.patient_id'))) VIRTUAL,
+    PRIMARY KEY (log_id, timestamp),
+    INDEX idx_audit_record (table_name, record_id),
     INDEX idx_audit_user (user_id),
-    INDEX idx_audit_action (action),
-    INDEX idx_audit_timestamp (timestamp)
+    INDEX idx_audit_patient (patient_id, timestamp),
+    INDEX idx_audit_patient_field (patient_id, (CAST(changed_fields AS CHAR(64) ARRAY)))
+)
+PARTITION BY RANGE (TO_DAYS(timestamp)) (
+    PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
 );
 -- CREATE TABLE departments (
 --     department_id INT PRIMARY KEY AUTO_INCREMENT,
@@ -5,7 +5,19 @@ Handles MySQL database connections and basic operations
 
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
+import hashlib
 import logging
+import os
+import threading
+import time
+from collections import deque
+from itertools import chain, islice
+from result_cache import (RESULT_CACHE_CONFIG, cacheable_tables, clear_result_cache, get_result_cache,
+                          get_result_cache_stats, invalidate_for_write, result_key)
+from row_factories import ROW_TYPES, build_rows, row_builder, to_columns
+from statement_cache import (STATEMENT_CACHE_CONFIG, discard_statement_cache, get_statement_cache_stats,
+                             invalidate_statement_caches, is_preparable, is_schema_change, statement_cache_for)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,14 +33,304 @@ DB_CONFIG = {
 
 DATABASE_NAME = 'hospital_OLTP_system'
 
+# Read replicas used by replica_router.py; each entry overrides DB_CONFIG keys,
+# e.g. {'host': '127.0.0.1', 'port': 3307}
+REPLICA_CONFIGS = []
+
+# Connection pool configuration (shared by every module in the process)
+POOL_CONFIG = {
+    'pool_size': 5,             # Maximum open connections per pool
+    'max_lifetime': 1800,       # Seconds before a connection is recycled
+    'checkout_timeout': 30,     # Seconds to wait for a free connection
+    'health_check': True        # Ping connections on checkout
+}
+
+# Chunked bulk-write configuration (DatabaseConnection.execute_many_chunked)
+BATCH_CONFIG = {
+    'max_batch_rows': 10000,        # Upper bound on rows per chunk
+    'target_chunk_seconds': 1.0,    # Chunk duration the row count adapts towards
+    'packet_fraction': 0.5,         # Share of max_allowed_packet a chunk may use
+    'isolate_failures': True        # Bisect chunks failing on bad rows to commit the good ones
+}
+
+
+class PooledConnection:
+    """Proxy around a pooled MySQL connection; close() returns it to the pool
+
+    Set reset_session after changing session state (USE, user variables,
+    SET SESSION); the pool then resets the session before lending the
+    connection out again.
+    """
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self.created_at = created_at
+        self.reset_session = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Return the connection to the pool instead of closing it"""
+        if self._connection is not None:
+            self._pool.release(self)
+
+    def raw_connection(self):
+        """Underlying mysql.connector connection"""
+        return self._connection
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool with health checks and recycling"""
+
+    def __init__(self, config, pool_size=5, max_lifetime=1800,
+                 checkout_timeout=30, health_check=True):
+        self.config = config
+        self.pool_size = pool_size
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self._idle = deque()
+        self._open_count = 0
+        self._closed = False
+        self._lock = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'failed_health_checks': 0,
+            'checkout_waits': 0,
+            'checkout_timeouts': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0
+        }
+
+    def _create_connection(self):
+        """Open a new physical connection"""
+        connection = mysql.connector.connect(**self.config)
+        self._count('connections_created')
+        return connection, time.monotonic()
+
+    def _count(self, key):
+        """Increment a counter in the stats dictionary"""
+        with self._lock:
+            self._stats[key] += 1
+
+    def _discard(self, connection):
+        """Close a physical connection and free its slot"""
+        discard_statement_cache(connection)
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._open_count -= 1
+            self._lock.notify()
+
+    def _is_healthy(self, connection):
+        """Ping the server without reconnecting"""
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def get_connection(self):
+        """Borrow a connection, waiting up to checkout_timeout seconds"""
+        start = time.monotonic()
+        waited = False
+        with self._lock:
+            while not self._idle and self._open_count >= self.pool_size:
+                waited = True
+                remaining = self.checkout_timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats['checkout_timeouts'] += 1
+                    raise PoolError(f"No connection available after {self.checkout_timeout}s "
+                                    f"(pool size {self.pool_size})")
+                self._lock.wait(remaining)
+            if self._idle:
+                connection, created_at = self._idle.popleft()
+            else:
+                connection, created_at = None, None
+                self._open_count += 1
+
+        wait_time = time.monotonic() - start
+        with self._lock:
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['checkout_waits'] += 1
+            self._stats['total_wait_time'] += wait_time
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait_time)
+
+        try:
+            if connection is not None:
+                if time.monotonic() - created_at > self.max_lifetime:
+                    discard_statement_cache(connection)
+                    connection.close()
+                    connection = None
+                    self._count('connections_recycled')
+                elif self.health_check and not self._is_healthy(connection):
+                    discard_statement_cache(connection)
+                    connection.close()
+                    connection = None
+                    self._count('failed_health_checks')
+            if connection is None:
+                connection, created_at = self._create_connection()
+        except Error:
+            with self._lock:
+                self._open_count -= 1
+                self._lock.notify()
+            raise
+
+        return PooledConnection(self, connection, created_at)
+
+    def release(self, pooled):
+        """Return a borrowed connection to the pool"""
+        connection = pooled._connection
+        pooled._connection = None
+        if self._closed:
+            # Borrowed before close_all(); nothing will lend it out again
+            self._discard(connection)
+            return
+        try:
+            if connection.is_connected():
+                if connection.in_transaction:
+                    connection.rollback()
+                if pooled.reset_session:
+                    self._reset_session(connection)
+            else:
+                self._discard(connection)
+                return
+        except Error:
+            self._discard(connection)
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.append((connection, pooled.created_at))
+                self._lock.notify()
+                return
+        self._discard(connection)
+
+    def _reset_session(self, connection):
+        """Clear session state and return to the pool's default database"""
+        # The server deallocates the session's prepared statements too
+        discard_statement_cache(connection)
+        connection.reset_session()
+        if self.config.get('database'):
+            connection.database = self.config['database']
+
+    def close_all(self):
+        """Close every idle connection; borrowed ones are closed when released"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open_count -= len(idle)
+            self._lock.notify_all()
+        for connection, _ in idle:
+            discard_statement_cache(connection)
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """Return pool usage and wait-time metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_connections'] = self._open_count
+            stats['idle_connections'] = len(self._idle)
+            stats['in_use'] = self._open_count - len(self._idle)
+        checkouts = stats['checkouts']
+        stats['avg_wait_time'] = stats['total_wait_time'] / checkouts if checkouts else 0.0
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def server_label(server):
+    """host:port of a DB_CONFIG override (the primary when server is None)"""
+    config = {**DB_CONFIG, **(server or {})}
+    return f"{config['host']}:{config['port']}"
+
+
+def get_pool(use_database=True, local_infile_dir=None, server=None):
+    """Return the process-wide pool for the server or the hospital database
+
+    local_infile_dir enables LOAD DATA LOCAL INFILE for files inside that
+    directory only; such connections are kept in a separate pool. server
+    overrides DB_CONFIG keys (host, port, ...) to reach another instance such
+    as a read replica.
+    """
+    global _pools_pid
+    with _pools_lock:
+        # Connections are not shareable across fork(); start fresh in a child
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        key = (DATABASE_NAME if use_database else None, local_infile_dir,
+               tuple(sorted(server.items())) if server else None)
+        if key not in _pools:
+            config = DB_CONFIG.copy()
+            if server:
+                config.update(server)
+            if use_database:
+                config['database'] = DATABASE_NAME
+            if local_infile_dir:
+                config['allow_local_infile_in_path'] = local_infile_dir
+            _pools[key] = ConnectionPool(config, **POOL_CONFIG)
+        return _pools[key]
+
+
+def get_connection(use_database=True, local_infile_dir=None, server=None):
+    """Borrow a pooled connection; call close() on it to return it"""
+    return get_pool(use_database, local_infile_dir, server).get_connection()
+
+
+def configure_pool(**options):
+    """Update POOL_CONFIG and drop existing pools so new settings apply"""
+    unknown = set(options) - set(POOL_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown pool options: {', '.join(sorted(unknown))}")
+    POOL_CONFIG.update(options)
+    close_all_pools()
+
+
+def close_all_pools():
+    """Close every pool; connections still borrowed are closed when released"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+def get_pool_stats():
+    """Return metrics for every pool keyed by database name"""
+    with _pools_lock:
+        return {(database or 'server') + (f' (local infile: {infile_dir})' if infile_dir else '')
+                + (f" @ {server_label(dict(server))}" if server else ''): pool.stats()
+                for (database, infile_dir, server), pool in _pools.items()}
+
 
 class DatabaseConnection:
     """Database connection manager with context manager support"""
     
-    def __init__(self, use_database=True):
+    def __init__(self, use_database=True, row_factory='dict', statement_cache=None, server=None, result_cache=None):
+        if row_factory not in ROW_TYPES:
+            raise ValueError(f"Unknown row factory {row_factory!r}; expected one of {', '.join(ROW_TYPES)}")
         self.connection = None
         self.cursor = None
         self.use_database = use_database
+        self.server = server
+        self.row_factory = row_factory
+        self.statement_cache = STATEMENT_CACHE_CONFIG['enabled'] if statement_cache is None else statement_cache
+        self.result_cache = RESULT_CACHE_CONFIG['enabled'] if result_cache is None else result_cache
+        self._max_packet = None
     
     def __enter__(self):
         """Context manager entry"""
@@ -41,16 +343,13 @@ class DatabaseConnection:
         return False
     
     def connect(self):
-        """Establish database connection"""
+        """Borrow a connection from the process-wide pool"""
         try:
-            config = DB_CONFIG.copy()
-            if self.use_database:
-                config['database'] = DATABASE_NAME
-            
-            self.connection = mysql.connector.connect(**config)
+            self.connection = get_connection(self.use_database, server=self.server)
             
             if self.connection.is_connected():
-                self.cursor = self.connection.cursor(dictionary=True)
+                # Only the 'dict' row factory needs the (allocation-heavy) dictionary cursor
+                self.cursor = self.connection.cursor(dictionary=self.row_factory == 'dict')
                 db_info = self.connection.get_server_info()
                 logger.info(f"Successfully connected to MySQL Server version {db_info}")
                 return True
@@ -59,58 +358,296 @@ class DatabaseConnection:
             return False
     
     def close(self):
-        """Close database connection"""
+        """Return database connection to the pool"""
         if self.cursor:
             self.cursor.close()
-        if self.connection and self.connection.is_connected():
+            self.cursor = None
+        if self.connection:
             self.connection.close()
-            logger.info("MySQL connection closed")
+            self.connection = None
+            self._max_packet = None
+            logger.info("MySQL connection returned to pool")
+    
+    def _prepared_cursor(self, query, params):
+        """Cursor holding the result of a cached prepared statement, or None if not cacheable"""
+        if not (self.statement_cache and params and isinstance(params, (tuple, list)) and is_preparable(query)):
+            return None
+        return statement_cache_for(self.connection.raw_connection()).execute(query, params)
     
     def execute_query(self, query, params=None):
         """Execute a query that doesn't return results (INSERT, UPDATE, DELETE)"""
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
+            cursor = self._prepared_cursor(query, params) or self.cursor
+            if cursor is self.cursor:
+                if params:
+                    self.cursor.execute(query, params)
+                else:
+                    self.cursor.execute(query)
             self.connection.commit()
-            logger.info(f"Query executed successfully: {self.cursor.rowcount} rows affected")
+            invalidate_for_write(query)
+            if is_schema_change(query):
+                invalidate_statement_caches()
+            logger.info(f"Query executed successfully: {cursor.rowcount} rows affected")
             return True
         except Error as e:
             logger.error(f"Error executing query: {e}")
             self.connection.rollback()
             return False
     
-    def execute_select(self, query, params=None):
-        """Execute a SELECT query and return results"""
+    def execute_select(self, query, params=None, row_factory=None):
+        """Execute a SELECT query and return results
+        
+        Rows are built by row_factory (default: the connection's): 'dict',
+        'tuple', 'namedtuple', 'record' or 'columnar' ({column: values}).
+        Parameterized queries run as cached server-side prepared statements.
+        Reads of reference tables are answered from the result cache.
+        """
+        row_factory = row_factory or self.row_factory
+        tables = cacheable_tables(query) if self.result_cache else None
+        key = result_key(self.server, self.use_database, query, params) if tables else None
+        if key:
+            cache = get_result_cache()
+            cached = cache.get(key)
+            if cached:
+                return build_rows(cached[0], list(cached[1]), row_factory)
+            generations = cache.generations(tables)
+        temporary = None
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            return results
+            cursor = self._prepared_cursor(query, params)
+            if not cursor:
+                cursor = self.cursor
+                if self.row_factory == 'dict' and (row_factory != 'dict' or key):
+                    # A dictionary cursor can't produce compact (or cacheable) rows; use a plain one
+                    cursor = temporary = self.connection.cursor()
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+            results = cursor.fetchall()
+            if key:
+                cache.put(key, tables, cursor.column_names, results, generations)
+            if cursor is self.cursor and self.row_factory == 'dict' and row_factory == 'dict':
+                return results
+            return build_rows(cursor.column_names, results, row_factory)
         except Error as e:
             logger.error(f"Error executing SELECT query: {e}")
             return None
+        finally:
+            if temporary:
+                temporary.close()
+    
+    def stream_select(self, query, params=None, batch_size=None, row_type='tuple'):
+        """Yield the rows of a SELECT lazily from an unbuffered cursor
+        
+        Rows are read from the socket as they are consumed, so memory stays
+        constant regardless of the result size. row_type is 'tuple',
+        'namedtuple', 'record' or 'dict'; with batch_size, lists of up to
+        batch_size rows are yielded instead of single rows ('columnar' yields
+        one {column: values} mapping per batch). The connection cannot run
+        other queries until the generator is exhausted or closed.
+        """
+        if row_type == 'columnar' and not batch_size:
+            raise ValueError("Columnar streaming needs a batch_size")
+        cursor = self.connection.cursor(buffered=False)
+        try:
+            cursor.execute(query, params) if params else cursor.execute(query)
+            build = row_builder(cursor.column_names, row_type) if row_type != 'columnar' else None
+            fetch_size = batch_size or STREAM_FETCH_SIZE
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    return
+                if row_type == 'columnar':
+                    yield to_columns(cursor.column_names, rows)
+                elif batch_size:
+                    yield [build(row) for row in rows]
+                else:
+                    for row in rows:
+                        yield build(row)
+        except Error as e:
+            logger.error(f"Error streaming SELECT query: {e}")
+            raise
+        finally:
+            # Drain what the caller did not read, in bounded batches, before the cursor can close
+            try:
+                while self.connection.unread_result and cursor.fetchmany(STREAM_FETCH_SIZE):
+                    pass
+            except Error:
+                pass
+            cursor.close()
     
     def execute_many(self, query, data_list):
-        """Execute multiple queries with different parameters"""
+        """Execute multiple queries with different parameters, committed in chunks"""
+        report = self.execute_many_chunked(query, data_list)
+        if report.succeeded:
+            logger.info(f"Batch executed successfully: {report.rows_committed} rows in {len(report.chunks)} chunks")
+        return report.succeeded
+    
+    def _max_allowed_packet(self):
+        """Server packet limit, read once per borrowed connection"""
+        if self._max_packet is None:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT @@max_allowed_packet")
+            self._max_packet = cursor.fetchone()[0]
+            cursor.close()
+        return self._max_packet
+    
+    def _execute_chunk(self, query, rows, start, report, isolate_failures):
+        """Execute and commit one chunk; bisect it on a data error to isolate bad rows
+
+        Returns True, False after a data error, or None after any other error
+        (lost connection, lock wait timeout, ...), which bisecting can't fix.
+        """
         try:
-            self.cursor.executemany(query, data_list)
+            self.cursor.executemany(query, rows)
             self.connection.commit()
-            logger.info(f"Batch executed successfully: {self.cursor.rowcount} rows affected")
+            invalidate_for_write(query)
+            report.rows_committed += len(rows)
             return True
         except Error as e:
-            logger.error(f"Error executing batch query: {e}")
-            self.connection.rollback()
-            return False
+            try:
+                self.connection.rollback()
+            except Error as rollback_error:
+                logger.warning(f"Rollback after failed batch rows failed: {rollback_error}")
+            data_error = e.errno in ROW_DATA_ERRORS
+            if not (isolate_failures and data_error) or len(rows) == 1:
+                report.failures.append({'start': start, 'rows': len(rows), 'error': str(e)})
+                logger.error(f"Error executing batch rows {start}-{start + len(rows) - 1}: {e}")
+                return False if data_error else None
+        middle = len(rows) // 2
+        first = self._execute_chunk(query, rows[:middle], start, report, isolate_failures)
+        if first is None:
+            return None
+        second = self._execute_chunk(query, rows[middle:], start + middle, report, isolate_failures)
+        return None if second is None else first and second
+    
+    def execute_many_chunked(self, query, data_list, resume_token=None, stop_on_error=False, **options):
+        """Execute a bulk write in adaptively sized, separately committed chunks
+        
+        Chunk size follows the measured row size (staying below a fraction of
+        max_allowed_packet) and the measured chunk duration (BATCH_CONFIG
+        target_chunk_seconds). data_list may be any iterable, including a
+        generator. Pass a previous report's resume_token to continue after the
+        last committed chunk. Returns a BatchReport.
+        """
+        config = {**BATCH_CONFIG, **options}
+        unknown = set(config) - set(BATCH_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown batch option(s): {', '.join(sorted(unknown))}")
+        
+        offset = parse_resume_token(query, resume_token) if resume_token else 0
+        rows = iter(data_list)
+        if offset:
+            # Resume tokens are offsets into the same input sequence
+            for _ in islice(rows, offset):
+                pass
+        
+        report = BatchReport(query, offset)
+        packet_budget = self._max_allowed_packet() * config['packet_fraction']
+        batch_rows = min(100, config['max_batch_rows'])
+        row_bytes = None
+        
+        while True:
+            chunk = list(islice(rows, batch_rows))
+            if not chunk:
+                break
+            # Size the chunk to the packet budget using the sampled row size
+            sample = chunk[:50]
+            row_bytes = max(sum(_estimate_row_bytes(row) for row in sample) // len(sample), 1)
+            fit = max(int(packet_budget // row_bytes), 1)
+            if len(chunk) > fit:
+                chunk, carry = chunk[:fit], chunk[fit:]
+                rows = chain(carry, rows)
+            
+            started = time.perf_counter()
+            ok = self._execute_chunk(query, chunk, offset, report, config['isolate_failures'])
+            elapsed = time.perf_counter() - started
+            report.chunks.append({'start': offset, 'rows': len(chunk), 'bytes': row_bytes * len(chunk),
+                                  'elapsed': elapsed, 'ok': bool(ok)})
+            if ok is None:
+                # Not caused by the rows, so the rest would fail too; rows before the failure were committed
+                report.next_offset = report.failures[-1]['start']
+                break
+            if not ok and stop_on_error:
+                # Without isolation nothing of the failed chunk was committed; resume at its start
+                if config['isolate_failures']:
+                    report.next_offset = offset + len(chunk)
+                break
+            offset += len(chunk)
+            report.next_offset = offset
+            
+            # Move the next chunk towards the target duration, at most doubling or halving
+            if elapsed > 0:
+                scale = min(max(config['target_chunk_seconds'] / elapsed, 0.5), 2.0)
+                batch_rows = int(len(chunk) * scale)
+            batch_rows = min(max(batch_rows, 1), config['max_batch_rows'], fit)
+        
+        return report
+
+
+# Rows fetched per socket read while streaming
+STREAM_FETCH_SIZE = 1000
+
+# Errors caused by the rows themselves (duplicate key, out of range, bad value,
+# NULL in NOT NULL, data too long, missing FK parent, truncated value); only
+# these are bisected to isolate the bad rows
+ROW_DATA_ERRORS = {1062, 1264, 1366, 1048, 1406, 1452, 1265, 1292}
+
+
+class BatchReport:
+    """Outcome of DatabaseConnection.execute_many_chunked"""
+    
+    def __init__(self, query, start_offset=0):
+        self.query = query
+        self.start_offset = start_offset
+        self.next_offset = start_offset
+        self.rows_committed = 0
+        self.chunks = []        # {'start', 'rows', 'bytes', 'elapsed', 'ok'}
+        self.failures = []      # {'start', 'rows', 'error'}
+    
+    @property
+    def succeeded(self):
+        return not self.failures
+    
+    @property
+    def resume_token(self):
+        """Token to continue the same input after the last processed chunk"""
+        return make_resume_token(self.query, self.next_offset)
+    
+    @property
+    def elapsed(self):
+        return sum(chunk['elapsed'] for chunk in self.chunks)
+    
+    def __repr__(self):
+        return (f"BatchReport(rows_committed={self.rows_committed}, chunks={len(self.chunks)}, "
+                f"failures={len(self.failures)}, elapsed={self.elapsed:.2f}s)")
+
+
+def make_resume_token(query, offset):
+    """Encode a row offset for a query as an opaque resume token"""
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()[:12]
+    return f"{digest}:{offset}"
+
+
+def parse_resume_token(query, token):
+    """Return the row offset in a resume token issued for the same query"""
+    digest, _, offset = token.partition(':')
+    if digest != make_resume_token(query, 0).partition(':')[0] or not offset.isdigit():
+        raise ValueError(f"Resume token {token!r} does not belong to this query")
+    return int(offset)
+
+
+def _estimate_row_bytes(row):
+    """Approximate the SQL text size of one parameter row"""
+    values = row.values() if isinstance(row, dict) else row
+    return sum(len(value) if isinstance(value, (bytes, str)) else len(str(value)) for value in values) \
+        + 4 * len(values) + 4
 
 
 def test_connection():
     """Test database connection"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = get_connection(use_database=False)
         if connection.is_connected():
             db_info = connection.get_server_info()
             print(f"Successfully connected to MySQL Server version {db_info}")
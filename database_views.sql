@@ -280,7 +280,7 @@ SELECT
 FROM medication_inventory mi
 INNER JOIN medications m ON mi.medication_id = m.medication_id
 WHERE mi.quantity_on_hand <= mi.reorder_level
-   OR DATEDIFF(mi.expiration_date, CURDATE()) <= 90
+   OR mi.expiration_date <= CURDATE() + INTERVAL 90 DAY
 ORDER BY mi.quantity_on_hand, mi.expiration_date;
 
 -- View: Insurance Claims Summary
@@ -0,0 +1,697 @@
+"""
+Hospital OLTP System - Index Advisor
+====================================
+
+Proposes composite (and, where cheap, covering) indexes for the reporting
+views and a captured query workload, flags redundant indexes, and writes the
+result as a migration script with measured before/after latency.
+
+Workload:
+- Every view in database_views.sql.
+- Optional query logs: MySQL general logs, slow logs or plain SQL files.
+  SELECTs are grouped by fingerprint (literals replaced), one sample each.
+
+Analysis:
+- Each SELECT's outer FROM/JOIN/WHERE/ORDER BY is parsed into per-table
+  predicates: equality (=, IN, IS NULL), range (<, >, BETWEEN, LIKE 'x%'),
+  and join columns. Predicates wrapped in functions are reported as
+  non-sargable.
+- A candidate index per table is: join columns (for joined tables), then
+  equality columns, then one range column or the ORDER BY columns when the
+  table drives the query. If the remaining referenced columns fit within
+  max_index_columns, they are appended to make the index covering.
+- Candidates already served by an existing index prefix are dropped, and
+  candidates that are a prefix of another are folded into it.
+- Against a loaded database, EXPLAIN picks the driving table and skips
+  accesses examining fewer than min_rows rows. Candidates are then created
+  INVISIBLE and each affected query is timed with use_invisible_indexes off
+  and on; only indexes that are used and cut some query's median latency by
+  min_gain are kept. They are dropped again unless --apply is given.
+- Redundant indexes are those duplicating, or a non-unique prefix of,
+  another index (existing or proposed).
+
+Usage:
+    python index_advisor.py
+    python index_advisor.py --log /var/log/mysql/general.log --output migration.sql
+    python index_advisor.py --offline            # schema file only, no EXPLAIN/timing
+    python index_advisor.py --apply              # also keep the winning indexes
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+from sql_script_executor import iter_sql_statements
+from schema_apply import CREATE_TABLE, split_definitions
+from statement_cache import invalidate_statement_caches
+from summary_tables import load_view_definitions
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+ADVISOR_CONFIG = {
+    'schema_file': 'create_schema.sql',
+    'views_file': 'database_views.sql',
+    'max_index_columns': 5,         # Widest composite index proposed (covering columns included)
+    'min_rows': 1000,               # Table accesses examining fewer rows are left alone
+    'runs': 5,                      # Timed executions per query and index state
+    'min_gain': 0.2                 # Keep an index only if it cuts some query's latency this much
+}
+
+# Column types never appended to make an index covering
+UNCOVERABLE_TYPES = {'text', 'tinytext', 'mediumtext', 'longtext', 'blob', 'tinyblob', 'mediumblob',
+                     'longblob', 'json', 'geometry'}
+
+# ---- SQL text helpers ------------------------------------------------------
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_CLAUSE = r'\b(?:SELECT|FROM|WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT|UNION|FOR\s+UPDATE|LOCK\s+IN|WINDOW)\b'
+_JOIN = r'\b(?:(?:NATURAL\s+)?(?:LEFT|RIGHT|INNER|CROSS)\s+(?:OUTER\s+)?)?(?:STRAIGHT_)?JOIN\b'
+_TABLE_ITEM = re.compile(r'\s*(\w+)(?:\.(\w+))?(?:\s+(?:AS\s+)?(?!(?:ON|USING|FORCE|USE|IGNORE)\b)(\w+))?'
+                         r'(?:\s+(?:FORCE|USE|IGNORE)\s+(?:INDEX|KEY)\s*\([^)]*\))*\s*(?:ON\b(.*))?$',
+                         re.IGNORECASE | re.DOTALL)
+_REF = re.compile(r'(?<![\w.])([A-Za-z_]\w*)(?:\.([A-Za-z_]\w*))?(?![\w.])')
+_OP_AFTER = re.compile(r'\s*(<=>|>=|<=|<>|!=|=|>|<|IS\s+NOT\b|IS\s+NULL\b|NOT\b|IN\s*\(|BETWEEN\b|LIKE\b)',
+                       re.IGNORECASE)
+_OP_BEFORE = re.compile(r'(<=>|>=|<=|<>|!=|=|>|<)\s*$')
+_FUNCTION_OPEN = re.compile(r'\w\s*\($')
+_GENERAL_LOG_LINE = re.compile(r'^(?:\S+\s+)?\s*\d+\s+(Query|Execute)\t(.*)$')
+_GENERAL_LOG_HEADER = re.compile(r'^(?:\S+\s+)?\s*\d+\s+[A-Z][a-z]+(?: [A-Z][a-z]+)?\t')
+
+
+def _mask(sql):
+    """Replace literals (keeping whether a LIKE pattern starts with a wildcard) and drop backticks"""
+    masked = _LITERAL.sub(lambda m: "'%'" if m.group()[1:2] in ('%', '_') else "'?'", sql)
+    return masked.replace('`', '')
+
+
+def _split_top(text, pattern):
+    """Split text at matches of pattern outside parentheses; return [(separator, piece)]"""
+    token = re.compile(r'\(|\)|' + pattern, re.IGNORECASE)
+    pieces, depth, start, separator = [], 0, 0, ''
+    for match in token.finditer(text):
+        if match.group() == '(':
+            depth += 1
+        elif match.group() == ')':
+            depth -= 1
+        elif depth == 0:
+            pieces.append((separator, text[start:match.start()]))
+            separator, start = match.group(), match.end()
+    pieces.append((separator, text[start:]))
+    return pieces
+
+
+def _closing_paren(text, start):
+    """Index of the parenthesis closing the one at start"""
+    depth = 0
+    for position in range(start, len(text)):
+        depth += (text[position] == '(') - (text[position] == ')')
+        if depth == 0:
+            return position
+    return -1
+
+
+def _strip_parens(text):
+    text = text.strip()
+    while text.startswith('(') and _closing_paren(text, 0) == len(text) - 1:
+        text = text[1:-1].strip()
+    return text
+
+
+def _conjuncts(text):
+    """Top-level AND terms of a condition, keeping BETWEEN ... AND ... together"""
+    terms = []
+    for _, piece in _split_top(text, r'\bAND\b'):
+        if terms and re.search(r'\bBETWEEN\b', terms[-1], re.IGNORECASE) and \
+                len(re.findall(r'\bAND\b', terms[-1], re.IGNORECASE)) < \
+                len(re.findall(r'\bBETWEEN\b', terms[-1], re.IGNORECASE)):
+            terms[-1] += ' AND ' + piece
+        else:
+            terms.append(piece)
+    return [_strip_parens(term) for term in terms if term.strip()]
+
+
+def fingerprint(sql):
+    """Normalized statement text with literals replaced, for grouping logged queries"""
+    text = _LITERAL.sub('?', sql)
+    text = re.sub(r'(?<![\w.])-?\d+(?:\.\d+)?\b', '?', text)
+    text = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?+)', text)
+    return ' '.join(text.split()).lower()
+
+
+# ---- workload --------------------------------------------------------------
+
+def read_query_log(path):
+    """Yield statements from a general log, slow log or plain SQL file"""
+    with open(path, encoding='utf-8', errors='replace') as file:
+        general = any(_GENERAL_LOG_LINE.match(line) for _, line in zip(range(200), file))
+    if not general:
+        for statement, _ in iter_sql_statements(path):
+            yield statement
+        return
+    current = None
+    with open(path, encoding='utf-8', errors='replace') as file:
+        for line in file:
+            match = _GENERAL_LOG_LINE.match(line)
+            if match or _GENERAL_LOG_HEADER.match(line):
+                if current:
+                    yield current.strip()
+                current = match.group(2) if match else None
+            elif current is not None:
+                current += '\n' + line.rstrip('\n')
+    if current:
+        yield current.strip()
+
+
+def load_workload(views_file=None, log_files=()):
+    """[{label, sql, count}] for every view and every distinct logged SELECT"""
+    workload = [{'label': view, 'sql': select, 'count': 1}
+                for view, select in load_view_definitions(views_file or ADVISOR_CONFIG['views_file']).items()]
+    logged = {}
+    for path in log_files:
+        for statement in read_query_log(path):
+            statement = statement.rstrip(';').strip()
+            if not re.match(r'\(?\s*SELECT\b', statement, re.IGNORECASE):
+                continue
+            key = fingerprint(statement)
+            if key in logged:
+                logged[key]['count'] += 1
+            else:
+                label = f"query {hashlib.md5(key.encode()).hexdigest()[:8]}"
+                logged[key] = {'label': label, 'sql': statement, 'count': 1}
+    workload.extend(sorted(logged.values(), key=lambda item: -item['count']))
+    return workload
+
+
+# ---- schema model ----------------------------------------------------------
+# {table: {'columns': {column: data type}, 'indexes': {name: (unique, (column, ...))}}}
+
+def _index_parts(text):
+    parts = []
+    for _, part in _split_top(text, ','):
+        part = part.strip()
+        column = re.match(r'(\w+)\s*(?:\(\d+\))?\s*(?:ASC|DESC)?$', part, re.IGNORECASE)
+        parts.append(column.group(1).lower() if column else ' '.join(part.split()))
+    return tuple(parts)
+
+
+def load_schema_file(schema_file=None):
+    """Schema model from the CREATE TABLE statements of create_schema.sql"""
+    schema = {}
+    for statement, _ in iter_sql_statements(schema_file or ADVISOR_CONFIG['schema_file']):
+        statement = _mask(statement)
+        foreign_key = re.match(r'ALTER\s+TABLE\s+(\w+)\s+ADD\s+CONSTRAINT\s+(\w+)\s+FOREIGN\s+KEY\s*\(([^)]*)\)',
+                               statement, re.IGNORECASE)
+        if foreign_key and foreign_key.group(1).lower() in schema:
+            # InnoDB creates an index for a foreign key no other index can serve
+            indexes = schema[foreign_key.group(1).lower()]['indexes']
+            columns = _index_parts(foreign_key.group(3))
+            if not _served(indexes, columns):
+                indexes[foreign_key.group(2)] = (False, columns)
+            continue
+        match = CREATE_TABLE.match(statement)
+        if not match:
+            continue
+        # Table options after the column list (PARTITION BY ...) hold parentheses too
+        body = statement[match.end():_closing_paren(statement, match.end() - 1)]
+        table = {'columns': {}, 'indexes': {}}
+        for item in split_definitions(body):
+            words = item.split(None, 1)
+            keyword = words[0].upper()
+            definition = re.match(r'(?:(PRIMARY)\s+KEY|(UNIQUE)(?:\s+(?:KEY|INDEX))?|INDEX|KEY)\s*(\w+)?\s*\((.*)\)',
+                                  item, re.IGNORECASE | re.DOTALL)
+            if keyword in ('CONSTRAINT', 'FOREIGN', 'CHECK', 'FULLTEXT', 'SPATIAL'):
+                continue
+            if definition and keyword in ('PRIMARY', 'UNIQUE', 'INDEX', 'KEY'):
+                primary, unique, name, columns = definition.groups()
+                name = 'PRIMARY' if primary else name
+                table['indexes'][name] = (bool(primary or unique), _index_parts(columns))
+                continue
+            column = words[0].lower()
+            data_type = re.match(r'\s*(\w+)', words[1] if len(words) > 1 else '')
+            table['columns'][column] = data_type.group(1).lower() if data_type else ''
+            if re.search(r'\bPRIMARY\s+KEY\b', item, re.IGNORECASE):
+                table['indexes']['PRIMARY'] = (True, (column,))
+            elif re.search(r'\bUNIQUE\b', item, re.IGNORECASE):
+                table['indexes'][column] = (True, (column,))
+        schema[match.group(1).lower()] = table
+    return schema
+
+
+def load_schema(cursor):
+    """Schema model of the connected database's base tables"""
+    schema = {}
+    cursor.execute("SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE FROM information_schema.COLUMNS c "
+                   "JOIN information_schema.TABLES t ON t.TABLE_SCHEMA = c.TABLE_SCHEMA "
+                   "AND t.TABLE_NAME = c.TABLE_NAME AND t.TABLE_TYPE = 'BASE TABLE' "
+                   "WHERE c.TABLE_SCHEMA = DATABASE() ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION")
+    for table, column, data_type in cursor.fetchall():
+        schema.setdefault(table.lower(), {'columns': {}, 'indexes': {}})['columns'][column.lower()] = \
+            data_type.lower()
+    cursor.execute("SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME, EXPRESSION "
+                   "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+                   "ORDER BY TABLE_NAME, INDEX_NAME = 'PRIMARY' DESC, INDEX_NAME, SEQ_IN_INDEX")
+    for table, index, non_unique, column, expression in cursor.fetchall():
+        if table.lower() not in schema:
+            continue
+        indexes = schema[table.lower()]['indexes']
+        unique, columns = indexes.get(index, (not non_unique, ()))
+        part = column.lower() if column else ' '.join(str(expression).split())
+        indexes[index] = (unique, columns + (part,))
+    return schema
+
+
+def _served(indexes, columns):
+    """True if some index already starts with these columns"""
+    return any(existing[:len(columns)] == tuple(columns) for _, existing in indexes.values())
+
+
+def index_name(table, columns):
+    name = f"idx_{table}_{'_'.join(columns)}"
+    if len(name) > 64:
+        name = f"{name[:55]}_{hashlib.md5(name.encode()).hexdigest()[:8]}"
+    return name
+
+
+def redundant_indexes(schema, proposals=()):
+    """[(table, index, columns, kept index, reason)] for indexes another index makes unnecessary"""
+    added = {}
+    for proposal in proposals:
+        added.setdefault(proposal['table'], {})[proposal['name']] = (False, proposal['columns'])
+    redundant = []
+    for table, info in schema.items():
+        indexes = dict(info['indexes'], **added.get(table, {}))
+        dropped = set()
+        for name, (unique, columns) in indexes.items():
+            if name == 'PRIMARY' or name in added.get(table, {}):
+                continue
+            for other, (other_unique, other_columns) in indexes.items():
+                # Functional and multi-valued indexes don't serve plain column lookups
+                if other == name or other in dropped or any('(' in part for part in other_columns):
+                    continue
+                if other_columns == columns:
+                    if unique and not other_unique:
+                        continue
+                    reason = f"duplicates {other}{' (UNIQUE)' if other_unique else ''}"
+                elif other_columns[:len(columns)] == columns and not unique:
+                    reason = f"is a prefix of {other}"
+                else:
+                    continue
+                dropped.add(name)
+                redundant.append((table, name, columns, other, reason))
+                break
+    return redundant
+
+
+# ---- query analysis --------------------------------------------------------
+
+def _column_refs(text, aliases, schema):
+    """[(alias, column, start, end)] for qualified and unambiguous bare column references"""
+    refs = []
+    for match in _REF.finditer(text):
+        first, second = match.groups()
+        if second:
+            if first.lower() in aliases:
+                refs.append((first.lower(), second.lower(), match.start(), match.end()))
+        elif not text[match.end():].lstrip().startswith('('):
+            owners = [alias for alias, table in aliases.items() if first.lower() in schema[table]['columns']]
+            if len(owners) == 1:
+                refs.append((owners[0], first.lower(), match.start(), match.end()))
+    return refs
+
+
+def _classify(term, aliases, schema):
+    """('eq'|'in'|'range', alias, column), ('join', (alias, column), (alias, column)),
+    ('non_sargable', term) or None for one conjunct"""
+    refs = _column_refs(term, aliases, schema)
+    distinct = {(alias, column) for alias, column, _, _ in refs}
+    if not distinct:
+        return None
+    if len(_split_top(term, r'\bOR\b')) > 1:
+        if len(distinct) == 1:
+            alias, column = distinct.pop()
+            return ('range', alias, column)
+        return ('non_sargable', term)
+    if len(distinct) == 2 and len(refs) == 2 and refs[0][0] != refs[1][0]:
+        if term[refs[0][3]:refs[1][2]].strip() == '=':
+            return ('join', refs[0][:2], refs[1][:2])
+        return None
+    if len(distinct) != 1:
+        return None
+    alias, column, start, end = refs[0]
+    if _FUNCTION_OPEN.search(term[:start].rstrip()):
+        return ('non_sargable', term)
+    operator = _OP_AFTER.match(term, end)
+    if operator:
+        operator = ' '.join(operator.group(1).upper().split())
+        if operator in ('=', '<=>', 'IS NULL'):
+            return ('eq', alias, column)
+        if operator.startswith('IN'):
+            return ('in', alias, column)
+        if operator == 'LIKE':
+            return ('non_sargable', term) if re.match(r"\s*LIKE\s+'%'", term[end:], re.IGNORECASE) \
+                else ('range', alias, column)
+        if operator in ('<', '>', '<=', '>=', 'BETWEEN'):
+            return ('range', alias, column)
+        return None
+    operator = _OP_BEFORE.search(term[:start])
+    if operator and operator.group(1) in ('=', '<=>'):
+        return ('eq', alias, column)
+    if operator and operator.group(1) in ('<', '>', '<=', '>='):
+        return ('range', alias, column)
+    return None
+
+
+def analyze_query(sql, schema):
+    """Per-table predicates, ORDER BY and referenced columns of a SELECT's outer block, or None"""
+    masked = _mask(sql)
+    clauses = {}
+    for separator, piece in _split_top(masked, _CLAUSE):
+        keyword = ' '.join(separator.upper().split())
+        if keyword == 'UNION' or (not keyword and piece.strip()) or keyword in clauses:
+            return None
+        clauses[keyword] = piece
+    if 'SELECT' not in clauses or 'FROM' not in clauses:
+        return None
+
+    aliases, order, joins = {}, [], []
+    for index, (_, item) in enumerate(_split_top(clauses['FROM'], _JOIN)):
+        for _, table_item in _split_top(item, ',') if index == 0 else [('', item)]:
+            match = _TABLE_ITEM.match(table_item)
+            if not match or table_item.strip().startswith('('):
+                continue
+            table = (match.group(2) or match.group(1)).lower()
+            if table not in schema:
+                continue
+            alias = (match.group(3) or table).lower()
+            aliases[alias] = table
+            order.append(alias)
+            if match.group(4):
+                joins.append((alias, match.group(4)))
+    if not aliases:
+        return None
+
+    predicates = {alias: {'eq': [], 'in': [], 'range': [], 'join': []} for alias in aliases}
+    notes = []
+
+    def record(term, joined_alias=None):
+        kind = _classify(term, aliases, schema)
+        if not kind:
+            return
+        if kind[0] == 'non_sargable':
+            notes.append(' '.join(kind[1].split()))
+        elif kind[0] == 'join':
+            # An ON condition is a lookup into the joined table; a WHERE join works both ways
+            for alias, column in kind[1:]:
+                if joined_alias in (None, alias) and column not in predicates[alias]['join']:
+                    predicates[alias]['join'].append(column)
+        elif joined_alias in (None, kind[1]):
+            # ON conditions of an outer join only restrict the joined table
+            target = predicates[kind[1]][kind[0]]
+            if kind[2] not in target:
+                target.append(kind[2])
+
+    for alias, condition in joins:
+        for term in _conjuncts(condition):
+            record(term, alias)
+    for term in _conjuncts(clauses.get('WHERE', '')):
+        record(term)
+
+    order_by = []
+    for _, item in _split_top(clauses.get('ORDER BY', ''), ','):
+        item = item.strip()
+        refs = _column_refs(item, aliases, schema)
+        if len(refs) != 1 or refs[0][2] != 0 or item[refs[0][3]:].strip().upper() not in ('', 'ASC', 'DESC'):
+            order_by = None
+            break
+        order_by.append((refs[0][0], refs[0][1], item.upper().endswith('DESC')))
+
+    referenced = {alias: [] for alias in aliases}
+    for text in clauses.values():
+        for alias, column, _, _ in _column_refs(text, aliases, schema):
+            if column not in referenced[alias]:
+                referenced[alias].append(column)
+    star = re.search(r'(?<![\w.])\*|\.\*', clauses['SELECT'])
+    return {'tables': aliases, 'order': order, 'predicates': predicates, 'order_by': order_by,
+            'referenced': referenced, 'select_star': bool(star), 'limited': 'LIMIT' in clauses,
+            'notes': notes}
+
+
+def candidate_indexes(analysis, schema, driving=None):
+    """One candidate {table, alias, columns, covering} per table the query could look up by index"""
+    driving = driving if driving in analysis['tables'] else analysis['order'][0]
+    limit = ADVISOR_CONFIG['max_index_columns']
+    candidates = []
+    for alias, table in analysis['tables'].items():
+        predicates = analysis['predicates'][alias]
+        key = []
+        for column in (predicates['join'] if alias != driving else []) + predicates['eq'] + predicates['in']:
+            if column not in key:
+                key.append(column)
+        indexes = schema[table]['indexes']
+        lookup = set(key) - set(predicates['in'])
+        if any(unique and set(columns) <= lookup for unique, columns in indexes.values()):
+            continue                # already a point lookup
+        ranges = [column for column in predicates['range'] if column not in key]
+        order_by = analysis['order_by'] or []
+        # An index only for the ORDER BY pays off with an equality prefix or a LIMIT
+        sortable = (alias == driving and order_by and not predicates['in'] and (key or analysis['limited'])
+                    and all(item[0] == alias for item in order_by)
+                    and len({item[2] for item in order_by}) == 1)
+        order_columns = [column for _, column, _ in order_by if column not in key] if sortable else []
+        if order_columns and (not ranges or ranges[0] == order_columns[0]):
+            key += order_columns
+        elif ranges:
+            key.append(ranges[0])
+        key = key[:limit]
+        if not key:
+            continue
+        if _served(indexes, key):
+            continue
+        columns, covering = list(key), False
+        primary = indexes.get('PRIMARY', (True, ()))[1]
+        extra = [column for column in analysis['referenced'][alias] if column not in key and column not in primary]
+        if (alias == driving and not analysis['select_star'] and extra and len(key) + len(extra) <= limit
+                and not any(schema[table]['columns'].get(column) in UNCOVERABLE_TYPES for column in extra)):
+            columns += extra
+            covering = True
+        candidates.append({'table': table, 'alias': alias, 'columns': tuple(columns), 'covering': covering})
+    return candidates
+
+
+def propose(workload, schema, plans=None):
+    """Merge per-query candidates into proposals; return (proposals, non-sargable notes)"""
+    proposals, notes = {}, []
+    for item in workload:
+        analysis = analyze_query(item['sql'], schema)
+        if not analysis:
+            continue
+        notes.extend((item['label'], note) for note in analysis['notes'])
+        plan = (plans or {}).get(item['label'])
+        driving = plan[0]['table'] if plan else None
+        for candidate in candidate_indexes(analysis, schema, driving):
+            if plan:
+                access = next((row for row in plan if row['table'] == candidate['alias']), None)
+                if access and (access['type'] in ('const', 'eq_ref', 'system')
+                               or (access['rows'] or 0) < ADVISOR_CONFIG['min_rows']):
+                    continue
+            proposal = proposals.setdefault((candidate['table'], candidate['columns']), {
+                'table': candidate['table'], 'columns': candidate['columns'],
+                'name': index_name(candidate['table'], candidate['columns']),
+                'covering': candidate['covering'], 'queries': {}})
+            proposal['queries'][item['label']] = item
+
+    # Fold a proposal into a longer one on the same table that starts with its columns
+    merged = sorted(proposals.values(), key=lambda proposal: -len(proposal['columns']))
+    kept = []
+    for proposal in merged:
+        wider = next((other for other in kept if other['table'] == proposal['table']
+                      and other['columns'][:len(proposal['columns'])] == proposal['columns']), None)
+        if wider:
+            wider['queries'].update(proposal['queries'])
+        else:
+            kept.append(proposal)
+    kept.sort(key=lambda proposal: -sum(item['count'] for item in proposal['queries'].values()))
+    return kept, notes
+
+
+# ---- measurement -----------------------------------------------------------
+
+def explain(cursor, sql):
+    cursor.execute("EXPLAIN " + sql)
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def time_query(cursor, sql, runs):
+    """Median seconds over runs executions, after one warm-up"""
+    samples = []
+    for attempt in range(runs + 1):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        if attempt:
+            samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _use_invisible(cursor, enabled):
+    cursor.execute(f"SET SESSION optimizer_switch = 'use_invisible_indexes={'on' if enabled else 'off'}'")
+
+
+def measure_proposals(cursor, proposals):
+    """Create proposals INVISIBLE and time their queries without and with them
+
+    Returns {label: (before seconds, after seconds, indexes used after)}; the
+    created indexes are left in place for the caller to keep or drop.
+    """
+    for proposal in proposals:
+        cursor.execute(f"ALTER TABLE {proposal['table']} ADD INDEX {proposal['name']} "
+                       f"({', '.join(proposal['columns'])}) INVISIBLE")
+        proposal['created'] = True
+    queries = {label: item for proposal in proposals for label, item in proposal['queries'].items()}
+    timings = {}
+    try:
+        for label, item in queries.items():
+            _use_invisible(cursor, False)
+            before = time_query(cursor, item['sql'], ADVISOR_CONFIG['runs'])
+            _use_invisible(cursor, True)
+            used = {row['key'] for row in explain(cursor, item['sql']) if row['key']}
+            after = time_query(cursor, item['sql'], ADVISOR_CONFIG['runs'])
+            timings[label] = (before, after, used)
+    finally:
+        _use_invisible(cursor, False)
+    return timings
+
+
+def _gain(proposal, timings):
+    """Best relative latency cut among the proposal's queries that use it"""
+    gains = [(before - after) / before for label, (before, after, used) in timings.items()
+             if label in proposal['queries'] and proposal['name'] in used and before > 0]
+    return max(gains, default=None)
+
+
+def write_migration(path, proposals, redundant, timings, workload):
+    """Write the ADD/DROP INDEX migration with the measured latencies as comments"""
+    views = sum(1 for item in workload if not item['label'].startswith('query '))
+    lines = [f"-- Index advisor migration, generated {datetime.now():%Y-%m-%d %H:%M:%S}",
+             f"-- Workload: {views} views, {len(workload) - views} distinct logged queries "
+             f"({sum(item['count'] for item in workload) - views} executions)",
+             ""]
+    for proposal in proposals:
+        for label in proposal['queries']:
+            if label in timings:
+                before, after, _ = timings[label]
+                lines.append(f"-- {label}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+            else:
+                lines.append(f"-- {label}: not measured")
+        lines.append(f"ALTER TABLE {proposal['table']} ADD INDEX {proposal['name']} "
+                     f"({', '.join(proposal['columns'])}), ALGORITHM=INPLACE, LOCK=NONE;")
+        lines.append("")
+    for table, name, columns, other, reason in redundant:
+        lines.append(f"-- Redundant: {name} ({', '.join(columns)}) {reason}")
+        lines.append(f"ALTER TABLE {table} DROP INDEX {name}, ALGORITHM=INPLACE, LOCK=NONE;")
+        lines.append("")
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(lines))
+
+
+def run_advisor(log_files=(), output=None, offline=False, apply=False):
+    """Analyze the workload, measure the proposals and write the migration"""
+    workload = load_workload(log_files=log_files)
+    timings = {}
+    if offline:
+        schema = load_schema_file()
+        proposals, notes = propose(workload, schema)
+    else:
+        connection = None
+        proposals = []
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            schema = load_schema(cursor)
+            plans = {}
+            for item in workload:
+                try:
+                    plans[item['label']] = explain(cursor, item['sql'])
+                except Error as e:
+                    logger.warning(f"Skipping {item['label']}: EXPLAIN failed: {e}")
+            workload = [item for item in workload if item['label'] in plans]
+            proposals, notes = propose(workload, schema, plans)
+            winners = []
+            try:
+                timings = measure_proposals(cursor, proposals)
+                winners = [proposal for proposal in proposals
+                           if (_gain(proposal, timings) or 0) >= ADVISOR_CONFIG['min_gain']]
+            finally:
+                for proposal in proposals:
+                    if not proposal.get('created'):
+                        continue
+                    if apply and proposal in winners:
+                        cursor.execute(f"ALTER TABLE {proposal['table']} ALTER INDEX {proposal['name']} VISIBLE")
+                    else:
+                        cursor.execute(f"ALTER TABLE {proposal['table']} DROP INDEX {proposal['name']}")
+            proposals = winners
+            if apply:
+                for table, name, _, _, _ in redundant_indexes(schema, proposals):
+                    cursor.execute(f"ALTER TABLE {table} DROP INDEX {name}")
+            cursor.close()
+            invalidate_statement_caches()
+        except Error as e:
+            logger.error(f"Error running index advisor: {e}")
+            return False
+        finally:
+            if connection:
+                connection.close()
+
+    redundant = redundant_indexes(schema, proposals)
+    output = output or f"index_migration_{datetime.now():%Y%m%d_%H%M%S}.sql"
+    write_migration(output, proposals, redundant, timings, workload)
+
+    print(f"   Workload:         {len(workload)} statements")
+    for proposal in proposals:
+        gain = _gain(proposal, timings)
+        print(f"   + {proposal['table']} ({', '.join(proposal['columns'])})"
+              f"{' covering' if proposal['covering'] else ''}"
+              f"{f' -{gain:.0%}' if gain is not None else ''}  <- {', '.join(proposal['queries'])}")
+    for table, name, columns, _, reason in redundant:
+        print(f"   - {table}.{name} ({', '.join(columns)}) {reason}")
+    for label, note in notes:
+        print(f"   ! {label}: non-sargable predicate: {note}")
+    print(f"   Migration:        {os.path.abspath(output)}")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Composite index advisor for the view and query workload")
+    parser.add_argument('--log', action='append', default=[], metavar='FILE',
+                        help="general/slow query log or SQL file to add to the workload (repeatable)")
+    parser.add_argument('--output', help="migration file (default: index_migration_<timestamp>.sql)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--offline', action='store_true', help="use create_schema.sql; no EXPLAIN or timing")
+    mode.add_argument('--apply', action='store_true', help="keep the winning indexes and drop redundant ones")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - INDEX ADVISOR")
+    print("=" * 60)
+    success = run_advisor(args.log, args.output, offline=args.offline, apply=args.apply)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,14 +1,25 @@
 """
 Initialize Hospital OLTP Database
 Complete database setup: creates database, tables, loads sample data, and verifies all objects
+
+SQL files are streamed through sql_script_executor.py, so large dumps can be
+restored as well:
+    python init_database_Setup.py --dump hospital_dump.sql --batch-size 5000
+
+The schema is applied by schema_apply.py (concurrent CREATE TABLEs, one FK
+ALTER per table). --defer-indexes builds secondary indexes and foreign keys
+after the data load instead:
+    python init_database_Setup.py --dump hospital_dump.sql --defer-indexes --schema-workers 8
 """
 
-import mysql.connector
 from mysql.connector import Error
 import os
 import logging
 from datetime import datetime
-from database_connection import DB_CONFIG, DATABASE_NAME, logger
+from audit_log import rotate_partitions
+from database_connection import DATABASE_NAME, get_connection, logger
+from schema_apply import DEFAULT_WORKERS, apply_schema, build_deferred_objects
+from sql_script_executor import DEFAULT_BATCH_SIZE, execute_sql_script
 
 
 def setup_init_database_log():
@@ -28,7 +39,7 @@ def setup_init_database_log():
 def create_database():
     """Create the hospital_OLTP_system database if it doesn't exist"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = get_connection(use_database=False)
         if connection.is_connected():
             cursor = connection.cursor()
             cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DATABASE_NAME}")
@@ -41,63 +52,21 @@ def create_database():
         return False
 
 
-def execute_sql_file(filename='create_schema.sql'):
-    """Execute SQL commands from a file"""
+def execute_sql_file(filename='create_schema.sql', batch_size=DEFAULT_BATCH_SIZE, multi_statement=True):
+    """Stream and execute SQL commands from a file"""
+    connection = None
     try:
-        # Read the SQL file
-        with open(filename, 'r', encoding='utf-8') as file:
-            sql_script = file.read()
-        
-        # Connect to MySQL
-        connection = mysql.connector.connect(**DB_CONFIG)
+        # Borrow a server-level connection from the pool
+        connection = get_connection(use_database=False)
+        # The script runs USE and toggles FK checks; don't hand that session back to the pool
+        connection.reset_session = True
         
         if connection.is_connected():
-            cursor = connection.cursor()
-            
-            # Clean and parse the SQL statements properly
-            # Remove single-line comments
-            lines = []
-            for line in sql_script.split('\n'):
-                # Skip lines that are only comments
-                stripped = line.strip()
-                if stripped.startswith('--'):
-                    continue
-                # Remove inline comments
-                if '--' in line:
-                    line = line.split('--')[0]
-                lines.append(line)
-            
-            clean_script = '\n'.join(lines)
-            
-            # Split by semicolon and execute each statement
-            statements = [stmt.strip() for stmt in clean_script.split(';') if stmt.strip()]
-            
-            success_count = 0
-            error_count = 0
-            
-            for stmt in statements:
-                try:
-                    cursor.execute(stmt)
-                    # Consume any results to avoid "Unread result found" error
-                    try:
-                        cursor.fetchall()
-                    except:
-                        pass  # No results to fetch
-                    success_count += 1
-                except Error as e:
-                    # Log warnings for DROP TABLE on non-existent tables (expected)
-                    if 'doesn\'t exist' in str(e) or '1051' in str(e):
-                        error_count += 1
-                    else:
-                        logger.error(f"Error executing statement: {e}")
-                        logger.debug(f"Statement: {stmt[:200]}...")
-                        error_count += 1
-            
-            connection.commit()
-            logger.info(f"Successfully executed {success_count} SQL statements ({error_count} warnings)")
-            
-            cursor.close()
-            connection.close()
+            # DROP TABLE on non-existent tables is expected and only counted as a warning
+            stats = execute_sql_script(connection, filename, batch_size=batch_size,
+                                       multi_statement=multi_statement, ignore_errors=(1051, 1146))
+            logger.info(f"Successfully executed {stats['statements'] - stats['errors'] - stats['warnings']} SQL statements "
+                        f"({stats['warnings'] + stats['errors']} warnings)")
             return True
             
     except FileNotFoundError:
@@ -109,57 +78,26 @@ def execute_sql_file(filename='create_schema.sql'):
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return False
+    finally:
+        if connection:
+            connection.close()
 
 
-def load_sample_data(filename='hospital_sample_data.sql'):
+def load_sample_data(filename='hospital_sample_data.sql', batch_size=DEFAULT_BATCH_SIZE, multi_statement=True):
     """Load sample data from hospital_sample_data.sql file"""
+    connection = None
     try:
-        # Read the SQL file
-        with open(filename, 'r', encoding='utf-8') as file:
-            sql_script = file.read()
-        
-        # Connect to MySQL with database selected
-        config = DB_CONFIG.copy()
-        config['database'] = DATABASE_NAME
-        connection = mysql.connector.connect(**config)
+        # Borrow a pooled connection with database selected
+        connection = get_connection()
+        connection.reset_session = True
         
         if connection.is_connected():
-            cursor = connection.cursor()
-            
-            # Clean and parse the SQL statements
-            lines = []
-            for line in sql_script.split('\n'):
-                stripped = line.strip()
-                if stripped.startswith('--'):
-                    continue
-                if '--' in line:
-                    line = line.split('--')[0]
-                lines.append(line)
-            
-            clean_script = '\n'.join(lines)
-            statements = [stmt.strip() for stmt in clean_script.split(';') if stmt.strip()]
-            
-            success_count = 0
-            error_count = 0
-            
-            for stmt in statements:
-                try:
-                    cursor.execute(stmt)
-                    try:
-                        cursor.fetchall()
-                    except:
-                        pass
-                    success_count += 1
-                except Error as e:
-                    if 'Duplicate entry' not in str(e):  # Allow duplicate key warnings
-                        logger.warning(f"Warning loading sample data: {e}")
-                    error_count += 1
-            
-            connection.commit()
-            logger.info(f"Successfully loaded {success_count} sample data statements")
-            
-            cursor.close()
-            connection.close()
+            # Allow duplicate key warnings when the data is already present
+            stats = execute_sql_script(connection, filename, batch_size=batch_size,
+                                       multi_statement=multi_statement, ignore_errors=(1062,),
+                                       error_level=logging.WARNING)
+            logger.info(f"Successfully loaded {stats['statements'] - stats['errors'] - stats['warnings']} "
+                        f"sample data statements")
             return True
             
     except FileNotFoundError:
@@ -171,17 +109,38 @@ def load_sample_data(filename='hospital_sample_data.sql'):
     except Exception as e:
         logger.error(f"Unexpected error loading sample data: {e}")
         return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def restore_dump(filename, batch_size=DEFAULT_BATCH_SIZE, multi_statement=True):
+    """Restore a (possibly multi-GB) SQL dump into the hospital database"""
+    connection = None
+    try:
+        connection = get_connection()
+        # A dump may switch databases and set session variables; reset them on release
+        connection.reset_session = True
+        stats = execute_sql_script(connection, filename, batch_size=batch_size, multi_statement=multi_statement)
+        return stats['errors'] == 0
+    except FileNotFoundError:
+        logger.error(f"Dump file '{filename}' not found")
+        return False
+    except Error as e:
+        logger.error(f"Error restoring dump: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
 
 
 def insert_sample_data():
     """Verify sample data insertion from SQL file"""
     try:
-        config = DB_CONFIG.copy()
-        config['database'] = DATABASE_NAME
-        connection = mysql.connector.connect(**config)
+        connection = get_connection()
         
         if connection.is_connected():
-            cursor = connection.cursor(dictionary=True)  # Use dictionary cursor
+            cursor = connection.cursor()
             
             # Display summary of inserted data from all 52 tables
             tables_to_check = [
@@ -223,9 +182,9 @@ def insert_sample_data():
             
             for table in tables_to_check:
                 try:
-                    cursor.execute(f"SELECT COUNT(*) as count FROM {table}")
+                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
                     result = cursor.fetchone()
-                    count = result['count'] if result else 0
+                    count = result[0] if result else 0
                     total_records += count
                     table_stats[table] = count
                     
@@ -292,7 +251,8 @@ def insert_sample_data():
         return False
 
 
-def initialize_database():
+def initialize_database(dump_file=None, batch_size=DEFAULT_BATCH_SIZE, multi_statement=True,
+                        schema_workers=DEFAULT_WORKERS, defer_indexes=False):
     """Main function to initialize the complete database"""
     log_path = setup_init_database_log()
     logger.info(f"Init database log file: {log_path}")
@@ -308,17 +268,36 @@ def initialize_database():
     
     # Step 2: Execute schema file
     print("Step 2: Creating tables and schema...")
-    if not execute_sql_file():
+    if not apply_schema(workers=schema_workers, defer_indexes=defer_indexes):
         print("Failed to create schema. Exiting.")
         return False
     print("[OK] Schema created\n")
+
+    # Monthly audit_logs partitions up to a few months ahead
+    if not rotate_partitions():
+        print("Warning: Could not create audit_logs partitions; inserts use the p_future partition.")
     
-    # Step 3: Load sample data
-    print("Step 3: Loading sample data from hospital_sample_data.sql...")
-    if not load_sample_data():
-        print("Warning: Could not load sample data, but schema is ready.")
+    # Step 3: Load sample data, or restore a dump in its place
+    if dump_file:
+        print(f"Step 3: Restoring dump from {dump_file}...")
+        if not restore_dump(dump_file, batch_size=batch_size, multi_statement=multi_statement):
+            print("Warning: Dump restored with errors, see the log file.")
+        else:
+            print("[OK] Dump restored\n")
     else:
-        print("[OK] Sample data loaded\n")
+        print("Step 3: Loading sample data from hospital_sample_data.sql...")
+        if not load_sample_data(batch_size=batch_size, multi_statement=multi_statement):
+            print("Warning: Could not load sample data, but schema is ready.")
+        else:
+            print("[OK] Sample data loaded\n")
+    
+    # Deferred indexes and foreign keys are built once the data is in
+    if defer_indexes:
+        print("Step 3b: Building deferred indexes and foreign keys...")
+        if not build_deferred_objects(workers=schema_workers):
+            print("Failed to build deferred indexes and foreign keys. Exiting.")
+            return False
+        print("[OK] Indexes and foreign keys built\n")
     
     # Step 4: Verify and display summary
     print("Step 4: Verifying database initialization...")
@@ -334,6 +313,20 @@ def initialize_database():
 
 
 if __name__ == "__main__":
+    import argparse
     import sys
-    success = initialize_database()
+    parser = argparse.ArgumentParser(description="Initialize the Hospital OLTP database")
+    parser.add_argument('--dump', help="SQL dump to restore instead of hospital_sample_data.sql")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"DML statements per transaction (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--no-multi-statement', action='store_true',
+                        help="send every statement in its own round trip")
+    parser.add_argument('--schema-workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"concurrent connections for schema DDL (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--defer-indexes', action='store_true',
+                        help="add secondary indexes and foreign keys after the data load")
+    args = parser.parse_args()
+    success = initialize_database(dump_file=args.dump, batch_size=args.batch_size,
+                                  multi_statement=not args.no_multi_statement,
+                                  schema_workers=args.schema_workers, defer_indexes=args.defer_indexes)
     sys.exit(0 if success else 1)
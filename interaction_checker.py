@@ -0,0 +1,469 @@
+"""
+Hospital OLTP System - Drug Interaction Checker
+===============================================
+
+Checks whole medication lists for interactions in memory instead of running
+one drug_interactions query per pair (and per ordering of the pair).
+
+- InteractionGraph gives every medication that has interactions a bit
+  position and keeps, per medication, a bitset (Python int) of the
+  medications it interacts with, plus a sorted array of the same neighbors
+  with a parallel array of severities. drug_interactions stores a pair in
+  either order; both orders land in the same entries, and when both exist
+  the more severe one wins.
+- Checking a list is one pass: the list becomes a bit mask and each
+  medication's bitset is ANDed with it, one big-integer operation per
+  medication instead of a lookup per pair. Only the (rare) hits look up
+  their severity, by bisecting the neighbor array.
+- Triggers on drug_interactions append changed pairs to
+  drug_interaction_changes. Each process's graph re-reads just those pairs
+  past its last change_id, at most every refresh_interval seconds. Change
+  ids are taken at insert but become visible at commit, so changes logged
+  within change_lookback seconds are read again and any not applied yet
+  are picked up. A graph reloads fully once its last full load (or its
+  last refresh) is older than change_retention. Checks and refreshes share
+  a lock, so a check never sees a half-applied change. Cascaded deletes
+  from medications fire no triggers, but a deleted medication can't be
+  prescribed, so its stale pairs are harmless until the next full reload.
+
+Usage:
+    python interaction_checker.py --install
+    python interaction_checker.py --check 42 --medications 7 19
+    python interaction_checker.py --benchmark --formulary 10000 --regimen 20 --regimens 10000
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from itertools import combinations
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+INTERACTION_CONFIG = {
+    'refresh_interval': 5.0,        # Seconds between change-log reads
+    'change_retention': 86400,      # Seconds change-log rows are kept; older graphs reload fully
+    'change_lookback': 300,         # Seconds of changes re-read in case an earlier id committed late
+    'fetch_size': 10000             # Rows per fetch while loading
+}
+
+# Most severe first
+SEVERITIES = ('major', 'moderate', 'minor')
+
+INTERACTION_TABLES = [
+    """CREATE TABLE IF NOT EXISTS drug_interaction_changes (
+        change_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+        medication_id_1 INT NOT NULL,
+        medication_id_2 INT NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_interaction_change_time (changed_at)
+    )"""
+]
+
+_LOG_CHANGE = "INSERT INTO drug_interaction_changes (medication_id_1, medication_id_2) VALUES "
+
+INTERACTION_TRIGGERS = {
+    'trg_drug_interactions_ai': (
+        "AFTER INSERT ON drug_interactions FOR EACH ROW " + _LOG_CHANGE +
+        "(NEW.medication_id_1, NEW.medication_id_2)"),
+    'trg_drug_interactions_au': (
+        "AFTER UPDATE ON drug_interactions FOR EACH ROW " + _LOG_CHANGE +
+        "(OLD.medication_id_1, OLD.medication_id_2), (NEW.medication_id_1, NEW.medication_id_2)"),
+    'trg_drug_interactions_ad': (
+        "AFTER DELETE ON drug_interactions FOR EACH ROW " + _LOG_CHANGE +
+        "(OLD.medication_id_1, OLD.medication_id_2)"),
+}
+
+
+class InteractionGraph:
+    """Interaction bitsets for one-pass checks plus sorted neighbor arrays for severities"""
+
+    def __init__(self):
+        self._position = {}     # medication_id -> bit
+        self._ids = array('i')  # bit -> medication_id
+        self._adjacent = {}     # bit -> bitset of the bits it interacts with
+        self._neighbors = {}    # bit -> sorted array('i') of the bits it interacts with
+        self._severity = {}     # bit -> array('b') of SEVERITIES indexes, parallel to _neighbors
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()   # serializes refreshes; _lock guards the structures
+        self.last_change_id = 0
+        self._applied = {}      # change_id -> monotonic time applied, for changes within change_lookback
+        self.refreshed_at = None
+        self.loaded_at = None
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Graph of (medication_id_1, medication_id_2, severity) rows"""
+        graph = cls()
+        for first, second, severity in pairs:
+            graph._add(first, second, severity)
+        return graph
+
+    def _bit(self, medication_id):
+        bit = self._position.get(medication_id)
+        if bit is None:
+            bit = self._position[medication_id] = len(self._ids)
+            self._ids.append(medication_id)
+        return bit
+
+    def _add(self, first, second, severity):
+        """Record a pair, keeping the more severe level if it is already known"""
+        level = SEVERITIES.index(severity)
+        a, b = self._bit(first), self._bit(second)
+        for this, other in ((a, b), (b, a)):
+            neighbors = self._neighbors.setdefault(this, array('i'))
+            levels = self._severity.setdefault(this, array('b'))
+            index = bisect_left(neighbors, other)
+            if index < len(neighbors) and neighbors[index] == other:
+                levels[index] = min(levels[index], level)
+            else:
+                neighbors.insert(index, other)
+                levels.insert(index, level)
+                self._adjacent[this] = self._adjacent.get(this, 0) | 1 << other
+
+    def _clear(self, a, b):
+        for this, other in ((a, b), (b, a)):
+            neighbors = self._neighbors.get(this)
+            index = bisect_left(neighbors, other) if neighbors else 0
+            if neighbors and index < len(neighbors) and neighbors[index] == other:
+                del neighbors[index]
+                del self._severity[this][index]
+                self._adjacent[this] ^= 1 << other
+
+    def _severity_of(self, this, other):
+        return SEVERITIES[self._severity[this][bisect_left(self._neighbors[this], other)]]
+
+    def _pairs(self, bits, mask, skip):
+        """(bit, other bit) for every interaction of bits within mask, skipping pairs skip() rejects"""
+        adjacent = self._adjacent
+        for bit in bits:
+            hits = adjacent.get(bit, 0) & mask
+            while hits:
+                lowest = hits & -hits
+                other = lowest.bit_length() - 1
+                hits ^= lowest
+                if not skip(bit, other):
+                    yield bit, other
+
+    def _bits_of(self, medication_ids):
+        position = self._position
+        return [position[medication_id] for medication_id in dict.fromkeys(medication_ids)
+                if medication_id in position]
+
+    def check(self, medication_ids):
+        """[(medication_id, medication_id, severity)] for every interacting pair in the list"""
+        with self._lock:
+            bits = self._bits_of(medication_ids)
+            mask = 0
+            for bit in bits:
+                mask |= 1 << bit
+            ids = self._ids
+            return [(ids[bit], ids[other], self._severity_of(bit, other))
+                    for bit, other in self._pairs(bits, mask, lambda bit, other: other < bit)]
+
+    def check_against(self, new_ids, current_ids):
+        """Interactions of new medications with the current ones and with each other"""
+        with self._lock:
+            new_bits = self._bits_of(new_ids)
+            new = set(new_bits)
+            mask = 0
+            for bit in new_bits + self._bits_of(current_ids):
+                mask |= 1 << bit
+            ids = self._ids
+            return [(ids[bit], ids[other], self._severity_of(bit, other))
+                    for bit, other in self._pairs(new_bits, mask, lambda bit, other: other in new and other < bit)]
+
+    def stats(self):
+        with self._lock:
+            arrays = list(self._neighbors.values()) + list(self._severity.values())
+            return {'medications': len(self._ids),
+                    'pairs': sum(len(neighbors) for neighbors in self._neighbors.values()) // 2,
+                    'bitset_bytes': sum(sys.getsizeof(bitset) for bitset in self._adjacent.values()),
+                    'array_bytes': sum(values.itemsize * len(values) for values in arrays)
+                    + self._ids.itemsize * len(self._ids),
+                    'last_change_id': self.last_change_id}
+
+    # ---- loading and refresh ------------------------------------------------
+
+    def load(self, cursor):
+        """Read every interaction (full rebuild)"""
+        cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM drug_interaction_changes")
+        last_change_id = cursor.fetchone()[0]
+        graph = InteractionGraph()
+        cursor.execute("SELECT medication_id_1, medication_id_2, interaction_type FROM drug_interactions")
+        while True:
+            rows = cursor.fetchmany(INTERACTION_CONFIG['fetch_size'])
+            if not rows:
+                break
+            for first, second, severity in rows:
+                graph._add(first, second, severity)
+        with self._lock:
+            self._position, self._ids = graph._position, graph._ids
+            self._adjacent, self._neighbors, self._severity = graph._adjacent, graph._neighbors, graph._severity
+            self.last_change_id = last_change_id
+            self._applied = {}
+            self.refreshed_at = self.loaded_at = time.monotonic()
+
+    def apply_changes(self, cursor):
+        """Re-read the pairs logged since the last refresh; return how many changed"""
+        lookback = INTERACTION_CONFIG['change_lookback']
+        now = time.monotonic()
+        # Ids below last_change_id may still commit; changes in the lookback window are read again
+        cursor.execute("SELECT change_id, medication_id_1, medication_id_2 FROM drug_interaction_changes "
+                       "WHERE change_id > %s OR changed_at >= NOW() - INTERVAL %s SECOND ORDER BY change_id",
+                       (self.last_change_id, lookback))
+        changes = [change for change in cursor.fetchall() if change[0] not in self._applied]
+        self._applied = {change_id: applied for change_id, applied in self._applied.items()
+                         if now - applied <= 2 * lookback}
+        if not changes:
+            self.refreshed_at = now
+            return 0
+        pairs = {(min(first, second), max(first, second)) for _, first, second in changes}
+        current = []
+        pair_list = sorted(pairs)
+        for start in range(0, len(pair_list), 500):
+            chunk = pair_list[start:start + 500]
+            conditions = ' OR '.join(['(medication_id_1 IN (%s, %s) AND medication_id_2 IN (%s, %s))'] * len(chunk))
+            cursor.execute(f"SELECT medication_id_1, medication_id_2, interaction_type FROM drug_interactions "
+                           f"WHERE {conditions}", [value for a, b in chunk for value in (a, b, a, b)])
+            current.extend(cursor.fetchall())
+        with self._lock:
+            for a, b in pairs:
+                if a in self._position and b in self._position:
+                    self._clear(self._position[a], self._position[b])
+            for first, second, severity in current:
+                if (min(first, second), max(first, second)) in pairs:
+                    self._add(first, second, severity)
+            self.last_change_id = max(self.last_change_id, changes[-1][0])
+            self._applied.update((change_id, now) for change_id, _, _ in changes)
+            self.refreshed_at = now
+        return len(pairs)
+
+    def _fresh(self):
+        return self.refreshed_at is not None and \
+            time.monotonic() - self.refreshed_at < INTERACTION_CONFIG['refresh_interval']
+
+    def refresh(self, connection=None, force=False):
+        """Bring the graph up to date if it is older than refresh_interval; return False on error"""
+        if not force and self._fresh():
+            return True
+        # One refresh at a time: a stale read applied after a newer one would stick
+        with self._refresh_lock:
+            if not force and self._fresh():
+                return True
+            now = time.monotonic()
+            owned = connection is None
+            try:
+                if owned:
+                    connection = get_connection()
+                cursor = connection.cursor()
+                retention = INTERACTION_CONFIG['change_retention']
+                if self.loaded_at is None or now - self.loaded_at > retention or \
+                        now - self.refreshed_at > retention:
+                    self.load(cursor)
+                else:
+                    self.apply_changes(cursor)
+                cursor.close()
+                connection.commit()
+                return True
+            except Error as e:
+                logger.error(f"Error refreshing drug interactions: {e}")
+                return False
+            finally:
+                if owned and connection:
+                    connection.close()
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_interaction_graph():
+    """The process-wide interaction graph, refreshed from the change log as needed"""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = InteractionGraph()
+        graph = _graph
+    return graph if graph.refresh() else None
+
+
+def install_interaction_log():
+    """Create the change log and its triggers, and purge expired change rows"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        for statement in INTERACTION_TABLES:
+            cursor.execute(statement)
+        for name, body in INTERACTION_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+        purge_changes(cursor)
+        connection.commit()
+        cursor.close()
+        invalidate_statement_caches()
+        return True
+    except Error as e:
+        logger.error(f"Error installing drug interaction change log: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def purge_changes(cursor):
+    cursor.execute("DELETE FROM drug_interaction_changes WHERE changed_at < NOW() - INTERVAL %s SECOND",
+                   (INTERACTION_CONFIG['change_retention'],))
+    return cursor.rowcount
+
+
+def interaction_details(cursor, pairs):
+    """{(medication_id_1, medication_id_2): row} for found pairs, whichever order they are stored in"""
+    if not pairs:
+        return {}
+    conditions = ' OR '.join(['(medication_id_1 = %s AND medication_id_2 = %s)'] * (2 * len(pairs)))
+    cursor.execute(f"SELECT medication_id_1, medication_id_2, interaction_type, description, clinical_effect, "
+                   f"recommendation FROM drug_interactions WHERE {conditions}",
+                   [value for a, b, _ in pairs for value in (a, b, b, a)])
+    details = {}
+    for row in cursor.fetchall():
+        details[row[0], row[1]] = details[row[1], row[0]] = row
+    return details
+
+
+def check_prescription(patient_id, medication_ids, connection=None):
+    """Interactions of new medications with a patient's active prescriptions and each other
+
+    Returns a list of {medication_id_1, medication_id_2, severity, description,
+    clinical_effect, recommendation}, most severe first, or None on error.
+    """
+    graph = get_interaction_graph()
+    if graph is None:
+        return None
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT DISTINCT medication_id FROM prescriptions WHERE patient_id = %s "
+                       "AND status = 'active' AND (end_date IS NULL OR end_date >= CURDATE())", (patient_id,))
+        current = [row[0] for row in cursor.fetchall()]
+        found = graph.check_against(medication_ids, current)
+        details = interaction_details(cursor, found)
+        cursor.close()
+        connection.commit()
+    except Error as e:
+        logger.error(f"Error checking interactions for patient {patient_id}: {e}")
+        return None
+    finally:
+        if owned and connection:
+            connection.close()
+    results = []
+    for first, second, severity in sorted(found, key=lambda pair: SEVERITIES.index(pair[2])):
+        row = details.get((first, second))
+        results.append({'medication_id_1': first, 'medication_id_2': second, 'severity': severity,
+                        'description': row[3] if row else None, 'clinical_effect': row[4] if row else None,
+                        'recommendation': row[5] if row else None})
+    return results
+
+
+# ---- benchmark ---------------------------------------------------------------
+
+def run_benchmark(formulary, regimen, regimens, degree, seed=42):
+    """Check random regimens against a synthetic formulary; compare with per-pair lookups"""
+    rng = random.Random(seed)
+    medication_ids = list(range(1, formulary + 1))
+    stored = {}
+    target = formulary * degree // 2
+    while len(stored) < target:
+        first, second = rng.sample(medication_ids, 2)
+        stored[first, second] = rng.choices(SEVERITIES, (10, 60, 30))[0]
+
+    started = time.perf_counter()
+    graph = InteractionGraph.from_pairs((first, second, severity) for (first, second), severity in stored.items())
+    build = time.perf_counter() - started
+    samples = [rng.sample(medication_ids, regimen) for _ in range(regimens)]
+
+    started = time.perf_counter()
+    graph_found = [graph.check(sample) for sample in samples]
+    graph_time = time.perf_counter() - started
+
+    # Baseline: what one query per pair and ordering does, minus the round trips
+    started = time.perf_counter()
+    pair_found = []
+    for sample in samples:
+        found = []
+        for first, second in combinations(sample, 2):
+            severity = stored.get((first, second)) or stored.get((second, first))
+            if severity:
+                found.append((first, second, severity))
+        pair_found.append(found)
+    pair_time = time.perf_counter() - started
+
+    mismatches = sum(1 for ours, theirs in zip(graph_found, pair_found)
+                     if {frozenset(pair[:2]) for pair in ours} != {frozenset(pair[:2]) for pair in theirs})
+    stats = graph.stats()
+    pairs_checked = regimens * regimen * (regimen - 1) // 2
+    print(f"   Formulary:        {formulary:,} medications, {len(stored):,} stored interactions")
+    print(f"   Graph:            {stats['pairs']:,} pairs, {stats['bitset_bytes'] / 1024 / 1024:.1f} MB bitsets "
+          f"+ {stats['array_bytes'] / 1024 / 1024:.1f} MB arrays, built in {build:.2f}s")
+    print(f"   Regimens:         {regimens:,} x {regimen} medications ({pairs_checked:,} pairs)")
+    print(f"   Bitset check:     {regimens / graph_time:,.0f} regimens/sec "
+          f"({graph_time / regimens * 1e6:.1f} us each)")
+    print(f"   Per-pair lookups: {regimens / pair_time:,.0f} regimens/sec "
+          f"({pair_time / regimens * 1e6:.1f} us each, {regimen * (regimen - 1)} lookups per regimen "
+          f"= as many queries)")
+    print(f"   Interactions:     {sum(map(len, graph_found)):,} found, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-memory drug interaction checker")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="create the change log and its triggers")
+    action.add_argument('--check', type=int, metavar='PATIENT_ID',
+                        help="check --medications against the patient's active prescriptions")
+    action.add_argument('--benchmark', action='store_true', help="synthetic formulary benchmark (no database)")
+    parser.add_argument('--medications', type=int, nargs='+', default=[], help="medication ids to check")
+    parser.add_argument('--formulary', type=int, default=10000, help="benchmark formulary size")
+    parser.add_argument('--regimen', type=int, default=20, help="medications per benchmark regimen")
+    parser.add_argument('--regimens', type=int, default=10000, help="benchmark regimens to check")
+    parser.add_argument('--degree', type=int, default=40, help="average interactions per medication")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - DRUG INTERACTION CHECKER")
+    print("=" * 60)
+    if args.install:
+        success = install_interaction_log()
+    elif args.check is not None:
+        results = check_prescription(args.check, args.medications)
+        success = results is not None
+        for result in results or []:
+            print(f"   {result['severity']:<9} {result['medication_id_1']} + {result['medication_id_2']}: "
+                  f"{result['description']}")
+        if success and not results:
+            print("   No interactions")
+    else:
+        success = run_benchmark(args.formulary, args.regimen, args.regimens, args.degree)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,647 @@
+"""
+Hospital OLTP System - Medication Inventory Ledger
+==================================================
+
+Records every change of medication_inventory.quantity_on_hand as an
+append-only movement and dispenses lots first-expiring first-out (FEFO) with
+atomic decrements, keeping lot status current as stock moves.
+
+- inventory_movements holds one signed row per quantity change. Triggers on
+  medication_inventory write them, so loaders and ad-hoc UPDATEs are
+  recorded too; this module labels its own writes (dispense/restock and the
+  prescription, refill or pharmacy order behind them) through session
+  variables the trigger reads. A lot's quantity_on_hand always equals the
+  sum of its movements (--verify).
+- BEFORE INSERT/UPDATE triggers derive status from the row being written
+  (expired / low_stock / available, recalled is kept), so low stock is
+  maintained incrementally instead of being recomputed per query.
+  vw_low_stock_medications reads status and an expiration_date range, both
+  indexed, instead of DATEDIFF over every lot; expire_lots() moves lots that
+  expired since their last write.
+- A dispense plans its lots from a plain read of the (medication_id,
+  expiration_date) index, then decrements each lot with a guarded UPDATE
+  (quantity_on_hand >= taken). No row is locked while planning and a lot is
+  locked only from its decrement to the commit; a stale plan is retried
+  with the lots locked in FEFO order. Lots expiring on the same day are
+  taken in random order, spreading a hot medication over its lots.
+- A dispense for a prescription or refill first inserts an
+  inventory_dispenses claim keyed by its source, so the same source is
+  never dispensed twice, even by concurrent callers.
+
+Usage:
+    python inventory_ledger.py --install
+    python inventory_ledger.py --sync --since 2026-01-01
+    python inventory_ledger.py --expire
+    python inventory_ledger.py --verify
+    python inventory_ledger.py --benchmark --threads 32 --dispenses 20000 --medications 4
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import groupby
+
+from mysql.connector import Error
+from database_connection import DATABASE_NAME, DB_CONFIG, POOL_CONFIG, ConnectionPool, get_connection, logger
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+LEDGER_CONFIG = {
+    'near_expiry_days': 90,         # Lots expiring within this many days are reported
+    'max_lots_per_dispense': 20,    # Lots read when planning one dispense
+    'max_retries': 3                # Retries after a deadlock or a stale lot plan
+}
+
+# Deadlock, lock wait timeout
+RETRYABLE_ERRORS = {1213, 1205}
+DUPLICATE_KEY = 1062
+
+# Lots a dispense may take from
+DISPENSABLE_STATUSES = ('available', 'low_stock')
+
+LEDGER_TABLES = [
+    """CREATE TABLE IF NOT EXISTS inventory_movements (
+    movement_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    inventory_id INT NOT NULL,
+    medication_id INT NOT NULL,
+    movement_type ENUM('opening', 'dispense', 'restock', 'adjustment', 'removal') NOT NULL,
+    quantity INT NOT NULL COMMENT 'Signed change of quantity_on_hand',
+    source_type ENUM('prescription', 'refill', 'pharmacy_order', 'manual') NOT NULL DEFAULT 'manual',
+    source_id BIGINT,
+    created_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_movement_lot (inventory_id, movement_id),
+    INDEX idx_movement_med_time (medication_id, created_at),
+    INDEX idx_movement_source (source_type, source_id)
+)""",
+    """CREATE TABLE IF NOT EXISTS inventory_dispenses (
+    source_type ENUM('prescription', 'refill', 'manual') NOT NULL,
+    source_id BIGINT NOT NULL,
+    medication_id INT NOT NULL,
+    quantity INT NOT NULL,
+    dispensed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source_type, source_id)
+)"""
+]
+
+# Same rule as the generated data: expired, else low stock at or below the reorder level
+_DERIVE_STATUS = ("SET NEW.status = IF(NEW.status = 'recalled', 'recalled', "
+                  "IF(NEW.expiration_date < CURDATE(), 'expired', "
+                  "IF(NEW.quantity_on_hand <= NEW.reorder_level, 'low_stock', 'available')))")
+
+# @inventory_movement_type / @inventory_source_type / @inventory_source_id label
+# this module's writes; anything else is recorded as a manual adjustment
+_RECORD_MOVEMENT = (
+    "INSERT INTO inventory_movements (inventory_id, medication_id, movement_type, quantity, source_type, source_id) "
+    "SELECT {row}.inventory_id, {row}.medication_id, {movement_type}, {quantity}, "
+    "COALESCE(@inventory_source_type, 'manual'), @inventory_source_id FROM DUAL WHERE {quantity} <> 0")
+
+LEDGER_TRIGGERS = {
+    'trg_inventory_status_bi': f"BEFORE INSERT ON medication_inventory FOR EACH ROW {_DERIVE_STATUS}",
+    'trg_inventory_status_bu': f"BEFORE UPDATE ON medication_inventory FOR EACH ROW {_DERIVE_STATUS}",
+    'trg_inventory_ledger_ai': "AFTER INSERT ON medication_inventory FOR EACH ROW " + _RECORD_MOVEMENT.format(
+        row='NEW', movement_type="'opening'", quantity='NEW.quantity_on_hand'),
+    'trg_inventory_ledger_au': "AFTER UPDATE ON medication_inventory FOR EACH ROW " + _RECORD_MOVEMENT.format(
+        row='NEW', movement_type="COALESCE(@inventory_movement_type, 'adjustment')",
+        quantity='NEW.quantity_on_hand - OLD.quantity_on_hand'),
+    'trg_inventory_ledger_ad': "AFTER DELETE ON medication_inventory FOR EACH ROW " + _RECORD_MOVEMENT.format(
+        row='OLD', movement_type="'removal'", quantity='-OLD.quantity_on_hand')
+}
+
+# FEFO lookups read lots of one medication in expiration order
+INVENTORY_INDEX = ('idx_inventory_med_expiry', '(medication_id, expiration_date)', 'idx_inventory_med')
+
+# Lots present before the triggers get their quantity as an opening movement
+OPENING_BALANCES = (
+    "INSERT INTO inventory_movements (inventory_id, medication_id, movement_type, quantity, source_type) "
+    "SELECT mi.inventory_id, mi.medication_id, 'opening', mi.quantity_on_hand, 'manual' "
+    "FROM medication_inventory mi WHERE mi.quantity_on_hand <> 0 AND NOT EXISTS "
+    "(SELECT 1 FROM inventory_movements m WHERE m.inventory_id = mi.inventory_id)")
+
+
+class _StalePlan(Exception):
+    """A planned lot no longer holds what the plan takes from it"""
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s", (table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def install_ledger():
+    """Create the ledger tables, triggers and FEFO index; record opening balances and resync lot status"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        for statement in LEDGER_TABLES:
+            cursor.execute(statement)
+        for name, body in LEDGER_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+        index, columns, replaces = INVENTORY_INDEX
+        if not _index_exists(cursor, 'medication_inventory', index):
+            cursor.execute(f"ALTER TABLE medication_inventory ADD INDEX {index} {columns}")
+            logger.info(f"Added index {index} on medication_inventory{columns}")
+        if _index_exists(cursor, 'medication_inventory', replaces):
+            cursor.execute(f"ALTER TABLE medication_inventory DROP INDEX {replaces}")
+        cursor.execute(OPENING_BALANCES)
+        logger.info(f"Recorded opening balances of {cursor.rowcount} lots")
+        # Loaders write status statically; let the status trigger recompute it
+        cursor.execute("UPDATE medication_inventory SET status = status")
+        connection.commit()
+        cursor.close()
+        invalidate_statement_caches()
+        return True
+    except Error as e:
+        logger.error(f"Error installing inventory ledger: {e}")
+        if connection:
+            connection.rollback()
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def plan_fefo(lots, quantity, rng=random):
+    """[(inventory_id, taken)] covering quantity from (inventory_id, on_hand, expiration_date) lots
+
+    Lots are taken in expiration order; lots expiring on the same date are
+    shuffled. Returns None if the lots hold less than quantity.
+    """
+    plan = []
+    for _, same_day in groupby(sorted(lots, key=lambda lot: lot[2]), key=lambda lot: lot[2]):
+        same_day = list(same_day)
+        rng.shuffle(same_day)
+        for inventory_id, on_hand, _ in same_day:
+            if quantity <= 0:
+                return plan
+            if on_hand > 0:
+                taken = min(on_hand, quantity)
+                plan.append((inventory_id, taken))
+                quantity -= taken
+    return plan if quantity <= 0 else None
+
+
+def _dispensable_lots(cursor, medication_id, lock):
+    statuses = ', '.join(['%s'] * len(DISPENSABLE_STATUSES))
+    cursor.execute(f"SELECT inventory_id, quantity_on_hand, expiration_date FROM medication_inventory "
+                   f"WHERE medication_id = %s AND expiration_date >= CURDATE() AND quantity_on_hand > 0 "
+                   f"AND status IN ({statuses}) ORDER BY expiration_date, inventory_id LIMIT %s"
+                   f"{' FOR UPDATE' if lock else ''}",
+                   (medication_id, *DISPENSABLE_STATUSES, LEDGER_CONFIG['max_lots_per_dispense']))
+    return cursor.fetchall()
+
+
+def _label_movements(cursor, movement_type=None, source_type=None, source_id=None):
+    """Set (or with no arguments clear) the labels the ledger triggers record"""
+    cursor.execute("SET @inventory_movement_type = %s, @inventory_source_type = %s, @inventory_source_id = %s",
+                   (movement_type, source_type, source_id))
+
+
+def _recorded_dispense(cursor, source_type, source_id):
+    cursor.execute("SELECT inventory_id, -quantity FROM inventory_movements "
+                   "WHERE source_type = %s AND source_id = %s AND movement_type = 'dispense' ORDER BY movement_id",
+                   (source_type, source_id))
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def _dispense(cursor, medication_id, quantity, source_type, source_id, lock):
+    """Claim the source and decrement lots FEFO; return the plan or None if stock is short"""
+    plan = plan_fefo(_dispensable_lots(cursor, medication_id, lock), quantity)
+    if plan is None:
+        return None
+    if source_id is not None:
+        cursor.execute("INSERT INTO inventory_dispenses (source_type, source_id, medication_id, quantity) "
+                       "VALUES (%s, %s, %s, %s)", (source_type, source_id, medication_id, quantity))
+    _label_movements(cursor, 'dispense', source_type, source_id)
+    statuses = ', '.join(['%s'] * len(DISPENSABLE_STATUSES))
+    for inventory_id, taken in plan:
+        # Locks the lot until commit; the guard rejects a plan another dispense overtook
+        cursor.execute(f"UPDATE medication_inventory SET quantity_on_hand = quantity_on_hand - %s "
+                       f"WHERE inventory_id = %s AND quantity_on_hand >= %s AND expiration_date >= CURDATE() "
+                       f"AND status IN ({statuses})", (taken, inventory_id, taken, *DISPENSABLE_STATUSES))
+        if cursor.rowcount != 1:
+            raise _StalePlan(inventory_id)
+    _label_movements(cursor)
+    return plan
+
+
+def dispense(medication_id, quantity, source_type='manual', source_id=None, connection=None):
+    """Take quantity units of a medication from its lots, first-expiring first
+
+    With source_id the dispense is recorded once per (source_type, source_id);
+    repeating it returns the recorded lots without dispensing again.
+    Returns [(inventory_id, quantity)] on success, False if the usable lots
+    hold too little, None on error.
+    """
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        for attempt in range(LEDGER_CONFIG['max_retries'] + 1):
+            cursor = connection.cursor()
+            try:
+                connection.start_transaction()
+                # Plan from a plain read first; lock the lots only after a stale plan
+                plan = _dispense(cursor, medication_id, quantity, source_type, source_id, lock=attempt > 0)
+                if plan is None:
+                    connection.rollback()
+                    logger.warning(f"Insufficient stock of medication {medication_id} for {quantity} units")
+                    return False
+                connection.commit()
+                return plan
+            except _StalePlan:
+                connection.rollback()
+                _label_movements(cursor)
+                if attempt == LEDGER_CONFIG['max_retries']:
+                    logger.warning(f"Gave up dispensing medication {medication_id} after {attempt + 1} stale plans")
+                    return False
+            except Error as e:
+                connection.rollback()
+                _label_movements(cursor)
+                if e.errno == DUPLICATE_KEY:
+                    # Already dispensed for this source
+                    recorded = _recorded_dispense(cursor, source_type, source_id)
+                    connection.commit()
+                    return recorded
+                if e.errno not in RETRYABLE_ERRORS or attempt == LEDGER_CONFIG['max_retries']:
+                    raise
+            finally:
+                cursor.close()
+    except Error as e:
+        logger.error(f"Error dispensing medication {medication_id}: {e}")
+        return None
+    finally:
+        if owned and connection:
+            connection.close()
+
+
+def dispense_prescription(prescription_id, connection=None):
+    """Dispense a prescription's quantity_dispensed (or quantity_prescribed) once"""
+    return _dispense_source('prescription', prescription_id,
+                            "SELECT medication_id, COALESCE(quantity_dispensed, quantity_prescribed) "
+                            "FROM prescriptions WHERE prescription_id = %s", connection)
+
+
+def dispense_refill(refill_id, connection=None):
+    """Dispense a prescription refill's quantity_dispensed once"""
+    return _dispense_source('refill', refill_id,
+                            "SELECT p.medication_id, r.quantity_dispensed FROM prescription_refills r "
+                            "JOIN prescriptions p ON p.prescription_id = r.prescription_id "
+                            "WHERE r.refill_id = %s", connection)
+
+
+def _dispense_source(source_type, source_id, query, connection):
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute(query, (source_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        connection.commit()
+        if row is None:
+            logger.warning(f"No {source_type} {source_id} to dispense")
+            return False
+        medication_id, quantity = row
+        if not quantity:
+            return []
+        return dispense(medication_id, quantity, source_type, source_id, connection)
+    except Error as e:
+        logger.error(f"Error reading {source_type} {source_id}: {e}")
+        return None
+    finally:
+        if owned and connection:
+            connection.close()
+
+
+def receive_order(order_id, lot_number, expiration_date, quantity=None, location=None, received_by=None):
+    """Restock a pharmacy order delivery into its lot; return the inventory_id, False if not receivable, None on error
+
+    quantity defaults to what is still outstanding on the order. The lot is
+    created (empty, then restocked) if the medication has no lot of that
+    number and expiration date yet.
+    """
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        try:
+            connection.start_transaction()
+            cursor.execute("SELECT medication_id, quantity_ordered, COALESCE(quantity_received, 0), order_status "
+                           "FROM pharmacy_orders WHERE order_id = %s FOR UPDATE", (order_id,))
+            row = cursor.fetchone()
+            if row is None or row[3] in ('cancelled', 'received'):
+                connection.rollback()
+                logger.warning(f"Pharmacy order {order_id} is not open for receiving")
+                return False
+            medication_id, ordered, received, _ = row
+            quantity = ordered - received if quantity is None else quantity
+            if quantity <= 0:
+                connection.rollback()
+                return False
+            cursor.execute("SELECT inventory_id FROM medication_inventory WHERE medication_id = %s "
+                           "AND expiration_date = %s AND lot_number = %s FOR UPDATE",
+                           (medication_id, expiration_date, lot_number))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("INSERT INTO medication_inventory (medication_id, lot_number, expiration_date, "
+                               "quantity_on_hand, location) VALUES (%s, %s, %s, 0, %s)",
+                               (medication_id, lot_number, expiration_date, location))
+                inventory_id = cursor.lastrowid
+            else:
+                inventory_id = row[0]
+            _label_movements(cursor, 'restock', 'pharmacy_order', order_id)
+            cursor.execute("UPDATE medication_inventory SET quantity_on_hand = quantity_on_hand + %s, "
+                           "last_restock_date = CURDATE(), last_restock_quantity = %s WHERE inventory_id = %s",
+                           (quantity, quantity, inventory_id))
+            _label_movements(cursor)
+            cursor.execute("UPDATE pharmacy_orders SET quantity_received = %s, actual_delivery_date = CURDATE(), "
+                           "order_status = IF(%s >= quantity_ordered, 'received', 'partially_received'), "
+                           "received_by = COALESCE(%s, received_by) WHERE order_id = %s",
+                           (received + quantity, received + quantity, received_by, order_id))
+            connection.commit()
+            return inventory_id
+        except Error:
+            connection.rollback()
+            _label_movements(cursor)
+            raise
+        finally:
+            cursor.close()
+    except Error as e:
+        logger.error(f"Error receiving pharmacy order {order_id}: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def sync_ledger(since):
+    """Dispense prescriptions and refills created since a date that have no dispense yet
+
+    Returns {source_type: (dispensed, short)} or None on error.
+    """
+    sources = {
+        'prescription': ("SELECT p.prescription_id FROM prescriptions p LEFT JOIN inventory_dispenses d "
+                         "ON d.source_type = 'prescription' AND d.source_id = p.prescription_id "
+                         "WHERE p.created_at >= %s AND p.quantity_dispensed > 0 AND d.source_id IS NULL "
+                         "ORDER BY p.prescription_id", dispense_prescription),
+        'refill': ("SELECT r.refill_id FROM prescription_refills r LEFT JOIN inventory_dispenses d "
+                   "ON d.source_type = 'refill' AND d.source_id = r.refill_id "
+                   "WHERE r.created_at >= %s AND d.source_id IS NULL ORDER BY r.refill_id", dispense_refill)
+    }
+    results = {}
+    connection = None
+    try:
+        connection = get_connection()
+        for source_type, (query, dispense_source) in sources.items():
+            cursor = connection.cursor()
+            cursor.execute(query, (since,))
+            source_ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            connection.commit()
+            outcomes = [dispense_source(source_id, connection) for source_id in source_ids]
+            if any(outcome is None for outcome in outcomes):
+                return None
+            results[source_type] = (sum(1 for outcome in outcomes if outcome),
+                                    sum(1 for outcome in outcomes if outcome is False))
+        return results
+    except Error as e:
+        logger.error(f"Error syncing inventory ledger: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def expire_lots():
+    """Mark lots that expired since their last write; return how many changed"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        statuses = ', '.join(['%s'] * len(DISPENSABLE_STATUSES))
+        cursor.execute(f"UPDATE medication_inventory SET status = 'expired' "
+                       f"WHERE expiration_date < CURDATE() AND status IN ({statuses})", DISPENSABLE_STATUSES)
+        expired = cursor.rowcount
+        connection.commit()
+        cursor.close()
+        if expired:
+            logger.info(f"Marked {expired} medication lots expired")
+        return expired
+    except Error as e:
+        logger.error(f"Error expiring medication lots: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def low_stock_lots(near_expiry_days=None, limit=100):
+    """Low-stock, expired or soon-expiring lots, from the status and expiration indexes"""
+    days = LEDGER_CONFIG['near_expiry_days'] if near_expiry_days is None else near_expiry_days
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT inventory_id, medication_id, lot_number, quantity_on_hand, reorder_level, "
+                       "expiration_date, status FROM medication_inventory "
+                       "WHERE status IN ('low_stock', 'expired') OR expiration_date <= CURDATE() + INTERVAL %s DAY "
+                       "ORDER BY quantity_on_hand, expiration_date LIMIT %s", (days, limit))
+        lots = cursor.fetchall()
+        cursor.close()
+        connection.commit()
+        return lots
+    except Error as e:
+        logger.error(f"Error reading low stock lots: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def verify_ledger():
+    """[(inventory_id, quantity_on_hand, ledger_total)] of lots whose movements don't add up, or None on error"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT mi.inventory_id, mi.quantity_on_hand, COALESCE(SUM(m.quantity), 0) AS ledger_total "
+                       "FROM medication_inventory mi LEFT JOIN inventory_movements m "
+                       "ON m.inventory_id = mi.inventory_id GROUP BY mi.inventory_id, mi.quantity_on_hand "
+                       "HAVING mi.quantity_on_hand <> ledger_total ORDER BY mi.inventory_id")
+        drift = [tuple(row) for row in cursor.fetchall()]
+        cursor.close()
+        connection.commit()
+        return drift
+    except Error as e:
+        logger.error(f"Error verifying inventory ledger: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+# ---- contention benchmark ----------------------------------------------------
+
+BENCHMARK_NAME = 'Ledger benchmark'
+
+
+def run_dispense_benchmark(threads, dispenses, medications, lots):
+    """Dispense a few hot medications from many threads; report throughput, latency and ledger drift"""
+    # Scratch medications keep real stock out of the benchmark
+    stock_per_lot = dispenses * 3 // (medications * lots) + 100
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        medication_ids = []
+        for number in range(medications):
+            cursor.execute("INSERT INTO medications (medication_name, dosage_form, status) "
+                           "VALUES (%s, 'tablet', 'discontinued')", (f"{BENCHMARK_NAME} {number}",))
+            medication_ids.append(cursor.lastrowid)
+        expires = date.today() + timedelta(days=365)
+        cursor.execute("INSERT INTO medication_inventory (medication_id, lot_number, expiration_date, "
+                       "quantity_on_hand, reorder_level, location) VALUES "
+                       + ', '.join(['(%s, %s, %s, %s, 100, %s)'] * (medications * lots)),
+                       [value for medication_id in medication_ids for lot in range(lots)
+                        for value in (medication_id, f"BENCH{lot:03d}", expires + timedelta(days=lot // 2),
+                                      stock_per_lot, BENCHMARK_NAME)])
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.error(f"Error preparing dispense benchmark: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+    source_base = int(time.time() * 1000) << 20
+    latencies, outcomes = [], {'dispensed': 0, 'short': 0, 'error': 0}
+    lock = threading.Lock()
+
+    def attempt(number):
+        rng = random.Random(number)
+        started = time.perf_counter()
+        connection = pool.get_connection()
+        try:
+            result = dispense(rng.choice(medication_ids), rng.randint(1, 5), 'manual', source_base + number,
+                              connection=connection)
+        finally:
+            connection.close()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            outcomes['dispensed' if result else 'short' if result is False else 'error'] += 1
+
+    # One connection per thread: measure contention on the lots, not on pool checkout
+    pool = ConnectionPool({**DB_CONFIG, 'database': DATABASE_NAME}, **{**POOL_CONFIG, 'pool_size': threads})
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(attempt, range(dispenses)))
+    finally:
+        pool.close_all()
+    elapsed = time.perf_counter() - started
+
+    drift = verify_ledger()
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        placeholders = ', '.join(['%s'] * len(medication_ids))
+        cursor.execute(f"SELECT COUNT(*) FROM medication_inventory "
+                       f"WHERE medication_id IN ({placeholders}) AND quantity_on_hand < 0", medication_ids)
+        negative = cursor.fetchone()[0]
+        # Movements last: deleting the lots records their removal
+        for table in ('inventory_dispenses', 'medication_inventory', 'medications', 'inventory_movements'):
+            cursor.execute(f"DELETE FROM {table} WHERE medication_id IN ({placeholders})", medication_ids)
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.error(f"Error verifying dispense benchmark: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+    latencies.sort()
+    print(f"   Threads:          {threads} ({medications} medications x {lots} lots)")
+    print(f"   Attempts:         {dispenses:,} in {elapsed:.2f}s")
+    print(f"   Dispensed:        {outcomes['dispensed']:,} ({outcomes['dispensed'] / elapsed:,.0f} dispenses/sec)")
+    print(f"   Out of stock:     {outcomes['short']:,}")
+    print(f"   Errors:           {outcomes['error']:,}")
+    print(f"   Latency:          median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f} ms")
+    print(f"   Negative lots:    {negative}")
+    print(f"   Ledger drift:     {'unknown' if drift is None else len(drift)} lots")
+    return negative == 0 and drift == [] and outcomes['error'] == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Medication inventory ledger with FEFO dispensing")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="create the ledger tables, triggers and FEFO index")
+    action.add_argument('--sync', action='store_true', help="dispense prescriptions and refills not dispensed yet")
+    action.add_argument('--expire', action='store_true', help="mark lots past their expiration date")
+    action.add_argument('--low-stock', action='store_true', help="print low-stock and soon-expiring lots")
+    action.add_argument('--verify', action='store_true', help="check every lot against its movements")
+    action.add_argument('--benchmark', action='store_true', help="run the multi-threaded dispense benchmark")
+    parser.add_argument('--since', type=date.fromisoformat, default=date.today(),
+                        help="--sync rows created on or after this date (default: today)")
+    parser.add_argument('--threads', type=int, default=32, help="dispensing threads (default: 32)")
+    parser.add_argument('--dispenses', type=int, default=20000, help="dispense attempts (default: 20000)")
+    parser.add_argument('--medications', type=int, default=4, help="medications to dispense (fewer = hotter)")
+    parser.add_argument('--lots', type=int, default=4, help="lots per benchmark medication (default: 4)")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - INVENTORY LEDGER")
+    print("=" * 60)
+    if args.install:
+        success = install_ledger()
+    elif args.sync:
+        results = sync_ledger(args.since)
+        success = results is not None
+        for source_type, (dispensed, short) in (results or {}).items():
+            print(f"   {source_type:<14} {dispensed:>7,} dispensed, {short:,} short of stock")
+    elif args.expire:
+        expired = expire_lots()
+        success = expired is not None
+        print(f"   Expired lots:     {expired}")
+    elif args.low_stock:
+        lots = low_stock_lots()
+        success = lots is not None
+        for lot in lots or []:
+            print(f"   lot {lot['inventory_id']:<6} medication {lot['medication_id']:<6} {lot['status']:<10} "
+                  f"{lot['quantity_on_hand']:>6} on hand, expires {lot['expiration_date']}")
+    elif args.verify:
+        drift = verify_ledger()
+        success = drift == []
+        for inventory_id, on_hand, ledger_total in drift or []:
+            print(f"   lot {inventory_id:<6} on hand {on_hand}, movements add up to {ledger_total}")
+        if drift == []:
+            print("   Every lot matches its movements")
+    else:
+        success = run_dispense_benchmark(args.threads, args.dispenses, args.medications, args.lots)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
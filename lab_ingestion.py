@@ -0,0 +1,607 @@
+"""
+Hospital OLTP System - Lab Result Ingestion
+===========================================
+
+Takes analyzer results in batches and writes each batch in one transaction:
+
+- Results name their test by order_number and test_code (or test_id, when an
+  order holds the same test twice). One join resolves a whole batch and locks
+  its lab_orders rows in order_id order, so batches touching the same order
+  take turns instead of deadlocking. Results for unknown or cancelled orders
+  and tests are rejected and counted, never written.
+- abnormal_flag is computed for the whole batch column by column: every
+  distinct reference_range is parsed once ('70-100', '<5', '>=60'), then the
+  values are compared against their bounds. Values beyond a limit by more
+  than critical_span times the range width are critical. A result the
+  analyzer itself reported as critical stays critical; results that aren't
+  numeric keep the analyzer's flag.
+- lab_results holds one result per test (uq_result_test), so a batch is one
+  multi-row INSERT ... ON DUPLICATE KEY UPDATE: a corrected result replaces
+  the earlier one, and a result older than the stored one is ignored, so
+  replays and out-of-order deliveries are harmless.
+- In the same transaction the tests are marked completed and their orders
+  move to in_progress, or completed once none of their tests are open.
+
+Results arrive from a file drop (ingest_directory: *.csv and *.json files,
+moved to processed/ or failed/ when done) or through ResultFeed, an
+in-process queue standing in for an interface engine: put() only enqueues,
+and a background thread ingests up to batch_size results at a time.
+
+Usage:
+    python lab_ingestion.py --install
+    python lab_ingestion.py --ingest /var/spool/lab-results
+    python lab_ingestion.py --ingest /var/spool/lab-results --watch
+    python lab_ingestion.py --benchmark --orders 5000 --tests-per-order 4
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+import queue
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+from statement_cache import invalidate_statement_caches
+from synthetic_data_generator import LAB_TEST_CATALOG
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+LAB_INGESTION_CONFIG = {
+    'batch_size': 1000,             # Results per transaction
+    'flush_interval': 0.5,          # Seconds a queued result may wait for a fuller batch
+    'queue_size': 100000,           # Results buffered by ResultFeed before put() blocks
+    'critical_span': 1.0,           # Range widths beyond a limit that make a result critical
+    'poll_interval': 5.0,           # Seconds between scans of a watched drop directory
+    'max_retries': 3                # Retries after a deadlock or lock wait timeout
+}
+
+# Deadlock, lock wait timeout
+RETRYABLE_ERRORS = {1213, 1205}
+
+FLAGS = ('normal', 'low', 'high', 'critical')
+
+RESULT_COLUMNS = ('test_id', 'result_value', 'result_unit', 'reference_range', 'abnormal_flag', 'result_datetime',
+                  'performed_by', 'verified_by', 'verification_datetime', 'notes')
+
+# result_datetime is assigned last: the other columns compare against the stored value
+_NEWER = "new.result_datetime >= lab_results.result_datetime"
+UPSERT_RESULTS = (f"INSERT INTO lab_results ({', '.join(RESULT_COLUMNS)}) VALUES {{rows}} AS new "
+                  f"ON DUPLICATE KEY UPDATE "
+                  + ', '.join(f"{column} = IF({_NEWER}, new.{column}, lab_results.{column})"
+                              for column in RESULT_COLUMNS[1:] if column != 'result_datetime')
+                  + ", result_datetime = GREATEST(lab_results.result_datetime, new.result_datetime)")
+
+FILE_PATTERNS = ('.csv', '.json')
+
+BENCHMARK_PREFIX = 'BENCH-LAB-'
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s", (table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def install_lab_ingestion():
+    """Make test_id unique in lab_results so results can be upserted"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        if not _index_exists(cursor, 'lab_results', 'uq_result_test'):
+            cursor.execute("SELECT COUNT(*) FROM (SELECT 1 FROM lab_results "
+                           "GROUP BY test_id HAVING COUNT(*) > 1) AS repeats")
+            repeats = cursor.fetchone()[0]
+            if repeats:
+                logger.error(f"{repeats} lab tests already hold several results; "
+                             f"keep one result per test before adding uq_result_test")
+                return False
+            # The unique key also serves the foreign key, so the plain index goes
+            cursor.execute("ALTER TABLE lab_results ADD UNIQUE KEY uq_result_test (test_id), "
+                           "DROP INDEX idx_result_test")
+            logger.info("Added uq_result_test to lab_results")
+        cursor.close()
+        invalidate_statement_caches()
+        return True
+    except Error as e:
+        logger.error(f"Error installing lab result ingestion: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+# ---- abnormal flags --------------------------------------------------------
+
+_RANGE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*-\s*(-?\d+(?:\.\d+)?)\s*$')
+_LIMIT = re.compile(r'^\s*([<>]=?)\s*(-?\d+(?:\.\d+)?)\s*$')
+_NUMBER = re.compile(r'^\s*[<>]?=?\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+@lru_cache(maxsize=4096)
+def range_bounds(reference_range):
+    """(low, high) of a reference range, with -inf/inf for an open side; None if it can't be read"""
+    if not reference_range:
+        return None
+    match = _RANGE.match(reference_range)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    match = _LIMIT.match(reference_range)
+    if match:
+        limit = float(match.group(2))
+        return (-math.inf, limit) if match.group(1).startswith('<') else (limit, math.inf)
+    return None
+
+
+def _number(value):
+    """A result value as a float ('<0.1' reads as 0.1), or NaN"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.match(value) if value else None
+    return float(match.group(1)) if match else math.nan
+
+
+def _width(low, high):
+    """Width of a range, or the size of the limit of an open-ended one"""
+    if math.isfinite(high - low):
+        return high - low
+    return abs(high if math.isfinite(high) else low) or 1.0
+
+
+def compute_flags(values, ranges, reported=None, critical_span=None):
+    """abnormal_flag of each result from parallel columns of values and reference ranges
+
+    reported holds the analyzer's own flags (or None); it is used where the
+    value or range isn't numeric, and a reported 'critical' is never lowered.
+    """
+    span = LAB_INGESTION_CONFIG['critical_span'] if critical_span is None else critical_span
+    bounds = [range_bounds(reference_range) or (math.nan, math.nan) for reference_range in ranges]
+    numbers = array('d', map(_number, values))
+    lows = array('d', (low for low, _ in bounds))
+    highs = array('d', (high for _, high in bounds))
+    margins = array('d', (span * _width(low, high) for low, high in bounds))
+    computed = [None if math.isnan(value) or math.isnan(low) else
+                'critical' if value < low - margin or value > high + margin else
+                'low' if value < low else 'high' if value > high else 'normal'
+                for value, low, high, margin in zip(numbers, lows, highs, margins)]
+    if reported is None:
+        return computed
+    return [own if own == 'critical' or flag is None and own in FLAGS else flag
+            for flag, own in zip(computed, reported)]
+
+
+# ---- batches ---------------------------------------------------------------
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _blank(value):
+    return None if value is None or value == '' else value
+
+
+def _when(value):
+    value = _blank(value)
+    return value if value is None or isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def _resolve(cursor, results):
+    """Lock the batch's orders; return ([(test_id, order_id, result)], Counter of rejection reasons)"""
+    order_numbers = sorted({str(result.get('order_number') or '') for result in results} - {''})
+    rejected = Counter()
+    if not order_numbers:
+        rejected['missing order_number'] += len(results)
+        return [], rejected
+    cursor.execute(f"SELECT o.order_id, o.order_number, o.status AS order_status, t.test_id, t.test_code, t.status "
+                   f"FROM lab_orders o JOIN lab_tests t ON t.order_id = o.order_id "
+                   f"WHERE o.order_number IN ({_placeholders(order_numbers)}) "
+                   f"ORDER BY o.order_id, t.test_id FOR UPDATE OF o", order_numbers)
+    tests, by_code = {}, {}
+    for row in cursor.fetchall():
+        tests[row['test_id']] = row
+        if row['status'] != 'cancelled':
+            by_code.setdefault((row['order_number'], row['test_code']), row)
+    accepted = {}
+    for result in results:
+        order_number = str(result.get('order_number') or '')
+        try:
+            test_id = _blank(result.get('test_id'))
+            test = tests.get(int(test_id)) if test_id is not None else \
+                by_code.get((order_number, result.get('test_code')))
+        except (TypeError, ValueError):
+            test = None
+        if test is None or test['order_number'] != order_number:
+            rejected['unknown order or test'] += 1
+        elif test['order_status'] == 'cancelled' or test['status'] == 'cancelled':
+            rejected['cancelled order or test'] += 1
+        else:
+            try:
+                result = {**result, 'result_datetime': _when(result.get('result_datetime')),
+                          'verification_datetime': _when(result.get('verification_datetime'))}
+            except (TypeError, ValueError):
+                rejected['unreadable datetime'] += 1
+                continue
+            if result['result_datetime'] is None:
+                rejected['missing result_datetime'] += 1
+                continue
+            previous = accepted.get(test['test_id'])
+            if previous is not None:
+                rejected['repeated in batch'] += 1
+                if previous[2]['result_datetime'] > result['result_datetime']:
+                    continue
+            accepted[test['test_id']] = (test['test_id'], test['order_id'], result)
+    return [accepted[test_id] for test_id in sorted(accepted)], rejected
+
+
+def _write_batch(cursor, resolved):
+    """Upsert the results, complete their tests and advance their orders; return the flags written"""
+    results = [result for _, _, result in resolved]
+    flags = compute_flags([_blank(result.get('result_value')) for result in results],
+                          [_blank(result.get('reference_range')) for result in results],
+                          [_blank(result.get('abnormal_flag')) for result in results])
+    row = f"({_placeholders(RESULT_COLUMNS)})"
+    cursor.execute(UPSERT_RESULTS.format(rows=', '.join([row] * len(resolved))),
+                   [value for (test_id, _, result), flag in zip(resolved, flags)
+                    for value in (test_id, _blank(result.get('result_value')), _blank(result.get('result_unit')),
+                                  _blank(result.get('reference_range')), flag, result['result_datetime'],
+                                  _blank(result.get('performed_by')), _blank(result.get('verified_by')),
+                                  result['verification_datetime'], _blank(result.get('notes')))])
+    test_ids = [test_id for test_id, _, _ in resolved]
+    cursor.execute(f"UPDATE lab_tests SET status = 'completed' "
+                   f"WHERE test_id IN ({_placeholders(test_ids)}) AND status <> 'completed'", test_ids)
+    order_ids = sorted({order_id for _, order_id, _ in resolved})
+    cursor.execute(f"UPDATE lab_orders o JOIN (SELECT order_id, "
+                   f"SUM(status NOT IN ('completed', 'cancelled')) AS open_tests FROM lab_tests "
+                   f"WHERE order_id IN ({_placeholders(order_ids)}) GROUP BY order_id) AS s "
+                   f"ON s.order_id = o.order_id "
+                   f"SET o.status = IF(s.open_tests = 0, 'completed', 'in_progress') "
+                   f"WHERE o.status <> 'cancelled'", order_ids)
+    return flags
+
+
+def ingest_batch(results):
+    """Write a batch of result dicts in one transaction; return counters, or None on error
+
+    Counters: written, rejected, and one per abnormal flag.
+    """
+    if not results:
+        return Counter()
+    connection = None
+    try:
+        connection = get_connection()
+        for attempt in range(LAB_INGESTION_CONFIG['max_retries'] + 1):
+            cursor = connection.cursor(dictionary=True)
+            try:
+                connection.start_transaction()
+                resolved, rejected = _resolve(cursor, results)
+                flags = _write_batch(cursor, resolved) if resolved else []
+                connection.commit()
+                if rejected:
+                    logger.warning(f"Rejected {sum(rejected.values())} of {len(results)} lab results: "
+                                   + ', '.join(f"{count} {reason}" for reason, count in rejected.most_common()))
+                counters = Counter(flag or 'unflagged' for flag in flags)
+                counters['written'] = len(resolved)
+                counters['rejected'] = sum(rejected.values())
+                return counters
+            except Error as e:
+                connection.rollback()
+                if e.errno not in RETRYABLE_ERRORS or attempt == LAB_INGESTION_CONFIG['max_retries']:
+                    raise
+                logger.warning(f"Retrying lab result batch after: {e}")
+            finally:
+                cursor.close()
+    except Error as e:
+        logger.error(f"Error ingesting {len(results)} lab results: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+# ---- file drop -------------------------------------------------------------
+
+def read_result_file(path):
+    """Result dicts of a .csv file (with a header row) or a .json file (a list of objects)"""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    with open(path, newline='', encoding='utf-8') as handle:
+        return list(csv.DictReader(handle))
+
+
+def _move(path, directory):
+    os.makedirs(directory, exist_ok=True)
+    shutil.move(path, os.path.join(directory, os.path.basename(path)))
+
+
+def ingest_file(path, batch_size=None):
+    """Ingest one result file; return counters, or None if a batch failed"""
+    batch_size = batch_size or LAB_INGESTION_CONFIG['batch_size']
+    try:
+        results = read_result_file(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading {path}: {e}")
+        return None
+    totals = Counter()
+    for batch in _chunks(results, batch_size):
+        counters = ingest_batch(batch)
+        if counters is None:
+            return None
+        totals.update(counters)
+    return totals
+
+
+def ingest_directory(directory, batch_size=None, watch=False):
+    """Ingest the result files dropped in a directory, oldest name first; return True if all succeeded
+
+    Ingested files move to processed/, files with a failed batch to failed/;
+    a failed file can simply be dropped again, as replayed results are
+    upserts. With watch, keeps polling until interrupted.
+    """
+    success = True
+    totals = Counter()
+    files = 0
+    started = time.perf_counter()
+    try:
+        while True:
+            names = sorted(name for name in os.listdir(directory) if name.endswith(FILE_PATTERNS))
+            for name in names:
+                path = os.path.join(directory, name)
+                counters = ingest_file(path, batch_size)
+                if counters is None:
+                    success = False
+                    _move(path, os.path.join(directory, 'failed'))
+                    continue
+                files += 1
+                totals.update(counters)
+                _move(path, os.path.join(directory, 'processed'))
+                logger.info(f"Ingested {name}: {counters['written']:,} results, {counters['rejected']:,} rejected")
+            if not watch:
+                break
+            time.sleep(LAB_INGESTION_CONFIG['poll_interval'])
+    except KeyboardInterrupt:
+        logger.info("Stopped watching for lab result files")
+    except OSError as e:
+        logger.error(f"Error reading drop directory {directory}: {e}")
+        return False
+    _print_totals(totals, time.perf_counter() - started, f"{files} files")
+    return success
+
+
+def _print_totals(totals, elapsed, source):
+    print(f"   Source:           {source}")
+    print(f"   Results:          {totals['written']:,} in {elapsed:.2f}s "
+          f"({totals['written'] / elapsed * 60 if elapsed else 0:,.0f} results/min)")
+    print(f"   Rejected:         {totals['rejected']:,}")
+    print(f"   Flags:            " + ', '.join(f"{flag} {totals[flag]:,}" for flag in (*FLAGS, 'unflagged')))
+
+
+# ---- queue -------------------------------------------------------------------
+
+_STOP = object()
+
+
+class ResultFeed:
+    """Queue results in memory and ingest them in batches from a background thread"""
+
+    def __init__(self, **options):
+        unknown = set(options) - set(LAB_INGESTION_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown result feed options: {', '.join(sorted(unknown))}")
+        self.config = {**LAB_INGESTION_CONFIG, **options}
+        self._queue = queue.Queue(self.config['queue_size'])
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = Counter()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='lab-result-feed', daemon=True)
+                    self._thread.start()
+
+    def put(self, result):
+        """Queue one result dict; blocks while the queue is full"""
+        self._ensure_started()
+        self._queue.put(result)
+
+    def _next_batch(self):
+        """Block for the first result, then gather more until the batch is full or flush_interval passes"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.config['flush_interval']
+        while len(batch) < self.config['batch_size']:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                result = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if result is _STOP:
+                return batch, True
+            batch.append(result)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                counters = ingest_batch(batch)
+                with self._stats_lock:
+                    if counters is None:
+                        self._stats['failed'] += len(batch)
+                    else:
+                        self._stats.update(counters)
+                        self._stats['batches'] += 1
+            for _ in range(len(batch) + stopping):
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued result has been ingested (or failed)"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Ingest the remaining results and stop the background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        with self._stats_lock:
+            stats = Counter(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+
+# ---- benchmark ---------------------------------------------------------------
+
+def _benchmark_results(orders, rng):
+    """One result per scratch test, values spread around the catalog's reference ranges"""
+    catalog = {entry[0]: entry for entry in LAB_TEST_CATALOG}
+    now = datetime.now().replace(microsecond=0)
+    for order_number, test_code in orders:
+        _, _, _, _, unit, low, high = catalog[test_code]
+        value = rng.gauss((low + high) / 2, (high - low) / 2)
+        yield {'order_number': order_number, 'test_code': test_code, 'result_value': f'{max(value, 0):.1f}',
+               'result_unit': unit, 'reference_range': f'{low:g}-{high:g}', 'result_datetime': now,
+               'performed_by': 'Analyzer'}
+
+
+def run_ingestion_benchmark(orders, tests_per_order, batch_size=None, corrections=0.1):
+    """Feed results for scratch lab orders through a ResultFeed; report results/min and order statuses"""
+    rng = random.Random(7)
+    prefix = f"{BENCHMARK_PREFIX}{int(time.time())}-"
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT encounter_id, patient_id, doctor_id FROM encounters ORDER BY encounter_id LIMIT 1")
+        encounter = cursor.fetchone()
+        if encounter is None:
+            logger.error("The lab ingestion benchmark needs at least one encounter")
+            return False
+        tests = []
+        for chunk in _chunks(range(orders), 1000):
+            cursor.execute(f"INSERT INTO lab_orders (order_number, encounter_id, patient_id, ordering_doctor_id, "
+                           f"order_datetime, status) VALUES "
+                           + ', '.join(["(%s, %s, %s, %s, NOW(), 'collected')"] * len(chunk)),
+                           [value for number in chunk for value in (f"{prefix}{number:07d}", *encounter)])
+            numbers = [f"{prefix}{number:07d}" for number in chunk]
+            cursor.execute(f"SELECT order_id, order_number FROM lab_orders "
+                           f"WHERE order_number IN ({_placeholders(numbers)}) ORDER BY order_id", numbers)
+            rows = [(order_id, order_number, entry) for order_id, order_number in cursor.fetchall()
+                    for entry in rng.sample(LAB_TEST_CATALOG, tests_per_order)]
+            cursor.execute("INSERT INTO lab_tests (order_id, test_code, test_name, test_category, specimen_type) "
+                           "VALUES " + ', '.join(['(%s, %s, %s, %s, %s)'] * len(rows)),
+                           [value for order_id, _, entry in rows for value in (order_id, *entry[:4])])
+            tests.extend((order_number, entry[0]) for _, order_number, entry in rows)
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.error(f"Error preparing lab ingestion benchmark: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+    # Deliver tests in a shuffled order, then resend some as corrections
+    rng.shuffle(tests)
+    replays = rng.sample(tests, int(len(tests) * corrections))
+    feed = ResultFeed(batch_size=batch_size or LAB_INGESTION_CONFIG['batch_size'])
+    started = time.perf_counter()
+    for result in _benchmark_results(tests + replays, rng):
+        feed.put(result)
+    feed.close()
+    elapsed = time.perf_counter() - started
+    totals = feed.stats()
+
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT o.status, COUNT(*) FROM lab_orders o "
+                       "WHERE o.order_number LIKE %s GROUP BY o.status", (f"{prefix}%",))
+        statuses = dict(cursor.fetchall())
+        cursor.execute("SELECT COUNT(*) FROM lab_results r JOIN lab_tests t ON t.test_id = r.test_id "
+                       "JOIN lab_orders o ON o.order_id = t.order_id WHERE o.order_number LIKE %s", (f"{prefix}%",))
+        stored = cursor.fetchone()[0]
+        # Tests and results go with their orders (ON DELETE CASCADE)
+        cursor.execute("DELETE FROM lab_orders WHERE order_number LIKE %s", (f"{prefix}%",))
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.error(f"Error verifying lab ingestion benchmark: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+    _print_totals(totals, elapsed, f"ResultFeed ({orders:,} orders x {tests_per_order} tests, "
+                                   f"{len(replays):,} corrections)")
+    print(f"   Batches:          {totals['batches']:,} ({totals['failed']:,} results in failed batches)")
+    print(f"   Stored results:   {stored:,} of {len(tests):,} tests")
+    print(f"   Order statuses:   " + ', '.join(f"{status} {count:,}" for status, count in sorted(statuses.items())))
+    return totals['failed'] == 0 and stored == len(tests) and set(statuses) == {'completed'}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk ingestion of lab analyzer results")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="add the one-result-per-test key to lab_results")
+    action.add_argument('--ingest', metavar='DIR', help="ingest the .csv/.json result files dropped in DIR")
+    action.add_argument('--benchmark', action='store_true', help="ingest results for scratch lab orders")
+    parser.add_argument('--watch', action='store_true', help="keep polling the drop directory")
+    parser.add_argument('--batch-size', type=int, default=LAB_INGESTION_CONFIG['batch_size'],
+                        help=f"results per transaction (default: {LAB_INGESTION_CONFIG['batch_size']})")
+    parser.add_argument('--orders', type=int, default=5000, help="scratch lab orders for --benchmark")
+    parser.add_argument('--tests-per-order', type=int, default=4, help="tests per scratch order for --benchmark")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - LAB RESULT INGESTION")
+    print("=" * 60)
+    if args.install:
+        success = install_lab_ingestion()
+    elif args.ingest:
+        success = ingest_directory(args.ingest, args.batch_size, args.watch)
+    else:
+        success = run_ingestion_benchmark(args.orders, min(args.tests_per_order, len(LAB_TEST_CATALOG)),
+                                          args.batch_size)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -22,19 +22,21 @@ Usage:
     python load_organizational_data.py
     etc.
 
+    Or run independent loaders concurrently (see parallel_loader.py):
+    python parallel_loader.py --workers 4
+
 Exit Codes:
     0: All data loaded successfully
     1: One or more loading steps failed
 """
 
-import mysql.connector
 from mysql.connector import Error
 import logging
 import sys
 import os
 from datetime import datetime, timedelta
 import random
-from database_connection import DB_CONFIG, DATABASE_NAME, logger
+from database_connection import get_connection, logger
 
 # Suppress other loggers
 logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
@@ -1535,6 +1537,40 @@ def load_admin_data(cursor):
     return True
 
 
+# Domain loaders in sequential dependency order
+DOMAIN_LOADERS = [
+    load_reference_data,
+    load_organizational_data,
+    load_staff_data,
+    load_patient_data,
+    load_transactional_data,
+    load_laboratory_data,
+    load_radiology_data,
+    load_pharmacy_data,
+    load_insurance_extended_data,
+    load_billing_data,
+    load_admin_data,
+]
+
+# Tables written by each domain loader (used to derive loader dependencies)
+LOADER_TABLES = {
+    'load_reference_data': ['icd_codes', 'cpt_codes', 'appointment_types', 'insurance_companies', 'medications'],
+    'load_organizational_data': ['departments', 'facilities', 'rooms', 'beds', 'equipment', 'department_equipment'],
+    'load_staff_data': ['doctors', 'specialists', 'nurses', 'nurse_assignments', 'staff', 'staff_shifts', 'doctor_schedules'],
+    'load_patient_data': ['patients', 'patient_addresses', 'patient_emergency_contacts', 'patient_allergies'],
+    'load_transactional_data': ['appointment_types', 'appointments', 'appointment_cancellations', 'encounters',
+                                'encounter_vitals', 'encounter_diagnoses', 'encounter_procedures', 'clinical_notes',
+                                'bed_assignments', 'insurance_plans', 'patient_insurance_policies'],
+    'load_laboratory_data': ['lab_orders', 'lab_tests', 'lab_results'],
+    'load_radiology_data': ['radiology_orders', 'radiology_results'],
+    'load_pharmacy_data': ['medications', 'drug_interactions', 'prescriptions', 'prescription_refills',
+                           'medication_inventory', 'pharmacy_orders'],
+    'load_insurance_extended_data': ['insurance_authorizations', 'insurance_claims', 'insurance_claim_items'],
+    'load_billing_data': ['invoices', 'invoice_items', 'payment_transactions'],
+    'load_admin_data': ['roles', 'users', 'user_roles', 'audit_logs'],
+}
+
+
 def load_all_fake_data():
     """Main function to load all fake data in proper order"""
     connection = None
@@ -1543,10 +1579,8 @@ def load_all_fake_data():
         log_path = setup_fake_data_log()
         logger.info(f"Fake data log file: {log_path}")
 
-        # Connect to database
-        config = DB_CONFIG.copy()
-        config['database'] = DATABASE_NAME
-        connection = mysql.connector.connect(**config)
+        # Borrow a pooled connection to the hospital database
+        connection = get_connection()
         
         if connection.is_connected():
             logger.info("Connected to hospital_OLTP_system database")
@@ -1558,60 +1592,11 @@ def load_all_fake_data():
             # Load data in dependency order - use fresh cursor for each layer
             success = True
             
-            cursor = connection.cursor()
-            success = load_reference_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_organizational_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_staff_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_patient_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_transactional_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_laboratory_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_radiology_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_pharmacy_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_insurance_extended_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_billing_data(cursor) and success
-            cursor.close()
-            connection.commit()
-            
-            cursor = connection.cursor()
-            success = load_admin_data(cursor) and success
-            cursor.close()
-            connection.commit()
+            for loader in DOMAIN_LOADERS:
+                cursor = connection.cursor()
+                success = loader(cursor) and success
+                cursor.close()
+                connection.commit()
             
             print("\n" + "=" * 60)
             print("[OK] ALL FAKE DATA LOADED SUCCESSFULLY")
@@ -0,0 +1,287 @@
+"""
+Hospital OLTP System - Parallel Fake Data Loader
+=================================================
+
+Loads fake data with a process pool instead of one loader after another.
+
+The FK constraints in create_schema.sql are parsed into a dependency DAG and
+split into stages: every unit of work in a stage only references tables loaded
+in earlier stages, so a stage's work runs concurrently with one database
+connection per worker process.
+
+Two modes:
+- Domain loaders (default): the 11 loaders from load_all_fake_data.py are the
+  units of work. A loader depends on another when one of its tables has an FK
+  to a table the other writes, or when both write the same table.
+- Synthetic (--synthetic): every (table, chunk) produced by
+  synthetic_data_generator.py is a unit of work, so large tables are split
+  across all workers.
+
+Wall-clock time is reported per stage so scaling with --workers can be measured.
+
+Usage:
+    python parallel_loader.py --workers 4
+    python parallel_loader.py --workers 8 --synthetic --patients 1_000_000
+
+Exit Codes:
+    0: All stages loaded successfully
+    1: One or more stages failed
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+import load_all_fake_data
+import synthetic_data_generator
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'create_schema.sql')
+
+FOREIGN_KEY_PATTERN = re.compile(
+    r"ALTER\s+TABLE\s+`?(\w+)`?\s+ADD\s+CONSTRAINT\s+`?\w+`?\s+FOREIGN\s+KEY\s*\(\s*`?(\w+)`?\s*\)\s*"
+    r"REFERENCES\s+`?(\w+)`?\s*\(\s*`?(\w+)`?\s*\)", re.IGNORECASE)
+
+
+def parse_foreign_key_columns(schema_path=SCHEMA_FILE):
+    """Return (child_table, child_column, parent_table, parent_column) for every FK"""
+    with open(schema_path, 'r', encoding='utf-8') as file:
+        schema = file.read()
+    # Ignore commented-out lines so disabled DDL does not add edges
+    schema = '\n'.join(line for line in schema.split('\n') if not line.strip().startswith('--'))
+    return [tuple(part.lower() for part in match) for match in FOREIGN_KEY_PATTERN.findall(schema)]
+
+
+def parse_foreign_keys(schema_path=SCHEMA_FILE):
+    """Return (child_table, parent_table) pairs for every FK in the schema file"""
+    return [(child, parent) for child, _, parent, _ in parse_foreign_key_columns(schema_path)]
+
+
+def table_dependencies(foreign_keys):
+    """Map each table to the set of tables it references (self-references dropped)"""
+    dependencies = {}
+    for child, parent in foreign_keys:
+        dependencies.setdefault(child, set())
+        dependencies.setdefault(parent, set())
+        if child != parent:
+            dependencies[child].add(parent)
+    return dependencies
+
+
+def topological_stages(dependencies):
+    """Split a {node: {prerequisites}} graph into stages of independent nodes"""
+    remaining = {node: set(prereqs) & set(dependencies) for node, prereqs in dependencies.items()}
+    stages = []
+    while remaining:
+        ready = sorted(node for node, prereqs in remaining.items() if not prereqs)
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+        stages.append(ready)
+        for node in ready:
+            del remaining[node]
+        for prereqs in remaining.values():
+            prereqs.difference_update(ready)
+    return stages
+
+
+def loader_dependencies(loader_tables, foreign_keys):
+    """Derive loader -> prerequisite loaders from the tables each loader writes"""
+    parents = table_dependencies(foreign_keys)
+    order = list(loader_tables)
+    dependencies = {name: set() for name in order}
+    for position, name in enumerate(order):
+        for table in loader_tables[name]:
+            for earlier in order[:position]:
+                # Two loaders writing the same table keep their original order
+                if table in loader_tables[earlier]:
+                    dependencies[name].add(earlier)
+            for parent in parents.get(table, ()):
+                for other in order:
+                    if other != name and parent in loader_tables[other]:
+                        dependencies[name].add(other)
+    return dependencies
+
+
+# ---- worker processes ------------------------------------------------------
+
+_worker_generator = None
+
+
+def _init_worker(generator=None):
+    """Process pool initializer: keep the generator for synthetic tasks"""
+    global _worker_generator
+    _worker_generator = generator
+    logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+
+def _run_domain_loader(name):
+    """Run one domain loader on this worker's pooled connection"""
+    started = time.perf_counter()
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        success = getattr(load_all_fake_data, name)(cursor)
+        cursor.close()
+        connection.commit()
+        return name, success, 0, time.perf_counter() - started, None
+    except Error as e:
+        if connection and connection.is_connected():
+            connection.rollback()
+        return name, False, 0, time.perf_counter() - started, str(e)
+    finally:
+        if connection:
+            connection.close()
+
+
+def _run_synthetic_chunk(table, chunk, batch_size):
+    """Generate and insert one chunk of a synthetic table"""
+    started = time.perf_counter()
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        rows = synthetic_data_generator.load_table(cursor, _worker_generator, table, batch_size, chunks=[chunk])
+        cursor.close()
+        connection.commit()
+        return f'{table}[{chunk}]', True, rows, time.perf_counter() - started, None
+    except Error as e:
+        if connection and connection.is_connected():
+            connection.rollback()
+        return f'{table}[{chunk}]', False, 0, time.perf_counter() - started, str(e)
+    finally:
+        if connection:
+            connection.close()
+
+
+# ---- stage execution -------------------------------------------------------
+
+def _run_stages(stages, submit, workers, initargs=()):
+    """Run stages in order, each stage's tasks concurrently; return per-stage timings"""
+    timings = []
+    success = True
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        for number, (label, tasks) in enumerate(stages, start=1):
+            print(f"\nStage {number}/{len(stages)}: {label}")
+            started = time.perf_counter()
+            futures = [submit(executor, task) for task in tasks]
+            rows = 0
+            for future in futures:
+                name, ok, loaded, elapsed, error = future.result()
+                rows += loaded
+                if not ok:
+                    success = False
+                    logger.error(f"{name} failed after {elapsed:.2f}s: {error}")
+                    print(f"   [FAILED] {name}: {error}")
+            elapsed = time.perf_counter() - started
+            timings.append((label, len(tasks), rows, elapsed))
+            logger.info(f"Stage {number} ({label}) finished in {elapsed:.2f}s, {rows} rows")
+            print(f"   [OK] Stage {number} finished in {elapsed:.2f}s")
+            if not success:
+                break
+    return success, timings
+
+
+def _print_timings(timings, workers):
+    total = sum(elapsed for _, _, _, elapsed in timings)
+    total_rows = sum(rows for _, _, rows, _ in timings)
+    print("\n" + "=" * 70)
+    print(f"STAGE TIMINGS ({workers} workers)")
+    print("=" * 70)
+    for number, (label, tasks, rows, elapsed) in enumerate(timings, start=1):
+        print(f"  Stage {number:<3} {tasks:>5} tasks {rows:>12,} rows {elapsed:>9.2f}s  {label[:30]}")
+    print("-" * 70)
+    rate = f" ({total_rows / total:,.0f} rows/sec)" if total_rows and total > 0 else ""
+    print(f"  TOTAL WALL-CLOCK: {total:.2f}s{rate}")
+    print("=" * 70)
+
+
+def load_domains_parallel(workers=None, schema_path=SCHEMA_FILE):
+    """Run the domain loaders of load_all_fake_data.py in dependency stages"""
+    workers = workers or os.cpu_count()
+    foreign_keys = parse_foreign_keys(schema_path)
+    stages = topological_stages(loader_dependencies(load_all_fake_data.LOADER_TABLES, foreign_keys))
+    logger.info(f"Parsed {len(foreign_keys)} FK constraints into {len(stages)} loader stages")
+
+    print("\n" + "=" * 60)
+    print(f"HOSPITAL OLTP SYSTEM - PARALLEL FAKE DATA LOADER ({workers} workers)")
+    print("=" * 60)
+
+    labelled = [(', '.join(stage), stage) for stage in stages]
+    success, timings = _run_stages(labelled, lambda executor, name: executor.submit(_run_domain_loader, name),
+                                   workers)
+    _print_timings(timings, workers)
+    return success
+
+
+def load_synthetic_parallel(workers=None, seed=synthetic_data_generator.DEFAULT_SEED,
+                            anchor_date=synthetic_data_generator.DEFAULT_ANCHOR_DATE, batch_size=1000,
+                            schema_path=SCHEMA_FILE, **scale):
+    """Generate synthetic data with (table, chunk) tasks spread across workers"""
+    workers = workers or os.cpu_count()
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        generator = synthetic_data_generator.SyntheticDataGenerator(
+            synthetic_data_generator.fetch_reference_ids(cursor),
+            synthetic_data_generator.fetch_id_offsets(cursor),
+            seed=seed, anchor_date=anchor_date, **scale)
+        cursor.close()
+    except Error as e:
+        logger.error(f"Error reading reference data: {e}")
+        print(f"\n[FAILED] Error: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+    tables = [table for _, table in synthetic_data_generator.generation_plan(generator)]
+    parents = table_dependencies(parse_foreign_keys(schema_path))
+    graph = {table: parents.get(table, set()) & set(tables) for table in tables}
+    stages = [(', '.join(stage), [(table, chunk) for table in stage for chunk in range(generator.chunk_count(table))])
+              for stage in topological_stages(graph)]
+
+    print("\n" + "=" * 60)
+    print(f"HOSPITAL OLTP SYSTEM - PARALLEL SYNTHETIC LOADER ({workers} workers)")
+    print("=" * 60)
+    print(f"Patients: {generator.scale['patients']:,}  Seed: {seed}  Stages: {len(stages)}")
+
+    success, timings = _run_stages(
+        stages, lambda executor, task: executor.submit(_run_synthetic_chunk, task[0], task[1], batch_size),
+        workers, initargs=(generator,))
+    _print_timings(timings, workers)
+    return success
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load fake data in parallel, honoring FK dependencies")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help=f"worker processes (default: {os.cpu_count()})")
+    parser.add_argument('--synthetic', action='store_true',
+                        help="load synthetic_data_generator.py data instead of the domain loaders")
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per executemany (default: 1000)")
+    synthetic_data_generator.add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+
+    log_path = load_all_fake_data.setup_fake_data_log()
+    logger.info(f"Fake data log file: {log_path}")
+
+    if args.synthetic:
+        return load_synthetic_parallel(workers=args.workers, seed=args.seed, anchor_date=args.anchor_date,
+                                       batch_size=args.batch_size,
+                                       **synthetic_data_generator.scale_from_args(args))
+    return load_domains_parallel(workers=args.workers)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
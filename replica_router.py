@@ -0,0 +1,310 @@
+"""
+Hospital OLTP System - Read/Write Splitting
+============================================
+
+Routes reads to read replicas and writes to the primary (DB_CONFIG).
+
+- Replicas are listed in REPLICA_CONFIGS (database_connection.py) as DB_CONFIG
+  overrides, e.g. {'host': '127.0.0.1', 'port': 3307}.
+- Replica lag is read from SHOW REPLICA STATUS (Seconds_Behind_Source) and
+  cached for lag_check_interval seconds. Replicas that are unreachable, have
+  replication stopped or lag more than max_replica_lag are skipped; reads
+  fall back to the primary when no replica qualifies.
+- Read-your-writes: after a RoutedDatabaseConnection writes, it reads the
+  primary's @@GLOBAL.gtid_executed, and a replica only serves its reads once
+  GTID_SUBSET shows the replica has executed that set (checked once per
+  replica and write). Lag can't prove this: Seconds_Behind_Source is 0 as
+  soon as the SQL thread has caught up with a relay log that may not hold
+  the write yet. Without GTIDs (gtid_mode OFF) reads after a write stay on
+  the primary.
+- Locking reads (FOR UPDATE / FOR SHARE), reads inside an open transaction on
+  the primary, and calls with read_only=False always use the primary.
+  autocommit is off, so a plain read served by the primary outside a
+  transaction is committed right after, ending the snapshot it opened;
+  otherwise every later read would stay on the primary. A locking read
+  keeps its transaction (and locks) open until the next write commits.
+
+Testing against two local instances (primary on 3306, replica on 3307):
+    python replica_router.py --replica 127.0.0.1:3307
+"""
+
+import argparse
+import itertools
+import re
+import sys
+import threading
+import time
+
+from mysql.connector import Error
+from database_connection import REPLICA_CONFIGS, DatabaseConnection, get_connection, logger, server_label
+
+ROUTING_CONFIG = {
+    'max_replica_lag': 5.0,         # Seconds behind the primary a replica may be
+    'lag_check_interval': 2.0,      # Seconds a lag measurement is reused
+    'require_replication': True     # Skip servers that report no replication status
+}
+
+LOCKING_READ = re.compile(r'\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b', re.IGNORECASE)
+
+
+class ReplicaRouter:
+    """Choose a replica for a read based on measured replication lag"""
+
+    def __init__(self, replicas=None, **options):
+        unknown = set(options) - set(ROUTING_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown routing options: {', '.join(sorted(unknown))}")
+        self.replicas = list(REPLICA_CONFIGS if replicas is None else replicas)
+        self.config = {**ROUTING_CONFIG, **options}
+        self._lag = {}              # server label -> (lag seconds or None, measured_at)
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def _measure_lag(self, replica):
+        """Seconds behind the primary, or None if the replica can't serve reads"""
+        connection = None
+        try:
+            connection = get_connection(use_database=False, server=replica)
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Error:
+                # MySQL before 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+            rows = cursor.fetchall()
+            cursor.close()
+        except Error as e:
+            logger.warning(f"Replica {server_label(replica)} unavailable: {e}")
+            return None
+        finally:
+            if connection:
+                connection.close()
+        if not rows:
+            return None if self.config['require_replication'] else 0.0
+        status = rows[0]
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        # NULL lag means the SQL or IO thread is not running
+        return float(lag) if lag is not None else None
+
+    def replica_lag(self, replica):
+        """(lag, measured_at) for a replica, re-measured after lag_check_interval"""
+        label = server_label(replica)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._lag.get(label)
+        if cached and now - cached[1] < self.config['lag_check_interval']:
+            return cached
+        measured = (self._measure_lag(replica), time.monotonic())
+        with self._lock:
+            self._lag[label] = measured
+        return measured
+
+    def choose_replica(self):
+        """Return the least-lagged eligible replica, or None to read from the primary"""
+        candidates = []
+        for replica in self.replicas:
+            lag, _ = self.replica_lag(replica)
+            if lag is None or lag > self.config['max_replica_lag']:
+                continue
+            candidates.append((lag, replica))
+        if not candidates:
+            return None
+        best = min(lag for lag, _ in candidates)
+        tied = [replica for lag, replica in candidates if lag == best]
+        return tied[next(self._turn) % len(tied)]
+
+    def status(self):
+        """Current lag and eligibility of every replica"""
+        report = []
+        for replica in self.replicas:
+            lag, _ = self.replica_lag(replica)
+            report.append({'server': server_label(replica), 'lag': lag,
+                           'eligible': lag is not None and lag <= self.config['max_replica_lag']})
+        return report
+
+
+_default_router = None
+_default_router_lock = threading.Lock()
+
+
+def get_router():
+    """Process-wide router over REPLICA_CONFIGS"""
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            _default_router = ReplicaRouter()
+        return _default_router
+
+
+class RoutedDatabaseConnection:
+    """DatabaseConnection API that sends reads to replicas and writes to the primary"""
+
+    def __init__(self, router=None, row_factory='dict'):
+        self.router = router or get_router()
+        self.row_factory = row_factory
+        self.primary = DatabaseConnection(row_factory=row_factory)
+        self._replicas = {}         # server label -> connected DatabaseConnection
+        self.last_write = None
+        self.last_gtid = None       # primary's gtid_executed after the last write ('' without GTIDs)
+        self._caught_up = set()     # labels of replicas that executed last_gtid
+
+    def __enter__(self):
+        """Context manager entry"""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.close()
+        return False
+
+    def connect(self):
+        """Borrow a primary connection; replica connections are borrowed on first read"""
+        return self.primary.connect()
+
+    def close(self):
+        """Return all borrowed connections to their pools"""
+        for replica in self._replicas.values():
+            replica.close()
+        self._replicas.clear()
+        self.primary.close()
+
+    def _in_transaction(self):
+        return self.primary.connection is not None and self.primary.connection.in_transaction
+
+    def _end_snapshot(self):
+        """Commit the transaction a plain read opened on the primary"""
+        if self.primary.connection is None:
+            return
+        try:
+            self.primary.connection.commit()
+        except Error as e:
+            logger.warning(f"Error ending a read transaction on the primary: {e}")
+
+    def _reader(self, query, read_only=True):
+        """(connection that should serve a read, whether to commit the primary after it)"""
+        locking = LOCKING_READ.search(query)
+        if not read_only or locking or self._in_transaction():
+            return self.primary, not locking and not self._in_transaction()
+        if self.last_write is not None and not self.last_gtid:
+            # Written without a GTID to wait for: only the primary is known to have it
+            return self.primary, True
+        replica = self.router.choose_replica()
+        if replica is None:
+            return self.primary, True
+        label = server_label(replica)
+        if label not in self._replicas:
+            connection = DatabaseConnection(row_factory=self.row_factory, server=replica)
+            if not connection.connect():
+                logger.warning(f"Falling back to the primary for reads: replica {label} unavailable")
+                return self.primary, True
+            self._replicas[label] = connection
+        if self.last_gtid and label not in self._caught_up:
+            if not self._has_executed(self._replicas[label], self.last_gtid):
+                return self.primary, True
+            self._caught_up.add(label)
+        return self._replicas[label], False
+
+    def _has_executed(self, replica, gtid_set):
+        """Whether a replica has executed every transaction of gtid_set"""
+        try:
+            cursor = replica.connection.cursor()
+            cursor.execute("SELECT GTID_SUBSET(%s, @@GLOBAL.gtid_executed)", (gtid_set,))
+            executed = cursor.fetchone()[0] == 1
+            cursor.close()
+            replica.connection.commit()
+            return executed
+        except Error as e:
+            logger.warning(f"Error checking replica GTIDs, reading from the primary: {e}")
+            return False
+
+    def record_write(self):
+        """Note a write on the primary: later reads wait for a replica that has executed it"""
+        self.last_write = time.monotonic()
+        self._caught_up.clear()
+        self.last_gtid = ''
+        if self.primary.connection is None:
+            return
+        try:
+            cursor = self.primary.connection.cursor()
+            cursor.execute("SELECT @@GLOBAL.gtid_executed")
+            self.last_gtid = cursor.fetchone()[0] or ''
+            cursor.close()
+            self.primary.connection.commit()
+        except Error as e:
+            logger.warning(f"Error reading the primary's GTIDs; reads stay on the primary: {e}")
+
+    def execute_select(self, query, params=None, row_factory=None, read_only=True):
+        """Run a SELECT on a replica (or the primary when required)"""
+        reader, end_snapshot = self._reader(query, read_only)
+        try:
+            return reader.execute_select(query, params, row_factory)
+        finally:
+            if end_snapshot:
+                self._end_snapshot()
+
+    def stream_select(self, query, params=None, batch_size=None, row_type='tuple', read_only=True):
+        """Stream a SELECT from a replica (or the primary when required)"""
+        reader, end_snapshot = self._reader(query, read_only)
+        try:
+            yield from reader.stream_select(query, params, batch_size, row_type)
+        finally:
+            if end_snapshot:
+                self._end_snapshot()
+
+    def execute_query(self, query, params=None):
+        """Run a write on the primary"""
+        try:
+            return self.primary.execute_query(query, params)
+        finally:
+            self.record_write()
+
+    def execute_many(self, query, data_list):
+        """Run a batched write on the primary"""
+        try:
+            return self.primary.execute_many(query, data_list)
+        finally:
+            self.record_write()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check replica lag and read/write routing")
+    parser.add_argument('--replica', action='append', default=[], metavar='HOST:PORT',
+                        help="replica to route reads to (repeatable; default: REPLICA_CONFIGS)")
+    parser.add_argument('--max-lag', type=float, default=ROUTING_CONFIG['max_replica_lag'],
+                        help=f"maximum replica lag in seconds (default: {ROUTING_CONFIG['max_replica_lag']})")
+    parser.add_argument('--no-require-replication', action='store_true',
+                        help="accept replicas that report no replication status (plain local instances)")
+    args = parser.parse_args(argv)
+
+    replicas = [{'host': host, 'port': int(port)} for host, port in
+                (replica.rsplit(':', 1) for replica in args.replica)] or None
+    router = ReplicaRouter(replicas, max_replica_lag=args.max_lag,
+                           require_replication=not args.no_require_replication)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - REPLICA ROUTING CHECK")
+    print("=" * 60)
+    print(f"Primary: {server_label(None)}")
+    for replica in router.status():
+        lag = 'n/a' if replica['lag'] is None else f"{replica['lag']:.1f}s"
+        print(f"   [{'OK' if replica['eligible'] else '--'}] replica {replica['server']:<22} lag {lag}")
+
+    with RoutedDatabaseConnection(router, row_factory='tuple') as db:
+        checks = [("SELECT @@hostname, @@port", None, True),
+                  ("SELECT @@hostname, @@port FOR UPDATE", None, True),
+                  ("SELECT @@hostname, @@port", None, False)]
+        for query, params, read_only in checks:
+            rows = db.execute_select(query, params, read_only=read_only)
+            served = f"{rows[0][0]}:{rows[0][1]}" if rows else 'error'
+            print(f"   {query[:40]:<40} read_only={read_only!s:<5} -> {served}")
+        db.record_write()
+        rows = db.execute_select("SELECT @@hostname, @@port")
+        served = f"{rows[0][0]}:{rows[0][1]}" if rows else 'error'
+        print(f"   {'(right after a write)':<40} read_only=True  -> {served}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
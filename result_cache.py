@@ -0,0 +1,255 @@
+"""
+Query Result Cache for Hospital OLTP System
+Process-wide LRU of SELECT results with TTL, a byte cap and table-based invalidation
+
+Only SELECTs whose every table is listed in RESULT_CACHE_CONFIG['tables']
+(rarely changing reference data) are cached, keyed by server, SQL text and
+parameters. Results are stored as column names plus tuple rows and rebuilt
+in the caller's row type on every hit, so callers can't modify a cached
+result.
+
+Invalidation:
+- execute_query/execute_many writes bump a generation counter for each table
+  they write (after commit); entries reading that table are dropped
+- a result read while one of its tables was being written is not stored,
+  because the generations it started with are checked again on insert
+- writes the table parser can't attribute (CALL, multi-statement scripts)
+  and DDL clear the whole cache
+- writes from other processes and trigger/cascade side effects are only
+  bounded by ttl
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_CONFIG = {
+    'enabled': True,
+    'tables': ('icd_codes', 'cpt_codes', 'appointment_types', 'medications', 'insurance_plans',
+               'insurance_companies', 'departments', 'facilities'),
+    'ttl': 300.0,                   # Seconds before an entry is refetched
+    'max_bytes': 64 * 1024 * 1024,  # Estimated size of all cached results
+    'max_entry_fraction': 0.1       # Results larger than this share of max_bytes are not cached
+}
+
+_READ_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+((?:`?\w+`?\.)?`?\w+`?(?:\s*(?:AS\s+)?\w+)?'
+                          r'(?:\s*,\s*(?:`?\w+`?\.)?`?\w+`?(?:\s*(?:AS\s+)?\w+)?)*)', re.IGNORECASE)
+_WRITE_TABLE = re.compile(
+    r'^\s*(?:INSERT(?:\s+(?:LOW_PRIORITY|DELAYED|HIGH_PRIORITY|IGNORE))*\s+(?:INTO\s+)?'
+    r'|REPLACE(?:\s+(?:LOW_PRIORITY|DELAYED))?\s+(?:INTO\s+)?'
+    r'|UPDATE(?:\s+(?:LOW_PRIORITY|IGNORE))*\s+'
+    r'|DELETE(?:\s+(?:LOW_PRIORITY|QUICK|IGNORE))*\s+(?:\w+(?:\s*,\s*\w+)*\s+)?FROM\s+'
+    r'|TRUNCATE\s+(?:TABLE\s+)?'
+    r'|LOAD\s+DATA\s+.*?\bINTO\s+TABLE\s+)'
+    r'((?:`?\w+`?\.)?`?\w+`?)', re.IGNORECASE | re.DOTALL)
+_UPDATE_JOIN = re.compile(r'^\s*UPDATE\b(.*?)\bSET\b', re.IGNORECASE | re.DOTALL)
+_UNCACHEABLE = re.compile(r'\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\b|\b(?:RAND|NOW|CURDATE|CURTIME|UUID|'
+                          r'SYSDATE|UTC_TIMESTAMP|CURRENT_TIMESTAMP|CURRENT_DATE|LAST_INSERT_ID)\b', re.IGNORECASE)
+_SUBQUERY_KEYWORDS = {'select', 'dual', 'lateral', 'json_table'}
+_WRITE_KEYWORDS = ('INSERT', 'REPLACE', 'UPDATE', 'DELETE', 'TRUNCATE', 'LOAD')
+_READ_ONLY_KEYWORDS = ('SELECT', 'SHOW', 'SET', 'USE', 'EXPLAIN', 'DESCRIBE', 'DESC', 'BEGIN', 'START',
+                       'COMMIT', 'ROLLBACK')
+
+
+def _table_name(reference):
+    """Bare lower-case table name of '[`db`.]`table` [alias]'"""
+    return reference.strip().split()[0].replace('`', '').split('.')[-1].lower()
+
+
+def tables_read(query):
+    """Tables named in FROM/JOIN clauses (subqueries included), or None if it can't tell"""
+    tables = set()
+    for match in _READ_TABLES.finditer(query):
+        for reference in match.group(1).split(','):
+            tables.add(_table_name(reference))
+    tables -= _SUBQUERY_KEYWORDS
+    return tables or None
+
+
+def tables_written(query):
+    """Tables a DML statement writes, or None if unknown (the whole cache must go)"""
+    statement = query.lstrip()
+    if not statement[:8].upper().startswith(_WRITE_KEYWORDS):
+        return None
+    match = _WRITE_TABLE.match(statement)
+    if not match:
+        return None
+    tables = {_table_name(match.group(1))}
+    if statement[:6].upper() == 'UPDATE':
+        # Multi-table UPDATE writes any of the joined tables
+        joined = _UPDATE_JOIN.match(statement)
+        if joined:
+            tables |= tables_read('FROM ' + joined.group(1)) or set()
+    elif statement[:6].upper() == 'DELETE':
+        tables |= tables_read(statement[statement.upper().index('FROM'):]) or set()
+    return tables
+
+
+def _result_bytes(column_names, rows):
+    """Rough in-memory size of a cached result"""
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(name) for name in column_names)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class ResultCache:
+    """LRU of (column names, rows) keyed by (server, query, params)"""
+
+    def __init__(self, ttl, max_bytes, max_entry_fraction):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes * max_entry_fraction
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires, tables, columns, rows, bytes)
+        self._by_table = {}             # table -> set of keys
+        self._generations = {}          # table -> write count
+        self._epoch = 0                 # bumped by clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected = 0
+
+    def _drop(self, key):
+        _, tables, _, _, size = self._entries.pop(key)
+        self.bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def get(self, key):
+        """(column names, rows) of a live entry, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[3]
+
+    def generations(self, tables):
+        """Snapshot to pass to put() so results that raced a write are not stored"""
+        with self._lock:
+            return self._epoch, tuple(self._generations.get(table, 0) for table in tables)
+
+    def put(self, key, tables, column_names, rows, generations):
+        tables = tuple(tables)
+        rows = tuple(tuple(row) for row in rows)
+        size = _result_bytes(column_names, rows)
+        with self._lock:
+            if generations != (self._epoch, tuple(self._generations.get(table, 0) for table in tables)):
+                self.rejected += 1
+                return False
+            if size > self.max_entry_bytes:
+                self.rejected += 1
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, tables, tuple(column_names), rows, size)
+            self.bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate_tables(self, tables):
+        """Drop every entry reading one of these tables"""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in list(self._by_table.get(table, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+            self._epoch += 1
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0,
+                    'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'evictions': self.evictions, 'expirations': self.expirations,
+                    'invalidations': self.invalidations, 'rejected': self.rejected}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """The process-wide result cache, created from RESULT_CACHE_CONFIG on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(RESULT_CACHE_CONFIG['ttl'], RESULT_CACHE_CONFIG['max_bytes'],
+                                 RESULT_CACHE_CONFIG['max_entry_fraction'])
+        return _cache
+
+
+def cacheable_tables(query):
+    """Tables of a SELECT that may be cached, or None if any table it reads is not cacheable"""
+    if query.lstrip()[:6].upper() != 'SELECT' or _UNCACHEABLE.search(query):
+        return None
+    tables = tables_read(query)
+    if not tables or not tables <= set(RESULT_CACHE_CONFIG['tables']):
+        return None
+    return sorted(tables)
+
+
+def invalidate_for_write(query):
+    """Invalidate what a committed write may have changed"""
+    if _cache is None or query.split(None, 1)[0].upper() in _READ_ONLY_KEYWORDS:
+        return
+    tables = tables_written(query)
+    if tables is None:
+        _cache.clear()
+    else:
+        _cache.invalidate_tables(tables)
+
+
+def result_key(server, use_database, query, params):
+    """Cache key of a SELECT, or None if its parameters can't be hashed"""
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    if isinstance(server, dict):
+        # DB_CONFIG overrides of a replica, keyed like the connection pools
+        server = tuple(sorted(server.items()))
+    key = (server, use_database, query, tuple(params) if params else ())
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def clear_result_cache():
+    if _cache is not None:
+        _cache.clear()
+
+
+def get_result_cache_stats():
+    """Hit ratio, entry count and memory use of the result cache"""
+    return get_result_cache().stats()
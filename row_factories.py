@@ -0,0 +1,121 @@
+"""
+Row Factories for Hospital OLTP System
+Compact alternatives to dictionary cursors for query results
+
+Row types:
+- 'tuple':      rows as returned by the cursor (smallest, positional access)
+- 'namedtuple': one namedtuple class per result shape (attribute + index access)
+- 'record':     one __slots__ class per result shape (attribute + row['col'] access)
+- 'dict':       one dict per row (largest; kept for compatibility)
+- 'columnar':   a single {column: values} mapping for the whole result; integer
+                and float columns without NULLs are packed into array.array
+"""
+
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+from keyword import iskeyword
+
+ROW_TYPES = ('tuple', 'namedtuple', 'record', 'dict', 'columnar')
+
+
+def _identifiers(column_names):
+    """Make column names usable as attributes, like namedtuple(rename=True)"""
+    names = []
+    for position, name in enumerate(column_names):
+        if not name.isidentifier() or iskeyword(name) or name.startswith('_') or name in names:
+            name = f'_{position}'
+        names.append(name)
+    return tuple(names)
+
+
+class Record:
+    """Base class for per-shape __slots__ rows"""
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return getattr(self, self._fields[key])
+        return getattr(self, key)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        return isinstance(other, Record) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields)
+        return f'{type(self).__name__}({values})'
+
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+
+@lru_cache(maxsize=256)
+def namedtuple_class(column_names):
+    """One namedtuple class per result shape; invalid identifiers (e.g. COUNT(*)) are renamed"""
+    return namedtuple('Row', column_names, rename=True)
+
+
+@lru_cache(maxsize=256)
+def record_class(column_names):
+    """One __slots__ record class per result shape"""
+    fields = _identifiers(column_names)
+    cls = type('Record', (Record,), {'__slots__': fields, '_fields': fields})
+    setters = tuple(cls.__dict__[name].__set__ for name in fields)
+
+    def make(row):
+        record = object.__new__(cls)
+        for setter, value in zip(setters, row):
+            setter(record, value)
+        return record
+
+    cls._make = staticmethod(make)
+    return cls
+
+
+def row_builder(column_names, row_type='tuple'):
+    """Return a function turning a result tuple into the requested row type"""
+    if row_type == 'tuple':
+        return tuple
+    if row_type == 'namedtuple':
+        return namedtuple_class(tuple(column_names))._make
+    if row_type == 'record':
+        return record_class(tuple(column_names))._make
+    if row_type == 'dict':
+        columns = tuple(column_names)
+        return lambda row: dict(zip(columns, row))
+    raise ValueError(f"Unknown row type {row_type!r}; expected one of {', '.join(ROW_TYPES)}")
+
+
+def _pack(values):
+    """Store NULL-free int/float columns as typed arrays, everything else as lists"""
+    if values and all(type(value) is int for value in values):
+        try:
+            return array('q', values)
+        except OverflowError:
+            return values
+    if values and all(type(value) is float for value in values):
+        return array('d', values)
+    return values
+
+
+def to_columns(column_names, rows):
+    """Transpose result rows into {column: values}"""
+    columns = list(zip(*rows)) if rows else [() for _ in column_names]
+    return {name: _pack(list(values)) for name, values in zip(column_names, columns)}
+
+
+def build_rows(column_names, rows, row_type='tuple'):
+    """Convert a fetched result into the requested row type (or columnar mapping)"""
+    if row_type == 'columnar':
+        return to_columns(column_names, rows)
+    if row_type == 'tuple':
+        return rows
+    build = row_builder(column_names, row_type)
+    return [build(row) for row in rows]
@@ -0,0 +1,319 @@
+"""
+Hospital OLTP System - Parallel Schema Apply
+=============================================
+
+Applies create_schema.sql faster than executing it statement by statement.
+
+The script is parsed (with the streaming splitter from sql_script_executor.py)
+into phases:
+1. Prelude (CREATE DATABASE, USE, SET, DROP TABLE) on one connection; the
+   per-table DROP TABLE statements are folded into a single DROP.
+2. CREATE TABLE statements, run concurrently across several connections. The
+   schema declares every FK with a separate ALTER, so all tables are
+   independent at this point.
+3. Foreign keys, grouped into one ALTER TABLE per table and run concurrently.
+   foreign_key_checks is disabled on the worker sessions so MySQL can add them
+   in place instead of rebuilding each table.
+4. Remaining statements (SET FOREIGN_KEY_CHECKS=1, status SELECT).
+
+With defer_indexes=True, secondary (non-unique) indexes are stripped from the
+CREATE TABLE statements and phase 3 is skipped. Run build_deferred_objects()
+after the bulk load: it adds each table's indexes and foreign keys in a single
+ALTER, then checks the loaded rows for FK orphans (the FKs were added without
+validation). UNIQUE and PRIMARY keys are never deferred, so INSERT IGNORE keeps
+its duplicate handling during the load.
+
+Usage:
+    python schema_apply.py --workers 4
+    python schema_apply.py --workers 4 --defer-indexes      # before a bulk load
+    python schema_apply.py --workers 4 --build-deferred     # after the load
+"""
+
+import argparse
+import logging
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error
+from bulk_loader import verify_table
+from database_connection import DATABASE_NAME, DB_CONFIG, POOL_CONFIG, ConnectionPool, get_connection, logger
+from parallel_loader import SCHEMA_FILE, parse_foreign_key_columns
+from sql_script_executor import iter_sql_statements
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+DEFAULT_WORKERS = POOL_CONFIG['pool_size']
+
+CREATE_TABLE = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\(', re.IGNORECASE)
+DROP_TABLES = re.compile(r'DROP\s+TABLE\s+IF\s+EXISTS\s+(.+)$', re.IGNORECASE | re.DOTALL)
+ADD_FOREIGN_KEY = re.compile(r'ALTER\s+TABLE\s+`?(\w+)`?\s+(ADD\s+CONSTRAINT\s+.+\bFOREIGN\s+KEY\b.+)$',
+                             re.IGNORECASE | re.DOTALL)
+SECONDARY_INDEX = re.compile(r'(?:(?:FULLTEXT|SPATIAL)\s+)?(?:INDEX|KEY)\b', re.IGNORECASE)
+PRELUDE_STATEMENT = re.compile(r'(CREATE\s+DATABASE|USE|SET|DROP)\b', re.IGNORECASE)
+
+
+def split_definitions(body):
+    """Split a CREATE TABLE body on top-level commas (ignoring parentheses and quotes)"""
+    definitions = []
+    depth = 0
+    quote = None
+    start = 0
+    for position, char in enumerate(body):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            definitions.append(body[start:position].strip())
+            start = position + 1
+    definitions.append(body[start:].strip())
+    return [definition for definition in definitions if definition]
+
+
+def _matching_paren(text, opening):
+    """Return the index of the parenthesis closing the one at text[opening]"""
+    depth = 0
+    quote = None
+    for position in range(opening, len(text)):
+        char = text[position]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return position
+    raise ValueError("Unbalanced parentheses in CREATE TABLE statement")
+
+
+class SchemaPlan:
+    """create_schema.sql split into the phases of a parallel apply"""
+
+    def __init__(self):
+        self.prelude = []
+        self.tables = {}            # table -> CREATE TABLE statement
+        self.indexes = {}           # table -> deferred secondary index definitions
+        self.foreign_keys = {}      # table -> ADD CONSTRAINT clauses
+        self.epilogue = []
+
+    def foreign_key_statements(self):
+        """One ALTER TABLE per table adding all of its foreign keys"""
+        return {table: f"ALTER TABLE {table} " + ', '.join(clauses)
+                for table, clauses in self.foreign_keys.items()}
+
+    def deferred_statements(self):
+        """One ALTER TABLE per table adding its deferred indexes and foreign keys"""
+        statements = {}
+        for table in self.tables:
+            clauses = [f"ADD {index}" for index in self.indexes.get(table, ())]
+            clauses += self.foreign_keys.get(table, [])
+            if clauses:
+                statements[table] = f"ALTER TABLE {table} " + ', '.join(clauses)
+        return statements
+
+
+def parse_schema(schema_path=SCHEMA_FILE, defer_indexes=False):
+    """Parse a schema script into a SchemaPlan"""
+    plan = SchemaPlan()
+    dropped = None
+    for statement, _ in iter_sql_statements(schema_path):
+        drop = DROP_TABLES.match(statement)
+        if drop and not plan.tables:
+            # Fold consecutive DROP TABLE IF EXISTS statements into one round trip
+            if dropped is None:
+                dropped = []
+                plan.prelude.append(dropped)
+            dropped.extend(name.strip() for name in drop.group(1).split(','))
+            continue
+        dropped = None
+
+        create = CREATE_TABLE.match(statement)
+        foreign_key = ADD_FOREIGN_KEY.match(statement)
+        if create:
+            table = create.group(1).lower()
+            if defer_indexes:
+                statement, plan.indexes[table] = _strip_secondary_indexes(statement, create.end() - 1)
+            plan.tables[table] = statement
+        elif foreign_key:
+            plan.foreign_keys.setdefault(foreign_key.group(1).lower(), []).append(foreign_key.group(2).strip())
+        elif not plan.tables and PRELUDE_STATEMENT.match(statement):
+            plan.prelude.append(statement)
+        else:
+            plan.epilogue.append(statement)
+
+    plan.prelude = [f"DROP TABLE IF EXISTS {', '.join(item)}" if isinstance(item, list) else item
+                    for item in plan.prelude]
+    return plan
+
+
+def _strip_secondary_indexes(statement, opening):
+    """Remove non-unique index definitions from a CREATE TABLE; return (statement, indexes)"""
+    closing = _matching_paren(statement, opening)
+    kept, indexes = [], []
+    for definition in split_definitions(statement[opening + 1:closing]):
+        (indexes if SECONDARY_INDEX.match(definition) else kept).append(definition)
+    body = ',\n    '.join(kept)
+    return f"{statement[:opening]}(\n    {body}\n){statement[closing + 1:]}", indexes
+
+
+# ---- execution -------------------------------------------------------------
+
+def _run_statement(pool, label, statement):
+    """Execute one DDL statement on a connection of pool with FK checks off"""
+    started = time.perf_counter()
+    connection = None
+    try:
+        connection = pool.get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+            cursor.close()
+        return label, True, time.perf_counter() - started, None
+    except Error as e:
+        return label, False, time.perf_counter() - started, str(e)
+    finally:
+        if connection:
+            connection.close()
+
+
+def _run_concurrently(phase, statements, workers):
+    """Run {label: statement} across worker connections; return (success, elapsed)"""
+    # Long ALTERs would hold shared connections past checkout_timeout; each worker gets its own
+    pool = ConnectionPool({**DB_CONFIG, 'database': DATABASE_NAME}, **{**POOL_CONFIG, 'pool_size': workers})
+    started = time.perf_counter()
+    success = True
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_statement, pool, label, statement)
+                       for label, statement in statements.items()]
+            for future in futures:
+                label, ok, elapsed, error = future.result()
+                if not ok:
+                    success = False
+                    logger.error(f"{phase}: {label} failed after {elapsed:.2f}s: {error}")
+                    print(f"   [FAILED] {label}: {error}")
+    finally:
+        pool.close_all()
+    elapsed = time.perf_counter() - started
+    logger.info(f"{phase}: {len(statements)} statements in {elapsed:.2f}s ({workers} workers)")
+    print(f"   [{'OK' if success else 'FAILED'}] {phase:<28}: {len(statements):>3} statements in {elapsed:.2f}s")
+    return success, elapsed
+
+
+def _run_serially(phase, statements):
+    """Run statements in order on one server-level connection"""
+    started = time.perf_counter()
+    connection = None
+    try:
+        connection = get_connection(use_database=False)
+        # The prelude runs USE and disables FK checks; don't hand that session back to the pool
+        connection.reset_session = True
+        cursor = connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+            if cursor.with_rows:
+                cursor.fetchall()
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.error(f"{phase} failed: {e}")
+        print(f"   [FAILED] {phase}: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+    elapsed = time.perf_counter() - started
+    logger.info(f"{phase}: {len(statements)} statements in {elapsed:.2f}s")
+    print(f"   [OK] {phase:<28}: {len(statements):>3} statements in {elapsed:.2f}s")
+    return True
+
+
+def apply_schema(schema_path=SCHEMA_FILE, workers=DEFAULT_WORKERS, defer_indexes=False):
+    """Apply the schema with concurrent CREATE TABLEs and grouped FK ALTERs"""
+    started = time.perf_counter()
+    plan = parse_schema(schema_path, defer_indexes)
+    fk_count = sum(len(clauses) for clauses in plan.foreign_keys.values())
+    logger.info(f"Schema plan: {len(plan.tables)} tables, {fk_count} FKs in {len(plan.foreign_keys)} ALTERs"
+                f"{', secondary indexes deferred' if defer_indexes else ''}")
+
+    if not _run_serially("Prelude", plan.prelude):
+        return False
+    if not _run_concurrently("Create tables", plan.tables, workers)[0]:
+        return False
+    if defer_indexes:
+        deferred = sum(len(indexes) for indexes in plan.indexes.values())
+        print(f"   [--] Deferred {deferred} secondary indexes and {fk_count} foreign keys")
+    elif not _run_concurrently("Add foreign keys", plan.foreign_key_statements(), workers)[0]:
+        return False
+    if not _run_serially("Epilogue", plan.epilogue):
+        return False
+    logger.info(f"Schema applied in {time.perf_counter() - started:.2f}s")
+    return True
+
+
+def build_deferred_objects(schema_path=SCHEMA_FILE, workers=DEFAULT_WORKERS, verify=True):
+    """Add the indexes and foreign keys skipped by apply_schema(defer_indexes=True)"""
+    plan = parse_schema(schema_path, defer_indexes=True)
+    success, _ = _run_concurrently("Build indexes and FKs", plan.deferred_statements(), workers)
+    if not success or not verify:
+        return success
+
+    # Foreign keys were added with foreign_key_checks off, so validate the loaded rows
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        foreign_keys = parse_foreign_key_columns(schema_path)
+        problems = [problem for table in plan.tables for problem in verify_table(cursor, table, foreign_keys)]
+        cursor.close()
+    except Error as e:
+        logger.error(f"Error verifying foreign keys: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+    for problem in problems:
+        logger.error(f"Integrity check failed: {problem}")
+        print(f"   [FAILED] {problem}")
+    return not problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply create_schema.sql with parallel DDL")
+    parser.add_argument('--schema', default=SCHEMA_FILE, help="schema script (default: create_schema.sql)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"concurrent DDL connections (default: {DEFAULT_WORKERS})")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--defer-indexes', action='store_true',
+                       help="create tables without secondary indexes and foreign keys")
+    group.add_argument('--build-deferred', action='store_true',
+                       help="add the deferred indexes and foreign keys after a bulk load")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.build_deferred:
+        success = build_deferred_objects(args.schema, args.workers)
+    else:
+        success = apply_schema(args.schema, args.workers, args.defer_indexes)
+    print(f"\n[{'OK' if success else 'FAILED'}] Finished in {time.perf_counter() - started:.2f}s")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
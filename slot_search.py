@@ -0,0 +1,620 @@
+"""
+Hospital OLTP System - Appointment Slot Search
+===============================================
+
+Precomputes every active doctor's free time into an interval index so "next
+N slots for specialty X within 7 days" is one indexed range read instead of a
+doctor_schedules scan plus a per-doctor appointments scan.
+
+- appointment_free_intervals holds, per doctor and day within the horizon,
+  the free intervals left after subtracting booked appointments from the
+  doctor's schedules, aligned to slot_minutes. It is keyed by
+  (doctor_id, slot_date, start_time) and indexed by
+  (specialization, slot_date, start_time).
+- Triggers on appointments, doctor_schedules and doctors record the affected
+  (doctor, day) in slot_index_dirty; booking or cancelling an appointment
+  marks one doctor-day, a schedule change marks all of the doctor's days.
+- Searches first recompute the dirty doctor-days (usually zero or a few), and
+  roll the horizon forward once a day.
+- appointments gets a composite (doctor_id, appointment_date,
+  appointment_time) index to back the per-doctor recomputation.
+
+--benchmark compares indexed searches with computing the same answer live
+from doctor_schedules and appointments. Generated data has no schedules;
+--assume-hours gives doctors without one a Monday-Friday working day.
+
+Usage:
+    python slot_search.py --install
+    python slot_search.py --search Cardiology --count 5
+    python slot_search.py --benchmark 500 --assume-hours 08:00-17:00
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+SLOT_CONFIG = {
+    'horizon_days': 30,             # Days ahead kept in the index
+    'slot_minutes': 15,             # Slot grid; intervals are aligned to it
+    'default_hours': None,          # (start, end) minutes for doctors without a schedule, Mon-Fri
+    'write_chunk_size': 1000
+}
+
+# Appointment statuses that occupy the doctor's time
+BOOKED_STATUSES = ('scheduled', 'confirmed', 'checked_in', 'in_progress', 'completed')
+
+# slot_index_dirty date meaning "every day in the horizon"
+ALL_DATES = date(1000, 1, 1)
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+SLOT_INDEX_TABLES = [
+    """CREATE TABLE IF NOT EXISTS appointment_free_intervals (
+        doctor_id INT NOT NULL,
+        slot_date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME NOT NULL,
+        free_minutes SMALLINT NOT NULL,
+        specialization VARCHAR(100) NOT NULL,
+        room_id INT,
+        PRIMARY KEY (doctor_id, slot_date, start_time),
+        INDEX idx_free_specialty_date (specialization, slot_date, start_time)
+    )""",
+    """CREATE TABLE IF NOT EXISTS slot_index_dirty (
+        doctor_id INT NOT NULL,
+        slot_date DATE NOT NULL,
+        PRIMARY KEY (doctor_id, slot_date)
+    )""",
+    """CREATE TABLE IF NOT EXISTS slot_index_state (
+        state_id TINYINT PRIMARY KEY,
+        built_from DATE NOT NULL,
+        built_through DATE NOT NULL
+    )"""
+]
+
+_MARK_DIRTY = "INSERT IGNORE INTO slot_index_dirty (doctor_id, slot_date) "
+
+SLOT_INDEX_TRIGGERS = {
+    'trg_slot_index_appointments_ai': (
+        "AFTER INSERT ON appointments FOR EACH ROW " + _MARK_DIRTY +
+        "SELECT NEW.doctor_id, NEW.appointment_date FROM DUAL WHERE NEW.appointment_date >= CURDATE()"),
+    'trg_slot_index_appointments_au': (
+        "AFTER UPDATE ON appointments FOR EACH ROW " + _MARK_DIRTY +
+        "SELECT doctor_id, slot_date FROM (SELECT NEW.doctor_id AS doctor_id, NEW.appointment_date AS slot_date "
+        "UNION SELECT OLD.doctor_id, OLD.appointment_date) AS changed "
+        "WHERE slot_date >= CURDATE() AND NOT (OLD.doctor_id <=> NEW.doctor_id "
+        "AND OLD.appointment_date <=> NEW.appointment_date AND OLD.appointment_time <=> NEW.appointment_time "
+        "AND OLD.duration_minutes <=> NEW.duration_minutes AND OLD.status <=> NEW.status)"),
+    'trg_slot_index_appointments_ad': (
+        "AFTER DELETE ON appointments FOR EACH ROW " + _MARK_DIRTY +
+        "SELECT OLD.doctor_id, OLD.appointment_date FROM DUAL WHERE OLD.appointment_date >= CURDATE()"),
+    'trg_slot_index_schedules_ai': (
+        "AFTER INSERT ON doctor_schedules FOR EACH ROW " + _MARK_DIRTY + f"VALUES (NEW.doctor_id, '{ALL_DATES}')"),
+    'trg_slot_index_schedules_au': (
+        "AFTER UPDATE ON doctor_schedules FOR EACH ROW " + _MARK_DIRTY +
+        f"SELECT doctor_id, '{ALL_DATES}' FROM (SELECT NEW.doctor_id AS doctor_id "
+        f"UNION SELECT OLD.doctor_id) AS changed"),
+    'trg_slot_index_schedules_ad': (
+        "AFTER DELETE ON doctor_schedules FOR EACH ROW " + _MARK_DIRTY + f"VALUES (OLD.doctor_id, '{ALL_DATES}')"),
+    'trg_slot_index_doctors_au': (
+        "AFTER UPDATE ON doctors FOR EACH ROW " + _MARK_DIRTY +
+        f"SELECT NEW.doctor_id, '{ALL_DATES}' FROM DUAL WHERE NOT (OLD.specialization <=> NEW.specialization "
+        f"AND OLD.status <=> NEW.status)")
+}
+
+# Composite indexes backing the recomputation, replacing their single-column prefixes
+SLOT_INDEXES = [
+    ('appointments', 'idx_appointment_doctor_date', '(doctor_id, appointment_date, appointment_time)',
+     'idx_appointment_doctor'),
+    ('doctor_schedules', 'idx_schedule_doctor_day', '(doctor_id, day_of_week)', 'idx_schedule_doctor')
+]
+
+
+# ---- interval arithmetic -----------------------------------------------------
+
+def minutes(value):
+    """Minutes since midnight of a TIME value (timedelta, time or minutes)"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    return value.hour * 60 + value.minute
+
+
+def as_time(total_minutes):
+    return f"{total_minutes // 60:02d}:{total_minutes % 60:02d}:00"
+
+
+def free_intervals(working, booked, grid):
+    """Subtract booked (start, end) intervals from working (start, end, room) intervals
+
+    Working intervals are made disjoint (a later schedule starts where an
+    earlier one ends) and the result is aligned to the slot grid.
+    """
+    booked = sorted(booked)
+    free = []
+    covered_until = 0
+    for start, end, room_id in sorted(working, key=lambda interval: interval[0]):
+        start = max(start, covered_until)
+        if start >= end:
+            continue
+        covered_until = end
+        cursor = start
+        for booked_start, booked_end in booked:
+            if booked_end <= cursor:
+                continue
+            if booked_start >= end:
+                break
+            if booked_start > cursor:
+                free.append((cursor, booked_start, room_id))
+            cursor = max(cursor, booked_end)
+        if cursor < end:
+            free.append((cursor, end, room_id))
+    aligned = []
+    for start, end, room_id in free:
+        start = -(-start // grid) * grid
+        end = end // grid * grid
+        if end > start:
+            aligned.append((start, end, room_id))
+    return aligned
+
+
+# ---- index maintenance -------------------------------------------------------
+
+def _index_exists(cursor, table, index):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s", (table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def _in_clause(column, values):
+    if values is None:
+        return "", []
+    return f" AND {column} IN ({', '.join(['%s'] * len(values))})", list(values)
+
+
+def compute_intervals(cursor, first, last, doctor_ids=None):
+    """(doctor_id, day, start, end, specialization, room_id) free intervals, in minutes,
+    for the doctors (all active ones if None) on days first..last"""
+    grid = SLOT_CONFIG['slot_minutes']
+    where, params = _in_clause('doctor_id', doctor_ids)
+    cursor.execute(f"SELECT doctor_id, specialization FROM doctors WHERE status = 'active'{where}", params)
+    specializations = dict(cursor.fetchall())
+    if not specializations:
+        return []
+
+    schedules = defaultdict(list)
+    cursor.execute(f"SELECT doctor_id, day_of_week, start_time, end_time, room_id, effective_from, effective_to "
+                   f"FROM doctor_schedules WHERE is_active = TRUE{where}", params)
+    for doctor_id, day, start, end, room_id, effective_from, effective_to in cursor.fetchall():
+        schedules[doctor_id].append((day, minutes(start), minutes(end), room_id, effective_from, effective_to))
+
+    booked = defaultdict(list)
+    statuses = ', '.join(['%s'] * len(BOOKED_STATUSES))
+    cursor.execute(f"SELECT doctor_id, appointment_date, appointment_time, duration_minutes FROM appointments "
+                   f"WHERE appointment_date BETWEEN %s AND %s AND status IN ({statuses}){where}",
+                   [first, last, *BOOKED_STATUSES] + params)
+    for doctor_id, day, start, duration in cursor:
+        start = minutes(start)
+        booked[doctor_id, day].append((start, start + (duration or 30)))
+
+    default_hours = SLOT_CONFIG['default_hours']
+    rows = []
+    for doctor_id, specialization in specializations.items():
+        doctor_schedules = schedules.get(doctor_id)
+        day = first
+        while day <= last:
+            weekday = WEEKDAYS[day.weekday()]
+            if doctor_schedules:
+                working = [(start, end, room_id) for name, start, end, room_id, effective_from, effective_to
+                           in doctor_schedules if name == weekday
+                           and (effective_from is None or effective_from <= day)
+                           and (effective_to is None or day <= effective_to)]
+            elif default_hours and day.weekday() < 5:
+                working = [(default_hours[0], default_hours[1], None)]
+            else:
+                working = []
+            for start, end, room_id in free_intervals(working, booked.get((doctor_id, day), ()), grid):
+                rows.append((doctor_id, day, start, end, specialization, room_id))
+            day += timedelta(days=1)
+    return rows
+
+
+def _write_intervals(cursor, intervals):
+    rows = [(doctor_id, day, as_time(start), as_time(end), end - start, specialization, room_id)
+            for doctor_id, day, start, end, specialization, room_id in intervals]
+    chunk_size = SLOT_CONFIG['write_chunk_size']
+    for start in range(0, len(rows), chunk_size):
+        cursor.executemany("INSERT INTO appointment_free_intervals (doctor_id, slot_date, start_time, end_time, "
+                           "free_minutes, specialization, room_id) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                           rows[start:start + chunk_size])
+
+
+def _horizon():
+    today = date.today()
+    return today, today + timedelta(days=SLOT_CONFIG['horizon_days'] - 1)
+
+
+def build_slot_index(connection):
+    """Recompute the whole index for today..horizon; return the number of intervals"""
+    first, last = _horizon()
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction(isolation_level='READ COMMITTED')
+        rows = compute_intervals(cursor, first, last)
+        cursor.execute("DELETE FROM appointment_free_intervals")
+        cursor.execute("DELETE FROM slot_index_dirty")
+        _write_intervals(cursor, rows)
+        cursor.execute("REPLACE INTO slot_index_state (state_id, built_from, built_through) VALUES (1, %s, %s)",
+                       (first, last))
+        connection.commit()
+        logger.info(f"Slot index built: {len(rows)} free intervals, {first} to {last}")
+        return len(rows)
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def roll_horizon(connection):
+    """Drop past days and add the days that entered the horizon (at most once a day)"""
+    first, last = _horizon()
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction(isolation_level='READ COMMITTED')
+        # Plain read first: concurrent searches only queue on the row lock on the day the horizon moves
+        for lock in ('', ' FOR UPDATE'):
+            cursor.execute(f"SELECT built_from, built_through FROM slot_index_state WHERE state_id = 1{lock}")
+            state = cursor.fetchone()
+            if state is None:
+                connection.rollback()
+                return build_slot_index(connection)
+            built_from, built_through = state
+            if built_from == first and built_through >= last:
+                connection.commit()
+                return 0
+        cursor.execute("DELETE FROM appointment_free_intervals WHERE slot_date < %s", (first,))
+        rows = []
+        if built_through < last:
+            new_first = max(first, built_through + timedelta(days=1))
+            rows = compute_intervals(cursor, new_first, last)
+            cursor.execute("DELETE FROM appointment_free_intervals WHERE slot_date >= %s", (new_first,))
+            _write_intervals(cursor, rows)
+        cursor.execute("UPDATE slot_index_state SET built_from = %s, built_through = %s WHERE state_id = 1",
+                       (first, max(built_through, last)))
+        connection.commit()
+        return len(rows)
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _claim_dirty(connection):
+    """Take all pending (doctor, day) marks in a short transaction"""
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction()
+        cursor.execute("SELECT doctor_id, slot_date FROM slot_index_dirty FOR UPDATE")
+        marks = cursor.fetchall()
+        if marks:
+            cursor.execute("DELETE FROM slot_index_dirty")
+        connection.commit()
+        return marks
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def refresh_doctor_days(cursor, marks):
+    """Recompute the intervals of (doctor_id, day) marks inside the caller's transaction"""
+    first, last = _horizon()
+    days = defaultdict(set)
+    for doctor_id, day in marks:
+        if day == ALL_DATES:
+            days[doctor_id] = None
+        elif days.get(doctor_id, set()) is not None and first <= day <= last:
+            days.setdefault(doctor_id, set()).add(day)
+    for doctor_id, dates in days.items():
+        span_first, span_last = (first, last) if dates is None else (min(dates), max(dates))
+        rows = [row for row in compute_intervals(cursor, span_first, span_last, [doctor_id])
+                if dates is None or row[1] in dates]
+        if dates is None:
+            cursor.execute("DELETE FROM appointment_free_intervals WHERE doctor_id = %s", (doctor_id,))
+        else:
+            placeholders = ', '.join(['%s'] * len(dates))
+            cursor.execute(f"DELETE FROM appointment_free_intervals WHERE doctor_id = %s "
+                           f"AND slot_date IN ({placeholders})", [doctor_id, *sorted(dates)])
+        _write_intervals(cursor, rows)
+    return len(days)
+
+
+def refresh_slot_index(connection):
+    """Roll the horizon and recompute dirty doctor-days; return the doctors refreshed"""
+    roll_horizon(connection)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM slot_index_dirty LIMIT 1")
+        pending = cursor.fetchone()
+        connection.commit()
+    finally:
+        cursor.close()
+    if not pending:
+        return 0
+    marks = _claim_dirty(connection)
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction(isolation_level='READ COMMITTED')
+        refreshed = refresh_doctor_days(cursor, marks)
+        connection.commit()
+        return refreshed
+    except Error:
+        connection.rollback()
+        # Put the marks back so the next search retries them
+        retry = connection.cursor()
+        retry.executemany("INSERT IGNORE INTO slot_index_dirty (doctor_id, slot_date) VALUES (%s, %s)", marks)
+        connection.commit()
+        retry.close()
+        raise
+    finally:
+        cursor.close()
+
+
+def install_slot_index():
+    """Create the interval index, its triggers and composite indexes, then build it"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        for statement in SLOT_INDEX_TABLES:
+            cursor.execute(statement)
+        for name, body in SLOT_INDEX_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+        for table, index, columns, replaces in SLOT_INDEXES:
+            if not _index_exists(cursor, table, index):
+                cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} {columns}")
+                logger.info(f"Added index {index} on {table}{columns}")
+            if _index_exists(cursor, table, replaces):
+                cursor.execute(f"ALTER TABLE {table} DROP INDEX {replaces}")
+        cursor.close()
+        invalidate_statement_caches()
+        build_slot_index(connection)
+        return True
+    except Error as e:
+        logger.error(f"Error installing slot index: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+# ---- search ------------------------------------------------------------------
+
+def _first_start(now):
+    """Earliest slot start today: now rounded up to the slot grid, in minutes"""
+    grid = SLOT_CONFIG['slot_minutes']
+    return -(-(now.hour * 60 + now.minute) // grid) * grid
+
+
+def _expand(intervals, count, duration, now):
+    """Turn (doctor, day, start, end, specialization, room) intervals into the earliest slots
+
+    Each interval contributes at most count slots, which is enough for the
+    overall earliest count.
+    """
+    grid = SLOT_CONFIG['slot_minutes']
+    today, first_start = now.date(), _first_start(now)
+    slots = []
+    for doctor_id, day, start, end, specialization, room_id in intervals:
+        start, end = minutes(start), minutes(end)
+        if day == today:
+            start = max(start, first_start)
+        last = min(end - duration, start + (count - 1) * grid)
+        while start <= last:
+            slots.append({'doctor_id': doctor_id, 'specialization': specialization, 'room_id': room_id,
+                          'slot_date': day, 'slot_time': as_time(start), 'duration_minutes': duration})
+            start += grid
+    slots.sort(key=lambda slot: (slot['slot_date'], slot['slot_time'], slot['doctor_id']))
+    return slots[:count]
+
+
+def _search_filters(specialization, doctor_id, days, duration, now):
+    today = now.date()
+    # Today's intervals must fit a slot starting on the grid, as _expand places it
+    clauses = ["slot_date BETWEEN %s AND %s", "free_minutes >= %s",
+               "(slot_date > %s OR end_time >= ADDTIME(%s, SEC_TO_TIME(%s * 60)))"]
+    params = [today, today + timedelta(days=days - 1), duration, today, as_time(_first_start(now)), duration]
+    if specialization is not None:
+        clauses.insert(0, "specialization = %s")
+        params.insert(0, specialization)
+    if doctor_id is not None:
+        clauses.insert(0, "doctor_id = %s")
+        params.insert(0, doctor_id)
+    return ' AND '.join(clauses), params
+
+
+def find_slots(specialization=None, doctor_id=None, days=7, count=10, duration=None, connection=None):
+    """Earliest free slots within the next days, by specialization and/or doctor
+
+    Returns [{doctor_id, specialization, room_id, slot_date, slot_time,
+    duration_minutes}] ordered by time, or None on error.
+    """
+    duration = duration or SLOT_CONFIG['slot_minutes']
+    now = datetime.now()
+    owned = connection is None
+    try:
+        if owned:
+            connection = get_connection()
+        refresh_slot_index(connection)
+        where, params = _search_filters(specialization, doctor_id, days, duration, now)
+        cursor = connection.cursor()
+        # The first `count` intervals by effective start hold the earliest `count` slots
+        cursor.execute(f"SELECT doctor_id, slot_date, start_time, end_time, specialization, room_id "
+                       f"FROM appointment_free_intervals WHERE {where} "
+                       f"ORDER BY slot_date, GREATEST(start_time, IF(slot_date = %s, %s, start_time)), doctor_id "
+                       f"LIMIT %s", params + [now.date(), as_time(_first_start(now)), count])
+        intervals = cursor.fetchall()
+        cursor.close()
+        connection.commit()
+        return _expand(intervals, count, duration, now)
+    except Error as e:
+        logger.error(f"Error searching appointment slots: {e}")
+        return None
+    finally:
+        if owned and connection:
+            connection.close()
+
+
+def find_slots_live(connection, specialization=None, doctor_id=None, days=7, count=10, duration=None):
+    """The same answer as find_slots(), computed from schedules and appointments without the index"""
+    duration = duration or SLOT_CONFIG['slot_minutes']
+    now = datetime.now()
+    cursor = connection.cursor()
+    try:
+        where, params = "", []
+        if specialization is not None:
+            where, params = " AND specialization = %s", [specialization]
+        if doctor_id is not None:
+            where, params = where + " AND doctor_id = %s", params + [doctor_id]
+        cursor.execute(f"SELECT doctor_id FROM doctors WHERE status = 'active'{where}", params)
+        doctor_ids = [row[0] for row in cursor.fetchall()]
+        if not doctor_ids:
+            return []
+        intervals = compute_intervals(cursor, now.date(), now.date() + timedelta(days=days - 1), doctor_ids)
+        connection.commit()
+    finally:
+        cursor.close()
+    return _expand(intervals, count, duration, now)
+
+
+# ---- benchmark ---------------------------------------------------------------
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000)
+
+
+def run_benchmark(searches, count, days, live_searches=20):
+    """Time indexed searches against live computation for random specializations"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM appointments")
+        total_appointments = cursor.fetchone()[0]
+        cursor.execute("SELECT DISTINCT specialization FROM doctors WHERE status = 'active'")
+        specializations = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        connection.commit()
+        if not specializations:
+            print("   No active doctors to search")
+            return False
+
+        start = time.perf_counter()
+        intervals = build_slot_index(connection)
+        print(f"   Appointments:     {total_appointments:,}")
+        print(f"   Index build:      {intervals:,} free intervals in {time.perf_counter() - start:.2f}s")
+
+        rng = random.Random(42)
+        indexed, live = [], []
+        for _ in range(searches):
+            specialization = rng.choice(specializations)
+            started = time.perf_counter()
+            find_slots(specialization, days=days, count=count, connection=connection)
+            indexed.append(time.perf_counter() - started)
+        for _ in range(min(live_searches, searches)):
+            specialization = rng.choice(specializations)
+            started = time.perf_counter()
+            find_slots_live(connection, specialization, days=days, count=count)
+            live.append(time.perf_counter() - started)
+
+        median, p99 = _percentiles(indexed)
+        print(f"   Indexed search:   median {median:.2f} ms, p99 {p99:.2f} ms ({len(indexed)} searches)")
+        median, p99 = _percentiles(live)
+        print(f"   Live computation: median {median:.2f} ms, p99 {p99:.2f} ms ({len(live)} searches)")
+        return True
+    except Error as e:
+        logger.error(f"Error running slot search benchmark: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def _parse_hours(value):
+    start, end = value.split('-')
+    return tuple(int(part.split(':')[0]) * 60 + int(part.split(':')[1]) for part in (start, end))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Appointment slot interval index and search")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="create the interval index, triggers and indexes")
+    action.add_argument('--rebuild', action='store_true', help="recompute the whole interval index")
+    action.add_argument('--search', metavar='SPECIALIZATION', help="print the next free slots for a specialization")
+    action.add_argument('--benchmark', type=int, metavar='N', help="time N indexed searches against live computation")
+    parser.add_argument('--count', type=int, default=10, help="slots to return (default: 10)")
+    parser.add_argument('--days', type=int, default=7, help="days ahead to search (default: 7)")
+    parser.add_argument('--duration', type=int, help=f"slot length in minutes (default: {SLOT_CONFIG['slot_minutes']})")
+    parser.add_argument('--assume-hours', type=_parse_hours, metavar='HH:MM-HH:MM',
+                        help="Mon-Fri working hours for doctors without a schedule")
+    args = parser.parse_args(argv)
+    if args.assume_hours:
+        SLOT_CONFIG['default_hours'] = args.assume_hours
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - APPOINTMENT SLOT SEARCH")
+    print("=" * 60)
+    if args.install:
+        success = install_slot_index()
+    elif args.rebuild:
+        connection = None
+        try:
+            connection = get_connection()
+            print(f"   {build_slot_index(connection):,} free intervals indexed")
+            success = True
+        except Error as e:
+            logger.error(f"Error rebuilding slot index: {e}")
+            success = False
+        finally:
+            if connection:
+                connection.close()
+    elif args.search:
+        start = time.perf_counter()
+        slots = find_slots(args.search, days=args.days, count=args.count, duration=args.duration)
+        elapsed = (time.perf_counter() - start) * 1000
+        success = slots is not None
+        for slot in slots or []:
+            print(f"   {slot['slot_date']} {slot['slot_time'][:5]}  doctor {slot['doctor_id']:<6} "
+                  f"room {slot['room_id']}")
+        print(f"   {len(slots or [])} slots in {elapsed:.1f} ms")
+    else:
+        success = run_benchmark(args.benchmark, args.count, args.days)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,318 @@
+"""
+Hospital OLTP System - Streaming SQL Script Executor
+=====================================================
+
+Executes SQL scripts and dump files of any size without loading them into
+memory.
+
+Splitting:
+- The file is read line by line and tokenized with a small state machine, so
+  ';' or '--' inside quoted strings, backtick identifiers and comments never
+  split a statement.
+- '-- ', '#' and '/* */' comments are dropped; '/*! */' and '/*+ */' comments
+  are kept because MySQL executes them (dump headers, optimizer hints).
+- Client-side DELIMITER commands are honored, so procedures and triggers
+  written for the mysql CLI can be executed.
+
+Execution:
+- Consecutive DML statements (INSERT/REPLACE/UPDATE/DELETE) are committed in
+  transactional batches and sent in multi-statement round trips capped by
+  max_allowed_packet. If a round trip fails, the batch is rolled back and
+  replayed one statement at a time so errors are attributed and handled
+  individually.
+- Everything else (DDL, SET, USE, routines) runs on its own.
+- Progress (bytes, statements/sec) is logged periodically.
+
+Usage:
+    python sql_script_executor.py dump.sql --batch-size 2000
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PROGRESS_INTERVAL = 10.0
+
+BATCHABLE_STATEMENT = re.compile(r'(INSERT|REPLACE|UPDATE|DELETE)\b', re.IGNORECASE)
+DELIMITER_COMMAND = re.compile(r'\s*DELIMITER\s+(\S+)', re.IGNORECASE)
+
+_QUOTE_ENDS = {
+    "'": re.compile(r"(?:[^'\\]|\\.)*'", re.DOTALL),
+    '"': re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL),
+    '`': re.compile(r'[^`]*`'),
+}
+
+
+class SqlStatementSplitter:
+    """Incrementally split SQL text into statements, one line at a time"""
+
+    def __init__(self, delimiter=';'):
+        self.delimiter = delimiter
+        self._pieces = []
+        self._state = None          # None, a quote character, 'comment' or 'hint'
+        self._set_token_pattern()
+
+    def _set_token_pattern(self):
+        self._token = re.compile(r"""['"`#]|--(?=\s|$)|/\*|""" + re.escape(self.delimiter))
+
+    def _at_statement_start(self):
+        return self._state is None and not ''.join(self._pieces).strip()
+
+    def feed(self, line):
+        """Consume one line (including its newline); return the statements it completed"""
+        if self._at_statement_start():
+            command = DELIMITER_COMMAND.match(line)
+            if command:
+                self._pieces = []
+                self.delimiter = command.group(1)
+                self._set_token_pattern()
+                return []
+
+        statements = []
+        position = 0
+        length = len(line)
+        while position < length:
+            if self._state in _QUOTE_ENDS:
+                end = _QUOTE_ENDS[self._state].match(line, position)
+                if not end:
+                    self._pieces.append(line[position:])
+                    break
+                self._pieces.append(line[position:end.end()])
+                position = end.end()
+                self._state = None
+            elif self._state in ('comment', 'hint'):
+                end = line.find('*/', position)
+                if end < 0:
+                    if self._state == 'hint':
+                        self._pieces.append(line[position:])
+                    break
+                if self._state == 'hint':
+                    self._pieces.append(line[position:end + 2])
+                else:
+                    self._pieces.append(' ')
+                position = end + 2
+                self._state = None
+            else:
+                token = self._token.search(line, position)
+                if not token:
+                    self._pieces.append(line[position:])
+                    break
+                self._pieces.append(line[position:token.start()])
+                text = token.group()
+                position = token.end()
+                if text in _QUOTE_ENDS:
+                    self._pieces.append(text)
+                    self._state = text
+                elif text in ('#', '--'):
+                    self._pieces.append('\n')
+                    break
+                elif text == '/*':
+                    if line.startswith(('!', '+'), position):
+                        self._pieces.append(text)
+                        self._state = 'hint'
+                    else:
+                        self._state = 'comment'
+                else:
+                    statement = ''.join(self._pieces).strip()
+                    self._pieces = []
+                    if statement:
+                        statements.append(statement)
+        return statements
+
+    def finish(self):
+        """Return the trailing statement that had no delimiter, if any"""
+        statement = ''.join(self._pieces).strip()
+        self._pieces = []
+        return [statement] if statement and self._state != 'comment' else []
+
+
+def iter_sql_statements(filename, delimiter=';'):
+    """Stream (statement, bytes_read) pairs from a SQL file"""
+    splitter = SqlStatementSplitter(delimiter)
+    bytes_read = 0
+    with open(filename, 'rb') as file:
+        for raw_line in file:
+            bytes_read += len(raw_line)
+            for statement in splitter.feed(raw_line.decode('utf-8')):
+                yield statement, bytes_read
+    for statement in splitter.finish():
+        yield statement, bytes_read
+
+
+def _consume(cursor):
+    """Read any result set so the connection is ready for the next statement"""
+    if cursor.with_rows:
+        cursor.fetchall()
+
+
+class SqlScriptExecutor:
+    """Execute streamed statements in transactional, multi-statement batches"""
+
+    def __init__(self, connection, batch_size=DEFAULT_BATCH_SIZE, multi_statement=True,
+                 ignore_errors=(), error_level=logging.ERROR, progress_interval=DEFAULT_PROGRESS_INTERVAL):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.batch_size = batch_size
+        self.multi_statement = multi_statement
+        self.ignore_errors = set(ignore_errors)
+        self.error_level = error_level
+        self.progress_interval = progress_interval
+        self._pending = []
+        self._pending_bytes = 0
+        self.stats = {'statements': 0, 'batched_statements': 0, 'round_trips': 0, 'batch_replays': 0,
+                      'warnings': 0, 'errors': 0, 'bytes': 0, 'elapsed': 0.0}
+        # Leave headroom below max_allowed_packet for the protocol framing
+        self.cursor.execute("SELECT @@max_allowed_packet")
+        self.max_round_trip_bytes = max(self.cursor.fetchone()[0] - 1024, 1024)
+
+    def _handle_error(self, statement, error):
+        if error.errno in self.ignore_errors:
+            self.stats['warnings'] += 1
+            logger.debug(f"Ignored error {error.errno}: {error.msg}")
+        else:
+            self.stats['errors'] += 1
+            logger.log(self.error_level, f"Error executing statement: {error}")
+            logger.debug(f"Statement: {statement[:200]}...")
+
+    def _execute_one(self, statement):
+        self.stats['round_trips'] += 1
+        try:
+            self.cursor.execute(statement)
+            _consume(self.cursor)
+        except Error as e:
+            self._handle_error(statement, e)
+        self.stats['statements'] += 1
+
+    def _round_trips(self, statements):
+        """Group statements into multi-statement packets below max_allowed_packet"""
+        group, size = [], 0
+        for statement in statements:
+            encoded = len(statement.encode('utf-8')) + 2
+            if group and size + encoded > self.max_round_trip_bytes:
+                yield group
+                group, size = [], 0
+            group.append(statement)
+            size += encoded
+        if group:
+            yield group
+
+    def flush(self):
+        """Execute and commit the pending DML batch"""
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_bytes = self._pending, [], 0
+        if self.multi_statement and len(batch) > 1:
+            try:
+                for group in self._round_trips(batch):
+                    for result in self.cursor.execute(';\n'.join(group), multi=True):
+                        _consume(result)
+                    self.stats['round_trips'] += 1
+                self.connection.commit()
+                self.stats['statements'] += len(batch)
+                self.stats['batched_statements'] += len(batch)
+                return
+            except Error as e:
+                # The failing statement aborted its packet; redo the batch statement by statement
+                logger.debug(f"Multi-statement batch failed ({e}), replaying {len(batch)} statements")
+                self.connection.rollback()
+                self.stats['batch_replays'] += 1
+        for statement in batch:
+            self._execute_one(statement)
+        self.connection.commit()
+
+    def execute(self, statement):
+        """Queue a DML statement for batching or run anything else immediately"""
+        if BATCHABLE_STATEMENT.match(statement):
+            self._pending.append(statement)
+            self._pending_bytes += len(statement)
+            if len(self._pending) >= self.batch_size or self._pending_bytes >= self.max_round_trip_bytes:
+                self.flush()
+        else:
+            self.flush()
+            self._execute_one(statement)
+            self.connection.commit()
+
+    def execute_file(self, filename, label=None):
+        """Stream and execute a SQL file; return the execution stats"""
+        label = label or os.path.basename(filename)
+        total_bytes = os.path.getsize(filename)
+        started = time.perf_counter()
+        last_report = started
+        for statement, bytes_read in iter_sql_statements(filename):
+            self.execute(statement)
+            self.stats['bytes'] = bytes_read
+            now = time.perf_counter()
+            if now - last_report >= self.progress_interval:
+                last_report = now
+                self._report_progress(label, total_bytes, now - started)
+        self.flush()
+        self.stats['elapsed'] = time.perf_counter() - started
+        return self.stats
+
+    def _report_progress(self, label, total_bytes, elapsed):
+        percent = 100.0 * self.stats['bytes'] / total_bytes if total_bytes else 100.0
+        logger.info(f"{label}: {percent:5.1f}% ({self.stats['bytes'] / 1048576:,.1f} MB), "
+                    f"{self.stats['statements'] + len(self._pending):,} statements, "
+                    f"{self.stats['statements'] / elapsed:,.0f} statements/sec")
+
+    def close(self):
+        self.cursor.close()
+
+
+def execute_sql_script(connection, filename, **options):
+    """Execute a SQL file on a connection; return the execution stats"""
+    executor = SqlScriptExecutor(connection, **options)
+    try:
+        stats = executor.execute_file(filename)
+    finally:
+        executor.close()
+    rate = stats['statements'] / stats['elapsed'] if stats['elapsed'] > 0 else 0
+    logger.info(f"Executed {stats['statements']} statements from {filename} in {stats['elapsed']:.2f}s "
+                f"({rate:,.0f} statements/sec, {stats['round_trips']} round trips, "
+                f"{stats['warnings']} warnings, {stats['errors']} errors)")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a SQL script or dump into the hospital database")
+    parser.add_argument('filename', help="SQL file to execute")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"DML statements per transaction (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--no-multi-statement', action='store_true',
+                        help="send every statement in its own round trip")
+    parser.add_argument('--server', action='store_true',
+                        help="connect without selecting the hospital database (script issues USE)")
+    args = parser.parse_args(argv)
+
+    connection = None
+    try:
+        connection = get_connection(use_database=not args.server)
+        # The script may change the session (USE, SET); reset it before the pool reuses it
+        connection.reset_session = True
+        stats = execute_sql_script(connection, args.filename, batch_size=args.batch_size,
+                                   multi_statement=not args.no_multi_statement)
+        return stats['errors'] == 0
+    except FileNotFoundError:
+        logger.error(f"SQL file '{args.filename}' not found")
+        return False
+    except Error as e:
+        logger.error(f"Error executing SQL file: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
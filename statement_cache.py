@@ -0,0 +1,194 @@
+"""
+Prepared Statement Cache for Hospital OLTP System
+Per-connection LRU of server-side prepared statements keyed by SQL text
+
+Each physical connection gets its own cache (prepared statements are
+connection-scoped on the server). A cached statement is executed again by
+handing the connector the exact same SQL string object, which makes it skip
+COM_STMT_PREPARE. It is not free: the connector sends COM_STMT_RESET before
+every COM_STMT_EXECUTE, so a cached execute costs two round trips where a
+text-protocol query costs one. The gain is the server-side parse and plan
+work, which pays off for statements heavier than a primary-key lookup.
+
+Schema changes invalidate the cache:
+- DDL run through DatabaseConnection calls invalidate_statement_caches()
+- DDL run elsewhere is detected by a fingerprint of the tables of the
+  connection's current database (name and CREATE_TIME), checked at most
+  every schema_check_interval seconds per connection
+- a statement failing with a schema error (e.g. 1615 after an instant ALTER
+  that leaves CREATE_TIME untouched) is evicted and re-prepared once
+"""
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from mysql.connector import Error
+
+STATEMENT_CACHE_CONFIG = {
+    'enabled': True,                # Use prepared statements for parameterized DML/SELECTs
+    'size': 64,                     # Prepared statements kept per connection
+    'schema_check_interval': 5.0    # Seconds between schema fingerprint checks per connection
+}
+
+PREPARABLE_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+SCHEMA_CHANGING_STATEMENTS = ('CREATE', 'ALTER', 'DROP', 'RENAME', 'TRUNCATE')
+
+# Unknown column, unknown table, statement needs re-prepare, wrong column count
+SCHEMA_ERRORS = {1054, 1146, 1615, 1136}
+
+# Tables of the current database only; UPDATE_TIME is left out as it moves on every write
+SCHEMA_FINGERPRINT_QUERY = (
+    "SELECT COUNT(*), COALESCE(SUM(CRC32(CONCAT_WS(':', TABLE_NAME, CREATE_TIME))), 0) "
+    "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()")
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+_schema_state = {'generation': 0}
+_schema_lock = threading.Lock()
+
+
+def is_preparable(query):
+    """Only plain DML and SELECTs go through prepared statements"""
+    return query.lstrip()[:7].upper().startswith(PREPARABLE_STATEMENTS)
+
+
+def is_schema_change(query):
+    return query.lstrip()[:8].upper().startswith(SCHEMA_CHANGING_STATEMENTS)
+
+
+def invalidate_statement_caches():
+    """Mark every cached statement in the process stale (after DDL)"""
+    with _schema_lock:
+        _schema_state['generation'] += 1
+
+
+def _schema_generation():
+    with _schema_lock:
+        return _schema_state['generation']
+
+
+def _schema_fingerprint(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(SCHEMA_FINGERPRINT_QUERY)
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+class StatementCache:
+    """LRU of prepared cursors for one physical connection"""
+
+    def __init__(self, connection, size):
+        self._connection = connection
+        self._entries = OrderedDict()   # sql -> (sql, prepared cursor)
+        self.size = size
+        self.schema_version = None
+        self.fingerprint = None
+        self.checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _entry(self, query):
+        entry = self._entries.get(query)
+        if entry:
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = (query, self._connection.cursor(prepared=True))
+        self._entries[query] = entry
+        while len(self._entries) > self.size:
+            _, (_, cursor) = self._entries.popitem(last=False)
+            cursor.close()
+            self.evictions += 1
+        return entry
+
+    def _evict(self, query):
+        entry = self._entries.pop(query, None)
+        if entry:
+            entry[1].close()
+
+    def invalidate(self):
+        """Deallocate every prepared statement of this connection"""
+        for _, cursor in self._entries.values():
+            try:
+                cursor.close()
+            except Error:
+                pass
+        self._entries.clear()
+        self.invalidations += 1
+
+    def _schema_version(self):
+        """(generation, fingerprint) of the schema, the fingerprint refreshed at most every check interval"""
+        now = time.monotonic()
+        if now - self.checked_at >= STATEMENT_CACHE_CONFIG['schema_check_interval']:
+            self.fingerprint = _schema_fingerprint(self._connection)
+            self.checked_at = now
+        return _schema_generation(), self.fingerprint
+
+    def execute(self, query, params):
+        """Execute through a cached prepared statement; return the cursor holding the result"""
+        version = self._schema_version()
+        if version != self.schema_version:
+            if self.schema_version is not None:
+                self.invalidate()
+            self.schema_version = version
+        sql, cursor = self._entry(query)
+        try:
+            cursor.execute(sql, params)
+        except Error as e:
+            if e.errno not in SCHEMA_ERRORS:
+                raise
+            # The statement was prepared against an older schema: prepare it again once
+            self._evict(query)
+            sql, cursor = self._entry(query)
+            cursor.execute(sql, params)
+        return cursor
+
+    def close(self):
+        for _, cursor in self._entries.values():
+            try:
+                cursor.close()
+            except Error:
+                pass
+        self._entries.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'statements': len(self._entries)}
+
+
+def statement_cache_for(connection):
+    """Return the cache of a physical connection, creating it on first use"""
+    with _caches_lock:
+        cache = _caches.get(connection)
+        if cache is None:
+            cache = _caches[connection] = StatementCache(connection, STATEMENT_CACHE_CONFIG['size'])
+        return cache
+
+
+def discard_statement_cache(connection):
+    """Drop the cache of a connection that is being closed"""
+    with _caches_lock:
+        cache = _caches.pop(connection, None)
+    if cache:
+        cache.close()
+
+
+def get_statement_cache_stats():
+    """Hit/miss counters summed over every live connection cache"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    totals = {'connections': len(caches), 'hits': 0, 'misses': 0, 'evictions': 0,
+              'invalidations': 0, 'statements': 0}
+    for cache in caches:
+        for key, value in cache.stats().items():
+            totals[key] += value
+    lookups = totals['hits'] + totals['misses']
+    totals['hit_rate'] = totals['hits'] / lookups if lookups else 0.0
+    return totals
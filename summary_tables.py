@@ -0,0 +1,386 @@
+"""
+Hospital OLTP System - Materialized Summary Tables
+===================================================
+
+Keeps table copies of the heavy reporting views (vw_doctor_performance,
+vw_department_statistics) so dashboards read a small keyed table instead of
+re-running a fan-out join with COUNT(DISTINCT ...) on every request.
+
+- The summary table (mv_<view>) has exactly the view's columns; its column
+  types and the SELECT that fills it are taken from database_views.sql.
+- AFTER INSERT/UPDATE/DELETE triggers on every source table record the
+  affected summary keys (doctor_id / department_id) in summary_dirty_keys.
+- A refresh claims the dirty keys, deletes their summary rows and re-inserts
+  them from the view's SELECT restricted to those keys, in one transaction.
+- Summaries over a rolling window (CURDATE()) are rebuilt in full once the
+  date changes.
+- read_summary() serves rows that are at most max_staleness seconds old,
+  refreshing first when the last refresh is older than that.
+
+MySQL does not fire triggers for rows changed by ON DELETE/UPDATE CASCADE, so
+schedule an occasional --refresh --full if cascades touch the source tables.
+
+Usage:
+    python summary_tables.py --install
+    python summary_tables.py --refresh
+    python summary_tables.py --verify
+
+Exit Codes:
+    0: Operation completed successfully
+    1: Operation failed
+"""
+
+import argparse
+import logging
+import re
+import sys
+import time
+
+from mysql.connector import Error
+from database_connection import DatabaseConnection, get_connection, logger
+from sql_script_executor import iter_sql_statements
+from statement_cache import invalidate_statement_caches
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+SUMMARY_CONFIG = {
+    'views_file': 'database_views.sql',
+    'max_staleness': 60.0,          # Seconds read_summary() may serve old rows for
+    'refresh_chunk_size': 500       # Dirty keys recomputed per statement
+}
+
+# view -> summary table, key column, the key expression inside the view's SELECT,
+# and for each source table a query selecting the affected keys of a changed row
+SUMMARY_TABLES = {
+    'vw_doctor_performance': {
+        'table': 'mv_doctor_performance',
+        'key': 'doctor_id',
+        'key_expr': 'd.doctor_id',
+        'rolling_window': True,
+        'sources': {
+            'doctors': "SELECT {row}.doctor_id AS key_id",
+            'departments': "SELECT doctor_id AS key_id FROM doctors WHERE department_id = {row}.department_id",
+            'appointments': "SELECT {row}.doctor_id AS key_id",
+            'encounters': "SELECT {row}.doctor_id AS key_id",
+            'prescriptions': "SELECT {row}.doctor_id AS key_id"
+        }
+    },
+    'vw_department_statistics': {
+        'table': 'mv_department_statistics',
+        'key': 'department_id',
+        'key_expr': 'dept.department_id',
+        'rolling_window': False,
+        'sources': {
+            'departments': "SELECT {row}.department_id AS key_id",
+            'doctors': "SELECT {row}.department_id AS key_id",
+            'nurses': "SELECT {row}.department_id AS key_id",
+            'staff': "SELECT {row}.department_id AS key_id",
+            'rooms': "SELECT {row}.department_id AS key_id",
+            'beds': "SELECT department_id AS key_id FROM rooms WHERE room_id = {row}.room_id",
+            'department_equipment': "SELECT {row}.department_id AS key_id"
+        }
+    }
+}
+
+SUMMARY_SUPPORT_TABLES = [
+    """CREATE TABLE IF NOT EXISTS summary_dirty_keys (
+        summary_name VARCHAR(64) NOT NULL,
+        key_id INT NOT NULL,
+        marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (summary_name, key_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS summary_refresh_state (
+        summary_name VARCHAR(64) PRIMARY KEY,
+        refreshed_at DATETIME(6) NOT NULL,
+        full_refresh_date DATE NOT NULL,
+        rows_refreshed INT NOT NULL DEFAULT 0
+    )"""
+]
+
+TRIGGER_EVENTS = {'INSERT': ('ai', ('NEW',)), 'UPDATE': ('au', ('NEW', 'OLD')), 'DELETE': ('ad', ('OLD',))}
+
+_VIEW_PATTERN = re.compile(r'^\s*CREATE\s+(?:OR\s+REPLACE\s+)?VIEW\s+(\w+)\s+AS\s+(.*)$',
+                           re.IGNORECASE | re.DOTALL)
+
+
+def load_view_definitions(views_file=None):
+    """{view name: SELECT} for every view in database_views.sql"""
+    views = {}
+    for statement, _ in iter_sql_statements(views_file or SUMMARY_CONFIG['views_file']):
+        match = _VIEW_PATTERN.match(statement)
+        if match:
+            views[match.group(1)] = match.group(2).strip()
+    return views
+
+
+def restrict_to_keys(select, key_expr, key_count):
+    """Add 'key_expr IN (%s, ...)' to a grouped SELECT's WHERE clause"""
+    group_by = list(re.finditer(r'\bGROUP\s+BY\b', select, re.IGNORECASE))
+    if not group_by:
+        raise ValueError("Summary views must end in a GROUP BY clause")
+    head, tail = select[:group_by[-1].start()], select[group_by[-1].start():]
+    keyword = 'AND' if re.search(r'\bWHERE\b', head, re.IGNORECASE) else 'WHERE'
+    placeholders = ', '.join(['%s'] * key_count)
+    return f"{head.rstrip()}\n  {keyword} {key_expr} IN ({placeholders})\n{tail}"
+
+
+class SummaryTable:
+    """One materialized view: its definition, triggers and refresh logic"""
+
+    def __init__(self, view, select, table, key, key_expr, sources, rolling_window=False):
+        self.view = view
+        self.select = select
+        self.table = table
+        self.key = key
+        self.key_expr = key_expr
+        self.sources = sources
+        self.rolling_window = rolling_window
+
+    def trigger_statements(self):
+        """(drop, create) pairs for the dirty-key triggers on every source table"""
+        statements = []
+        for source, key_query in self.sources.items():
+            for event, (suffix, rows) in TRIGGER_EVENTS.items():
+                name = f"trg_{self.table}_{source}_{suffix}"
+                changed = ' UNION '.join(key_query.format(row=row) for row in rows)
+                statements.append((
+                    f"DROP TRIGGER IF EXISTS {name}",
+                    f"CREATE TRIGGER {name} AFTER {event} ON {source} FOR EACH ROW "
+                    f"INSERT IGNORE INTO summary_dirty_keys (summary_name, key_id) "
+                    f"SELECT '{self.table}', key_id FROM ({changed}) AS changed WHERE key_id IS NOT NULL"))
+        return statements
+
+    def install(self, cursor, rebuild=False):
+        """Create the summary table (typed like the view) and its triggers"""
+        if rebuild:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+        cursor.execute("SELECT COUNT(*) FROM information_schema.TABLES "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (self.table,))
+        if not cursor.fetchone()[0]:
+            cursor.execute(f"CREATE TABLE {self.table} AS {self.select} LIMIT 0")
+            cursor.execute(f"ALTER TABLE {self.table} ADD PRIMARY KEY ({self.key})")
+        for drop, create in self.trigger_statements():
+            cursor.execute(drop)
+            cursor.execute(create)
+
+    def _claim_dirty_keys(self, connection):
+        """Take the pending keys off summary_dirty_keys in a short transaction"""
+        cursor = connection.cursor()
+        try:
+            connection.start_transaction()
+            cursor.execute("SELECT key_id FROM summary_dirty_keys WHERE summary_name = %s FOR UPDATE",
+                           (self.table,))
+            keys = [row[0] for row in cursor.fetchall()]
+            if keys:
+                cursor.execute("DELETE FROM summary_dirty_keys WHERE summary_name = %s", (self.table,))
+            connection.commit()
+            return keys
+        except Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _remark_keys(self, connection, keys):
+        """Put claimed keys back after a failed refresh so the next one retries them"""
+        cursor = connection.cursor()
+        try:
+            cursor.executemany("INSERT IGNORE INTO summary_dirty_keys (summary_name, key_id) VALUES (%s, %s)",
+                               [(self.table, key) for key in keys])
+            connection.commit()
+        except Error as e:
+            logger.error(f"Could not re-mark {len(keys)} keys of {self.table}: {e}")
+        finally:
+            cursor.close()
+
+    def refresh(self, connection, full=False):
+        """Bring the summary up to date; return the number of keys recomputed (or None on error)"""
+        keys = self._claim_dirty_keys(connection)
+        cursor = connection.cursor()
+        try:
+            # READ COMMITTED: INSERT ... SELECT must not lock the OLTP source rows
+            connection.start_transaction(isolation_level='READ COMMITTED')
+            cursor.execute("SELECT full_refresh_date < CURDATE() FROM summary_refresh_state "
+                           "WHERE summary_name = %s FOR UPDATE", (self.table,))
+            state = cursor.fetchone()
+            full = full or state is None or (self.rolling_window and bool(state[0]))
+            if full:
+                cursor.execute(f"DELETE FROM {self.table}")
+                cursor.execute(f"INSERT INTO {self.table} {self.select}")
+                refreshed = cursor.rowcount
+            else:
+                refreshed = 0
+                chunk_size = SUMMARY_CONFIG['refresh_chunk_size']
+                for start in range(0, len(keys), chunk_size):
+                    chunk = keys[start:start + chunk_size]
+                    placeholders = ', '.join(['%s'] * len(chunk))
+                    cursor.execute(f"DELETE FROM {self.table} WHERE {self.key} IN ({placeholders})", chunk)
+                    cursor.execute(f"INSERT INTO {self.table} "
+                                   f"{restrict_to_keys(self.select, self.key_expr, len(chunk))}", chunk)
+                    refreshed += len(chunk)
+            cursor.execute("INSERT INTO summary_refresh_state (summary_name, refreshed_at, full_refresh_date, "
+                           "rows_refreshed) VALUES (%s, NOW(6), CURDATE(), %s) AS new "
+                           "ON DUPLICATE KEY UPDATE refreshed_at = new.refreshed_at, "
+                           "full_refresh_date = IF(%s, new.full_refresh_date, summary_refresh_state.full_refresh_date), "
+                           "rows_refreshed = new.rows_refreshed",
+                           (self.table, refreshed, full))
+            connection.commit()
+            logger.info(f"Refreshed {self.table}: {'full rebuild' if full else f'{refreshed} keys'}")
+            return refreshed
+        except Error as e:
+            logger.error(f"Error refreshing {self.table}: {e}")
+            connection.rollback()
+            if keys:
+                self._remark_keys(connection, keys)
+            return None
+        finally:
+            cursor.close()
+
+    def age(self, cursor):
+        """Seconds since the last refresh, or None if it must be refreshed now"""
+        cursor.execute("SELECT TIMESTAMPDIFF(MICROSECOND, refreshed_at, NOW(6)) / 1000000, "
+                       "full_refresh_date < CURDATE() FROM summary_refresh_state WHERE summary_name = %s",
+                       (self.table,))
+        state = cursor.fetchone()
+        if state is None or (self.rolling_window and state[1]):
+            return None
+        return float(state[0])
+
+
+def get_summary_tables(views_file=None):
+    """SummaryTable objects for every configured view found in the views file"""
+    views = load_view_definitions(views_file)
+    summaries = {}
+    for view, spec in SUMMARY_TABLES.items():
+        if view not in views:
+            logger.warning(f"View {view} not found in {views_file or SUMMARY_CONFIG['views_file']}")
+            continue
+        summaries[view] = SummaryTable(view, views[view], **spec)
+    return summaries
+
+
+def install_summary_tables(rebuild=False, views_file=None):
+    """Create the summary tables, dirty-key tracking and triggers, then fill the tables"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        for statement in SUMMARY_SUPPORT_TABLES:
+            cursor.execute(statement)
+        summaries = get_summary_tables(views_file)
+        for summary in summaries.values():
+            summary.install(cursor, rebuild)
+            logger.info(f"Installed {summary.table} with {len(summary.sources) * len(TRIGGER_EVENTS)} triggers")
+        cursor.close()
+        invalidate_statement_caches()
+        return all(summary.refresh(connection, full=True) is not None for summary in summaries.values())
+    except Error as e:
+        logger.error(f"Error installing summary tables: {e}")
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+def refresh_summaries(full=False, views_file=None):
+    """Refresh every summary table; return {view: keys recomputed or None on error}"""
+    connection = None
+    try:
+        connection = get_connection()
+        return {view: summary.refresh(connection, full)
+                for view, summary in get_summary_tables(views_file).items()}
+    except Error as e:
+        logger.error(f"Error refreshing summary tables: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+_summaries = {}
+
+
+def read_summary(view, max_staleness=None, where=None, params=None, row_factory=None):
+    """Rows of a view's summary table, at most max_staleness seconds old
+
+    where/params filter the summary like a WHERE clause on the view would.
+    """
+    if view not in _summaries:
+        _summaries.update(get_summary_tables())
+    summary = _summaries[view]
+    max_staleness = SUMMARY_CONFIG['max_staleness'] if max_staleness is None else max_staleness
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        age = summary.age(cursor)
+        cursor.close()
+        connection.commit()
+        if age is None or age > max_staleness:
+            if summary.refresh(connection) is None:
+                return None
+    except Error as e:
+        logger.error(f"Error checking freshness of {summary.table}: {e}")
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+    query = f"SELECT * FROM {summary.table}" + (f" WHERE {where}" if where else "")
+    with DatabaseConnection() as db:
+        return db.execute_select(query, params, row_factory)
+
+
+def verify_summaries(views_file=None):
+    """Refresh each summary and compare it with the live view; print both read times"""
+    success = True
+    summaries = get_summary_tables(views_file)
+    with DatabaseConnection(row_factory='tuple') as db:
+        for view, summary in summaries.items():
+            start = time.perf_counter()
+            expected = db.execute_select(f"SELECT * FROM ({summary.select}) AS v ORDER BY {summary.key}")
+            view_time = time.perf_counter() - start
+            start = time.perf_counter()
+            actual = read_summary(view, max_staleness=0, row_factory='tuple')
+            summary_time = time.perf_counter() - start
+            if expected is None or actual is None:
+                return False
+            matches = len(expected) == len(actual) and set(expected) == set(actual)
+            success = success and matches
+            print(f"   [{'OK' if matches else 'MISMATCH'}] {view:<28} {len(expected):>6} rows   "
+                  f"view {view_time * 1000:8.1f} ms   summary {summary_time * 1000:8.1f} ms")
+    return success
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain materialized summaries of the reporting views")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--install', action='store_true', help="create summary tables and triggers, then fill them")
+    action.add_argument('--refresh', action='store_true', help="recompute the keys changed since the last refresh")
+    action.add_argument('--verify', action='store_true', help="compare each summary with its view and time both")
+    parser.add_argument('--full', action='store_true', help="with --refresh: rebuild the tables completely")
+    parser.add_argument('--rebuild', action='store_true', help="with --install: drop existing summary tables first")
+    parser.add_argument('--views-file', default=SUMMARY_CONFIG['views_file'],
+                        help=f"file with the view definitions (default: {SUMMARY_CONFIG['views_file']})")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 60)
+    print("HOSPITAL OLTP SYSTEM - SUMMARY TABLES")
+    print("=" * 60)
+    if args.install:
+        success = install_summary_tables(args.rebuild, args.views_file)
+    elif args.refresh:
+        results = refresh_summaries(args.full, args.views_file)
+        success = results is not None and all(result is not None for result in results.values())
+        for view, result in (results or {}).items():
+            print(f"   {view:<28} {'error' if result is None else f'{result} rows/keys refreshed'}")
+    else:
+        success = verify_summaries(args.views_file)
+    print(f"\n{'✓' if success else '✗'} {'Done' if success else 'Failed'}")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
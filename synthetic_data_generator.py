@@ -0,0 +1,877 @@
+"""
+Hospital OLTP System - Scalable Synthetic Data Generator
+=========================================================
+
+Generates FK-consistent rows at production scale for the patient-centric
+domains loaded by load_all_fake_data.py (patient, transactional, laboratory,
+radiology, pharmacy, insurance, billing and admin data).
+
+Reference, organizational and staff data (ICD/CPT codes, departments, rooms,
+beds, doctors, nurses, medications, insurance plans, roles) are read from the
+database, so run init_database_Setup.py and/or load_all_fake_data.py first.
+
+Design:
+- Rows are produced by generators, one chunk of patients at a time, so memory
+  stays bounded regardless of the requested volume.
+- Every chunk of every table is seeded from (seed, table, chunk), so output is
+  deterministic and any chunk can be regenerated independently.
+- Primary keys of referenced tables are assigned explicitly from the current
+  MAX(id), so child rows compute their parent IDs arithmetically instead of
+  querying them back. Gaps in the ID sequences are expected.
+
+Usage:
+    python synthetic_data_generator.py --patients 5_000_000 --encounters-per-patient 8
+    python synthetic_data_generator.py --patients 10000 --seed 7 --batch-size 2000
+
+Exit Codes:
+    0: All data generated and loaded successfully
+    1: Loading failed
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from mysql.connector import Error
+from database_connection import get_connection, logger
+
+# Suppress other loggers
+logging.getLogger('mysql.connector').setLevel(logging.CRITICAL)
+
+
+# Default volumes (per-patient counts are fixed so child IDs can be derived)
+SCALE_DEFAULTS = {
+    'patients': 1000,
+    'encounters_per_patient': 4,
+    'appointments_per_patient': 4,
+    'lab_orders_per_patient': 2,
+    'tests_per_lab_order': 3,
+    'radiology_orders_per_patient': 1,
+    'prescriptions_per_patient': 2,
+    'claims_per_patient': 1,
+    'items_per_claim': 2,
+    'items_per_invoice': 2,
+    'audit_logs_per_patient': 2,
+    'inventory_lots_per_medication': 3,
+    'pharmacy_orders_per_medication': 2,
+    'users': 500,
+    'chunk_size': 10000
+}
+
+# Options other tables divide by (lab orders, prescriptions, claims, ... link to an encounter)
+POSITIVE_SCALE_OPTIONS = ('encounters_per_patient', 'chunk_size')
+
+DEFAULT_SEED = 42
+DEFAULT_ANCHOR_DATE = date(2024, 3, 15)
+
+# Columns inserted for each generated table, in insert order
+TABLE_COLUMNS = {
+    'patients': ('patient_id', 'mrn', 'first_name', 'last_name', 'date_of_birth', 'gender', 'ssn', 'phone', 'email', 'blood_group', 'marital_status', 'registration_date', 'status'),
+    'patient_addresses': ('patient_id', 'address_type', 'street_address1', 'city', 'state', 'postal_code', 'is_primary'),
+    'patient_emergency_contacts': ('patient_id', 'contact_name', 'relationship', 'phone', 'is_primary', 'priority_order'),
+    'patient_allergies': ('patient_id', 'allergen_name', 'allergen_type', 'reaction', 'severity', 'onset_date', 'notes', 'status'),
+    'appointments': ('appointment_id', 'appointment_number', 'patient_id', 'doctor_id', 'appointment_type_id', 'appointment_date', 'appointment_time', 'duration_minutes', 'room_id', 'reason', 'status', 'priority'),
+    'appointment_cancellations': ('appointment_id', 'cancelled_by', 'cancellation_date', 'reason', 'reschedule_requested', 'new_appointment_id', 'notes'),
+    'encounters': ('encounter_id', 'encounter_number', 'patient_id', 'doctor_id', 'appointment_id', 'encounter_date', 'encounter_type', 'department_id', 'room_id', 'bed_id', 'chief_complaint', 'admission_date', 'discharge_date', 'length_of_stay', 'status', 'discharge_disposition'),
+    'encounter_vitals': ('encounter_id', 'recorded_datetime', 'recorded_by', 'temperature', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'respiratory_rate', 'oxygen_saturation', 'weight', 'height', 'bmi', 'pain_score', 'notes'),
+    'encounter_diagnoses': ('encounter_id', 'icd_code_id', 'diagnosis_description', 'diagnosis_type', 'severity', 'onset_date', 'resolution_date', 'is_chronic', 'notes'),
+    'encounter_procedures': ('encounter_id', 'cpt_code_id', 'procedure_name', 'procedure_description', 'performed_by', 'assisted_by', 'procedure_datetime', 'duration_minutes', 'room_id', 'anesthesia_type', 'outcome', 'complications', 'status'),
+    'clinical_notes': ('encounter_id', 'note_type', 'author_id', 'author_type', 'note_datetime', 'subject', 'note_text', 'is_signed', 'signed_datetime', 'is_amended', 'amendment_note'),
+    'bed_assignments': ('patient_id', 'bed_id', 'encounter_id', 'assignment_datetime', 'discharge_datetime', 'reason', 'assigned_by', 'status'),
+    'nurse_assignments': ('nurse_id', 'patient_id', 'bed_id', 'assigned_date', 'end_date', 'shift', 'notes'),
+    'patient_insurance_policies': ('policy_id', 'patient_id', 'insurance_plan_id', 'policy_number', 'group_number', 'subscriber_name', 'subscriber_relationship', 'policy_start_date', 'is_primary', 'status'),
+    'lab_orders': ('order_id', 'order_number', 'encounter_id', 'patient_id', 'ordering_doctor_id', 'order_datetime', 'priority', 'status', 'collection_datetime', 'notes'),
+    'lab_tests': ('test_id', 'order_id', 'test_code', 'test_name', 'test_category', 'specimen_type', 'status'),
+    'lab_results': ('test_id', 'result_value', 'result_unit', 'reference_range', 'abnormal_flag', 'result_datetime', 'performed_by', 'verified_by', 'verification_datetime', 'notes'),
+    'radiology_orders': ('order_id', 'order_number', 'encounter_id', 'patient_id', 'ordering_doctor_id', 'exam_type', 'body_part', 'modality', 'order_datetime', 'scheduled_datetime', 'priority', 'clinical_indication', 'contrast_used', 'status', 'notes'),
+    'radiology_results': ('order_id', 'exam_datetime', 'radiologist_id', 'findings', 'impression', 'report_text', 'critical_findings', 'report_datetime', 'image_location', 'status'),
+    'prescriptions': ('prescription_id', 'prescription_number', 'encounter_id', 'patient_id', 'doctor_id', 'medication_id', 'dosage', 'dosage_unit', 'route', 'frequency', 'duration', 'quantity_prescribed', 'quantity_dispensed', 'refills_allowed', 'refills_remaining', 'prescription_date', 'start_date', 'end_date', 'instructions', 'indication', 'status', 'is_refill'),
+    'prescription_refills': ('prescription_id', 'refill_number', 'refill_date', 'quantity_dispensed', 'dispensed_by', 'pharmacy_name', 'pharmacy_phone', 'cost', 'notes'),
+    'medication_inventory': ('medication_id', 'lot_number', 'expiration_date', 'quantity_on_hand', 'reorder_level', 'location', 'last_restock_date', 'last_restock_quantity', 'status'),
+    'pharmacy_orders': ('order_id', 'order_number', 'medication_id', 'supplier_name', 'order_date', 'expected_delivery_date', 'actual_delivery_date', 'quantity_ordered', 'quantity_received', 'unit_cost', 'total_cost', 'order_status', 'notes'),
+    'insurance_authorizations': ('authorization_id', 'patient_id', 'policy_id', 'authorization_number', 'service_type', 'cpt_code_id', 'units_authorized', 'units_used', 'authorization_date', 'effective_date', 'expiration_date', 'status', 'notes'),
+    'insurance_claims': ('claim_id', 'claim_number', 'patient_id', 'policy_id', 'encounter_id', 'claim_date', 'service_date_from', 'service_date_to', 'total_charge', 'allowed_amount', 'paid_amount', 'patient_responsibility', 'adjustment_amount', 'submission_date', 'adjudication_date', 'payment_date', 'status', 'denial_reason', 'notes'),
+    'insurance_claim_items': ('claim_id', 'line_number', 'service_date', 'cpt_code_id', 'icd_code_id', 'service_description', 'quantity', 'unit_charge', 'total_charge', 'allowed_amount', 'paid_amount', 'adjustment_amount', 'adjustment_reason'),
+    'invoices': ('invoice_id', 'invoice_number', 'patient_id', 'encounter_id', 'invoice_date', 'due_date', 'subtotal_amount', 'tax_amount', 'discount_amount', 'total_amount', 'amount_paid', 'payment_status', 'payment_terms', 'notes'),
+    'invoice_items': ('invoice_id', 'line_number', 'item_type', 'cpt_code_id', 'description', 'quantity', 'unit_price', 'total_price', 'discount_amount', 'tax_amount'),
+    'payment_transactions': ('transaction_id', 'transaction_number', 'invoice_id', 'patient_id', 'payment_date', 'payment_amount', 'payment_method', 'payment_reference', 'card_type', 'card_last_four', 'processed_by', 'notes', 'status'),
+    'users': ('user_id', 'username', 'password_hash', 'email', 'user_type', 'reference_id', 'is_active', 'last_login', 'password_changed_at', 'failed_login_attempts', 'account_locked'),
+    'user_roles': ('user_id', 'role_id', 'assigned_date', 'assigned_by'),
+    'audit_logs': ('table_name', 'record_id', 'action', 'user_id', 'user_type', 'old_values', 'new_values', 'ip_address', 'user_agent', 'timestamp'),
+}
+
+# Tables grouped by the domain loader they scale, in FK-safe load order
+DOMAIN_TABLES = [
+    ('patient', ['patients', 'patient_addresses', 'patient_emergency_contacts', 'patient_allergies']),
+    ('transactional', ['appointments', 'appointment_cancellations', 'encounters', 'encounter_vitals',
+                       'encounter_diagnoses', 'encounter_procedures', 'clinical_notes', 'bed_assignments',
+                       'nurse_assignments', 'patient_insurance_policies']),
+    ('laboratory', ['lab_orders', 'lab_tests', 'lab_results']),
+    ('radiology', ['radiology_orders', 'radiology_results']),
+    ('pharmacy', ['prescriptions', 'prescription_refills', 'medication_inventory', 'pharmacy_orders']),
+    ('insurance', ['insurance_authorizations', 'insurance_claims', 'insurance_claim_items']),
+    ('billing', ['invoices', 'invoice_items', 'payment_transactions']),
+    ('admin', ['users', 'user_roles', 'audit_logs']),
+]
+
+# Primary key of every table whose IDs are assigned by the generator
+EXPLICIT_ID_COLUMNS = {
+    'patients': 'patient_id',
+    'appointments': 'appointment_id',
+    'encounters': 'encounter_id',
+    'patient_insurance_policies': 'policy_id',
+    'lab_orders': 'order_id',
+    'lab_tests': 'test_id',
+    'radiology_orders': 'order_id',
+    'prescriptions': 'prescription_id',
+    'pharmacy_orders': 'order_id',
+    'insurance_authorizations': 'authorization_id',
+    'insurance_claims': 'claim_id',
+    'invoices': 'invoice_id',
+    'payment_transactions': 'transaction_id',
+    'users': 'user_id',
+}
+
+# Reference ID lists read from the database: key -> query
+REFERENCE_QUERIES = {
+    'doctors': "SELECT doctor_id FROM doctors ORDER BY doctor_id",
+    'nurses': "SELECT nurse_id FROM nurses ORDER BY nurse_id",
+    'staff': "SELECT staff_id FROM staff ORDER BY staff_id",
+    'departments': "SELECT department_id FROM departments ORDER BY department_id",
+    'rooms': "SELECT room_id FROM rooms ORDER BY room_id",
+    'beds': "SELECT bed_id FROM beds ORDER BY bed_id",
+    'icd_codes': "SELECT icd_id FROM icd_codes ORDER BY icd_id",
+    'cpt_codes': "SELECT cpt_id FROM cpt_codes ORDER BY cpt_id",
+    'appointment_types': "SELECT type_id FROM appointment_types ORDER BY type_id",
+    'medications': "SELECT medication_id FROM medications ORDER BY medication_id",
+    'insurance_plans': "SELECT plan_id FROM insurance_plans ORDER BY plan_id",
+}
+
+# Reference lists each table cannot be generated without
+REQUIRED_REFERENCES = {
+    'appointments': ['doctors'],
+    'encounters': ['doctors'],
+    'encounter_vitals': ['nurses'],
+    'encounter_diagnoses': ['icd_codes'],
+    'encounter_procedures': ['cpt_codes', 'doctors'],
+    'clinical_notes': ['doctors'],
+    'bed_assignments': ['beds'],
+    'nurse_assignments': ['nurses', 'beds'],
+    'patient_insurance_policies': ['insurance_plans'],
+    'lab_orders': ['doctors'],
+    'lab_results': ['doctors'],
+    'radiology_orders': ['doctors'],
+    'radiology_results': ['doctors'],
+    'prescriptions': ['doctors', 'medications'],
+    'medication_inventory': ['medications'],
+    'pharmacy_orders': ['medications'],
+    'insurance_authorizations': ['insurance_plans'],
+    'insurance_claims': ['insurance_plans'],
+    'insurance_claim_items': ['insurance_plans'],
+    'user_roles': ['roles'],
+}
+
+# Value pools
+FIRST_NAMES = ('James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Carlos', 'Maria',
+               'Daniel', 'Nancy', 'Matthew', 'Lisa', 'Anthony', 'Betty', 'Mark', 'Sandra', 'Wei', 'Priya')
+LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+              'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Clark', 'Lewis', 'Patel', 'Nguyen', 'Chen')
+CITIES = (('Healthcare City', 'ST'), ('Springfield', 'IL'), ('Riverside', 'CA'), ('Franklin', 'TN'),
+          ('Greenville', 'SC'), ('Madison', 'WI'), ('Georgetown', 'TX'), ('Salem', 'OR'))
+STREETS = ('Main Street', 'Oak Avenue', 'Maple Drive', 'Cedar Lane', 'Pine Road', 'Elm Street', 'Lakeview Blvd')
+BLOOD_GROUPS = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+MARITAL_STATUSES = ('single', 'married', 'divorced', 'widowed')
+RELATIONSHIPS = ('Spouse', 'Parent', 'Child', 'Sibling', 'Friend')
+ALLERGENS = (('Penicillin', 'drug', 'Hives'), ('Sulfa drugs', 'drug', 'Rash'), ('Peanuts', 'food', 'Anaphylaxis'),
+             ('Shellfish', 'food', 'Swelling'), ('Pollen', 'environmental', 'Sneezing'),
+             ('Latex', 'other', 'Contact dermatitis'), ('Aspirin', 'drug', 'Bronchospasm'))
+VISIT_REASONS = ('Routine checkup', 'Follow-up visit', 'Chest pain evaluation', 'Headache', 'Shortness of breath',
+                 'Abdominal pain', 'Medication review', 'Joint pain', 'Fever and cough', 'Pre-operative assessment')
+APPOINTMENT_TIMES = tuple(dt_time(8 + slot // 2, 30 * (slot % 2)) for slot in range(18))
+ENCOUNTER_TYPES = ('outpatient',) * 14 + ('emergency',) * 2 + ('inpatient',) * 2 + ('surgical', 'consultation')
+NOTE_TYPES = ('progress', 'consultation', 'admission', 'discharge')
+SHIFTS = ('day', 'evening', 'night')
+
+# Lab test catalog: code, name, category, specimen, unit, reference low, reference high
+LAB_TEST_CATALOG = (
+    ('GLUC', 'Glucose', 'Chemistry', 'Serum', 'mg/dL', 70.0, 100.0),
+    ('BUN', 'Blood Urea Nitrogen', 'Chemistry', 'Serum', 'mg/dL', 7.0, 20.0),
+    ('CREAT', 'Creatinine', 'Chemistry', 'Serum', 'mg/dL', 0.6, 1.2),
+    ('NA', 'Sodium', 'Chemistry', 'Serum', 'mmol/L', 135.0, 145.0),
+    ('K', 'Potassium', 'Chemistry', 'Serum', 'mmol/L', 3.5, 5.1),
+    ('HGB', 'Hemoglobin', 'Hematology', 'Whole Blood', 'g/dL', 12.0, 17.5),
+    ('WBC', 'White Blood Cell Count', 'Hematology', 'Whole Blood', 'K/uL', 4.5, 11.0),
+    ('PLT', 'Platelet Count', 'Hematology', 'Whole Blood', 'K/uL', 150.0, 400.0),
+    ('TSH', 'Thyroid Stimulating Hormone', 'Endocrinology', 'Serum', 'mIU/L', 0.4, 4.0),
+    ('HBA1C', 'Hemoglobin A1c', 'Chemistry', 'Whole Blood', '%', 4.0, 5.6),
+)
+RADIOLOGY_EXAMS = (('Chest X-Ray', 'Chest', 'X-Ray'), ('CT Head', 'Head', 'CT'), ('MRI Knee', 'Knee', 'MRI'),
+                   ('Abdominal Ultrasound', 'Abdomen', 'Ultrasound'), ('Screening Mammogram', 'Breast', 'Mammography'),
+                   ('CT Chest', 'Chest', 'CT'))
+FREQUENCIES = ('once daily', 'twice daily', 'three times daily', 'every 8 hours', 'as needed')
+SUPPLIERS = ('Cardinal Health', 'McKesson', 'AmerisourceBergen', 'Henry Schein')
+SERVICE_TYPES = ('Hospitalization', 'MRI', 'Physical Therapy', 'Outpatient Surgery', 'Specialist Referral')
+USER_TYPES = ('doctor', 'nurse', 'staff', 'admin', 'receptionist')
+AUDITED_TABLES = ('patients', 'appointments', 'encounters', 'prescriptions', 'lab_results', 'invoices')
+
+
+def _money(cents):
+    """Convert integer cents to an exact 2-decimal Decimal"""
+    return Decimal(cents).scaleb(-2)
+
+
+def _split_cents(rng, total_cents, parts):
+    """Split an amount into parts that sum exactly to the total"""
+    if parts <= 1:
+        return [total_cents]
+    weights = [rng.randint(1, 10) for _ in range(parts)]
+    scale = sum(weights)
+    shares = [total_cents * w // scale for w in weights[:-1]]
+    shares.append(total_cents - sum(shares))
+    return shares
+
+
+def insert_sql(table):
+    """Build the INSERT IGNORE statement for a generated table"""
+    columns = TABLE_COLUMNS[table]
+    placeholders = ', '.join(['%s'] * len(columns))
+    return f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def fetch_reference_ids(cursor):
+    """Read reference/organizational/staff IDs the generated rows point at"""
+    reference = {}
+    for key, query in REFERENCE_QUERIES.items():
+        cursor.execute(query)
+        reference[key] = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT role_name, role_id FROM roles")
+    reference['roles'] = {name: role_id for name, role_id in cursor.fetchall()}
+    cursor.execute("SELECT user_id FROM users ORDER BY user_id")
+    reference['users'] = [row[0] for row in cursor.fetchall()]
+    return reference
+
+
+def fetch_id_offsets(cursor):
+    """Read MAX(primary key) for every table with generator-assigned IDs"""
+    offsets = {}
+    for table, id_column in EXPLICIT_ID_COLUMNS.items():
+        cursor.execute(f"SELECT COALESCE(MAX({id_column}), 0) FROM {table}")
+        offsets[table] = int(cursor.fetchone()[0])
+    return offsets
+
+
+class SyntheticDataGenerator:
+    """Deterministic, chunked row generator for the patient-centric domains"""
+
+    def __init__(self, reference, offsets, seed=DEFAULT_SEED, anchor_date=DEFAULT_ANCHOR_DATE, **scale):
+        unknown = set(scale) - set(SCALE_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown scale options: {', '.join(sorted(unknown))}")
+        self.scale = dict(SCALE_DEFAULTS, **scale)
+        too_small = [option for option in POSITIVE_SCALE_OPTIONS if self.scale[option] < 1]
+        if too_small:
+            raise ValueError(f"Scale options must be at least 1: {', '.join(too_small)}")
+        self.reference = reference
+        self.offsets = offsets
+        self.seed = seed
+        self.anchor = datetime.combine(anchor_date, dt_time(0, 0))
+        self.user_ids = list(reference.get('users', [])) + [
+            offsets['users'] + u + 1 for u in range(self.scale['users'])]
+
+    # ---- chunking ----------------------------------------------------------
+
+    def _scope(self, table):
+        """Unit a table is chunked by: patients, medications or users"""
+        if table in ('medication_inventory', 'pharmacy_orders'):
+            return 'medications'
+        if table in ('users', 'user_roles'):
+            return 'users'
+        return 'patients'
+
+    def _unit_count(self, scope):
+        if scope == 'medications':
+            return len(self.reference.get('medications', []))
+        return self.scale[scope]
+
+    def chunk_count(self, table):
+        """Number of independently generated chunks for a table"""
+        units = self._unit_count(self._scope(table))
+        return -(-units // self.scale['chunk_size'])
+
+    def chunk_range(self, table, chunk):
+        """Unit index range [start, end) covered by a chunk"""
+        units = self._unit_count(self._scope(table))
+        start = chunk * self.scale['chunk_size']
+        return range(start, min(start + self.scale['chunk_size'], units))
+
+    def missing_references(self, table):
+        """Reference lists a table needs that are empty in this database"""
+        return [key for key in REQUIRED_REFERENCES.get(table, []) if not self.reference.get(key)]
+
+    def _rng(self, table, chunk):
+        return random.Random(f"{self.seed}:{table}:{chunk}")
+
+    def _regen(self, table, units):
+        """Regenerate a parent table's rows for the same chunk (same seed, same rows)"""
+        generate = getattr(self, f'_gen_{table}')
+        return generate(self._rng(table, units.start // self.scale['chunk_size']), units)
+
+    def rows(self, table, chunk):
+        """Yield the rows of one chunk of a table as tuples in TABLE_COLUMNS order"""
+        generate = getattr(self, f'_gen_{table}')
+        return generate(self._rng(table, chunk), self.chunk_range(table, chunk))
+
+    def iter_rows(self, table):
+        """Yield every row of a table, chunk by chunk"""
+        for chunk in range(self.chunk_count(table)):
+            yield from self.rows(table, chunk)
+
+    # ---- ID arithmetic -----------------------------------------------------
+
+    def patient_id(self, i):
+        return self.offsets['patients'] + i + 1
+
+    def appointment_id(self, i, k):
+        return self.offsets['appointments'] + i * self.scale['appointments_per_patient'] + k + 1
+
+    def encounter_id(self, i, k):
+        return self.offsets['encounters'] + i * self.scale['encounters_per_patient'] + k + 1
+
+    def policy_id(self, i):
+        return self.offsets['patient_insurance_policies'] + i + 1
+
+    def lab_order_id(self, i, j):
+        return self.offsets['lab_orders'] + i * self.scale['lab_orders_per_patient'] + j + 1
+
+    def lab_test_id(self, i, j, t):
+        order_index = i * self.scale['lab_orders_per_patient'] + j
+        return self.offsets['lab_tests'] + order_index * self.scale['tests_per_lab_order'] + t + 1
+
+    def radiology_order_id(self, i, j):
+        return self.offsets['radiology_orders'] + i * self.scale['radiology_orders_per_patient'] + j + 1
+
+    def prescription_id(self, i, j):
+        return self.offsets['prescriptions'] + i * self.scale['prescriptions_per_patient'] + j + 1
+
+    def claim_id(self, i, j):
+        return self.offsets['insurance_claims'] + i * self.scale['claims_per_patient'] + j + 1
+
+    def invoice_id(self, i, k):
+        return self.offsets['invoices'] + i * self.scale['encounters_per_patient'] + k + 1
+
+    def user_id(self, u):
+        return self.offsets['users'] + u + 1
+
+    def _when(self, rng, days_back, days_ahead=0):
+        """Random datetime around the anchor date"""
+        return self.anchor + timedelta(days=rng.randint(-days_back, days_ahead),
+                                       minutes=rng.randint(8 * 60, 18 * 60))
+
+    # ---- patient domain ----------------------------------------------------
+
+    def _gen_patients(self, rng, units):
+        for i in units:
+            pid = self.patient_id(i)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            digits = f"{pid:08d}"
+            yield (pid, f'MRN{pid:09d}', first, last,
+                   (self.anchor - timedelta(days=rng.randint(365, 95 * 365))).date(),
+                   rng.choice(('Male', 'Female')), f'9{digits[-8:-6]}-{digits[-6:-4]}-{digits[-4:]}',
+                   f'555-{rng.randint(1000, 9999)}', f'{first.lower()}.{last.lower()}.{pid}@email.com',
+                   rng.choice(BLOOD_GROUPS), rng.choice(MARITAL_STATUSES),
+                   (self.anchor - timedelta(days=rng.randint(0, 5 * 365))).date(), 'active')
+
+    def _gen_patient_addresses(self, rng, units):
+        for i in units:
+            city, state = rng.choice(CITIES)
+            yield (self.patient_id(i), 'home', f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+                   city, state, f'{rng.randint(10000, 99999)}', True)
+            if rng.random() < 0.2:
+                yield (self.patient_id(i), 'work', f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+                       city, state, f'{rng.randint(10000, 99999)}', False)
+
+    def _gen_patient_emergency_contacts(self, rng, units):
+        for i in units:
+            for order in range(rng.randint(1, 2)):
+                yield (self.patient_id(i), f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                       rng.choice(RELATIONSHIPS), f'555-{rng.randint(1000, 9999)}', order == 0, order + 1)
+
+    def _gen_patient_allergies(self, rng, units):
+        for i in units:
+            if rng.random() < 0.4:
+                allergen, allergen_type, reaction = rng.choice(ALLERGENS)
+                yield (self.patient_id(i), allergen, allergen_type, reaction,
+                       rng.choice(('mild', 'moderate', 'severe')),
+                       (self.anchor - timedelta(days=rng.randint(30, 3650))).date(), None, 'active')
+
+    # ---- transactional domain ----------------------------------------------
+
+    def _gen_appointments(self, rng, units):
+        ref = self.reference
+        for i in units:
+            for k in range(self.scale['appointments_per_patient']):
+                aid = self.appointment_id(i, k)
+                appt_date = (self.anchor + timedelta(days=rng.randint(-365, 60))).date()
+                if appt_date < self.anchor.date():
+                    status = rng.choices(('completed', 'no_show', 'cancelled'), (85, 5, 10))[0]
+                else:
+                    status = rng.choice(('scheduled', 'confirmed'))
+                yield (aid, f'APT{aid:010d}', self.patient_id(i), rng.choice(ref['doctors']),
+                       rng.choice(ref['appointment_types']) if ref['appointment_types'] else None,
+                       appt_date, rng.choice(APPOINTMENT_TIMES), rng.choice((15, 20, 30, 45, 60)),
+                       rng.choice(ref['rooms']) if ref['rooms'] else None, rng.choice(VISIT_REASONS),
+                       status, rng.choices(('routine', 'urgent', 'emergency'), (90, 8, 2))[0])
+
+    def _gen_appointment_cancellations(self, rng, units):
+        for row in self._regen('appointments', units):
+            if row[10] == 'cancelled':
+                yield (row[0], rng.choice(('patient', 'doctor', 'staff', 'system')),
+                       datetime.combine(row[5], dt_time(8, 0)) - timedelta(days=rng.randint(0, 5)),
+                       'Unable to attend', rng.random() < 0.5, None, None)
+
+    def _gen_encounters(self, rng, units):
+        ref = self.reference
+        for i in units:
+            for k in range(self.scale['encounters_per_patient']):
+                eid = self.encounter_id(i, k)
+                enc_type = rng.choice(ENCOUNTER_TYPES)
+                enc_date = self._when(rng, 365)
+                appointment_id = (self.appointment_id(i, k)
+                                  if k < self.scale['appointments_per_patient'] else None)
+                bed_id = admission = discharge = los = disposition = None
+                status = 'completed'
+                if enc_type in ('inpatient', 'surgical') and ref['beds']:
+                    bed_id = rng.choice(ref['beds'])
+                    admission = enc_date
+                    los = rng.randint(1, 10)
+                    if admission + timedelta(days=los) < self.anchor:
+                        discharge = admission + timedelta(days=los)
+                        disposition = 'home'
+                    else:
+                        status, los = 'in_progress', None
+                yield (eid, f'ENC{eid:010d}', self.patient_id(i), rng.choice(ref['doctors']), appointment_id,
+                       enc_date, enc_type, rng.choice(ref['departments']) if ref['departments'] else None,
+                       rng.choice(ref['rooms']) if ref['rooms'] else None, bed_id, rng.choice(VISIT_REASONS),
+                       admission, discharge, los, status, disposition)
+
+    def _encounter_rows(self, units):
+        return self._regen('encounters', units)
+
+    def _gen_encounter_vitals(self, rng, units):
+        for enc in self._encounter_rows(units):
+            height = rng.randint(58, 76)
+            weight = rng.randint(100, 260)
+            yield (enc[0], enc[5] + timedelta(minutes=10), rng.choice(self.reference['nurses']),
+                   Decimal(rng.randint(970, 1010)).scaleb(-1), rng.randint(100, 160), rng.randint(60, 100),
+                   rng.randint(55, 110), rng.randint(12, 22), Decimal(rng.randint(920, 1000)).scaleb(-1),
+                   weight, height, round(703 * weight / (height * height), 2), rng.randint(0, 8), None)
+
+    def _gen_encounter_diagnoses(self, rng, units):
+        icd_ids = self.reference['icd_codes']
+        for enc in self._encounter_rows(units):
+            yield (enc[0], rng.choice(icd_ids), enc[10], 'primary',
+                   rng.choice(('mild', 'moderate', 'severe')), enc[5].date(), None, rng.random() < 0.3, None)
+            if rng.random() < 0.3:
+                yield (enc[0], rng.choice(icd_ids), 'Secondary finding', 'secondary', 'mild',
+                       enc[5].date(), None, False, None)
+
+    def _gen_encounter_procedures(self, rng, units):
+        for enc in self._encounter_rows(units):
+            if enc[6] in ('surgical', 'inpatient'):
+                yield (enc[0], rng.choice(self.reference['cpt_codes']), 'Procedure', None, enc[3], None,
+                       enc[5] + timedelta(hours=2), rng.randint(30, 240), enc[8],
+                       'general' if enc[6] == 'surgical' else 'local', 'Successful', None,
+                       'completed' if enc[14] == 'completed' else 'scheduled')
+
+    def _gen_clinical_notes(self, rng, units):
+        for enc in self._encounter_rows(units):
+            note_time = enc[5] + timedelta(hours=1)
+            yield (enc[0], rng.choice(NOTE_TYPES), enc[3], 'doctor', note_time, enc[10],
+                   f'Patient seen for {enc[10].lower()}. Plan discussed with patient.',
+                   True, note_time + timedelta(minutes=30), False, None)
+
+    def _gen_bed_assignments(self, rng, units):
+        for enc in self._encounter_rows(units):
+            if enc[9] is not None:
+                yield (enc[2], enc[9], enc[0], enc[11], enc[12], enc[10],
+                       rng.choice(self.reference['staff']) if self.reference['staff'] else None,
+                       'active' if enc[12] is None else 'discharged')
+
+    def _gen_nurse_assignments(self, rng, units):
+        for enc in self._encounter_rows(units):
+            if enc[9] is not None:
+                yield (rng.choice(self.reference['nurses']), enc[2], enc[9], enc[11], enc[12],
+                       rng.choice(SHIFTS), None)
+
+    def _gen_patient_insurance_policies(self, rng, units):
+        for i in units:
+            policy_id = self.policy_id(i)
+            yield (policy_id, self.patient_id(i), rng.choice(self.reference['insurance_plans']),
+                   f'POL{policy_id:010d}', f'GRP{rng.randint(1000, 9999)}', None, 'self',
+                   (self.anchor - timedelta(days=rng.randint(30, 2000))).date(), True, 'active')
+
+    # ---- laboratory & radiology --------------------------------------------
+
+    def _gen_lab_orders(self, rng, units):
+        for i in units:
+            for j in range(self.scale['lab_orders_per_patient']):
+                order_id = self.lab_order_id(i, j)
+                ordered = self._when(rng, 365)
+                status = 'completed' if ordered < self.anchor - timedelta(days=2) else rng.choice(('ordered', 'in_progress'))
+                yield (order_id, f'LAB{order_id:010d}', self.encounter_id(i, j % self.scale['encounters_per_patient']),
+                       self.patient_id(i), rng.choice(self.reference['doctors']), ordered,
+                       rng.choices(('routine', 'urgent', 'stat'), (85, 10, 5))[0], status,
+                       ordered + timedelta(hours=1) if status != 'ordered' else None, None)
+
+    def _gen_lab_tests(self, rng, units):
+        orders = self._regen('lab_orders', units)
+        for order in orders:
+            i, j = divmod(order[0] - self.offsets['lab_orders'] - 1, self.scale['lab_orders_per_patient'])
+            for t in range(self.scale['tests_per_lab_order']):
+                code, name, category, specimen = rng.choice(LAB_TEST_CATALOG)[:4]
+                yield (self.lab_test_id(i, j, t), order[0], code, name, category, specimen,
+                       'completed' if order[7] == 'completed' else 'pending')
+
+    def _gen_lab_results(self, rng, units):
+        catalog = {entry[0]: entry for entry in LAB_TEST_CATALOG}
+        orders = {order[0]: order for order in
+                  self._regen('lab_orders', units)}
+        tests = self._regen('lab_tests', units)
+        for test in tests:
+            if test[6] != 'completed':
+                continue
+            _, _, _, _, unit, low, high = catalog[test[2]]
+            value = rng.gauss((low + high) / 2, (high - low) / 3)
+            if value < low - (high - low) or value > high + (high - low):
+                flag = 'critical'
+            elif value < low:
+                flag = 'low'
+            elif value > high:
+                flag = 'high'
+            else:
+                flag = 'normal'
+            resulted = orders[test[1]][5] + timedelta(hours=rng.randint(2, 24))
+            yield (test[0], f'{max(value, 0):.1f}', unit, f'{low:g}-{high:g}', flag, resulted, 'Lab Tech',
+                   rng.choice(self.reference['doctors']), resulted + timedelta(minutes=30), None)
+
+    def _gen_radiology_orders(self, rng, units):
+        for i in units:
+            for j in range(self.scale['radiology_orders_per_patient']):
+                order_id = self.radiology_order_id(i, j)
+                exam, body_part, modality = rng.choice(RADIOLOGY_EXAMS)
+                ordered = self._when(rng, 365)
+                status = 'completed' if ordered < self.anchor - timedelta(days=3) else rng.choice(('ordered', 'scheduled'))
+                yield (order_id, f'RAD{order_id:010d}', self.encounter_id(i, j % self.scale['encounters_per_patient']),
+                       self.patient_id(i), rng.choice(self.reference['doctors']), exam, body_part, modality,
+                       ordered, ordered + timedelta(days=1), rng.choices(('routine', 'urgent', 'stat'), (85, 10, 5))[0],
+                       VISIT_REASONS[j % len(VISIT_REASONS)], modality in ('CT', 'MRI') and rng.random() < 0.3,
+                       status, None)
+
+    def _gen_radiology_results(self, rng, units):
+        orders = self._regen('radiology_orders', units)
+        for order in orders:
+            if order[13] == 'completed':
+                critical = rng.random() < 0.02
+                yield (order[0], order[9], rng.choice(self.reference['doctors']),
+                       'Significant abnormality identified' if critical else 'No acute abnormality',
+                       'Urgent follow-up recommended' if critical else 'Normal study', None, critical,
+                       order[9] + timedelta(hours=4), f'PACS/{order[1]}', 'final')
+
+    # ---- pharmacy ----------------------------------------------------------
+
+    def _gen_prescriptions(self, rng, units):
+        for i in units:
+            for j in range(self.scale['prescriptions_per_patient']):
+                rx_id = self.prescription_id(i, j)
+                rx_date = (self.anchor - timedelta(days=rng.randint(0, 365))).date()
+                days = rng.choice((7, 14, 30, 90))
+                end_date = rx_date + timedelta(days=days)
+                refills = rng.randint(0, 3)
+                remaining = rng.randint(0, refills)
+                quantity = days * rng.choice((1, 2))
+                yield (rx_id, f'RX{rx_id:010d}', self.encounter_id(i, j % self.scale['encounters_per_patient']),
+                       self.patient_id(i), rng.choice(self.reference['doctors']),
+                       rng.choice(self.reference['medications']), '1 tablet', 'tablet', 'oral',
+                       rng.choice(FREQUENCIES), f'{days} days', quantity, quantity, refills, remaining,
+                       rx_date, rx_date, end_date, 'Take as directed', None,
+                       'active' if end_date >= self.anchor.date() else 'completed', False)
+
+    def _gen_prescription_refills(self, rng, units):
+        prescriptions = self._regen('prescriptions', units)
+        for rx in prescriptions:
+            for refill_number in range(1, rx[13] - rx[14] + 1):
+                yield (rx[0], refill_number, rx[15] + timedelta(days=30 * refill_number), rx[11], 'Pharmacist',
+                       'Hospital Pharmacy', '555-1234', _money(rng.randint(500, 9000)), None)
+
+    def _gen_medication_inventory(self, rng, units):
+        medications = self.reference['medications']
+        for m in units:
+            for lot in range(self.scale['inventory_lots_per_medication']):
+                quantity = rng.randint(0, 2000)
+                reorder = rng.choice((50, 100, 200))
+                expires = (self.anchor + timedelta(days=rng.randint(-30, 720))).date()
+                if expires < self.anchor.date():
+                    status = 'expired'
+                else:
+                    status = 'low_stock' if quantity <= reorder else 'available'
+                yield (medications[m], f'LOT{medications[m]:06d}{lot:03d}', expires, quantity, reorder,
+                       f'Pharmacy Shelf {chr(65 + lot % 6)}', (self.anchor - timedelta(days=rng.randint(1, 90))).date(),
+                       rng.randint(500, 2000), status)
+
+    def _gen_pharmacy_orders(self, rng, units):
+        medications = self.reference['medications']
+        per_medication = self.scale['pharmacy_orders_per_medication']
+        for m in units:
+            for k in range(per_medication):
+                order_id = self.offsets['pharmacy_orders'] + m * per_medication + k + 1
+                ordered = (self.anchor - timedelta(days=rng.randint(0, 365))).date()
+                quantity = rng.choice((250, 500, 1000))
+                unit_cost = rng.randint(10, 500)
+                received = ordered + timedelta(days=5) < self.anchor.date()
+                yield (order_id, f'PO{order_id:010d}', medications[m], rng.choice(SUPPLIERS), ordered,
+                       ordered + timedelta(days=5), ordered + timedelta(days=5) if received else None,
+                       quantity, quantity if received else None, _money(unit_cost), _money(unit_cost * quantity),
+                       'received' if received else 'ordered', None)
+
+    # ---- insurance ---------------------------------------------------------
+
+    def _gen_insurance_authorizations(self, rng, units):
+        for i in units:
+            if rng.random() < 0.4:
+                auth_id = self.offsets['insurance_authorizations'] + i + 1
+                authorized = (self.anchor - timedelta(days=rng.randint(0, 365))).date()
+                units_authorized = rng.randint(1, 10)
+                yield (auth_id, self.patient_id(i), self.policy_id(i), f'AUTH{auth_id:010d}',
+                       rng.choice(SERVICE_TYPES),
+                       rng.choice(self.reference['cpt_codes']) if self.reference['cpt_codes'] else None,
+                       units_authorized, rng.randint(0, units_authorized), authorized, authorized,
+                       authorized + timedelta(days=90), rng.choices(('approved', 'pending', 'denied'), (80, 15, 5))[0],
+                       None)
+
+    def _gen_insurance_claims(self, rng, units):
+        for i in units:
+            for j in range(self.scale['claims_per_patient']):
+                claim_id = self.claim_id(i, j)
+                service = (self.anchor - timedelta(days=rng.randint(0, 365))).date()
+                total = rng.randint(10000, 500000)
+                status = rng.choices(('submitted', 'pending', 'approved', 'paid', 'denied'), (15, 15, 10, 55, 5))[0]
+                allowed = paid = patient_part = adjudicated = paid_on = denial = None
+                if status in ('approved', 'paid', 'denied'):
+                    adjudicated = service + timedelta(days=14)
+                if status in ('approved', 'paid'):
+                    allowed = total * rng.randint(60, 90) // 100
+                    patient_part = allowed * rng.randint(10, 30) // 100
+                    if status == 'paid':
+                        paid = allowed - patient_part
+                        paid_on = service + timedelta(days=30)
+                if status == 'denied':
+                    denial = 'Service not covered'
+                yield (claim_id, f'CLM{claim_id:010d}', self.patient_id(i), self.policy_id(i),
+                       self.encounter_id(i, j % self.scale['encounters_per_patient']), service, service, service,
+                       _money(total), None if allowed is None else _money(allowed),
+                       _money(paid or 0), None if patient_part is None else _money(patient_part), _money(0),
+                       service + timedelta(days=1), adjudicated, paid_on, status, denial, None)
+
+    def _gen_insurance_claim_items(self, rng, units):
+        claims = self._regen('insurance_claims', units)
+        cpt_ids = self.reference['cpt_codes']
+        icd_ids = self.reference['icd_codes']
+        for claim in claims:
+            shares = _split_cents(rng, int(claim[8] * 100), self.scale['items_per_claim'])
+            for line, cents in enumerate(shares, start=1):
+                yield (claim[0], line, claim[6], rng.choice(cpt_ids) if cpt_ids else None,
+                       rng.choice(icd_ids) if icd_ids else None, 'Hospital service', 1, _money(cents),
+                       _money(cents), None, _money(0), _money(0), None)
+
+    # ---- billing -----------------------------------------------------------
+
+    def _gen_invoices(self, rng, units):
+        for enc in self._encounter_rows(units):
+            i, k = divmod(enc[0] - self.offsets['encounters'] - 1, self.scale['encounters_per_patient'])
+            invoice_id = self.invoice_id(i, k)
+            invoiced = enc[5].date()
+            subtotal = rng.randint(5000, 300000)
+            tax = subtotal * 5 // 100
+            discount = rng.choice((0, 0, subtotal // 10))
+            total = subtotal + tax - discount
+            status = rng.choices(('paid', 'partial', 'pending', 'overdue'), (55, 15, 20, 10))[0]
+            paid = {'paid': total, 'partial': total * rng.randint(20, 80) // 100}.get(status, 0)
+            yield (invoice_id, f'INV{invoice_id:010d}', enc[2], enc[0], invoiced, invoiced + timedelta(days=30),
+                   _money(subtotal), _money(tax), _money(discount), _money(total), _money(paid), status,
+                   'Net 30', None)
+
+    def _gen_invoice_items(self, rng, units):
+        cpt_ids = self.reference['cpt_codes']
+        for invoice in self._regen('invoices', units):
+            shares = _split_cents(rng, int(invoice[6] * 100), self.scale['items_per_invoice'])
+            for line, cents in enumerate(shares, start=1):
+                yield (invoice[0], line, rng.choice(('service', 'procedure', 'lab', 'medication')),
+                       rng.choice(cpt_ids) if cpt_ids else None, f'Service item {line}', 1, _money(cents),
+                       _money(cents), _money(0), _money(0))
+
+    def _gen_payment_transactions(self, rng, units):
+        for invoice in self._regen('invoices', units):
+            if invoice[10] > 0:
+                transaction_id = self.offsets['payment_transactions'] + invoice[0] - self.offsets['invoices']
+                method = rng.choice(('cash', 'check', 'credit_card', 'debit_card', 'insurance'))
+                card = method in ('credit_card', 'debit_card')
+                yield (transaction_id, f'TXN{transaction_id:010d}', invoice[0], invoice[2],
+                       invoice[4] + timedelta(days=rng.randint(0, 30)), invoice[10], method, None,
+                       'Visa' if card else None, f'{rng.randint(0, 9999):04d}' if card else None, None, None,
+                       'completed')
+
+    # ---- admin -------------------------------------------------------------
+
+    def _gen_users(self, rng, units):
+        for u in units:
+            user_id = self.user_id(u)
+            user_type = rng.choices(USER_TYPES, (30, 40, 20, 2, 8))[0]
+            reference_id = None
+            if user_type == 'doctor' and self.reference['doctors']:
+                reference_id = rng.choice(self.reference['doctors'])
+            elif user_type == 'nurse' and self.reference['nurses']:
+                reference_id = rng.choice(self.reference['nurses'])
+            elif user_type == 'staff' and self.reference['staff']:
+                reference_id = rng.choice(self.reference['staff'])
+            yield (user_id, f'user{user_id:08d}', 'password_hash_here', f'user{user_id:08d}@hospital.com',
+                   user_type, reference_id, True, self._when(rng, 30), None, 0, False)
+
+    def _gen_user_roles(self, rng, units):
+        roles = self.reference['roles']
+        users = self._regen('users', units)
+        for user in users:
+            role_id = roles.get(user[4])
+            if role_id is not None:
+                yield (user[0], role_id, (self.anchor - timedelta(days=rng.randint(0, 365))).date(), None)
+
+    def _gen_audit_logs(self, rng, units):
+        user_ids = self.user_ids
+        for i in units:
+            pid = self.patient_id(i)
+            for _ in range(self.scale['audit_logs_per_patient']):
+                table = rng.choice(AUDITED_TABLES)
+                action = rng.choices(('INSERT', 'UPDATE', 'VIEW'), (30, 30, 40))[0]
+                old_values = new_values = None
+                if action == 'UPDATE':
+                    old_values = json.dumps({'patient_id': pid, 'phone': f'555-{rng.randint(1000, 9999)}'})
+                    new_values = json.dumps({'patient_id': pid, 'phone': f'555-{rng.randint(1000, 9999)}'})
+                elif action == 'INSERT':
+                    new_values = json.dumps({'patient_id': pid})
+                yield (table, pid, action, rng.choice(user_ids) if user_ids else None,
+                       rng.choice(USER_TYPES), old_values, new_values,
+                       f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}', 'Mozilla/5.0',
+                       self._when(rng, 365))
+
+
+def generation_plan(generator):
+    """Tables to load in FK-safe order, skipping those missing references"""
+    plan = []
+    for domain, tables in DOMAIN_TABLES:
+        for table in tables:
+            missing = generator.missing_references(table)
+            if missing:
+                logger.warning(f"Skipping {table}: no rows in {', '.join(missing)}")
+                continue
+            plan.append((domain, table))
+    return plan
+
+
+def load_table(cursor, generator, table, batch_size=1000, chunks=None):
+    """Stream generated rows of a table into MySQL with batched executemany"""
+    sql = insert_sql(table)
+    loaded = 0
+    for chunk in (range(generator.chunk_count(table)) if chunks is None else chunks):
+        rows = generator.rows(table, chunk)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            cursor.executemany(sql, batch)
+            loaded += len(batch)
+    return loaded
+
+
+def load_synthetic_data(seed=DEFAULT_SEED, anchor_date=DEFAULT_ANCHOR_DATE, batch_size=1000, **scale):
+    """Generate and load synthetic data for every patient-centric domain"""
+    connection = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        generator = SyntheticDataGenerator(fetch_reference_ids(cursor), fetch_id_offsets(cursor),
+                                           seed=seed, anchor_date=anchor_date, **scale)
+
+        print("\n" + "=" * 60)
+        print("HOSPITAL OLTP SYSTEM - SYNTHETIC DATA GENERATOR")
+        print("=" * 60)
+        print(f"Patients: {generator.scale['patients']:,}  Seed: {seed}  Anchor date: {anchor_date}")
+
+        started = time.perf_counter()
+        total_rows = 0
+        current_domain = None
+        for domain, table in generation_plan(generator):
+            if domain != current_domain:
+                print(f"\nLoading {domain} domain...")
+                current_domain = domain
+            table_started = time.perf_counter()
+            loaded = load_table(cursor, generator, table, batch_size)
+            connection.commit()
+            elapsed = time.perf_counter() - table_started
+            total_rows += loaded
+            rate = loaded / elapsed if elapsed > 0 else 0
+            logger.info(f"Generated {loaded} {table} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+            print(f"   [OK] {table:<30}: {loaded:>12,} rows ({rate:,.0f} rows/sec)")
+
+        elapsed = time.perf_counter() - started
+        cursor.close()
+        print("\n" + "=" * 60)
+        print(f"[OK] {total_rows:,} ROWS GENERATED IN {elapsed:.1f}s")
+        print("=" * 60)
+        return True
+
+    except Error as e:
+        logger.error(f"Error loading synthetic data: {e}")
+        print(f"\n[FAILED] Error: {e}")
+        if connection and connection.is_connected():
+            connection.rollback()
+        return False
+
+    finally:
+        if connection:
+            connection.close()
+
+
+def add_scale_arguments(parser):
+    """Register --patients, --encounters-per-patient, ... on an argument parser"""
+    for option, default in SCALE_DEFAULTS.items():
+        parser.add_argument(f"--{option.replace('_', '-')}", type=int, default=default,
+                            help=f"default: {default}")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f"default: {DEFAULT_SEED}")
+    parser.add_argument('--anchor-date', type=date.fromisoformat, default=DEFAULT_ANCHOR_DATE,
+                        help=f"date generated activity is centred on (default: {DEFAULT_ANCHOR_DATE})")
+
+
+def scale_from_args(args):
+    """Extract the scale options from parsed arguments"""
+    return {option: getattr(args, option) for option in SCALE_DEFAULTS}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic hospital data at scale")
+    add_scale_arguments(parser)
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per executemany (default: 1000)")
+    args = parser.parse_args(argv)
+    return load_synthetic_data(seed=args.seed, anchor_date=args.anchor_date, batch_size=args.batch_size,
+                               **scale_from_args(args))
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)